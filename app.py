@@ -59,6 +59,10 @@ def create_app(config_override: dict = None) -> Flask:
     # Inicializar banco de dados
     db.init_app(app)
     
+    # Cache de consultas por requisição, descartado a cada escrita
+    from utils import cache
+    cache.registrar_eventos()
+    
     # Inicializar proteção CSRF
     csrf = CSRFProtect(app)
     
@@ -124,6 +128,11 @@ def create_app(config_override: dict = None) -> Flask:
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
     
+    # Acompanhamento dos uploads assíncronos: consultas do próprio front-end
+    # enquanto o OCR roda, não devem consumir a cota padrão (50/hora)
+    limiter.exempt(app.view_functions['upload.status_job'])
+    limiter.exempt(app.view_functions['upload.eventos_job_ocr'])
+    
     # Tratamento de erros
     @app.errorhandler(413)
     def request_entity_too_large(error):
@@ -132,21 +141,21 @@ def create_app(config_override: dict = None) -> Flask:
             'sucesso': False,
             'erro': f'Arquivo muito grande. Máximo: {Config.MAX_CONTENT_LENGTH // (1024*1024)}MB'
         }), 413
-
+    
     @app.errorhandler(404)
     def not_found(error):
         """Tratamento para página não encontrada."""
         if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
             return jsonify({'sucesso': False, 'erro': 'Recurso não encontrado.'}), 404
         return render_template('404.html'), 404
-
+    
     @app.errorhandler(403)
     def forbidden(error):
         """Tratamento para acesso negado."""
         if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
             return jsonify({'sucesso': False, 'erro': 'Acesso negado.'}), 403
         return render_template('403.html'), 403
-
+    
     @app.errorhandler(500)
     def internal_error(error):
         """Tratamento para erro interno."""
@@ -168,9 +177,12 @@ app = create_app()
 # =============================================================================
 
 def init_db():
-    """Cria as tabelas do banco de dados se não existirem."""
+    """Cria as tabelas do banco de dados e aplica migrações pendentes."""
+    from utils.migracoes import aplicar_migracoes
+    
     with app.app_context():
         db.create_all()
+        aplicar_migracoes()
         logger.info("✅ Banco de dados inicializado")
 
 
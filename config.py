@@ -70,6 +70,99 @@ class Config:
     # Modelo com suporte a visão (imagens)
     # Opções: meta-llama/llama-4-maverick-17b-128e-instruct ou meta-llama/llama-4-scout-17b-16e-instruct
     GROQ_MODEL: str = 'meta-llama/llama-4-maverick-17b-128e-instruct'
+    # Roteamento entre modelos: o rápido (scout) tenta primeiro e o GROQ_MODEL
+    # só é chamado se a extração falhar ou a confiança informada pelo modelo
+    # ficar abaixo de OCR_CONFIANCA_MINIMA (0 a 1)
+    OCR_ROTEAMENTO_ATIVO: bool = os.getenv('OCR_ROTEAMENTO_ATIVO', 'True').lower() == 'true'
+    GROQ_MODEL_RAPIDO: str = os.getenv('GROQ_MODEL_RAPIDO', 'meta-llama/llama-4-scout-17b-16e-instruct')
+    OCR_CONFIANCA_MINIMA: float = float(os.getenv('OCR_CONFIANCA_MINIMA', '0.7'))
+    # Upload em massa: imagens pequenas (prints de PIX, cupons) vão juntas numa
+    # só requisição, até OCR_LOTE_MAX_IMAGENS (a Groq aceita 5) de no máximo
+    # OCR_LOTE_TAMANHO_MAXIMO_KB cada; PDFs e fotos grandes seguem sozinhos
+    OCR_LOTE_ATIVO: bool = os.getenv('OCR_LOTE_ATIVO', 'True').lower() == 'true'
+    OCR_LOTE_MAX_IMAGENS: int = int(os.getenv('OCR_LOTE_MAX_IMAGENS', '5'))
+    OCR_LOTE_TAMANHO_MAXIMO_KB: int = int(os.getenv('OCR_LOTE_TAMANHO_MAXIMO_KB', '500'))
+    # Modelo só de texto, mais barato, para PDFs digitais que as regras
+    # locais (utils/regras_comprovante.py) não conseguiram ler sozinhas
+    GROQ_MODEL_TEXTO: str = os.getenv('GROQ_MODEL_TEXTO', 'llama-3.1-8b-instant')
+    # Saída estruturada das extrações: 'json_schema' (esquema fixo de
+    # utils/esquema_ocr.py), 'json_object' (só JSON válido) ou 'desligada'
+    GROQ_SAIDA_ESTRUTURADA: str = os.getenv('GROQ_SAIDA_ESTRUTURADA', 'json_schema').lower()
+    # Cota da chave Groq (utils/limitador.py): requisições e tokens por minuto.
+    # Padrões = plano gratuito do modelo de visão; ajuste conforme o plano contratado
+    GROQ_RPM: int = int(os.getenv('GROQ_RPM', '30'))
+    GROQ_TPM: int = int(os.getenv('GROQ_TPM', '6000'))
+    # GROQ_LIMITADOR: 'sqlite' (baldes num arquivo, a cota vale para todos os
+    # processos: workers web e scripts/worker_ocr.py) ou 'processo' (em
+    # memória; cada processo teria a cota inteira)
+    GROQ_LIMITADOR: str = os.getenv('GROQ_LIMITADOR', 'sqlite').lower()
+    GROQ_LIMITADOR_ARQUIVO: Path = Path(os.getenv('GROQ_LIMITADOR_ARQUIVO', str(INSTANCE_DIR / 'limitador.db')))
+    # Espera máxima (s) por cota antes de desistir da chamada
+    GROQ_ESPERA_MAXIMA: float = float(os.getenv('GROQ_ESPERA_MAXIMA', '90'))
+    # Resiliência das chamadas (utils/resiliencia.py): timeout por tentativa,
+    # prazo total (tentativas + esperas), tentativas e backoff exponencial (s)
+    GROQ_TIMEOUT: float = float(os.getenv('GROQ_TIMEOUT', '30'))
+    GROQ_PRAZO: float = float(os.getenv('GROQ_PRAZO', '90'))
+    GROQ_TENTATIVAS: int = int(os.getenv('GROQ_TENTATIVAS', '3'))
+    GROQ_BACKOFF_BASE: float = float(os.getenv('GROQ_BACKOFF_BASE', '1'))
+    GROQ_BACKOFF_MAXIMO: float = float(os.getenv('GROQ_BACKOFF_MAXIMO', '20'))
+    # Disjuntor: após GROQ_DISJUNTOR_FALHAS falhas seguidas da Groq, as
+    # chamadas falham na hora por GROQ_DISJUNTOR_ESPERA segundos
+    GROQ_DISJUNTOR_FALHAS: int = int(os.getenv('GROQ_DISJUNTOR_FALHAS', '5'))
+    GROQ_DISJUNTOR_ESPERA: float = float(os.getenv('GROQ_DISJUNTOR_ESPERA', '30'))
+    # Hedge (opcional): chamada que passar do percentil GROQ_HEDGE_PERCENTIL
+    # das latências recentes ganha uma cópia (vale a primeira resposta).
+    # Só com GROQ_HEDGE_MINIMO_AMOSTRAS medidas e se o limitador tiver ao
+    # menos GROQ_HEDGE_FOLGA_MINIMA (0-1) da cota livre
+    GROQ_HEDGE_ATIVO: bool = os.getenv('GROQ_HEDGE_ATIVO', 'False').lower() == 'true'
+    GROQ_HEDGE_PERCENTIL: float = float(os.getenv('GROQ_HEDGE_PERCENTIL', '95'))
+    GROQ_HEDGE_MINIMO_AMOSTRAS: int = int(os.getenv('GROQ_HEDGE_MINIMO_AMOSTRAS', '20'))
+    GROQ_HEDGE_FOLGA_MINIMA: float = float(os.getenv('GROQ_HEDGE_FOLGA_MINIMA', '0.5'))
+    # Arquivos processados em paralelo no upload em massa
+    UPLOAD_MAX_PARALELO: int = int(os.getenv('UPLOAD_MAX_PARALELO', '4'))
+    # OCR_ASSINCRONO: uploads de notas viram jobs processados por
+    # scripts/worker_ocr.py (o upload responde na hora com o id do job).
+    # False processa na própria requisição (útil sem worker ou para rollback)
+    OCR_ASSINCRONO: bool = os.getenv('OCR_ASSINCRONO', 'True').lower() == 'true'
+    # Segundos de cada conexão do stream /upload-jobs/<id>/eventos. Cada
+    # conexão ocupa um worker síncrono (uWSGI); o navegador reconecta
+    # sozinho e o Last-Event-ID evita reenviar o que já recebeu
+    SSE_DURACAO_MAXIMA: float = float(os.getenv('SSE_DURACAO_MAXIMA', '5'))
+    # Cache de resultados do OCR (services/ocr_cache_service.py): o mesmo
+    # arquivo enviado de novo não gera outra chamada paga à Groq.
+    # Entradas expiram após OCR_CACHE_TTL_DIAS; acima de OCR_CACHE_MAX_ITENS
+    # as menos acessadas são descartadas
+    OCR_CACHE_ATIVO: bool = os.getenv('OCR_CACHE_ATIVO', 'True').lower() == 'true'
+    OCR_CACHE_TTL_DIAS: int = int(os.getenv('OCR_CACHE_TTL_DIAS', '90'))
+    OCR_CACHE_MAX_ITENS: int = int(os.getenv('OCR_CACHE_MAX_ITENS', '5000'))
+    # Pré-processamento das imagens antes do OCR (utils/imagem_ocr.py):
+    # rotação pelo EXIF, recorte do documento, tons de cinza, redução até
+    # OCR_IMAGEM_LADO_MAXIMO px e recompressão JPEG com OCR_IMAGEM_QUALIDADE
+    OCR_PREPROCESSAMENTO_ATIVO: bool = os.getenv('OCR_PREPROCESSAMENTO_ATIVO', 'True').lower() == 'true'
+    OCR_IMAGEM_LADO_MAXIMO: int = int(os.getenv('OCR_IMAGEM_LADO_MAXIMO', '1600'))
+    OCR_IMAGEM_QUALIDADE: int = int(os.getenv('OCR_IMAGEM_QUALIDADE', '85'))
+    # PDFs com camada de texto: regras locais e, se preciso, o modelo de
+    # texto, antes de renderizar a página para o modelo de visão
+    OCR_TEXTO_PDF_ATIVO: bool = os.getenv('OCR_TEXTO_PDF_ATIVO', 'True').lower() == 'true'
+    # PDFs enviados ao modelo de visão: até OCR_PDF_MAX_PAGINAS páginas numa
+    # única requisição (a Groq aceita no máximo 5 imagens), renderizadas por
+    # OCR_PDF_PROCESSOS processos (0 = no próprio processo, em sequência).
+    # O pool (spawn) não funciona dentro do uWSGI, onde sys.executable é o
+    # binário do servidor: o processo web renderiza em sequência, e só o
+    # scripts/worker_ocr.py usa OCR_PDF_PROCESSOS_WORKER processos
+    OCR_PDF_MAX_PAGINAS: int = int(os.getenv('OCR_PDF_MAX_PAGINAS', '3'))
+    OCR_PDF_PROCESSOS: int = int(os.getenv('OCR_PDF_PROCESSOS', '0'))
+    OCR_PDF_PROCESSOS_WORKER: int = int(os.getenv('OCR_PDF_PROCESSOS_WORKER', '2'))
+    # Renderização adaptativa das páginas (utils/pdf_converter.py): DPI pelo
+    # tamanho do texto, recorte no conteúdo e cinza sem cor. False = 150 DPI fixo
+    OCR_PDF_RENDER_ADAPTATIVO: bool = os.getenv('OCR_PDF_RENDER_ADAPTATIVO', 'True').lower() == 'true'
+    
+    # Cache de resultados agregados entre requisições (utils/cache.py)
+    # CACHE_BACKEND: 'lru' (memória de cada processo), 'sqlite' (arquivo
+    # compartilhado entre os workers) ou 'nenhum' (desativa)
+    CACHE_BACKEND: str = os.getenv('CACHE_BACKEND', 'lru').lower()
+    CACHE_MAX_ITENS: int = int(os.getenv('CACHE_MAX_ITENS', '512'))
+    CACHE_ARQUIVO: Path = INSTANCE_DIR / 'cache.db'
     
     # Senha de segurança para exclusão de transações
     # Altere para uma senha personalizada via .env ou aqui diretamente
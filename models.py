@@ -7,15 +7,24 @@ consultas e agregações.
 """
 
 # 1. Bibliotecas padrão
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from typing import Optional
+import json
 import logging
+import re
+import uuid
 
 # 2. Bibliotecas externas
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event, func, and_, or_, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# 3. Imports locais
+from utils.cache import memoizar_por_requisicao, cache_entre_requisicoes, marcar_falha_consulta
+from utils.helpers import para_centavos, de_centavos
+
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
@@ -88,22 +97,36 @@ class Transacao(db.Model):
     Attributes:
         id: Identificador único da transação
         tipo: Tipo da transação ('DESPESA' ou 'RECEITA')
-        valor: Valor monetário da transação
+        valor: Valor monetário da transação em reais (derivado de valor_centavos)
+        valor_centavos: Valor em centavos inteiros (coluna gravada no banco)
         data: Data e hora da transação
         categoria: Categoria da transação
         descricao: Descrição opcional da transação
         estabelecimento: Nome do estabelecimento (para despesas)
         comprovante_url: URL do comprovante/nota fiscal
+        texto_comprovante: Texto extraído do comprovante (indexado na busca)
         status: Status da transação ('CONFIRMADO', 'PENDENTE', etc.)
         created_at: Data e hora de criação do registro
     """
     
     __tablename__ = 'transacoes'
     
+    # Índices das consultas por período (bancos existentes: utils/migracoes.py)
+    __table_args__ = (
+        # Intervalos de data (listagem do mês/ano, ORDER BY data)
+        db.Index('ix_transacoes_data', 'data'),
+        # SUM(valor_centavos) por tipo no período sem ler a tabela
+        db.Index('ix_transacoes_tipo_data_centavos', 'tipo', 'data', 'valor_centavos'),
+        # Consultas anuais de transações confirmadas
+        db.Index('ix_transacoes_status_data_centavos', 'status', 'data', 'tipo', 'valor_centavos'),
+        # Detalhamento por categoria/subcategoria
+        db.Index('ix_transacoes_categoria_subcategoria_data', 'categoria', 'subcategoria', 'data'),
+    )
+    
     # Campos obrigatórios
     id: int = db.Column(db.Integer, primary_key=True, autoincrement=True)
     tipo: str = db.Column(db.String(10), nullable=False)  # 'DESPESA' ou 'RECEITA'
-    valor: float = db.Column(db.Float, nullable=False)
+    valor_centavos: int = db.Column(db.Integer, nullable=False)  # Somas exatas no SQL
     data: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     categoria: str = db.Column(db.String(50), nullable=False)
     
@@ -112,11 +135,30 @@ class Transacao(db.Model):
     descricao: Optional[str] = db.Column(db.String(200), nullable=True)
     estabelecimento: Optional[str] = db.Column(db.String(100), nullable=True)
     comprovante_url: Optional[str] = db.Column(db.String(500), nullable=True)
+    texto_comprovante: Optional[str] = db.Column(db.Text, nullable=True)
     
     # Campos de controle
     status: str = db.Column(db.String(20), default='CONFIRMADO')
     created_at: datetime = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @hybrid_property
+    def valor(self) -> Optional[float]:
+        """Valor em reais, calculado a partir dos centavos gravados."""
+        if self.valor_centavos is None:
+            return None
+        return de_centavos(self.valor_centavos)
+    
+    @valor.inplace.setter
+    def _valor_setter(self, valor) -> None:
+        """Aceita reais (float, int, str ou Decimal) e grava em centavos."""
+        self.valor_centavos = para_centavos(valor) if valor is not None else None
+    
+    @valor.inplace.expression
+    @classmethod
+    def _valor_expression(cls):
+        """Em consultas, Transacao.valor é valor_centavos / 100.0."""
+        return cls.valor_centavos / 100.0
+    
     def __repr__(self) -> str:
         """Representação em string do objeto Transacao."""
         return f'<Transacao {self.id}: {self.tipo} R${self.valor:.2f}>'
@@ -151,6 +193,595 @@ class Transacao(db.Model):
         }
 
 
+# =============================================================================
+# BUSCA TEXTUAL (SQLite FTS5)
+# =============================================================================
+
+# Índice FTS5 em modo "external content": o texto fica só em transacoes e a
+# tabela virtual guarda apenas o índice invertido. remove_diacritics torna a
+# busca insensível a acentos e prefix='2 3' acelera buscas por prefixo curtas.
+SQL_INDICE_BUSCA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transacoes_fts USING fts5(
+        descricao, estabelecimento, texto_comprovante,
+        content='transacoes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # Triggers mantêm o índice sincronizado com qualquer escrita (ORM ou SQL)
+    """
+    CREATE TRIGGER IF NOT EXISTS transacoes_fts_ai AFTER INSERT ON transacoes BEGIN
+        INSERT INTO transacoes_fts(rowid, descricao, estabelecimento, texto_comprovante)
+        VALUES (new.id, new.descricao, new.estabelecimento, new.texto_comprovante);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transacoes_fts_ad AFTER DELETE ON transacoes BEGIN
+        INSERT INTO transacoes_fts(transacoes_fts, rowid, descricao, estabelecimento, texto_comprovante)
+        VALUES ('delete', old.id, old.descricao, old.estabelecimento, old.texto_comprovante);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transacoes_fts_au
+    AFTER UPDATE OF descricao, estabelecimento, texto_comprovante ON transacoes BEGIN
+        INSERT INTO transacoes_fts(transacoes_fts, rowid, descricao, estabelecimento, texto_comprovante)
+        VALUES ('delete', old.id, old.descricao, old.estabelecimento, old.texto_comprovante);
+        INSERT INTO transacoes_fts(rowid, descricao, estabelecimento, texto_comprovante)
+        VALUES (new.id, new.descricao, new.estabelecimento, new.texto_comprovante);
+    END
+    """,
+]
+
+# Pesos do bm25 por coluna (descricao, estabelecimento, texto_comprovante):
+# o fornecedor pesa mais que a descrição livre e o texto integral da nota
+PESOS_BUSCA = (1.0, 2.0, 0.5)
+
+
+def criar_indice_busca(conexao) -> None:
+    """
+    Cria a tabela FTS5 e os triggers de sincronização (idempotente).
+    
+    Args:
+        conexao: Conexão SQLAlchemy (engine.begin() ou evento de DDL)
+    """
+    for sql in SQL_INDICE_BUSCA:
+        conexao.execute(text(sql))
+
+
+@event.listens_for(Transacao.__table__, 'after_create')
+def _criar_busca_com_tabela(tabela, conexao, **kwargs) -> None:
+    """db.create_all() cria o índice de busca junto com a tabela transacoes."""
+    criar_indice_busca(conexao)
+
+
+@event.listens_for(Transacao.__table__, 'before_drop')
+def _remover_busca_com_tabela(tabela, conexao, **kwargs) -> None:
+    """db.drop_all() remove o índice de busca antes da tabela transacoes."""
+    conexao.execute(text("DROP TABLE IF EXISTS transacoes_fts"))
+
+
+def _expressao_busca(termo: str) -> Optional[str]:
+    """
+    Converte o texto digitado numa expressão MATCH do FTS5.
+    
+    Cada palavra vira um prefixo entre aspas ("palavra"*), combinadas com
+    AND implícito. Aspas e operadores digitados pelo usuário são descartados.
+    
+    Args:
+        termo: Texto livre (ex: 'atacadão camar')
+    
+    Returns:
+        str: Expressão MATCH, ou None se não houver palavras
+    
+    Example:
+        >>> _expressao_busca('Atacadão camar')
+        '"Atacadão"* "camar"*'
+    """
+    palavras = re.findall(r'\w+', termo or '')
+    if not palavras:
+        return None
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+@memoizar_por_requisicao
+def buscar_transacoes(termo: str, limite: int = 50, tipo: str = None) -> list:
+    """
+    Busca textual ranqueada em todas as transações (todos os anos).
+    
+    Pesquisa descrição, estabelecimento e texto do comprovante pelo índice
+    FTS5, sem diferenciar maiúsculas ou acentos e casando prefixos das
+    palavras. Ordena por relevância (bm25) e, no empate, pela data mais
+    recente.
+    
+    Args:
+        termo: Texto da busca (ex: 'atacadao')
+        limite: Máximo de resultados
+        tipo: Opcional filtro 'DESPESA' ou 'RECEITA'
+    
+    Returns:
+        list: Objetos Transacao na ordem de relevância
+    """
+    expressao = _expressao_busca(termo)
+    if not expressao:
+        return []
+    
+    try:
+        sql = f"""
+            SELECT t.id
+            FROM transacoes_fts
+            JOIN transacoes t ON t.id = transacoes_fts.rowid
+            WHERE transacoes_fts MATCH :expressao
+            {'AND t.tipo = :tipo' if tipo else ''}
+            ORDER BY bm25(transacoes_fts, {', '.join(map(str, PESOS_BUSCA))}), t.data DESC
+            LIMIT :limite
+        """
+        ids = db.session.execute(
+            text(sql), {'expressao': expressao, 'tipo': tipo, 'limite': limite}
+        ).scalars().all()
+        
+        if not ids:
+            return []
+        
+        por_id = {t.id: t for t in Transacao.query.filter(Transacao.id.in_(ids)).all()}
+        transacoes = [por_id[i] for i in ids if i in por_id]
+        
+        logger.info(f"Busca '{termo}': {len(transacoes)} resultados")
+        return transacoes
+        
+    except Exception as e:
+        logger.error(f"Erro na busca textual '{termo}': {e}")
+        return []
+
+
+class ResumoTransacao(db.Model):
+    """
+    Totais pré-agregados de transações por período (tabela de rollup).
+    
+    Cada linha guarda a soma e a quantidade de transações de um período
+    (dia, mês ou ano) para uma combinação de tipo, status, categoria e
+    subcategoria. É mantida incrementalmente por triggers a cada escrita em
+    transacoes (SQL_RESUMOS), então as telas leem O(categorias) linhas
+    em vez de varrer as transações do período.
+    
+    Attributes:
+        granularidade: 'dia', 'mes' ou 'ano'
+        periodo: 'YYYY-MM-DD', 'YYYY-MM' ou 'YYYY', conforme a granularidade
+        tipo: 'DESPESA' ou 'RECEITA'
+        status: Status das transações agregadas
+        categoria: Categoria das transações agregadas
+        subcategoria: Subcategoria ('' quando a transação não tem)
+        total_centavos: Soma dos valores em centavos (inteiro, sem erro de arredondamento)
+        quantidade: Número de transações
+    """
+    
+    __tablename__ = 'resumos_transacoes'
+    __table_args__ = (
+        db.UniqueConstraint(
+            'granularidade', 'periodo', 'tipo', 'status', 'categoria', 'subcategoria',
+            name='uq_resumos_transacoes_chave'
+        ),
+    )
+    
+    id: int = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    granularidade: str = db.Column(db.String(3), nullable=False)
+    periodo: str = db.Column(db.String(10), nullable=False)
+    tipo: str = db.Column(db.String(10), nullable=False)
+    status: str = db.Column(db.String(20), nullable=False, default='')
+    categoria: str = db.Column(db.String(50), nullable=False)
+    subcategoria: str = db.Column(db.String(50), nullable=False, default='')
+    total_centavos: int = db.Column(db.Integer, nullable=False, default=0)
+    quantidade: int = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Formato do campo 'periodo' para cada granularidade
+    FORMATOS_PERIODO = {
+        'dia': '%Y-%m-%d',
+        'mes': '%Y-%m',
+        'ano': '%Y'
+    }
+    
+    def __repr__(self) -> str:
+        return f'<ResumoTransacao {self.granularidade} {self.periodo} {self.tipo}/{self.categoria}>'
+
+
+# Soma (sinal '+', linha new) ou subtrai (sinal '-', linha old) uma
+# transação nas linhas de dia, mês e ano do rollup. Mesmos formatos de
+# ResumoTransacao.FORMATOS_PERIODO; o WHERE também desfaz a ambiguidade
+# do INSERT ... SELECT com ON CONFLICT no SQLite.
+_SQL_DELTA_RESUMO = """
+        INSERT INTO resumos_transacoes
+            (granularidade, periodo, tipo, status, categoria, subcategoria, total_centavos, quantidade)
+        SELECT g.granularidade, strftime(g.formato, {linha}.data), {linha}.tipo,
+               coalesce({linha}.status, ''), {linha}.categoria, coalesce({linha}.subcategoria, ''),
+               {sinal}{linha}.valor_centavos, {sinal}1
+        FROM (SELECT 'dia' AS granularidade, '%Y-%m-%d' AS formato
+              UNION ALL SELECT 'mes', '%Y-%m' UNION ALL SELECT 'ano', '%Y') AS g
+        WHERE {linha}.data IS NOT NULL AND {linha}.valor_centavos IS NOT NULL
+        ON CONFLICT (granularidade, periodo, tipo, status, categoria, subcategoria) DO UPDATE SET
+            total_centavos = total_centavos + excluded.total_centavos,
+            quantidade = quantidade + excluded.quantidade;
+"""
+
+# Remove as linhas que ficaram sem transações (só os períodos da linha old)
+_SQL_LIMPAR_RESUMO = """
+        DELETE FROM resumos_transacoes
+        WHERE quantidade <= 0 AND periodo IN
+            (strftime('%Y-%m-%d', old.data), strftime('%Y-%m', old.data), strftime('%Y', old.data));
+"""
+
+# Triggers mantêm o rollup em qualquer escrita, inclusive query.delete(),
+# query.update() e SQL direto, que não passam pelos eventos da sessão
+SQL_RESUMOS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_resumos_ai AFTER INSERT ON transacoes BEGIN
+        {_SQL_DELTA_RESUMO.format(linha='new', sinal='+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_resumos_ad AFTER DELETE ON transacoes BEGIN
+        {_SQL_DELTA_RESUMO.format(linha='old', sinal='-')}
+        {_SQL_LIMPAR_RESUMO}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_resumos_au
+    AFTER UPDATE OF tipo, status, categoria, subcategoria, data, valor_centavos ON transacoes BEGIN
+        {_SQL_DELTA_RESUMO.format(linha='old', sinal='-')}
+        {_SQL_DELTA_RESUMO.format(linha='new', sinal='+')}
+        {_SQL_LIMPAR_RESUMO}
+    END
+    """,
+]
+
+
+def criar_triggers_resumos(conexao) -> None:
+    """
+    Cria os triggers de manutenção do rollup (idempotente).
+    
+    Args:
+        conexao: Conexão SQLAlchemy (engine.begin() ou evento de DDL)
+    """
+    for sql in SQL_RESUMOS:
+        conexao.execute(text(sql))
+
+
+class VersaoDados(db.Model):
+    """
+    Versão global dos dados de transações (linha única, id=1).
+    
+    Incrementada por triggers a cada INSERT, UPDATE ou DELETE em
+    transacoes, inclusive escritas feitas fora do ORM. Compõe a chave do
+    cache entre requisições (utils/cache.py): como fica no próprio banco,
+    todos os workers enxergam a mesma versão.
+    """
+    
+    __tablename__ = 'versao_dados'
+    
+    id: int = db.Column(db.Integer, primary_key=True)
+    versao: int = db.Column(db.Integer, nullable=False, default=0)
+
+
+SQL_VERSAO_DADOS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transacoes_versao_{sufixo} AFTER {evento} ON transacoes BEGIN
+        UPDATE versao_dados SET versao = versao + 1 WHERE id = 1;
+    END
+    """
+    for sufixo, evento in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))
+]
+
+
+def criar_versao_dados(conexao) -> None:
+    """
+    Cria a linha de versão e os triggers que a incrementam (idempotente).
+    
+    A versão inicial usa o relógio (ms) para que um banco recriado não
+    reaproveite versões — e entradas de cache — de um banco anterior.
+    
+    Args:
+        conexao: Conexão SQLAlchemy (engine.begin() ou evento de DDL)
+    """
+    conexao.execute(
+        text("INSERT OR IGNORE INTO versao_dados (id, versao) VALUES (1, :versao)"),
+        {'versao': int(datetime.utcnow().timestamp() * 1000)}
+    )
+    for sql in SQL_VERSAO_DADOS:
+        conexao.execute(text(sql))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _criar_versao_com_tabelas(metadata, conexao, tables=(), **kwargs) -> None:
+    """
+    db.create_all() cria a versão dos dados depois de todas as tabelas.
+    
+    Os triggers do rollup só nascem junto com uma tabela de resumos nova
+    (vazia, coerente com eles); bancos antigos os recebem pela migração
+    que também reconstrói o rollup (utils/migracoes.py).
+    """
+    criar_versao_dados(conexao)
+    if ResumoTransacao.__table__ in tables:
+        criar_triggers_resumos(conexao)
+
+
+@memoizar_por_requisicao
+def get_versao_dados() -> Optional[int]:
+    """
+    Lê a versão global dos dados (uma vez por requisição, até a próxima escrita).
+    
+    Returns:
+        int: Versão atual, ou None se a tabela ainda não existe
+    """
+    try:
+        return db.session.execute(text("SELECT versao FROM versao_dados WHERE id = 1")).scalar()
+    except Exception as e:
+        logger.warning(f"Versão dos dados indisponível: {e}")
+        return None
+
+
+# =============================================================================
+# FILA DE OCR (processamento assíncrono de uploads)
+# =============================================================================
+
+class JobOCR(db.Model):
+    """
+    Lote de arquivos enviados para OCR (um upload, com um ou vários arquivos).
+    
+    O upload grava os arquivos no disco e cria o job; o worker
+    (scripts/worker_ocr.py) processa cada ArquivoJobOCR e o cliente
+    consulta o andamento pelo id (services/ocr_job_service.py).
+    
+    Attributes:
+        id: Identificador aleatório (uuid hex) devolvido ao cliente
+        origem: 'nota' (upload único) ou 'massa' (upload em massa)
+        created_at: Data e hora de criação
+        arquivos: Arquivos do job, na ordem do upload
+    """
+    
+    __tablename__ = 'jobs_ocr'
+    
+    id: str = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    origem: str = db.Column(db.String(10), nullable=False, default='nota')
+    created_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    arquivos = db.relationship(
+        'ArquivoJobOCR', backref='job', order_by='ArquivoJobOCR.indice',
+        cascade='all, delete-orphan', lazy='selectin'
+    )
+    
+    @property
+    def status(self) -> str:
+        """'CONCLUIDO' quando todos os arquivos terminaram, senão PENDENTE/PROCESSANDO."""
+        if all(a.finalizado for a in self.arquivos):
+            return 'CONCLUIDO'
+        if any(a.tentativas for a in self.arquivos):  # Algum já foi pego pelo worker
+            return 'PROCESSANDO'
+        return 'PENDENTE'
+    
+    def to_dict(self) -> dict:
+        """Andamento do job e os resultados já disponíveis de cada arquivo."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'total': len(self.arquivos),
+            'concluidos': sum(1 for a in self.arquivos if a.finalizado),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'resultados': [a.to_dict() for a in self.arquivos]
+        }
+
+
+class ArquivoJobOCR(db.Model):
+    """
+    Um arquivo de um JobOCR e o resultado da extração.
+    
+    Attributes:
+        job_id: Job ao qual o arquivo pertence
+        indice: Posição do arquivo no upload (0-based)
+        nome_arquivo: Nome original do arquivo
+        tipo_arquivo: 'imagem' ou 'pdf'
+        comprovante_url: URL do arquivo salvo em /static/uploads
+        status: PENDENTE, PROCESSANDO (reivindicado), CONVERTENDO (PDF → imagem),
+                EXTRAINDO (chamada à Groq), SUCESSO ou ERRO
+        tentativas: Quantas vezes um worker pegou o arquivo
+        resultado: JSON com os dados extraídos (quando SUCESSO)
+        erro: Mensagem de erro (quando ERRO)
+        iniciado_em: Quando o worker pegou o arquivo pela última vez
+        concluido_em: Quando o processamento terminou
+    """
+    
+    __tablename__ = 'arquivos_job_ocr'
+    __table_args__ = (
+        # Busca do próximo arquivo pendente pelo worker
+        db.Index('ix_arquivos_job_ocr_status', 'status', 'id'),
+    )
+    
+    STATUS_PENDENTE = 'PENDENTE'
+    STATUS_PROCESSANDO = 'PROCESSANDO'
+    STATUS_CONVERTENDO = 'CONVERTENDO'
+    STATUS_EXTRAINDO = 'EXTRAINDO'
+    STATUS_SUCESSO = 'SUCESSO'
+    STATUS_ERRO = 'ERRO'
+    
+    # Etapas de um arquivo que está com algum worker
+    STATUS_EM_ANDAMENTO = (STATUS_PROCESSANDO, STATUS_CONVERTENDO, STATUS_EXTRAINDO)
+    
+    id: int = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id: str = db.Column(db.String(32), db.ForeignKey('jobs_ocr.id'), nullable=False, index=True)
+    indice: int = db.Column(db.Integer, nullable=False)
+    nome_arquivo: str = db.Column(db.String(255), nullable=False)
+    tipo_arquivo: str = db.Column(db.String(10), nullable=False, default='imagem')
+    comprovante_url: Optional[str] = db.Column(db.String(500), nullable=True)
+    status: str = db.Column(db.String(15), nullable=False, default=STATUS_PENDENTE)
+    tentativas: int = db.Column(db.Integer, nullable=False, default=0)
+    resultado: Optional[str] = db.Column(db.Text, nullable=True)
+    erro: Optional[str] = db.Column(db.String(300), nullable=True)
+    iniciado_em: Optional[datetime] = db.Column(db.DateTime, nullable=True)
+    concluido_em: Optional[datetime] = db.Column(db.DateTime, nullable=True)
+    
+    @property
+    def finalizado(self) -> bool:
+        """True se o arquivo já tem resultado (sucesso ou erro)."""
+        return self.status in (self.STATUS_SUCESSO, self.STATUS_ERRO)
+    
+    def to_dict(self) -> dict:
+        """
+        Resultado no mesmo formato de cada item de /upload-notas-massa.
+        
+        Returns:
+            dict: {status, nome_arquivo, sucesso, dados, comprovante_url, erro};
+                  sucesso é None enquanto o arquivo não terminou
+        """
+        return {
+            'status': self.status,
+            'nome_arquivo': self.nome_arquivo,
+            'sucesso': (self.status == self.STATUS_SUCESSO) if self.finalizado else None,
+            'dados': json.loads(self.resultado) if self.resultado else None,
+            'comprovante_url': self.comprovante_url,
+            'erro': self.erro
+        }
+
+
+class StatusWorkerOCR(db.Model):
+    """
+    Último estado publicado por um processo worker de OCR.
+    
+    As chamadas à Groq do modo assíncrono rodam em scripts/worker_ocr.py,
+    então o disjuntor, as latências e o roteamento que importam ficam
+    naquele processo. Cada worker grava aqui um snapshot a cada arquivo
+    concluído (e periodicamente quando ocioso), e GET /api/ocr/status o lê
+    (services/ocr_job_service.py).
+    
+    Attributes:
+        id: Identificação do processo ('host:pid')
+        dados: JSON com {disjuntor, latencia, roteamento}
+        atualizado_em: Quando o snapshot foi publicado
+    """
+    
+    __tablename__ = 'status_worker_ocr'
+    
+    id: str = db.Column(db.String(100), primary_key=True)
+    dados: str = db.Column(db.Text, nullable=False)
+    atualizado_em: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def to_dict(self) -> dict:
+        """Snapshot com a identificação do worker e o horário (UTC) da publicação."""
+        return {
+            'worker': self.id,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None,
+            **json.loads(self.dados)
+        }
+
+
+# =============================================================================
+# CACHE DE OCR
+# =============================================================================
+
+class ResultadoOCRCache(db.Model):
+    """
+    Resultado de uma extração da Groq, reaproveitado quando o mesmo arquivo volta.
+    
+    A chave combina o SHA-256 do arquivo com o modelo e a versão do prompt,
+    então trocar qualquer um deles invalida as entradas antigas
+    (services/ocr_cache_service.py).
+    
+    Attributes:
+        chave: SHA-256 de (hash do arquivo, modelo, versão do prompt)
+        hash_arquivo: SHA-256 dos bytes decodificados do arquivo
+        modelo: Modelo da Groq que gerou o resultado
+        versao_prompt: Versão do prompt usado na extração
+        resultado: JSON com o retorno da extração ({'sucesso': True, 'dados': {...}})
+        acertos: Quantas vezes o resultado foi reaproveitado
+        created_at: Quando o resultado foi gravado (base do TTL)
+        acessado_em: Último uso (base do descarte por tamanho)
+    """
+    
+    __tablename__ = 'cache_ocr'
+    
+    chave: str = db.Column(db.String(64), primary_key=True)
+    hash_arquivo: str = db.Column(db.String(64), nullable=False, index=True)
+    modelo: str = db.Column(db.String(100), nullable=False)
+    versao_prompt: str = db.Column(db.String(40), nullable=False)
+    resultado: str = db.Column(db.Text, nullable=False)
+    acertos: int = db.Column(db.Integer, nullable=False, default=0)
+    created_at: datetime = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    acessado_em: datetime = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+def _somar_resumos(granularidade: str, inicio: str, fim: str, *agrupadores, filtros: tuple = ()) -> list:
+    """
+    Soma linhas da tabela de rollup num intervalo de períodos.
+    
+    Args:
+        granularidade: 'dia', 'mes' ou 'ano'
+        inicio: Primeiro período (inclusive), ex: '2025-01-01'
+        fim: Último período (inclusive), ex: '2025-01-31'
+        *agrupadores: Colunas de ResumoTransacao do GROUP BY
+        filtros: Condições adicionais do WHERE
+    
+    Returns:
+        list: Linhas (agrupador_1, ..., agrupador_n, soma_centavos, soma_quantidade)
+    """
+    return db.session.query(
+        *agrupadores,
+        func.sum(ResumoTransacao.total_centavos),
+        func.sum(ResumoTransacao.quantidade)
+    ).filter(
+        ResumoTransacao.granularidade == granularidade,
+        ResumoTransacao.periodo >= inicio,
+        ResumoTransacao.periodo <= fim,
+        *filtros
+    ).group_by(*agrupadores).all()
+
+
+def _intervalo_mes(ano: int, mes: int) -> tuple:
+    """
+    Retorna o intervalo [início, fim) de datas de um mês.
+    
+    Args:
+        ano: Ano desejado (ex: 2024)
+        mes: Mês desejado (1-12)
+    
+    Returns:
+        tuple: (data_inicio, data_fim) onde data_fim é o 1º dia do mês seguinte
+    """
+    data_inicio = datetime(ano, mes, 1)
+    
+    # Calcula o próximo mês para o limite superior
+    if mes == 12:
+        data_fim = datetime(ano + 1, 1, 1)
+    else:
+        data_fim = datetime(ano, mes + 1, 1)
+    
+    return data_inicio, data_fim
+
+
+def _somar_valores_mes(ano: int, mes: int, *agrupadores, filtros: tuple = ()) -> list:
+    """
+    Executa SUM(valor_centavos) agrupado no banco para as transações de um mês.
+    
+    Evita carregar as transações como objetos ORM: o banco devolve apenas
+    uma linha por grupo (tipo, categoria, dia...).
+    
+    Args:
+        ano: Ano desejado
+        mes: Mês desejado (1-12)
+        *agrupadores: Colunas/expressões do GROUP BY
+        filtros: Condições adicionais do WHERE
+    
+    Returns:
+        list: Linhas (agrupador_1, ..., agrupador_n, soma_centavos)
+    """
+    data_inicio, data_fim = _intervalo_mes(ano, mes)
+    
+    return db.session.query(
+        *agrupadores,
+        func.sum(Transacao.valor_centavos)
+    ).filter(
+        Transacao.data >= data_inicio,
+        Transacao.data < data_fim,
+        *filtros
+    ).group_by(*agrupadores).all()
+
+
+@memoizar_por_requisicao
 def get_transacoes_mes(ano: int, mes: int) -> list:
     """
     Obtém todas as transações de um mês específico.
@@ -169,14 +800,7 @@ def get_transacoes_mes(ano: int, mes: int) -> list:
         ...     print(f"{t.data}: {t.valor}")
     """
     try:
-        # Define o primeiro e último dia do mês
-        data_inicio = datetime(ano, mes, 1)
-        
-        # Calcula o próximo mês para o limite superior
-        if mes == 12:
-            data_fim = datetime(ano + 1, 1, 1)
-        else:
-            data_fim = datetime(ano, mes + 1, 1)
+        data_inicio, data_fim = _intervalo_mes(ano, mes)
         
         # Consulta as transações no intervalo
         transacoes = Transacao.query.filter(
@@ -192,10 +816,14 @@ def get_transacoes_mes(ano: int, mes: int) -> list:
         return []
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_totais_mes(ano: int, mes: int) -> dict:
     """
     Calcula os totais financeiros de um mês específico.
     
+    A soma é feita no banco (SUM ... GROUP BY tipo).
+    
     Args:
         ano: Ano desejado (ex: 2024)
         mes: Mês desejado (1-12)
@@ -211,11 +839,11 @@ def get_totais_mes(ano: int, mes: int) -> dict:
         >>> print(f"Lucro: R${totais['lucro']:.2f}")
     """
     try:
-        transacoes = get_transacoes_mes(ano, mes)
+        somas = dict(_somar_valores_mes(ano, mes, Transacao.tipo))
         
-        receitas = sum(t.valor for t in transacoes if t.tipo == 'RECEITA')
-        despesas = sum(t.valor for t in transacoes if t.tipo == 'DESPESA')
-        lucro = receitas - despesas
+        receitas = de_centavos(somas.get('RECEITA'))
+        despesas = de_centavos(somas.get('DESPESA'))
+        lucro = de_centavos((somas.get('RECEITA') or 0) - (somas.get('DESPESA') or 0))
         
         logger.info(
             f"Totais {mes}/{ano} - Receitas: R${receitas:.2f}, "
@@ -230,6 +858,7 @@ def get_totais_mes(ano: int, mes: int) -> dict:
     
     except Exception as e:
         logger.error(f"Erro ao calcular totais do mês {mes}/{ano}: {e}")
+        marcar_falha_consulta()
         return {
             'receitas': 0.0,
             'despesas': 0.0,
@@ -237,6 +866,8 @@ def get_totais_mes(ano: int, mes: int) -> dict:
         }
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_gastos_por_categoria(ano: int, mes: int) -> dict:
     """
     Agrupa as despesas por categoria para um mês específico.
@@ -257,19 +888,11 @@ def get_gastos_por_categoria(ano: int, mes: int) -> dict:
         ...     print(f"{categoria}: R${valor:.2f}")
     """
     try:
-        transacoes = get_transacoes_mes(ano, mes)
-        
-        # Filtra apenas despesas
-        despesas = [t for t in transacoes if t.tipo == 'DESPESA']
-        
-        # Agrupa por categoria
-        gastos_categoria: dict = {}
-        for transacao in despesas:
-            categoria = transacao.categoria
-            if categoria in gastos_categoria:
-                gastos_categoria[categoria] += transacao.valor
-            else:
-                gastos_categoria[categoria] = transacao.valor
+        linhas = _somar_valores_mes(
+            ano, mes, Transacao.categoria,
+            filtros=(Transacao.tipo == 'DESPESA',)
+        )
+        gastos_categoria = {categoria: de_centavos(total) for categoria, total in linhas}
         
         logger.info(
             f"Gastos por categoria {mes}/{ano}: {len(gastos_categoria)} categorias"
@@ -279,9 +902,12 @@ def get_gastos_por_categoria(ano: int, mes: int) -> dict:
     
     except Exception as e:
         logger.error(f"Erro ao agrupar gastos por categoria {mes}/{ano}: {e}")
+        marcar_falha_consulta()
         return {}
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_receitas_por_categoria(ano: int, mes: int) -> dict:
     """
     Agrupa as receitas por categoria (tipo de pagamento) para um mês específico.
@@ -295,19 +921,11 @@ def get_receitas_por_categoria(ano: int, mes: int) -> dict:
               e os valores são os totais recebidos em cada categoria
     """
     try:
-        transacoes = get_transacoes_mes(ano, mes)
-        
-        # Filtra apenas receitas
-        receitas = [t for t in transacoes if t.tipo == 'RECEITA']
-        
-        # Agrupa por categoria
-        receitas_categoria: dict = {}
-        for transacao in receitas:
-            categoria = transacao.categoria
-            if categoria in receitas_categoria:
-                receitas_categoria[categoria] += transacao.valor
-            else:
-                receitas_categoria[categoria] = transacao.valor
+        linhas = _somar_valores_mes(
+            ano, mes, Transacao.categoria,
+            filtros=(Transacao.tipo == 'RECEITA',)
+        )
+        receitas_categoria = {categoria: de_centavos(total) for categoria, total in linhas}
         
         logger.info(
             f"Receitas por categoria {mes}/{ano}: {len(receitas_categoria)} categorias"
@@ -317,9 +935,12 @@ def get_receitas_por_categoria(ano: int, mes: int) -> dict:
     
     except Exception as e:
         logger.error(f"Erro ao agrupar receitas por categoria {mes}/{ano}: {e}")
+        marcar_falha_consulta()
         return {}
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_gastos_por_subcategoria(ano: int, mes: int, categoria: str) -> dict:
     """
     Agrupa as despesas por subcategoria para uma categoria específica.
@@ -341,19 +962,20 @@ def get_gastos_por_subcategoria(ano: int, mes: int, categoria: str) -> dict:
         ...     print(f"{subcat}: R${valor:.2f}")
     """
     try:
-        transacoes = get_transacoes_mes(ano, mes)
+        linhas = _somar_valores_mes(
+            ano, mes, Transacao.subcategoria,
+            filtros=(Transacao.tipo == 'DESPESA', Transacao.categoria == categoria)
+        )
         
-        # Filtra despesas da categoria especificada
-        despesas = [t for t in transacoes if t.tipo == 'DESPESA' and t.categoria == categoria]
+        # NULL e string vazia caem no mesmo grupo 'Sem subcategoria'
+        centavos_subcategoria: dict = {}
+        for subcategoria, total in linhas:
+            chave = subcategoria or 'Sem subcategoria'
+            centavos_subcategoria[chave] = centavos_subcategoria.get(chave, 0) + total
         
-        # Agrupa por subcategoria
-        gastos_subcategoria: dict = {}
-        for transacao in despesas:
-            subcategoria = transacao.subcategoria or 'Sem subcategoria'
-            if subcategoria in gastos_subcategoria:
-                gastos_subcategoria[subcategoria] += transacao.valor
-            else:
-                gastos_subcategoria[subcategoria] = transacao.valor
+        gastos_subcategoria = {
+            chave: de_centavos(total) for chave, total in centavos_subcategoria.items()
+        }
         
         logger.info(
             f"Gastos por subcategoria {categoria} {mes}/{ano}: {len(gastos_subcategoria)} subcategorias"
@@ -363,9 +985,12 @@ def get_gastos_por_subcategoria(ano: int, mes: int, categoria: str) -> dict:
     
     except Exception as e:
         logger.error(f"Erro ao agrupar gastos por subcategoria {mes}/{ano}: {e}")
+        marcar_falha_consulta()
         return {}
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_totais_diarios_mes(ano: int, mes: int) -> dict:
     """
     Calcula totais diários para o gráfico de evolução (Dias x Valores).
@@ -393,15 +1018,18 @@ def get_totais_diarios_mes(ano: int, mes: int) -> dict:
         receitas_map = {d: 0.0 for d in dias}
         despesas_map = {d: 0.0 for d in dias}
         
-        # Busca transações
-        transacoes = get_transacoes_mes(ano, mes)
+        # Soma por (dia, tipo) a partir da tabela de rollup
+        linhas = _somar_resumos(
+            'dia', f'{ano:04d}-{mes:02d}-01', f'{ano:04d}-{mes:02d}-{num_dias:02d}',
+            ResumoTransacao.periodo, ResumoTransacao.tipo
+        )
         
-        for t in transacoes:
-            dia = t.data.day
-            if t.tipo == 'RECEITA':
-                receitas_map[dia] += t.valor
-            elif t.tipo == 'DESPESA':
-                despesas_map[dia] += t.valor
+        for periodo, tipo, total, _ in linhas:
+            dia = int(periodo[8:10])
+            if tipo == 'RECEITA':
+                receitas_map[dia] += de_centavos(total)
+            elif tipo == 'DESPESA':
+                despesas_map[dia] += de_centavos(total)
         
         # Converte para listas ordenadas (para o Chart.js)
         # Atenção: Retorna listas alinhadas pelo índice
@@ -416,13 +1044,273 @@ def get_totais_diarios_mes(ano: int, mes: int) -> dict:
         
     except Exception as e:
         logger.error(f"Erro ao calcular totais diários: {e}")
+        marcar_falha_consulta()
         return {'dias': [], 'receitas': [], 'despesas': []}
 
 
+def _condicoes_filtros(filtros: dict) -> list:
+    """
+    Traduz os filtros de busca do dashboard em condições SQL sobre Transacao.
+    
+    O texto de busca usa o índice FTS5 (mesmas regras de buscar_transacoes).
+    
+    Args:
+        filtros: Dict com as chaves opcionais busca, categoria, subcategoria,
+                 tipo, valor_min, valor_max, data_inicio e data_fim (date)
+    
+    Returns:
+        list: Condições para o WHERE (vazia se nenhum filtro foi informado)
+    """
+    condicoes = []
+    
+    expressao = _expressao_busca(filtros.get('busca'))
+    if expressao:
+        condicoes.append(Transacao.id.in_(
+            text("SELECT rowid FROM transacoes_fts WHERE transacoes_fts MATCH :busca_fts")
+            .bindparams(busca_fts=expressao)
+        ))
+    
+    if filtros.get('categoria'):
+        condicoes.append(Transacao.categoria == filtros['categoria'])
+    
+    if filtros.get('subcategoria'):
+        condicoes.append(Transacao.subcategoria == filtros['subcategoria'])
+    
+    if filtros.get('tipo') in ['RECEITA', 'DESPESA']:
+        condicoes.append(Transacao.tipo == filtros['tipo'])
+    
+    if filtros.get('valor_min') is not None:
+        condicoes.append(Transacao.valor_centavos >= para_centavos(filtros['valor_min']))
+    
+    if filtros.get('valor_max') is not None:
+        condicoes.append(Transacao.valor_centavos <= para_centavos(filtros['valor_max']))
+    
+    # Datas são inclusivas: data_fim vai até o fim do dia
+    if filtros.get('data_inicio'):
+        condicoes.append(Transacao.data >= datetime.combine(filtros['data_inicio'], time.min))
+    
+    if filtros.get('data_fim'):
+        condicoes.append(Transacao.data < datetime.combine(filtros['data_fim'] + timedelta(days=1), time.min))
+    
+    return condicoes
+
+
+def _codificar_cursor(transacao: 'Transacao') -> str:
+    """Gera o cursor de paginação (data + id) a partir da última linha da página."""
+    return f"{transacao.data.isoformat()}_{transacao.id}"
+
+
+def _decodificar_cursor(cursor: str) -> Optional[tuple]:
+    """
+    Interpreta um cursor gerado por _codificar_cursor.
+    
+    Returns:
+        tuple: (data, id), ou None se o cursor for inválido
+    """
+    try:
+        data_str, id_str = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(data_str), int(id_str)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _snapshot_vazio(ano: int, mes: int) -> dict:
+    """Retorna a estrutura de snapshot zerada para o mês."""
+    from calendar import monthrange
+    
+    _, num_dias = monthrange(ano, mes)
+    
+    return {
+        'totais': {'receitas': 0.0, 'despesas': 0.0, 'lucro': 0.0},
+        'gastos_por_categoria': {},
+        'receitas_por_categoria': {},
+        'totais_diarios': {
+            'dias': list(range(1, num_dias + 1)),
+            'receitas': [0.0] * num_dias,
+            'despesas': [0.0] * num_dias
+        },
+        'quantidades': {'RECEITA': 0, 'DESPESA': 0, 'total': 0},
+        'transacoes': [],
+        'total_filtrado': 0,
+        'pagina': 1,
+        'total_paginas': 1,
+        'cursor_proximo': None
+    }
+
+
+@memoizar_por_requisicao
+@cache_entre_requisicoes
+def _agregados_mes(ano: int, mes: int) -> dict:
+    """
+    Agregados do mês a partir das linhas diárias da tabela de rollup.
+    
+    Uma leitura agrupada por (tipo, categoria, dia) produz os totais, as
+    quebras por categoria dos dois tipos, a série diária e as quantidades.
+    Erros de banco são propagados para o chamador.
+    
+    Returns:
+        dict: Chaves totais, gastos_por_categoria, receitas_por_categoria,
+              totais_diarios e quantidades (mesmo formato do snapshot)
+    """
+    vazio = _snapshot_vazio(ano, mes)
+    agregados = {
+        chave: vazio[chave]
+        for chave in ('totais', 'gastos_por_categoria', 'receitas_por_categoria',
+                      'totais_diarios', 'quantidades')
+    }
+    
+    num_dias = len(agregados['totais_diarios']['dias'])
+    linhas = _somar_resumos(
+        'dia', f'{ano:04d}-{mes:02d}-01', f'{ano:04d}-{mes:02d}-{num_dias:02d}',
+        ResumoTransacao.tipo, ResumoTransacao.categoria, ResumoTransacao.periodo
+    )
+    
+    quantidades = agregados['quantidades']
+    
+    # Acumula em centavos (inteiros) e converte para reais só no final
+    centavos = {
+        tipo: {'total': 0, 'diarios': [0] * num_dias, 'categorias': {}}
+        for tipo in ('RECEITA', 'DESPESA')
+    }
+    
+    for tipo_linha, categoria, periodo, total, quantidade in linhas:
+        quantidade = int(quantidade)
+        quantidades['total'] += quantidade
+        
+        if tipo_linha not in centavos:
+            continue
+        
+        acumulado = centavos[tipo_linha]
+        acumulado['total'] += total
+        acumulado['diarios'][int(periodo[8:10]) - 1] += total
+        acumulado['categorias'][categoria] = acumulado['categorias'].get(categoria, 0) + total
+        quantidades[tipo_linha] += quantidade
+    
+    receitas, despesas = centavos['RECEITA'], centavos['DESPESA']
+    agregados['totais'] = {
+        'receitas': de_centavos(receitas['total']),
+        'despesas': de_centavos(despesas['total']),
+        'lucro': de_centavos(receitas['total'] - despesas['total'])
+    }
+    agregados['totais_diarios']['receitas'] = [de_centavos(c) for c in receitas['diarios']]
+    agregados['totais_diarios']['despesas'] = [de_centavos(c) for c in despesas['diarios']]
+    agregados['receitas_por_categoria'] = {c: de_centavos(v) for c, v in receitas['categorias'].items()}
+    agregados['gastos_por_categoria'] = {c: de_centavos(v) for c, v in despesas['categorias'].items()}
+    
+    return agregados
+
+
+@memoizar_por_requisicao
+def get_snapshot_mes(
+    ano: int,
+    mes: int,
+    tipo: str = None,
+    filtros: dict = None,
+    pagina: int = None,
+    por_pagina: int = None,
+    incluir_transacoes: bool = True,
+    cursor: str = None
+) -> dict:
+    """
+    Monta numa única passada todos os dados de um mês usados pelas telas.
+    
+    Os agregados (totais, categorias, série diária) vêm de _agregados_mes,
+    uma leitura da tabela de rollup cacheada entre requisições. A lista de
+    transações é filtrada e ordenada no banco (data e id decrescentes); com paginação,
+    um COUNT separado dá o total filtrado e apenas a página é carregada,
+    via cursor (keyset) quando informado ou OFFSET para saltos de página.
+    
+    Args:
+        ano: Ano desejado
+        mes: Mês desejado (1-12)
+        tipo: 'DESPESA' ou 'RECEITA' para restringir a lista de transações
+        filtros: Filtros de busca (ver _condicoes_filtros)
+        pagina: Página desejada (1-based). Se None, retorna todas
+        por_pagina: Itens por página (obrigatório se pagina for informado)
+        incluir_transacoes: Se False, não consulta a lista de transações
+        cursor: cursor_proximo da página anterior (pagina deve ser a seguinte)
+    
+    Returns:
+        dict: {
+            'totais': {'receitas', 'despesas', 'lucro'},
+            'gastos_por_categoria': {...},
+            'receitas_por_categoria': {...},
+            'totais_diarios': {'dias', 'receitas', 'despesas'},
+            'quantidades': {'RECEITA': n, 'DESPESA': n, 'total': n},
+            'transacoes': [...],
+            'total_filtrado': n,
+            'pagina': n,
+            'total_paginas': n,
+            'cursor_proximo': str ou None
+        }
+    """
+    snapshot = _snapshot_vazio(ano, mes)
+    
+    try:
+        snapshot.update(_agregados_mes(ano, mes))
+        quantidades = snapshot['quantidades']
+        
+        if incluir_transacoes:
+            data_inicio, data_fim = _intervalo_mes(ano, mes)
+            condicoes = [Transacao.data >= data_inicio, Transacao.data < data_fim]
+            if tipo:
+                condicoes.append(Transacao.tipo == tipo)
+            if filtros:
+                condicoes.extend(_condicoes_filtros(filtros))
+            
+            # Ordem estável (data, id) para o cursor; coberta por ix_transacoes_data
+            query = Transacao.query.filter(*condicoes).order_by(
+                Transacao.data.desc(), Transacao.id.desc()
+            )
+            
+            if pagina is not None and por_pagina:
+                total_filtrado = db.session.query(func.count(Transacao.id)).filter(*condicoes).scalar() or 0
+                total_paginas = max(1, (total_filtrado + por_pagina - 1) // por_pagina)
+                pagina = min(max(1, pagina), total_paginas)
+                
+                posicao = _decodificar_cursor(cursor) if cursor else None
+                if posicao:
+                    # Keyset: continua após a última linha da página anterior
+                    data_cursor, id_cursor = posicao
+                    query = query.filter(or_(
+                        Transacao.data < data_cursor,
+                        and_(Transacao.data == data_cursor, Transacao.id < id_cursor)
+                    ))
+                else:
+                    query = query.offset((pagina - 1) * por_pagina)
+                
+                transacoes = query.limit(por_pagina).all()
+                
+                if pagina < total_paginas and transacoes:
+                    snapshot['cursor_proximo'] = _codificar_cursor(transacoes[-1])
+                snapshot['pagina'] = pagina
+                snapshot['total_paginas'] = total_paginas
+            else:
+                transacoes = query.all()
+                total_filtrado = len(transacoes)
+            
+            snapshot['total_filtrado'] = total_filtrado
+            snapshot['transacoes'] = transacoes
+        
+        logger.info(
+            f"Snapshot {mes}/{ano}: {quantidades['total']} transações, "
+            f"{snapshot['total_filtrado']} na lista"
+        )
+        return snapshot
+    
+    except Exception as e:
+        logger.error(f"Erro ao montar snapshot do mês {mes}/{ano}: {e}")
+        return _snapshot_vazio(ano, mes)
+
+
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_totais_ano(ano: int) -> dict:
     """
     Calcula os totais financeiros de um ano inteiro.
     
+    Lê as linhas anuais da tabela de rollup (transações confirmadas).
+    
     Args:
         ano: Ano desejado (ex: 2024)
     
@@ -433,36 +1321,38 @@ def get_totais_ano(ano: int) -> dict:
             - lucro: Diferença entre receitas e despesas
     """
     try:
-        inicio_ano = datetime(ano, 1, 1)
-        fim_ano = datetime(ano, 12, 31, 23, 59, 59)
-        
-        transacoes = Transacao.query.filter(
-            Transacao.data >= inicio_ano,
-            Transacao.data <= fim_ano,
-            Transacao.status == 'CONFIRMADO'
-        ).all()
+        linhas = _somar_resumos(
+            'ano', str(ano), str(ano), ResumoTransacao.tipo,
+            filtros=(ResumoTransacao.status == 'CONFIRMADO',)
+        )
+        somas = {tipo: total for tipo, total, _ in linhas}
         
-        receitas = sum(t.valor for t in transacoes if t.tipo == 'RECEITA')
-        despesas = sum(t.valor for t in transacoes if t.tipo == 'DESPESA')
+        receitas = somas.get('RECEITA', 0)
+        despesas = somas.get('DESPESA', 0)
         
         resultado = {
-            'receitas': receitas,
-            'despesas': despesas,
-            'lucro': receitas - despesas
+            'receitas': de_centavos(receitas),
+            'despesas': de_centavos(despesas),
+            'lucro': de_centavos(receitas - despesas)
         }
         
-        logger.info(f"Totais anuais {ano}: R={receitas:.2f}, D={despesas:.2f}")
+        logger.info(f"Totais anuais {ano}: R={resultado['receitas']:.2f}, D={resultado['despesas']:.2f}")
         return resultado
         
     except Exception as e:
         logger.error(f"Erro ao calcular totais anuais {ano}: {e}")
+        marcar_falha_consulta()
         return {'receitas': 0.0, 'despesas': 0.0, 'lucro': 0.0}
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_totais_mensais_ano(ano: int) -> dict:
     """
     Calcula totais mensais para gráfico de evolução anual (Meses x Valores).
     
+    Lê as linhas mensais da tabela de rollup (transações confirmadas).
+    
     Args:
         ano: Ano desejado
     
@@ -480,22 +1370,18 @@ def get_totais_mensais_ano(ano: int) -> dict:
         receitas_mes = [0.0] * 12
         despesas_mes = [0.0] * 12
         
-        # Busca todas as transações do ano
-        inicio_ano = datetime(ano, 1, 1)
-        fim_ano = datetime(ano, 12, 31, 23, 59, 59)
-        
-        transacoes = Transacao.query.filter(
-            Transacao.data >= inicio_ano,
-            Transacao.data <= fim_ano,
-            Transacao.status == 'CONFIRMADO'
-        ).all()
+        linhas = _somar_resumos(
+            'mes', f'{ano:04d}-01', f'{ano:04d}-12',
+            ResumoTransacao.periodo, ResumoTransacao.tipo,
+            filtros=(ResumoTransacao.status == 'CONFIRMADO',)
+        )
         
-        for t in transacoes:
-            mes_idx = t.data.month - 1  # 0-indexed
-            if t.tipo == 'RECEITA':
-                receitas_mes[mes_idx] += t.valor
-            elif t.tipo == 'DESPESA':
-                despesas_mes[mes_idx] += t.valor
+        for periodo, tipo, total, _ in linhas:
+            mes_idx = int(periodo[5:7]) - 1  # 0-indexed
+            if tipo == 'RECEITA':
+                receitas_mes[mes_idx] += de_centavos(total)
+            elif tipo == 'DESPESA':
+                despesas_mes[mes_idx] += de_centavos(total)
         
         resultado = {
             'meses': meses_nomes,
@@ -508,9 +1394,40 @@ def get_totais_mensais_ano(ano: int) -> dict:
         
     except Exception as e:
         logger.error(f"Erro ao calcular totais mensais do ano {ano}: {e}")
+        marcar_falha_consulta()
         return {'meses': [], 'receitas': [], 'despesas': []}
 
 
+def _ranking_categorias_ano(ano: int, tipo: str, limite: int) -> list:
+    """
+    Top N categorias de um tipo no ano, lido da tabela de rollup.
+    
+    Args:
+        ano: Ano desejado
+        tipo: 'DESPESA' ou 'RECEITA'
+        limite: Quantidade de categorias no ranking
+    
+    Returns:
+        list: Lista de dicts [{'categoria': 'Insumos', 'valor': 15000.0}, ...]
+    """
+    linhas = _somar_resumos(
+        'ano', str(ano), str(ano), ResumoTransacao.categoria,
+        filtros=(
+            ResumoTransacao.tipo == tipo,
+            ResumoTransacao.status == 'CONFIRMADO'
+        )
+    )
+    
+    # Ordena por valor decrescente e limita
+    return sorted(
+        [{'categoria': categoria or 'Outros', 'valor': de_centavos(total)} for categoria, total, _ in linhas],
+        key=lambda x: x['valor'],
+        reverse=True
+    )[:limite]
+
+
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_ranking_categorias_ano(ano: int, limite: int = 5) -> list:
     """
     Retorna Top N categorias de despesas do ano, ordenadas por valor.
@@ -523,37 +1440,19 @@ def get_ranking_categorias_ano(ano: int, limite: int = 5) -> list:
         list: Lista de dicts [{'categoria': 'Insumos', 'valor': 15000.0}, ...]
     """
     try:
-        inicio_ano = datetime(ano, 1, 1)
-        fim_ano = datetime(ano, 12, 31, 23, 59, 59)
-        
-        transacoes = Transacao.query.filter(
-            Transacao.data >= inicio_ano,
-            Transacao.data <= fim_ano,
-            Transacao.tipo == 'DESPESA',
-            Transacao.status == 'CONFIRMADO'
-        ).all()
-        
-        # Agrupa por categoria
-        totais = {}
-        for t in transacoes:
-            cat = t.categoria or 'Outros'
-            totais[cat] = totais.get(cat, 0) + t.valor
-        
-        # Ordena por valor decrescente e limita
-        ranking = sorted(
-            [{'categoria': k, 'valor': v} for k, v in totais.items()],
-            key=lambda x: x['valor'],
-            reverse=True
-        )[:limite]
+        ranking = _ranking_categorias_ano(ano, 'DESPESA', limite)
         
         logger.info(f"Ranking de categorias {ano}: {len(ranking)} itens")
         return ranking
         
     except Exception as e:
         logger.error(f"Erro ao calcular ranking de categorias {ano}: {e}")
+        marcar_falha_consulta()
         return []
 
 
+@memoizar_por_requisicao
+@cache_entre_requisicoes
 def get_ranking_receitas_ano(ano: int, limite: int = 5) -> list:
     """
     Retorna Top N tipos de receita do ano, ordenados por valor.
@@ -566,37 +1465,134 @@ def get_ranking_receitas_ano(ano: int, limite: int = 5) -> list:
         list: Lista de dicts [{'categoria': 'PIX', 'valor': 50000.0}, ...]
     """
     try:
-        inicio_ano = datetime(ano, 1, 1)
-        fim_ano = datetime(ano, 12, 31, 23, 59, 59)
-        
-        transacoes = Transacao.query.filter(
-            Transacao.data >= inicio_ano,
-            Transacao.data <= fim_ano,
-            Transacao.tipo == 'RECEITA',
-            Transacao.status == 'CONFIRMADO'
-        ).all()
-        
-        # Agrupa por categoria (tipo de receita)
-        totais = {}
-        for t in transacoes:
-            cat = t.categoria or 'Outros'
-            totais[cat] = totais.get(cat, 0) + t.valor
-        
-        # Ordena por valor decrescente e limita
-        ranking = sorted(
-            [{'categoria': k, 'valor': v} for k, v in totais.items()],
-            key=lambda x: x['valor'],
-            reverse=True
-        )[:limite]
+        ranking = _ranking_categorias_ano(ano, 'RECEITA', limite)
         
         logger.info(f"Ranking de receitas {ano}: {len(ranking)} itens")
         return ranking
         
     except Exception as e:
         logger.error(f"Erro ao calcular ranking de receitas {ano}: {e}")
+        marcar_falha_consulta()
         return []
 
 
+def _variacao_percentual(atual: float, anterior: float) -> Optional[float]:
+    """Variação percentual entre dois valores (None se não há base de comparação)."""
+    if anterior == 0:
+        return None
+    return ((atual - anterior) / anterior) * 100
+
+
+@memoizar_por_requisicao
+@cache_entre_requisicoes
+def get_analise_anos(ano: int, num_anos: int = 2, limite_ranking: int = 5) -> dict:
+    """
+    Monta os dados anuais de vários anos a partir de uma única consulta.
+    
+    Uma leitura das linhas mensais do rollup (transações confirmadas),
+    agrupadas por (mês, tipo, categoria), cobre os num_anos exibidos mais
+    o ano anterior ao primeiro (base da variação). Dela saem, para cada
+    ano, os totais, a série mensal, os rankings por categoria e as
+    variações em relação ao ano anterior.
+    
+    Args:
+        ano: Ano mais recente da análise
+        num_anos: Quantidade de anos (ano, ano-1, ..., ano-num_anos+1)
+        limite_ranking: Quantidade de categorias em cada ranking
+    
+    Returns:
+        dict: {
+            'anos': [ano-num_anos+1, ..., ano],
+            'por_ano': {
+                ano: {
+                    'totais': {'receitas', 'despesas', 'lucro'},
+                    'dados_mensais': {'meses', 'receitas', 'despesas'},
+                    'ranking_despesas': [{'categoria', 'valor'}, ...],
+                    'ranking_receitas': [{'categoria', 'valor'}, ...],
+                    'variacoes': {'receitas', 'despesas', 'lucro'}  # % ou None
+                }, ...
+            }
+        }
+    """
+    meses_nomes = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
+                   'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    anos = list(range(ano - num_anos + 1, ano + 1))
+    primeiro_ano = anos[0] - 1  # Base da variação do ano mais antigo
+    
+    # Acumulado em centavos (inteiros); convertido para reais na saída
+    acumulado = {
+        a: {
+            'receitas': [0] * 12,
+            'despesas': [0] * 12,
+            'categorias': {'DESPESA': {}, 'RECEITA': {}}
+        }
+        for a in range(primeiro_ano, ano + 1)
+    }
+    
+    try:
+        linhas = _somar_resumos(
+            'mes', f'{primeiro_ano:04d}-01', f'{ano:04d}-12',
+            ResumoTransacao.periodo, ResumoTransacao.tipo, ResumoTransacao.categoria,
+            filtros=(ResumoTransacao.status == 'CONFIRMADO',)
+        )
+        
+        for periodo, tipo, categoria, total, _ in linhas:
+            if tipo not in ('DESPESA', 'RECEITA'):
+                continue
+            dados_ano = acumulado[int(periodo[:4])]
+            mes_idx = int(periodo[5:7]) - 1
+            
+            serie = dados_ano['receitas'] if tipo == 'RECEITA' else dados_ano['despesas']
+            serie[mes_idx] += total
+            
+            categoria = categoria or 'Outros'
+            por_categoria = dados_ano['categorias'][tipo]
+            por_categoria[categoria] = por_categoria.get(categoria, 0) + total
+        
+    except Exception as e:
+        logger.error(f"Erro ao consultar análise de {num_anos} anos até {ano}: {e}")
+        marcar_falha_consulta()
+    
+    def _totais(a: int) -> dict:
+        receitas = sum(acumulado[a]['receitas'])
+        despesas = sum(acumulado[a]['despesas'])
+        return {
+            'receitas': de_centavos(receitas),
+            'despesas': de_centavos(despesas),
+            'lucro': de_centavos(receitas - despesas)
+        }
+    
+    def _ranking(a: int, tipo: str) -> list:
+        return sorted(
+            [{'categoria': c, 'valor': de_centavos(v)} for c, v in acumulado[a]['categorias'][tipo].items()],
+            key=lambda x: x['valor'],
+            reverse=True
+        )[:limite_ranking]
+    
+    por_ano = {}
+    for a in anos:
+        totais = _totais(a)
+        anterior = _totais(a - 1)
+        por_ano[a] = {
+            'totais': totais,
+            'dados_mensais': {
+                'meses': meses_nomes,
+                'receitas': [de_centavos(c) for c in acumulado[a]['receitas']],
+                'despesas': [de_centavos(c) for c in acumulado[a]['despesas']]
+            },
+            'ranking_despesas': _ranking(a, 'DESPESA'),
+            'ranking_receitas': _ranking(a, 'RECEITA'),
+            'variacoes': {
+                chave: _variacao_percentual(totais[chave], anterior[chave])
+                for chave in ('receitas', 'despesas', 'lucro')
+            }
+        }
+    
+    logger.info(f"Análise anual {anos[0]}-{ano}: {num_anos} anos numa consulta")
+    return {'anos': anos, 'por_ano': por_ano}
+
+
+@memoizar_por_requisicao
 def get_transacoes_ano(ano: int, tipo: str = None) -> list:
     """
     Obtém todas as transações de um ano específico.
@@ -7,6 +7,7 @@ Este módulo contém as rotas:
 - Editar usuário (/admin/usuarios/<id>/editar)
 - Toggle ativo/inativo (/admin/usuarios/<id>/toggle)
 - Reset de senha (/admin/usuarios/<id>/reset-senha)
+- Limpar cache de OCR (/admin/cache-ocr/limpar)
 """
 
 import logging
@@ -16,6 +17,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 
 from config import Config
 from models import db, User
+from services.ocr_cache_service import estatisticas_cache, limpar_cache
 from utils.auth_decorators import admin_required
 
 logger = logging.getLogger(__name__)
@@ -28,7 +30,7 @@ bp = Blueprint('admin', __name__, url_prefix='/admin')
 def usuarios():
     """Lista todos os usuários do sistema."""
     users = User.query.order_by(User.nome).all()
-    return render_template('admin/usuarios.html', usuarios=users)
+    return render_template('admin/usuarios.html', usuarios=users, cache_ocr=estatisticas_cache())
 
 
 @bp.route('/usuarios/novo', methods=['GET', 'POST'])
@@ -140,3 +142,17 @@ def usuario_reset_senha(user_id):
     logger.info(f"Senha resetada para: {user.email}")
     flash(f'Senha de {user.nome} resetada com sucesso!', 'success')
     return redirect(url_for('admin.usuarios'))
+
+
+@bp.route('/cache-ocr/limpar', methods=['POST'])
+@admin_required
+def cache_ocr_limpar():
+    """Esvazia o cache de resultados do OCR (próximos envios voltam a chamar a Groq)."""
+    try:
+        removidas = limpar_cache()
+        flash(f'Cache de OCR limpo: {removidas} resultado(s) removido(s).', 'success')
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erro ao limpar cache de OCR: {e}")
+        flash('Erro ao limpar o cache de OCR.', 'danger')
+    return redirect(url_for('admin.usuarios'))
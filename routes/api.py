@@ -5,6 +5,8 @@ Este módulo contém as rotas:
 - API de totais (GET /api/totais)
 - API de subcategorias (GET /api/subcategorias/<categoria>)
 - API de gastos por subcategoria (GET /api/gastos-subcategoria)
+- API de busca textual em todas as transações (GET /api/buscar)
+- Estado do disjuntor, latências e roteamento de modelos do OCR (GET /api/ocr/status)
 """
 
 import logging
@@ -13,7 +15,14 @@ from datetime import date
 from flask import Blueprint, request, jsonify
 
 from config import Config
-from models import get_totais_mes, get_gastos_por_categoria, get_gastos_por_subcategoria, get_totais_diarios_mes
+from models import (
+    get_snapshot_mes, get_gastos_por_subcategoria, get_totais_diarios_mes,
+    buscar_transacoes
+)
+from services.groq_service import get_groq_service
+from services.ocr_job_service import obter_status_workers
+from utils.auth_decorators import auth_if_enabled
+from utils.resiliencia import get_disjuntor_groq, get_monitor_latencia
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +43,9 @@ def api_totais():
         mes = request.args.get('mes', hoje.month, type=int)
         ano = request.args.get('ano', hoje.year, type=int)
         
-        totais = get_totais_mes(ano, mes)
-        gastos_categoria = get_gastos_por_categoria(ano, mes)
+        snapshot = get_snapshot_mes(ano, mes, incluir_transacoes=False)
+        totais = snapshot['totais']
+        gastos_categoria = snapshot['gastos_por_categoria']
         
         return jsonify({
             'sucesso': True,
@@ -186,3 +196,93 @@ def api_dados_diarios():
             'erro': 'Erro ao buscar dados diários.'
         }), 500
 
+
+@bp.route('/buscar')
+@auth_if_enabled
+def api_buscar():
+    """
+    API de busca textual em transações de todos os anos.
+    
+    Busca por prefixo, sem diferenciar maiúsculas e acentos, na descrição,
+    no estabelecimento e no texto do comprovante. Resultados ordenados
+    por relevância.
+    
+    Query Parameters:
+        - q: Texto da busca (ex: "atacadao")
+        - tipo: DESPESA ou RECEITA (opcional)
+        - limite: Máximo de resultados (1-200, padrão 50)
+    
+    Response JSON:
+        {"sucesso": true, "termo": "...", "total": n, "transacoes": [...]}
+    """
+    try:
+        termo = request.args.get('q', '').strip()
+        tipo = request.args.get('tipo', '').strip().upper()
+        limite = request.args.get('limite', 50, type=int)
+        
+        if not termo:
+            return jsonify({
+                'sucesso': False,
+                'erro': 'Parâmetro "q" é obrigatório.'
+            }), 400
+        
+        limite = min(max(1, limite), 200)
+        transacoes = buscar_transacoes(
+            termo,
+            limite=limite,
+            tipo=tipo if tipo in ['DESPESA', 'RECEITA'] else None
+        )
+        
+        return jsonify({
+            'sucesso': True,
+            'termo': termo,
+            'total': len(transacoes),
+            'transacoes': [t.to_dict() for t in transacoes]
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Erro na API de busca: {e}")
+        return jsonify({
+            'sucesso': False,
+            'erro': 'Erro ao buscar transações.'
+        }), 500
+
+
+@bp.route('/ocr/status')
+@auth_if_enabled
+def api_ocr_status():
+    """
+    API de monitoramento das chamadas à Groq.
+    
+    Response JSON:
+        {"sucesso": true, "disjuntor": {"estado": "fechado" | "aberto" | "meio_aberto",
+         "falhas_consecutivas": n, "aberturas": n, "recusadas": n, "reabre_em": s | null},
+         "latencia": {"modelos": {"<modelo>": {"amostras": n, "p50": s, "p95": s}},
+                      "hedge": {"disparados": n, "vencidos_pela_copia": n, "suprimidos_por_cota": n}},
+         "roteamento": {"rapido": n, "completo": n, "escalados": {"falha": n, "confianca": n},
+                        "modelos": {"rapido": "<modelo>", "completo": "<modelo>"}},
+         "origem": "worker" | "web",
+         "workers": [{"worker": "host:pid", "atualizado_em": "...", "disjuntor": {...},
+                      "latencia": {...}, "roteamento": {...}}, ...]}
+    
+    Com OCR_ASSINCRONO as chamadas à Groq rodam no scripts/worker_ocr.py:
+    os campos principais vêm do snapshot mais recente publicado por um
+    worker no banco (origem "worker"), e "workers" traz o de cada um. Sem
+    worker ativo, ou com o OCR síncrono, o estado é o do próprio processo
+    web que atende a requisição (origem "web").
+    """
+    workers = obter_status_workers() if Config.OCR_ASSINCRONO else []
+    estado = workers[0] if workers else {
+        'disjuntor': get_disjuntor_groq().estado(),
+        'latencia': get_monitor_latencia().resumo(),
+        'roteamento': get_groq_service().estatisticas_roteamento()
+    }
+    
+    return jsonify({
+        'sucesso': True,
+        'disjuntor': estado['disjuntor'],
+        'latencia': estado['latencia'],
+        'roteamento': estado['roteamento'],
+        'origem': 'worker' if workers else 'web',
+        'workers': workers
+    }), 200
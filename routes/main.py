@@ -15,7 +15,7 @@ from io import BytesIO
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
 
 from config import Config
-from models import get_transacoes_mes, get_totais_mes, get_gastos_por_categoria, get_receitas_por_categoria
+from models import get_transacoes_mes, get_snapshot_mes
 from services.pdf_service import gerar_relatorio_mensal
 from utils.auth_decorators import auth_if_enabled
 
@@ -56,6 +56,8 @@ def dashboard():
         page = request.args.get('page', 1, type=int)
         if page < 1:
             page = 1
+        # Cursor (keyset) enviado pelo link "próxima página"
+        cursor = request.args.get('cursor', '').strip() or None
         
         # Parâmetros de busca
         busca_descricao = request.args.get('busca', '').strip()
@@ -77,76 +79,40 @@ def dashboard():
         mes_anterior, ano_anterior = (12, ano - 1) if mes == 1 else (mes - 1, ano)
         mes_proximo, ano_proximo = (1, ano + 1) if mes == 12 else (mes + 1, ano)
         
-        # Busca dados
-        totais = get_totais_mes(ano, mes)
-        gastos_categoria = get_gastos_por_categoria(ano, mes)
-        receitas_categoria = get_receitas_por_categoria(ano, mes)
-        transacoes = get_transacoes_mes(ano, mes)
-        
-        # Filtra por aba
-        if aba_ativa == 'despesas':
-            transacoes_aba = [t for t in transacoes if t.tipo == 'DESPESA']
-        elif aba_ativa == 'receitas':
-            transacoes_aba = [t for t in transacoes if t.tipo == 'RECEITA']
-        else:
-            transacoes_aba = transacoes
-        
-        # Aplica filtros de busca
-        transacoes_filtradas = transacoes_aba
-        
-        if busca_descricao:
-            busca_lower = busca_descricao.lower()
-            transacoes_filtradas = [
-                t for t in transacoes_filtradas 
-                if (t.descricao and busca_lower in t.descricao.lower()) or
-                   (t.estabelecimento and busca_lower in t.estabelecimento.lower())
-            ]
-        
-        if busca_categoria:
-            transacoes_filtradas = [t for t in transacoes_filtradas if t.categoria == busca_categoria]
-        
-        if busca_subcategoria:
-            transacoes_filtradas = [t for t in transacoes_filtradas if t.subcategoria == busca_subcategoria]
-        
-        if busca_tipo and busca_tipo in ['RECEITA', 'DESPESA']:
-            transacoes_filtradas = [t for t in transacoes_filtradas if t.tipo == busca_tipo]
-        
-        if busca_valor_min is not None:
-            transacoes_filtradas = [t for t in transacoes_filtradas if t.valor >= busca_valor_min]
-        
-        if busca_valor_max is not None:
-            transacoes_filtradas = [t for t in transacoes_filtradas if t.valor <= busca_valor_max]
-        
-        if busca_data_inicio:
-            try:
-                data_inicio = datetime.strptime(busca_data_inicio, '%Y-%m-%d').date()
-                transacoes_filtradas = [
-                    t for t in transacoes_filtradas 
-                    if t.data and (t.data.date() if hasattr(t.data, 'date') else t.data) >= data_inicio
-                ]
-            except ValueError:
-                pass
-        
-        if busca_data_fim:
-            try:
-                data_fim = datetime.strptime(busca_data_fim, '%Y-%m-%d').date()
-                transacoes_filtradas = [
-                    t for t in transacoes_filtradas 
-                    if t.data and (t.data.date() if hasattr(t.data, 'date') else t.data) <= data_fim
-                ]
-            except ValueError:
-                pass
-        
-        # Ordena e pagina
-        transacoes_ordenadas = sorted(transacoes_filtradas, key=lambda t: t.data if t.data else hoje, reverse=True)
-        total_transacoes = len(transacoes_ordenadas)
-        total_pages = max(1, (total_transacoes + per_page - 1) // per_page)
-        
-        if page > total_pages:
-            page = total_pages
-        
-        start_idx = (page - 1) * per_page
-        transacoes_pagina = transacoes_ordenadas[start_idx:start_idx + per_page]
+        # Filtros de busca (datas inválidas são ignoradas)
+        filtros = {
+            'busca': busca_descricao,
+            'categoria': busca_categoria,
+            'subcategoria': busca_subcategoria,
+            'tipo': busca_tipo,
+            'valor_min': busca_valor_min,
+            'valor_max': busca_valor_max,
+            'data_inicio': None,
+            'data_fim': None
+        }
+        for chave, valor in (('data_inicio', busca_data_inicio), ('data_fim', busca_data_fim)):
+            if valor:
+                try:
+                    filtros[chave] = datetime.strptime(valor, '%Y-%m-%d').date()
+                except ValueError:
+                    pass
+        
+        # Busca dados do mês numa única passada
+        tipo_aba = {'despesas': 'DESPESA', 'receitas': 'RECEITA'}.get(aba_ativa)
+        snapshot = get_snapshot_mes(
+            ano, mes,
+            tipo=tipo_aba,
+            filtros=filtros,
+            pagina=page,
+            por_pagina=per_page,
+            cursor=cursor
+        )
+        totais = snapshot['totais']
+        quantidades = snapshot['quantidades']
+        total_transacoes = snapshot['total_filtrado']
+        total_pages = snapshot['total_paginas']
+        page = snapshot['pagina']
+        transacoes_pagina = snapshot['transacoes']
         
         # Formata transações
         transacoes_recentes = []
@@ -171,12 +137,12 @@ def dashboard():
             'faturamento': totais['receitas'],
             'gastos': totais['despesas'],
             'lucro': totais['lucro'],
-            'gastos_por_categoria': gastos_categoria,
-            'receitas_por_categoria': receitas_categoria,
+            'gastos_por_categoria': snapshot['gastos_por_categoria'],
+            'receitas_por_categoria': snapshot['receitas_por_categoria'],
             'transacoes_recentes': transacoes_recentes,
             'total_transacoes': total_transacoes,
-            'total_transacoes_aba': len(transacoes_aba),
-            'total_transacoes_mes': len(transacoes),
+            'total_transacoes_aba': quantidades[tipo_aba] if tipo_aba else quantidades['total'],
+            'total_transacoes_mes': quantidades['total'],
             'mes_atual': mes,
             'ano_atual': ano,
             'mes_nome': MESES_NOMES[mes],
@@ -193,6 +159,7 @@ def dashboard():
             'total_pages': total_pages,
             'has_prev': page > 1,
             'has_next': page < total_pages,
+            'cursor_proximo': snapshot['cursor_proximo'],
             'paginas_visiveis': paginas_visiveis,
             'busca': busca_descricao,
             'busca_categoria': busca_categoria,
@@ -218,46 +185,45 @@ def dashboard():
 @auth_if_enabled
 def analise_anual():
     """Renderiza o dashboard de análise anual."""
-    from models import (
-        get_totais_ano, get_totais_mensais_ano,
-        get_ranking_categorias_ano, get_ranking_receitas_ano,
-        get_transacoes_ano
-    )
-    from utils.analytics import get_analise_completa
+    from models import get_analise_anos
+    from utils.analytics import get_analise_ano
     
     try:
         hoje = date.today()
         ano = request.args.get('ano', hoje.year, type=int)
+        num_anos = request.args.get('anos', 5, type=int)
         
         if ano < 2000 or ano > 2100:
             ano = hoje.year
+        # Mínimo de 2 anos (comparativo com o anterior), máximo de 10
+        num_anos = min(max(num_anos, 2), 10)
         
-        # Totais do ano atual
-        totais = get_totais_ano(ano)
-        dados_mensais = get_totais_mensais_ano(ano)
-        
-        # Rankings (Módulo F4)
-        ranking_despesas = get_ranking_categorias_ano(ano, limite=5)
-        ranking_receitas = get_ranking_receitas_ano(ano, limite=5)
+        # Totais, séries, rankings e variações de todos os anos numa consulta
+        analise_anos = get_analise_anos(ano, num_anos=num_anos, limite_ranking=5)
+        atual = analise_anos['por_ano'][ano]
+        totais = atual['totais']
         
         # Análise de fornecedores e insights (Módulo F5)
-        transacoes_despesas = get_transacoes_ano(ano, tipo='DESPESA')
-        analise = get_analise_completa(transacoes_despesas, totais)
+        analise = get_analise_ano(ano)
         
-        # Totais do ano anterior para comparativo
+        # Ano anterior para comparativo
         ano_anterior = ano - 1
-        totais_anterior = get_totais_ano(ano_anterior)
-        dados_mensais_anterior = get_totais_mensais_ano(ano_anterior)
-        
-        # Calcula variações percentuais
-        def calcular_variacao(atual, anterior):
-            if anterior == 0:
-                return None  # N/A
-            return ((atual - anterior) / anterior) * 100
-        
-        variacao_receitas = calcular_variacao(totais['receitas'], totais_anterior['receitas'])
-        variacao_despesas = calcular_variacao(totais['despesas'], totais_anterior['despesas'])
-        variacao_lucro = calcular_variacao(totais['lucro'], totais_anterior['lucro']) if totais_anterior['lucro'] != 0 else None
+        anterior = analise_anos['por_ano'][ano_anterior]
+        totais_anterior = anterior['totais']
+        
+        variacao_receitas = atual['variacoes']['receitas']
+        variacao_despesas = atual['variacoes']['despesas']
+        variacao_lucro = atual['variacoes']['lucro']
+        
+        # Histórico de N anos (mais recente primeiro)
+        historico_anos = [
+            {
+                'ano': a,
+                **analise_anos['por_ano'][a]['totais'],
+                'variacoes': analise_anos['por_ano'][a]['variacoes']
+            }
+            for a in reversed(analise_anos['anos'])
+        ]
         
         dados = {
             'ano': ano,
@@ -271,10 +237,12 @@ def analise_anual():
             'variacao_receitas': variacao_receitas,
             'variacao_despesas': variacao_despesas,
             'variacao_lucro': variacao_lucro,
-            'dados_mensais': dados_mensais,
-            'dados_mensais_anterior': dados_mensais_anterior,
-            'ranking_despesas': ranking_despesas,
-            'ranking_receitas': ranking_receitas,
+            'dados_mensais': atual['dados_mensais'],
+            'dados_mensais_anterior': anterior['dados_mensais'],
+            'ranking_despesas': atual['ranking_despesas'],
+            'ranking_receitas': atual['ranking_receitas'],
+            'historico_anos': historico_anos,
+            'num_anos': num_anos,
             'fornecedores': analise['fornecedores'],
             'palavras_chave': analise['palavras_chave'],
             'insights': analise['insights']
@@ -312,17 +280,12 @@ def gerar_relatorio():
         mes = hoje.month
     
     try:
-        totais = get_totais_mes(ano, mes)
-        gastos_categoria = get_gastos_por_categoria(ano, mes) if tipo_filtro != 'RECEITA' else {}
-        receitas_categoria = get_receitas_por_categoria(ano, mes) if tipo_filtro != 'DESPESA' else {}
-        transacoes = get_transacoes_mes(ano, mes)
-        
-        if tipo_filtro == 'DESPESA':
-            transacoes = [t for t in transacoes if t.tipo == 'DESPESA']
-        elif tipo_filtro == 'RECEITA':
-            transacoes = [t for t in transacoes if t.tipo == 'RECEITA']
+        snapshot = get_snapshot_mes(ano, mes, tipo=tipo_filtro or None)
+        totais = snapshot['totais']
+        gastos_categoria = snapshot['gastos_por_categoria'] if tipo_filtro != 'RECEITA' else {}
+        receitas_categoria = snapshot['receitas_por_categoria'] if tipo_filtro != 'DESPESA' else {}
         
-        transacoes_ordenadas = sorted(transacoes, key=lambda t: t.data if t.data else hoje)
+        transacoes_ordenadas = sorted(snapshot['transacoes'], key=lambda t: t.data if t.data else hoje)
         
         pdf_bytes = gerar_relatorio_mensal(
             mes=mes,
@@ -15,6 +15,7 @@ from flask import Blueprint, request, jsonify
 from config import Config
 from models import db, Transacao, get_transacoes_mes
 from utils.helpers import formatar_valor, validar_data
+from utils.file_handler import extrair_texto_comprovante
 from utils.auth_decorators import auth_if_enabled
 
 logger = logging.getLogger(__name__)
@@ -114,6 +115,7 @@ def criar_transacao():
             descricao=descricao[:200] if descricao else None,
             estabelecimento=estabelecimento[:100] if estabelecimento else None,
             comprovante_url=comprovante_url[:500] if comprovante_url else None,
+            texto_comprovante=extrair_texto_comprovante(comprovante_url),  # Indexado na busca
             status='CONFIRMADO'
         )
         
@@ -4,27 +4,44 @@ Blueprint para rotas de upload de arquivos do GestorBot.
 Este módulo contém as rotas para:
 - Upload de nota fiscal única
 - Upload de múltiplas notas (em massa)
+- Andamento dos jobs de OCR assíncronos
 - Upload de comprovante de receita
+
+Os uploads aceitam JSON com base64 ou multipart/form-data (arquivos binários).
+
+Com OCR_ASSINCRONO ligado, os uploads de notas apenas salvam os arquivos e
+enfileiram um job (services/ocr_job_service.py); o OCR roda no worker
+(scripts/worker_ocr.py) e o cliente consulta /upload-jobs/<id> ou recebe os
+arquivos conforme ficam prontos pelo stream SSE /upload-jobs/<id>/eventos.
 """
 
-import base64
-import time
+import json
 import logging
-from datetime import datetime
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import Optional
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from config import Config
 from services.groq_service import get_groq_service
-from utils.file_handler import salvar_arquivo
-from utils.pdf_converter import converter_pdf_para_imagem, eh_pdf
+from services.ocr_job_service import (
+    agrupar_lotes, codificar_enviados, decodificar_enviados, enfileirar_arquivos, eventos_job,
+    extrair_dados_lote, extrair_dados_nota, obter_job
+)
+from utils.arquivo_upload import ArquivoUpload, decodificar_item, nome_do_item
+from utils.file_handler import salvar_upload
+from utils.pdf_converter import renderizar_paginas_pdf
 from utils.auth_decorators import auth_if_enabled
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('upload', __name__)
 
+# Espera do navegador antes de reconectar ao stream de eventos (campo retry)
+SSE_RECONEXAO_MS = 1000
+
 
 @bp.route('/upload-nota', methods=['POST'])
 @auth_if_enabled
@@ -39,70 +56,53 @@ def upload_nota():
             "nome_arquivo": "nota.pdf"
         }
     
+    Request multipart/form-data (sem base64):
+        imagem: arquivo (nome e tipo vêm da própria parte)
+    
     Response JSON:
         {"sucesso": true, "dados": {...}, "comprovante_url": "..."}
+        ou, com OCR_ASSINCRONO (HTTP 202):
+        {"sucesso": true, "job_id": "...", "status_url": "/upload-jobs/...",
+         "eventos_url": "/upload-jobs/.../eventos"}
     """
     try:
         # Rate limit: 30 uploads por minuto por IP
         limiter = current_app.limiter
         limiter.limit("30 per minute")(lambda: None)()
         
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'sucesso': False,
-                'erro': 'Requisição inválida. Envie um JSON com a imagem.'
-            }), 400
+        if _eh_multipart():
+            parte = request.files.get('imagem')
+            arquivo = ArquivoUpload.de_multipart(parte) if parte else None
+        else:
+            data = request.get_json()
+            if not data:
+                return jsonify({
+                    'sucesso': False,
+                    'erro': 'Requisição inválida. Envie um JSON com a imagem.'
+                }), 400
+            arquivo = data if data.get('imagem') else None
         
-        arquivo_base64 = data.get('imagem')
-        if not arquivo_base64:
+        if not arquivo:
             return jsonify({
                 'sucesso': False,
                 'erro': 'Campo "imagem" é obrigatório.'
             }), 400
         
-        tipo_arquivo = data.get('tipo_arquivo', 'imagem')
-        nome_arquivo_original = data.get('nome_arquivo', '')
-        
-        # Extrai nome do arquivo para usar como observação
-        observacao_arquivo = ''
-        if nome_arquivo_original:
-            if '.' in nome_arquivo_original:
-                observacao_arquivo = nome_arquivo_original.rsplit('.', 1)[0]
-            else:
-                observacao_arquivo = nome_arquivo_original
-            observacao_arquivo = observacao_arquivo.replace('_', ' ').replace('-', ' ')
-        
-        # Detecta se é PDF
-        is_pdf = eh_pdf(arquivo_base64) or tipo_arquivo == 'pdf'
-        
-        # Se for PDF, converte para imagem antes de processar
-        imagem_para_ocr = arquivo_base64
-        if is_pdf:
-            logger.info("Detectado PDF - convertendo para imagem...")
-            imagem_convertida = converter_pdf_para_imagem(arquivo_base64)
-            
-            if not imagem_convertida:
-                return jsonify({
-                    'sucesso': False,
-                    'erro': 'Não foi possível processar o PDF.'
-                }), 400
-            
-            imagem_para_ocr = imagem_convertida
-            logger.info("PDF convertido com sucesso")
+        if Config.OCR_ASSINCRONO:
+            return _resposta_job(enfileirar_arquivos([arquivo], origem='nota'))
         
-        # Salva arquivo original no disco
+        # Decodifica uma vez: os mesmos bytes vão para o disco, o PDF e a IA
         try:
-            comprovante_url = salvar_arquivo(arquivo_base64, tipo_arquivo)
+            upload = decodificar_item(arquivo)
+            comprovante_url = salvar_upload(upload)
         except ValueError as e:
             return jsonify({
                 'sucesso': False,
                 'erro': str(e)
             }), 400
         
-        # Processa com IA
-        service = get_groq_service()
-        resultado = service.processar_nota(imagem_para_ocr, nome_arquivo_original)
+        # PDF → imagem, IA e observação baseada no nome do arquivo
+        resultado = extrair_dados_nota(upload, get_groq_service())
         
         if not resultado['sucesso']:
             return jsonify({
@@ -110,17 +110,14 @@ def upload_nota():
                 'erro': resultado.get('erro', 'Erro ao processar nota fiscal.')
             }), 400
         
-        # Adiciona observação baseada no nome do arquivo
-        dados_resposta = resultado['dados']
-        if observacao_arquivo:
-            dados_resposta['observacao'] = observacao_arquivo
-        
         return jsonify({
             'sucesso': True,
-            'dados': dados_resposta,
+            'dados': resultado['dados'],
             'comprovante_url': comprovante_url
         }), 200
         
+    except RequestEntityTooLarge:
+        raise  # Tratado pelo errorhandler(413) da aplicação
     except Exception as e:
         logger.error(f"Erro no upload de nota: {e}")
         return jsonify({
@@ -129,6 +126,99 @@ def upload_nota():
         }), 500
 
 
+def _eh_multipart() -> bool:
+    """
+    True se o upload veio como multipart/form-data (arquivos binários).
+    
+    As rotas de upload aceitam os dois formatos: JSON com base64 (legado) e
+    multipart, em que o Werkzeug grava as partes em arquivos temporários
+    enquanto lê a requisição, sem o acréscimo de 33% do base64 nem o parse
+    de até 16 MB de JSON.
+    """
+    return request.mimetype == 'multipart/form-data'
+
+
+def _resposta_job(job) -> tuple:
+    """Resposta 202 de um upload enfileirado: id do job e URLs de andamento."""
+    return jsonify({
+        'sucesso': True,
+        'job_id': job.id,
+        'status_url': f'/upload-jobs/{job.id}',
+        'eventos_url': f'/upload-jobs/{job.id}/eventos'
+    }), 202
+
+
+def _salvar_arquivo_massa(indice: int, arquivo: dict) -> dict:
+    """
+    Decodifica e grava no disco um arquivo do upload em massa.
+    
+    Executada nas threads do pool; nunca levanta exceção — erros viram um
+    resultado com sucesso=False.
+    
+    Args:
+        indice: Posição do arquivo na requisição (0-based)
+        arquivo: {"imagem": "...", "nome_arquivo": "...", "tipo_arquivo": "..."}
+            ou ArquivoUpload (multipart)
+    
+    Returns:
+        dict: {'nome_arquivo', 'upload', 'comprovante_url'} para o OCR, ou o
+            resultado de erro no formato da resposta de /upload-notas-massa
+    """
+    nome_arquivo = f'arquivo_{indice+1}'
+    
+    try:
+        nome_arquivo = nome_do_item(arquivo, nome_arquivo)
+        upload = decodificar_item(arquivo, nome_arquivo)
+        return {
+            'nome_arquivo': nome_arquivo,
+            'upload': upload,
+            'comprovante_url': salvar_upload(upload)
+        }
+    
+    except ValueError as e:
+        return {
+            'sucesso': False,
+            'erro': str(e),
+            'nome_arquivo': nome_arquivo
+        }
+    except Exception as e:
+        logger.error(f"Erro ao salvar arquivo {indice+1}: {e}")
+        return {
+            'sucesso': False,
+            'erro': f'Erro interno: {str(e)[:50]}',
+            'nome_arquivo': nome_arquivo
+        }
+
+
+def _processar_lote_massa(itens: list, service, app) -> list:
+    """
+    OCR de um grupo de arquivos salvos (um arquivo ou um lote de imagens pequenas).
+    
+    Executada nas threads do pool: não usa o contexto da requisição (abre
+    um app_context próprio, para o cache de OCR) e nunca levanta exceção.
+    
+    Args:
+        itens: Retornos de _salvar_arquivo_massa do grupo
+        service: Instância de GroqService
+        app: Aplicação Flask
+    
+    Returns:
+        list: Resultados no formato da resposta de /upload-notas-massa, na ordem dos itens
+    """
+    try:
+        with app.app_context():
+            resultados = extrair_dados_lote([item['upload'] for item in itens], service)
+    except Exception as e:
+        logger.error(f"Erro ao processar {', '.join(item['nome_arquivo'] for item in itens)}: {e}")
+        resultados = [{'sucesso': False, 'erro': f'Erro interno: {str(e)[:50]}'} for _ in itens]
+    
+    for item, resultado in zip(itens, resultados):
+        resultado['nome_arquivo'] = item['nome_arquivo']
+        if resultado['sucesso']:
+            resultado['comprovante_url'] = item['comprovante_url']
+    return resultados
+
+
 @bp.route('/upload-notas-massa', methods=['POST'])
 @auth_if_enabled
 def upload_notas_massa():
@@ -137,20 +227,31 @@ def upload_notas_massa():
     
     Request JSON:
         {"arquivos": [{"imagem": "...", "nome_arquivo": "..."}, ...]}
+    
+    Request multipart/form-data (sem base64):
+        arquivos: um arquivo por parte (campo repetido)
+    
+    Response JSON:
+        {"sucesso": true, "total_processados": n, "total_erros": n, "resultados": [...]}
+        ou, com OCR_ASSINCRONO (HTTP 202):
+        {"sucesso": true, "job_id": "...", "status_url": "/upload-jobs/...",
+         "eventos_url": "/upload-jobs/.../eventos"}
     """
     try:
         # Rate limit: 5 uploads em massa por minuto por IP
         limiter = current_app.limiter
         limiter.limit("5 per minute")(lambda: None)()
         
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'sucesso': False,
-                'erro': 'Requisição inválida.'
-            }), 400
-        
-        arquivos = data.get('arquivos', [])
+        if _eh_multipart():
+            arquivos = [ArquivoUpload.de_multipart(parte) for parte in request.files.getlist('arquivos')]
+        else:
+            data = request.get_json()
+            if not data:
+                return jsonify({
+                    'sucesso': False,
+                    'erro': 'Requisição inválida.'
+                }), 400
+            arquivos = data.get('arquivos', [])
         
         if not arquivos:
             return jsonify({
@@ -165,88 +266,30 @@ def upload_notas_massa():
                 'erro': f'Máximo de {MAX_ARQUIVOS} arquivos por vez.'
             }), 400
         
-        resultados = []
-        total_sucesso = 0
-        total_erro = 0
+        if Config.OCR_ASSINCRONO:
+            return _resposta_job(enfileirar_arquivos(arquivos, origem='massa'))
         
+        # Gravação e OCR rodam em paralelo; o limitador da Groq
+        # (utils/limitador.py) segura as chamadas à API. Imagens pequenas vão
+        # em lotes, várias por requisição (agrupar_lotes)
         service = get_groq_service()
+        max_paralelo = max(1, min(Config.UPLOAD_MAX_PARALELO, len(arquivos)))
         
-        for i, arquivo in enumerate(arquivos):
-            if i > 0:
-                time.sleep(2)  # Rate limit
+        with ThreadPoolExecutor(max_workers=max_paralelo) as executor:
+            # map() devolve os resultados na ordem de entrada
+            resultados = list(executor.map(_salvar_arquivo_massa, range(len(arquivos)), arquivos))
             
-            try:
-                arquivo_base64 = arquivo.get('imagem', '')
-                nome_arquivo = arquivo.get('nome_arquivo', f'arquivo_{i+1}')
-                tipo_arquivo = arquivo.get('tipo_arquivo', 'imagem')
-                
-                if not arquivo_base64:
-                    resultados.append({
-                        'sucesso': False,
-                        'erro': 'Arquivo vazio',
-                        'nome_arquivo': nome_arquivo
-                    })
-                    total_erro += 1
-                    continue
-                
-                is_pdf = eh_pdf(arquivo_base64) or tipo_arquivo == 'pdf'
-                
-                imagem_para_ocr = arquivo_base64
-                if is_pdf:
-                    imagem_convertida = converter_pdf_para_imagem(arquivo_base64)
-                    if imagem_convertida:
-                        imagem_para_ocr = imagem_convertida
-                    else:
-                        resultados.append({
-                            'sucesso': False,
-                            'erro': 'Não foi possível processar o PDF',
-                            'nome_arquivo': nome_arquivo
-                        })
-                        total_erro += 1
-                        continue
-                
-                try:
-                    comprovante_url = salvar_arquivo(arquivo_base64, tipo_arquivo)
-                except ValueError as e:
-                    resultados.append({
-                        'sucesso': False,
-                        'erro': str(e),
-                        'nome_arquivo': nome_arquivo
-                    })
-                    total_erro += 1
-                    continue
-                
-                resultado = service.processar_nota(imagem_para_ocr, nome_arquivo)
-                
-                if resultado['sucesso']:
-                    dados_resposta = resultado['dados']
-                    if nome_arquivo:
-                        observacao = nome_arquivo.rsplit('.', 1)[0] if '.' in nome_arquivo else nome_arquivo
-                        dados_resposta['observacao'] = observacao.replace('_', ' ').replace('-', ' ')
-                    
-                    resultados.append({
-                        'sucesso': True,
-                        'dados': dados_resposta,
-                        'comprovante_url': comprovante_url,
-                        'nome_arquivo': nome_arquivo
-                    })
-                    total_sucesso += 1
-                else:
-                    resultados.append({
-                        'sucesso': False,
-                        'erro': resultado.get('erro', 'Erro ao processar'),
-                        'nome_arquivo': nome_arquivo
-                    })
-                    total_erro += 1
-                    
-            except Exception as e:
-                logger.error(f"Erro ao processar arquivo {i+1}: {e}")
-                resultados.append({
-                    'sucesso': False,
-                    'erro': f'Erro interno: {str(e)[:50]}',
-                    'nome_arquivo': arquivo.get('nome_arquivo', f'arquivo_{i+1}')
-                })
-                total_erro += 1
+            grupos = agrupar_lotes([item.get('upload') for item in resultados])
+            resultados_grupos = executor.map(
+                _processar_lote_massa, [[resultados[indice] for indice in grupo] for grupo in grupos],
+                repeat(service), repeat(current_app._get_current_object())
+            )
+            for grupo, resultados_grupo in zip(grupos, resultados_grupos):
+                for indice, resultado in zip(grupo, resultados_grupo):
+                    resultados[indice] = resultado
+        
+        total_sucesso = sum(1 for r in resultados if r['sucesso'])
+        total_erro = len(resultados) - total_sucesso
         
         return jsonify({
             'sucesso': True,
@@ -255,6 +298,8 @@ def upload_notas_massa():
             'resultados': resultados
         }), 200
         
+    except RequestEntityTooLarge:
+        raise  # Tratado pelo errorhandler(413) da aplicação
     except Exception as e:
         logger.error(f"Erro no upload em massa: {e}")
         return jsonify({
@@ -263,6 +308,87 @@ def upload_notas_massa():
         }), 500
 
 
+@bp.route('/upload-jobs/<job_id>', methods=['GET'])
+@auth_if_enabled
+def status_job(job_id):
+    """
+    Andamento de um upload assíncrono e os resultados já extraídos.
+    
+    Response JSON:
+        {"sucesso": true, "job_id": "...", "status": "PENDENTE|PROCESSANDO|CONCLUIDO",
+         "total": n, "concluidos": n, "resultados": [{status, sucesso, dados, ...}, ...]}
+    """
+    try:
+        job = obter_job(job_id)
+        if not job:
+            return jsonify({
+                'sucesso': False,
+                'erro': 'Job não encontrado.'
+            }), 404
+        
+        return jsonify({'sucesso': True, **job}), 200
+        
+    except Exception as e:
+        logger.error(f"Erro ao consultar job {job_id}: {e}")
+        return jsonify({
+            'sucesso': False,
+            'erro': 'Erro ao consultar o processamento.'
+        }), 500
+
+
+def _evento_sse(evento: str, dados, id_evento: Optional[str] = None) -> str:
+    """Formata um evento no protocolo Server-Sent Events (ping vira comentário)."""
+    if evento == 'ping':
+        return ': ping\n\n'
+    linha_id = f"id: {id_evento}\n" if id_evento else ''
+    return f"{linha_id}event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@bp.route('/upload-jobs/<job_id>/eventos', methods=['GET'])
+@auth_if_enabled
+def eventos_job_ocr(job_id):
+    """
+    Stream SSE (text/event-stream) com cada arquivo do job conforme avança.
+    
+    Eventos:
+        arquivo: {"indice": n, "status": "PENDENTE|PROCESSANDO|CONVERTENDO|EXTRAINDO|SUCESSO|ERRO",
+                  "sucesso": ..., "dados": {...}, "comprovante_url": "...", "erro": ...}
+        fim:     {"job_id": "...", "status": "CONCLUIDO", "total": n, "concluidos": n}
+    
+    Cada conexão dura no máximo Config.SSE_DURACAO_MAXIMA segundos, para
+    não prender um worker síncrono do uWSGI durante todo o OCR. O navegador
+    reconecta depois de SSE_RECONEXAO_MS enviando o Last-Event-ID: o id de
+    cada evento codifica o status já recebido de cada arquivo, então a
+    nova conexão só transmite o que mudou.
+    """
+    if not obter_job(job_id):
+        return jsonify({
+            'sucesso': False,
+            'erro': 'Job não encontrado.'
+        }), 404
+    
+    enviados = decodificar_enviados(request.headers.get('Last-Event-ID'))
+    
+    def gerar():
+        yield f'retry: {SSE_RECONEXAO_MS}\n\n'
+        try:
+            for evento, dados in eventos_job(job_id, enviados=enviados):
+                id_evento = codificar_enviados(enviados) if evento == 'arquivo' else None
+                yield _evento_sse(evento, dados, id_evento)
+        except Exception as e:
+            logger.error(f"Erro no stream de eventos do job {job_id}: {e}")
+            yield _evento_sse('erro', {'erro': 'Erro ao acompanhar o processamento.'})
+    
+    return Response(
+        stream_with_context(gerar()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # nginx: não acumular o stream
+        }
+    )
+
+
 @bp.route('/upload-comprovante', methods=['POST'])
 @auth_if_enabled
 def upload_comprovante():
@@ -271,52 +397,49 @@ def upload_comprovante():
     
     Request JSON:
         {"arquivo": "data:image/jpeg;base64,..."}
+    
+    Request multipart/form-data (sem base64):
+        arquivo: arquivo do comprovante
     """
     try:
         # Rate limit: 30 uploads por minuto por IP
         limiter = current_app.limiter
         limiter.limit("30 per minute")(lambda: None)()
         
-        data = request.get_json()
-        if not data or not data.get('arquivo'):
+        if _eh_multipart():
+            parte = request.files.get('arquivo')
+            arquivo = ArquivoUpload.de_multipart(parte) if parte else None
+        else:
+            data = request.get_json()
+            arquivo = data.get('arquivo') if data else None
+        
+        if not arquivo:
             return jsonify({
                 'sucesso': False,
                 'erro': 'Arquivo não enviado.'
             }), 400
         
-        arquivo_base64_original = data.get('arquivo')
-        
-        is_pdf = 'application/pdf' in arquivo_base64_original or eh_pdf(arquivo_base64_original)
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        extensao = 'pdf' if is_pdf else 'jpg'
-        filename = f"comprovante_{timestamp}.{extensao}"
-        
-        arquivo_base64 = arquivo_base64_original
-        if 'base64,' in arquivo_base64:
-            arquivo_base64 = arquivo_base64.split('base64,')[1]
-        
-        arquivo_bytes = base64.b64decode(arquivo_base64.strip())
-        
-        upload_folder = Path(Config.UPLOAD_FOLDER)
-        upload_folder.mkdir(parents=True, exist_ok=True)
-        
-        filepath = upload_folder / filename
-        with open(filepath, 'wb') as f:
-            f.write(arquivo_bytes)
-        
-        logger.info(f"Comprovante salvo: {filepath}")
-        
-        comprovante_url = f"/static/uploads/{filename}"
-        
-        imagem_para_ocr = arquivo_base64_original
-        if is_pdf:
-            imagem_convertida = converter_pdf_para_imagem(arquivo_base64_original)
-            if imagem_convertida:
-                imagem_para_ocr = imagem_convertida
+        try:
+            upload = ArquivoUpload.de_base64(arquivo) if isinstance(arquivo, str) else decodificar_item(arquivo)
+            comprovante_url = salvar_upload(upload, prefixo='comprovante')
+        except ValueError as e:
+            return jsonify({
+                'sucesso': False,
+                'erro': str(e)
+            }), 400
         
+        # PDF digital: camada de texto primeiro; senão a IA recebe as páginas
+        # renderizadas (ou o próprio PDF, se a renderização falhar)
         service = get_groq_service()
-        resultado = service.processar_receita(imagem_para_ocr)
+        resultado = service.processar_pdf_texto(upload, receita=True) if upload.eh_pdf else None
+        
+        if resultado is None:
+            imagem_para_ocr = upload
+            if upload.eh_pdf:
+                paginas = renderizar_paginas_pdf(upload.conteudo)
+                if paginas:
+                    imagem_para_ocr = [ArquivoUpload(pagina) for pagina in paginas]
+            resultado = service.processar_receita(imagem_para_ocr)
         
         if resultado['sucesso']:
             return jsonify({
@@ -332,6 +455,8 @@ def upload_comprovante():
                 'aviso': resultado.get('erro', 'Não foi possível extrair dados.')
             }), 200
         
+    except RequestEntityTooLarge:
+        raise  # Tratado pelo errorhandler(413) da aplicação
     except Exception as e:
         logger.error(f"Erro ao salvar comprovante: {e}")
         return jsonify({
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Benchmark dos índices da tabela transacoes.
+
+Uso:
+    python scripts/benchmark_indices.py [--linhas 50000] [--repeticoes 5]
+
+Cria um banco SQLite temporário com transações sintéticas e, para cada
+função de consulta "quente" de models.py, mostra o plano de consulta
+(EXPLAIN QUERY PLAN) e o tempo mediano SEM os índices e COM os índices
+aplicados por utils/migracoes.py.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+
+from app import create_app
+from config import Config
+import models
+from models import db, Transacao
+from utils.migracoes import aplicar_migracoes
+
+
+# Funções medidas: (rótulo, chamada)
+FUNCOES_QUENTES = [
+    ('get_transacoes_mes', lambda: models.get_transacoes_mes(2025, 1)),
+    ('get_totais_mes', lambda: models.get_totais_mes(2025, 1)),
+    ('get_gastos_por_categoria', lambda: models.get_gastos_por_categoria(2025, 1)),
+    ('get_gastos_por_subcategoria', lambda: models.get_gastos_por_subcategoria(2025, 1, 'Insumos')),
+    ('get_totais_diarios_mes', lambda: models.get_totais_diarios_mes(2025, 1)),
+    ('get_snapshot_mes', lambda: models.get_snapshot_mes(2025, 1, tipo='DESPESA', pagina=1, por_pagina=10)),
+    ('get_totais_ano', lambda: models.get_totais_ano(2025)),
+    ('get_totais_mensais_ano', lambda: models.get_totais_mensais_ano(2025)),
+    ('get_ranking_categorias_ano', lambda: models.get_ranking_categorias_ano(2025)),
+    ('get_transacoes_ano', lambda: models.get_transacoes_ano(2025, tipo='DESPESA')),
+]
+
+
+def popular(quantidade: int) -> None:
+    """Insere transações aleatórias espalhadas entre 2020 e 2025."""
+    random.seed(42)
+    inicio = datetime(2020, 1, 1)
+    dias = (datetime(2025, 12, 31) - inicio).days
+    categorias = list(Config.CATEGORIAS_SUBCATEGORIAS.items())
+    
+    linhas = []
+    for _ in range(quantidade):
+        tipo = 'DESPESA' if random.random() < 0.7 else 'RECEITA'
+        if tipo == 'DESPESA':
+            categoria, subcategorias = random.choice(categorias)
+            subcategoria = random.choice(subcategorias)
+        else:
+            categoria, subcategoria = random.choice(['Vendas', 'PIX', 'Cartão']), None
+        
+        linhas.append({
+            'tipo': tipo,
+            'valor_centavos': random.randint(500, 500000),
+            'data': inicio + timedelta(days=random.randrange(dias), minutes=random.randrange(1440)),
+            'categoria': categoria,
+            'subcategoria': subcategoria,
+            'descricao': f'Lançamento {random.randrange(10000)}',
+            'status': 'CONFIRMADO'
+        })
+    
+    db.session.execute(Transacao.__table__.insert(), linhas)
+    db.session.commit()
+
+
+def capturar_sql(funcao) -> list:
+    """Executa a função e retorna os SELECTs emitidos: [(sql, parametros), ...]."""
+    capturados = []
+    
+    def _ouvir(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            capturados.append((statement, parameters))
+    
+    event.listen(db.engine, 'before_cursor_execute', _ouvir)
+    try:
+        funcao()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _ouvir)
+    
+    return capturados
+
+
+def plano_consulta(sql: str, parametros) -> list:
+    """Retorna as linhas 'detail' do EXPLAIN QUERY PLAN."""
+    with db.engine.connect() as conn:
+        linhas = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros).fetchall()
+    return [linha[-1] for linha in linhas]
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Tempo mediano (ms) de execução da função."""
+    tempos = []
+    for _ in range(repeticoes):
+        db.session.expire_all()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def rodada(titulo: str, repeticoes: int) -> dict:
+    """Mostra plano e tempo de cada função. Retorna {rotulo: ms}."""
+    print(f"\n{'=' * 70}\n{titulo}\n{'=' * 70}")
+    tempos = {}
+    
+    for rotulo, funcao in FUNCOES_QUENTES:
+        consultas = capturar_sql(funcao)
+        tempos[rotulo] = medir(funcao, repeticoes)
+        
+        print(f"\n▶ {rotulo}: {tempos[rotulo]:.1f} ms")
+        for sql, parametros in consultas:
+            for detalhe in plano_consulta(sql, parametros):
+                print(f"    {detalhe}")
+    
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos índices de transacoes')
+    parser.add_argument('--linhas', type=int, default=50000, help='Transações sintéticas')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por função')
+    args = parser.parse_args()
+    
+    pasta = tempfile.mkdtemp(prefix='gestorbot_bench_')
+    caminho_db = os.path.join(pasta, 'benchmark.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_db}'})
+    
+    with app.app_context():
+        db.create_all()
+        
+        # Simula um banco antigo: remove os índices criados pelo create_all
+        for indice in Transacao.__table__.indexes:
+            db.session.execute(text(f'DROP INDEX IF EXISTS {indice.name}'))
+        db.session.commit()
+        
+        print(f"Populando {args.linhas} transações em {caminho_db}...")
+        popular(args.linhas)
+        db.session.execute(text('ANALYZE'))
+        
+        antes = rodada('SEM ÍNDICES', args.repeticoes)
+        
+        aplicar_migracoes()
+        db.session.execute(text('ANALYZE'))
+        
+        depois = rodada('COM ÍNDICES (utils/migracoes.py)', args.repeticoes)
+    
+    print(f"\n{'=' * 70}\nRESUMO (ms, mediana de {args.repeticoes} execuções)\n{'=' * 70}")
+    print(f"{'função':<32}{'sem índice':>12}{'com índice':>12}{'ganho':>10}")
+    for rotulo, _ in FUNCOES_QUENTES:
+        ganho = antes[rotulo] / depois[rotulo] if depois[rotulo] else float('inf')
+        print(f"{rotulo:<32}{antes[rotulo]:>12.1f}{depois[rotulo]:>12.1f}{ganho:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Benchmark do pré-processamento de imagens do OCR (utils/imagem_ocr.py).
+
+Uso:
+    python scripts/benchmark_preprocessamento.py [--pasta amostras/] [--api]
+
+Para cada imagem da pasta (jpg, jpeg, png, webp) mostra tamanho e
+dimensões antes e depois do pré-processamento, o tempo gasto e se a
+imagem seria recusada pelo limite de 4 MB de GroqService._preparar_imagem.
+Sem --pasta, gera um corpus sintético de fotos de cupons (12 MP, fundo
+de mesa, orientação pelo EXIF).
+
+Com --api (requer GROQ_API_KEY), envia cada imagem à Groq com e sem o
+pré-processamento e compara tokens consumidos e tempo da chamada.
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from config import Config
+from utils.arquivo_upload import ArquivoUpload
+from utils.imagem_ocr import preprocessar_imagem
+
+LIMITE_GROQ = 4 * 1024 * 1024  # Mesmo limite de GroqService._preparar_imagem
+EXTENSOES = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def foto_sintetica(indice: int) -> bytes:
+    """Simula a foto de um cupom: 4032x3024, fundo de mesa, EXIF 'deitado'."""
+    random.seed(indice)
+    fundo = Image.effect_noise((4032, 3024), 40).convert('RGB')
+    fundo = Image.blend(fundo, Image.new('RGB', fundo.size, (110, 80, 50)), 0.6)
+    
+    largura, altura = random.randint(1000, 1400), random.randint(2200, 2800)
+    cupom = Image.new('RGB', (largura, altura), (245, 243, 238))
+    desenho = ImageDraw.Draw(cupom)
+    for linha in range(60, altura - 60, 45):
+        texto = f"{random.choice(['GELO', 'CAMARAO', 'LIMAO', 'CERVEJA'])} {random.randint(1, 99)},{random.randint(0, 99):02d}"
+        desenho.text((60, linha), texto, fill=(30, 30, 30), font_size=32)
+    
+    # Foto "deitada": pixels em paisagem, orientação 6 (girar 90°) no EXIF
+    fundo.paste(cupom.rotate(90, expand=True), (random.randint(200, 800), random.randint(100, 600)))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    
+    saida = io.BytesIO()
+    fundo.save(saida, 'JPEG', quality=95, exif=exif)
+    return saida.getvalue()
+
+
+def carregar_corpus(pasta: str, quantidade: int) -> list:
+    """[(nome, bytes), ...] da pasta informada ou do corpus sintético."""
+    if pasta:
+        return [
+            (caminho.name, caminho.read_bytes())
+            for caminho in sorted(Path(pasta).iterdir())
+            if caminho.suffix.lower() in EXTENSOES
+        ]
+    print(f"Gerando {quantidade} fotos sintéticas de cupons...")
+    return [(f'sintetica_{i + 1}.jpg', foto_sintetica(i)) for i in range(quantidade)]
+
+
+def dimensoes(conteudo: bytes) -> str:
+    """'LxA' da imagem."""
+    with Image.open(io.BytesIO(conteudo)) as imagem:
+        return f"{imagem.width}x{imagem.height}"
+
+
+def chamar_api(service, imagem: ArquivoUpload) -> tuple:
+    """(tokens, ms) de uma chamada real ao modelo de visão."""
+    prompt = service._construir_prompt(imagem.nome_arquivo)
+    inicio = time.perf_counter()
+    response = service._chamar_visao(prompt, imagem)
+    return response.usage.total_tokens, (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do pré-processamento de imagens do OCR')
+    parser.add_argument('--pasta', help='Pasta com fotos de cupons/notas (padrão: corpus sintético)')
+    parser.add_argument('--quantidade', type=int, default=5, help='Fotos sintéticas geradas')
+    parser.add_argument('--api', action='store_true', help='Compara tokens e tempo reais na Groq')
+    args = parser.parse_args()
+    
+    corpus = carregar_corpus(args.pasta, args.quantidade)
+    if not corpus:
+        print("Nenhuma imagem encontrada.")
+        return
+    
+    service = None
+    if args.api:
+        from services.groq_service import GroqService
+        Config.OCR_CACHE_ATIVO = False
+        service = GroqService()
+    
+    print(f"\n{'arquivo':<24}{'antes':>18}{'KB':>8}{'depois':>14}{'KB':>7}{'ms':>7}")
+    tempos, recusadas_antes, recusadas_depois = [], 0, 0
+    total_antes = total_depois = 0
+    comparacoes = []
+    
+    for nome, conteudo in corpus:
+        upload = ArquivoUpload(conteudo, nome)
+        inicio = time.perf_counter()
+        processada = preprocessar_imagem(upload)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        
+        total_antes += upload.tamanho
+        total_depois += processada.tamanho
+        recusadas_antes += upload.tamanho > LIMITE_GROQ
+        recusadas_depois += processada.tamanho > LIMITE_GROQ
+        
+        print(f"{nome[:23]:<24}{dimensoes(conteudo):>18}{upload.tamanho // 1024:>8}"
+              f"{dimensoes(processada.conteudo):>14}{processada.tamanho // 1024:>7}{tempos[-1]:>7.0f}")
+        
+        if service:
+            original = chamar_api(service, upload) if upload.tamanho <= LIMITE_GROQ else None
+            comparacoes.append((nome, original, chamar_api(service, processada)))
+    
+    print(f"\n{'=' * 78}\nRESUMO ({len(corpus)} imagens)\n{'=' * 78}")
+    print(f"Bytes enviados à Groq: {total_antes / 1024**2:.1f} MB → {total_depois / 1024**2:.1f} MB "
+          f"({100 * (1 - total_depois / total_antes):.0f}% menos)")
+    print(f"Recusadas (> 4 MB): {recusadas_antes} → {recusadas_depois}")
+    print(f"Tempo de pré-processamento: mediana {statistics.median(tempos):.0f} ms, máximo {max(tempos):.0f} ms")
+    
+    if comparacoes:
+        print(f"\n{'arquivo':<24}{'tokens antes':>14}{'depois':>8}{'ms antes':>10}{'depois':>8}")
+        for nome, original, processada in comparacoes:
+            tokens, ms = original or ('recusada', '-')
+            print(f"{nome[:23]:<24}{tokens:>14}{processada[0]:>8}{ms if isinstance(ms, str) else f'{ms:.0f}':>10}{processada[1]:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
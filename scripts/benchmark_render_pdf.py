@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Relatório da renderização de PDFs para o OCR (utils/pdf_converter.py).
+
+Uso:
+    python scripts/benchmark_render_pdf.py [--pasta pdfs/] [--api]
+
+Compara, para cada PDF da pasta, o modo fixo (150 DPI, página inteira,
+colorida) com o adaptativo (DPI pelo tamanho do texto, recorte no
+conteúdo, cinza sem cor): tamanho e dimensões das imagens renderizadas,
+tempo de renderização e o tamanho que de fato segue para a Groq depois
+do pré-processamento (utils/imagem_ocr.py). Sem --pasta, usa um corpus
+sintético (nota digital, boleto com logotipo, página escaneada e fatura
+de duas páginas).
+
+Com --api (requer GROQ_API_KEY), envia as páginas dos dois modos ao
+modelo de visão e compara tokens consumidos e tempo da chamada.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from PIL import Image, ImageDraw
+
+from config import Config
+from utils.arquivo_upload import ArquivoUpload
+from utils.imagem_ocr import preprocessar_imagem
+from utils.pdf_converter import DPI_PADRAO, renderizar_paginas_pdf
+
+ITENS = ['CAMARAO ROSA KG', 'GELO EM CUBOS 20KG', 'LIMAO TAHITI CX', 'CERVEJA LATA 350ML', 'AGUA COCO 1L']
+
+
+def escrever_itens(pagina, inicio: float, fim: float, tamanho: float) -> None:
+    """Linhas de itens de nota entre as alturas inicio e fim."""
+    y = inicio
+    while y < fim:
+        item = ITENS[int(y) % len(ITENS)]
+        pagina.insert_text((50, y), f"{item:<24} 3 x 12,50 = 37,50", fontsize=tamanho, fontname='cour')
+        y += tamanho * 1.4
+
+
+def nota_digital() -> bytes:
+    """A4, texto 8 pt ocupando a metade de cima (cupom/DANFE simplificado)."""
+    with fitz.open() as documento:
+        pagina = documento.new_page()
+        pagina.insert_text((50, 50), 'DISTRIBUIDORA DE BEBIDAS LTDA', fontsize=12)
+        escrever_itens(pagina, 80, 420, 8)
+        pagina.insert_text((50, 440), 'TOTAL R$ 1.237,50', fontsize=12)
+        return documento.tobytes()
+
+
+def boleto_colorido() -> bytes:
+    """A4 com logotipo azul e texto 10 pt (a cor deve ser mantida)."""
+    with fitz.open() as documento:
+        pagina = documento.new_page()
+        pagina.draw_rect(fitz.Rect(40, 40, 200, 100), color=None, fill=(0.1, 0.3, 0.8))
+        pagina.draw_rect(fitz.Rect(40, 110, 555, 300), color=(0, 0, 0), width=0.5)
+        escrever_itens(pagina, 130, 290, 10)
+        return documento.tobytes()
+
+
+def pagina_escaneada() -> bytes:
+    """A4 com a foto de um cupom a 200 DPI, sem camada de texto."""
+    largura, altura = 1654, 2339  # A4 a 200 DPI
+    imagem = Image.new('L', (largura, altura), 235)
+    desenho = ImageDraw.Draw(imagem)
+    for linha in range(120, 1400, 40):
+        desenho.text((140, linha), f"{ITENS[linha % len(ITENS)]}  3 x 12,50", fill=30, font_size=28)
+    saida = io.BytesIO()
+    imagem.save(saida, 'JPEG', quality=85)
+    
+    with fitz.open() as documento:
+        pagina = documento.new_page()
+        pagina.insert_image(pagina.rect, stream=saida.getvalue())
+        return documento.tobytes()
+
+
+def fatura_duas_paginas() -> bytes:
+    """Fatura de fornecedor com o total na segunda página."""
+    with fitz.open() as documento:
+        for numero in (1, 2):
+            pagina = documento.new_page()
+            escrever_itens(pagina, 60, 780 if numero == 1 else 300, 9)
+        pagina.insert_text((50, 330), 'VALOR TOTAL DA FATURA R$ 4.812,00', fontsize=11)
+        return documento.tobytes()
+
+
+def carregar_corpus(pasta: str) -> list:
+    """[(nome, bytes), ...] da pasta informada ou do corpus sintético."""
+    if pasta:
+        return [(caminho.name, caminho.read_bytes()) for caminho in sorted(Path(pasta).glob('*.pdf'))]
+    return [
+        ('nota_digital.pdf', nota_digital()),
+        ('boleto_colorido.pdf', boleto_colorido()),
+        ('escaneada.pdf', pagina_escaneada()),
+        ('fatura_2_paginas.pdf', fatura_duas_paginas()),
+    ]
+
+
+def medir(pdf: bytes, dpi) -> dict:
+    """Renderiza no modo pedido (dpi fixo ou None = adaptativo) e mede."""
+    inicio = time.perf_counter()
+    paginas = renderizar_paginas_pdf(pdf, dpi=dpi)
+    ms = (time.perf_counter() - inicio) * 1000
+    
+    enviadas = [preprocessar_imagem(ArquivoUpload(pagina, 'pagina.jpg')) for pagina in paginas]
+    with Image.open(io.BytesIO(paginas[0])) as primeira:
+        dimensoes = f"{primeira.width}x{primeira.height} {primeira.mode}"
+    
+    return {
+        'kb': sum(map(len, paginas)) / 1024,
+        'enviado_kb': sum(imagem.tamanho for imagem in enviadas) / 1024,
+        'dimensoes': dimensoes,
+        'ms': ms,
+        'paginas': enviadas,
+    }
+
+
+def chamar_api(service, paginas: list) -> tuple:
+    """(tokens, ms) de uma chamada real ao modelo de visão com as páginas."""
+    imagens = paginas[0] if len(paginas) == 1 else paginas
+    prompt = service._prompt_paginas(service._construir_prompt(), imagens)
+    inicio = time.perf_counter()
+    response = service._chamar_visao(prompt, imagens)
+    return response.usage.total_tokens, (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relatório da renderização de PDFs para o OCR')
+    parser.add_argument('--pasta', help='Pasta com PDFs (padrão: corpus sintético)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Renderizações por modo (mediana do tempo)')
+    parser.add_argument('--api', action='store_true', help='Compara tokens e tempo reais na Groq')
+    args = parser.parse_args()
+    
+    corpus = carregar_corpus(args.pasta)
+    if not corpus:
+        print("Nenhum PDF encontrado.")
+        return
+    
+    service = None
+    if args.api:
+        from services.groq_service import GroqService
+        Config.OCR_CACHE_ATIVO = False
+        service = GroqService()
+    
+    print(f"\n{'arquivo':<22}{'modo':<11}{'imagem':>20}{'KB':>8}{'enviado KB':>12}{'ms':>7}")
+    totais = {'fixo': [0, 0, []], 'adaptativo': [0, 0, []]}
+    comparacoes = []
+    
+    for nome, pdf in corpus:
+        resultados = {}
+        for modo, dpi in (('fixo', DPI_PADRAO), ('adaptativo', None)):
+            medidas = [medir(pdf, dpi) for _ in range(args.repeticoes)]
+            resultado = {**medidas[-1], 'ms': statistics.median(m['ms'] for m in medidas)}
+            resultados[modo] = resultado
+            
+            totais[modo][0] += resultado['kb']
+            totais[modo][1] += resultado['enviado_kb']
+            totais[modo][2].append(resultado['ms'])
+            print(f"{nome[:21]:<22}{modo:<11}{resultado['dimensoes']:>20}{resultado['kb']:>8.0f}"
+                  f"{resultado['enviado_kb']:>12.0f}{resultado['ms']:>7.0f}")
+        
+        if service:
+            comparacoes.append((nome, *(chamar_api(service, resultados[m]['paginas']) for m in ('fixo', 'adaptativo'))))
+    
+    print(f"\n{'=' * 80}\nRESUMO ({len(corpus)} PDFs, páginas até OCR_PDF_MAX_PAGINAS={Config.OCR_PDF_MAX_PAGINAS})\n{'=' * 80}")
+    for modo, (kb, enviado_kb, tempos) in totais.items():
+        print(f"{modo:<11} renderizado {kb:>7.0f} KB | enviado à Groq {enviado_kb:>7.0f} KB | "
+              f"tempo mediano {statistics.median(tempos):.0f} ms")
+    
+    if comparacoes:
+        print(f"\n{'arquivo':<22}{'tokens fixo':>13}{'adaptativo':>12}{'ms fixo':>9}{'adaptativo':>12}")
+        for nome, (tokens_fixo, ms_fixo), (tokens_adaptativo, ms_adaptativo) in comparacoes:
+            print(f"{nome[:21]:<22}{tokens_fixo:>13}{tokens_adaptativo:>12}{ms_fixo:>9.0f}{ms_adaptativo:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
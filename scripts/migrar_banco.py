@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Script para atualizar um banco existente (instance/gestor.db).
+
+Uso:
+    python scripts/migrar_banco.py
+
+Cria tabelas ausentes e aplica as migrações de utils/migracoes.py
+(índices, colunas novas etc.). Pode ser executado múltiplas vezes: só as
+migrações pendentes rodam.
+
+ATENÇÃO: a migração valores_em_centavos é irreversível. Em um banco
+antigo, cada transacoes.valor (REAL) é regravado em valor_centavos
+(inteiro), arredondado ao centavo (ex: 0.285 vira 29 centavos), e a
+coluna valor é removida. Faça antes uma cópia de instance/gestor.db:
+
+    cp instance/gestor.db instance/gestor.db.bak
+"""
+
+import sys
+import os
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db
+from utils.migracoes import aplicar_migracoes
+
+
+def migrar():
+    """Cria tabelas ausentes e aplica migrações pendentes."""
+    with app.app_context():
+        db.create_all()
+        aplicadas = aplicar_migracoes()
+        
+        if not aplicadas:
+            print("✅ Banco já está atualizado. Nada a fazer.")
+            return
+        
+        for nome, resultado in aplicadas.items():
+            print(f"✅ {nome}: {resultado}")
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("🗄️  Migração do Banco de Dados")
+    print("=" * 50)
+    print()
+    
+    migrar()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Script para reconstruir a tabela de rollup (resumos_transacoes).
+
+Uso:
+    python scripts/reconstruir_resumos.py
+
+Recalcula os totais por dia/mês/ano a partir da tabela transacoes.
+Os triggers do banco mantêm o rollup em qualquer escrita (ORM, query em
+massa ou SQL direto); o script só é necessário quando os triggers não
+estavam ativos, como na restauração de um backup antigo. Seguro para
+executar múltiplas vezes: a tabela de rollup é descartável e é regerada
+por completo.
+"""
+
+import sys
+import os
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db
+from services.resumo_service import reconstruir_resumos
+
+
+def reconstruir():
+    """Cria tabelas ausentes e reconstrói o rollup."""
+    with app.app_context():
+        db.create_all()
+        total_linhas = reconstruir_resumos()
+        print(f"✅ Rollup reconstruído: {total_linhas} linhas de resumo.")
+
+
+if __name__ == '__main__':
+    print("=" * 50)
+    print("📊 Reconstrução da Tabela de Resumos")
+    print("=" * 50)
+    print()
+    
+    reconstruir()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Worker da fila de OCR (uploads assíncronos).
+
+Uso:
+    python scripts/worker_ocr.py              # roda continuamente
+    python scripts/worker_ocr.py --uma-vez    # esvazia a fila e encerra
+    python scripts/worker_ocr.py --paralelo 2
+    python scripts/worker_ocr.py --processos-pdf 4
+
+Processa os arquivos enfileirados por /upload-nota e /upload-notas-massa
+(services/ocr_job_service.py) e grava os resultados no banco. Deve rodar
+ao lado do servidor web, com o mesmo .env e a mesma pasta de uploads.
+Mais de um worker pode rodar ao mesmo tempo.
+
+O pool de processos que renderiza as páginas de PDFs só é ligado aqui
+(OCR_PDF_PROCESSOS_WORKER): no servidor web (uWSGI) ele não funciona.
+"""
+
+import argparse
+import os
+import sys
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from config import Config
+from models import db
+from services.ocr_job_service import executar_worker
+from utils.migracoes import aplicar_migracoes
+
+
+def main():
+    """Lê os argumentos e inicia o laço do worker."""
+    parser = argparse.ArgumentParser(description='Worker da fila de OCR')
+    parser.add_argument('--paralelo', type=int, default=Config.UPLOAD_MAX_PARALELO,
+                        help='Arquivos processados ao mesmo tempo')
+    parser.add_argument('--intervalo', type=float, default=1.0,
+                        help='Segundos entre consultas quando a fila está vazia')
+    parser.add_argument('--uma-vez', action='store_true',
+                        help='Processa os pendentes e encerra')
+    parser.add_argument('--processos-pdf', type=int, default=Config.OCR_PDF_PROCESSOS_WORKER,
+                        help='Processos que renderizam as páginas de PDFs (0 = em sequência)')
+    args = parser.parse_args()
+    
+    Config.OCR_PDF_PROCESSOS = args.processos_pdf
+    
+    with app.app_context():
+        db.create_all()
+        aplicar_migracoes()
+    
+    print(
+        f"🧾 Worker de OCR iniciado ({args.paralelo} em paralelo, "
+        f"{args.processos_pdf} processos de PDF). Ctrl+C para encerrar."
+    )
+    
+    try:
+        processados = executar_worker(
+            app, paralelo=args.paralelo, intervalo=args.intervalo, uma_vez=args.uma_vez
+        )
+        print(f"✅ {processados} arquivos processados")
+    except KeyboardInterrupt:
+        print("\n⏹️  Worker encerrado")
+
+
+if __name__ == '__main__':
+    main()
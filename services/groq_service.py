@@ -6,19 +6,33 @@ notas fiscais e extrair dados estruturados usando o modelo LLaMA Vision.
 """
 
 # 1. Bibliotecas padrão
-import base64
+import hashlib
 import json
 import logging
 import os
 import re
-from typing import Optional
+import threading
+import time
+import unicodedata
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Union
 
 # 2. Bibliotecas externas
-from groq import Groq
+from groq import BadRequestError, Groq
 
 # 3. Imports locais
 from config import Config
+from services.ocr_cache_service import buscar_resultado, gravar_resultado, hash_arquivo
+from utils.arquivo_upload import ArquivoUpload
+from utils.esquema_ocr import (
+    ESQUEMA_DESPESA, ESQUEMA_LOTE_DESPESA, ESQUEMA_RECEITA, formato_resposta, ler_resposta_estruturada
+)
 from utils.helpers import extrair_json_de_texto, validar_data, formatar_valor
+from utils.imagem_ocr import preprocessar_imagem
+from utils.limitador import get_limitador_groq
+from utils.resiliencia import atraso_hedge, chamar_com_hedge, chamar_com_resiliencia, get_monitor_latencia
+from utils.pdf_converter import extrair_texto_digital
+from utils.regras_comprovante import extrair_campos_despesa, extrair_campos_receita
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -43,7 +57,9 @@ INSTRUÇÕES:
 1. Identifique a data do pagamento/compra (formato: YYYY-MM-DD)
 2. Identifique o nome do estabelecimento/fornecedor/beneficiário
 3. Extraia o valor TOTAL pago (apenas números, sem R$)
-4. Classifique a despesa em CATEGORIA e SUBCATEGORIA conforme abaixo:
+4. Classifique a despesa em CATEGORIA e SUBCATEGORIA conforme abaixo
+5. Informe em "confianca" (0 a 1) o quanto tem certeza da data e do valor lidos
+   (baixa se o documento estiver borrado, cortado ou com mais de um total)
 
 CATEGORIAS E SUBCATEGORIAS DISPONÍVEIS:
 - Insumos: Frutos do Mar, Carnes e Aves, Hortifruti, Laticínios, Frutas, Alimento (Variado), Gelo, Outros
@@ -67,7 +83,8 @@ RESPONDA APENAS COM JSON VÁLIDO:
     "estabelecimento": "Nome do Fornecedor ou Beneficiário",
     "valor_total": 123.45,
     "categoria": "Categoria",
-    "subcategoria": "Subcategoria"
+    "subcategoria": "Subcategoria",
+    "confianca": 0.95
 }}
 
 Se a imagem não for legível ou não for um documento de despesa, retorne:
@@ -94,13 +111,15 @@ INSTRUÇÕES IMPORTANTES:
    - "TED" ou "DOC" ou "transferência bancária" ou "depósito" → tipo_pagamento: "Transferência"
    - "Cupom fiscal" ou "nota fiscal" ou "venda" ou "recibo" → tipo_pagamento: "Vendas"
    - Se não encontrar nenhuma palavra-chave clara → tipo_pagamento: "Outros"
+5. Informe em "confianca" (0 a 1) o quanto tem certeza da data e do valor lidos
 
 RESPONDA APENAS COM JSON VÁLIDO:
 {
     "data": "YYYY-MM-DD",
     "origem": "Nome do pagador ou banco",
     "valor": 123.45,
-    "tipo_pagamento": "PIX"
+    "tipo_pagamento": "PIX",
+    "confianca": 0.95
 }
 
 IMPORTANTE: O campo tipo_pagamento DEVE ser exatamente um destes valores:
@@ -117,6 +136,87 @@ Se a imagem não for legível ou não for um comprovante, retorne:
 # Alias para compatibilidade
 PROMPT_SISTEMA = PROMPT_DESPESA
 
+# Envelope dos prompts acima para o modelo só de texto (PDFs digitais)
+PROMPT_TEXTO_PDF = """
+ATENÇÃO: não há imagem. O documento abaixo é o TEXTO extraído de um PDF
+digital; onde as instruções falam em imagem, considere este texto.
+{prompt}
+
+TEXTO DO DOCUMENTO:
+\"\"\"
+{texto}
+\"\"\"
+"""
+
+# Caracteres do texto do PDF enviados ao modelo de texto
+MAX_CARACTERES_TEXTO_PDF = 6000
+
+# Aviso somado ao prompt quando o documento chega em várias imagens (PDF multipágina)
+PROMPT_PAGINAS = """
+ATENÇÃO: as {quantidade} imagens são páginas do MESMO documento, em ordem.
+Considere todas; o valor total costuma estar na última página.
+"""
+
+# Imagens por requisição aceitas pelo modelo de visão da Groq
+MAX_IMAGENS_POR_REQUISICAO = 5
+
+# Aviso somado ao PROMPT_DESPESA quando várias notas vão juntas (processar_notas_lote)
+PROMPT_LOTE = """
+ATENÇÃO: são {quantidade} imagens e cada uma é um documento DIFERENTE
+(índices 0 a {ultimo}, na ordem em que aparecem). Extraia cada documento
+separadamente, sem misturar dados entre as imagens.
+Nomes dos arquivos (ajudam a classificar): {nomes}
+
+Responda com um único objeto JSON, um item por imagem:
+{{"documentos": [{{"indice": 0, "data": "YYYY-MM-DD", "estabelecimento": "...", "valor_total": 123.45,
+"categoria": "...", "subcategoria": "...", "confianca": 0.95, "erro": null}}, ...]}}
+Para uma imagem ilegível ou que não é despesa, informe só "indice" e "erro".
+"""
+
+# Tokens de resposta por documento de um lote (o JSON de uma nota tem ~120)
+TOKENS_RESPOSTA_LOTE = 300
+
+# Estimativa de tokens de entrada de uma imagem, para o limitador de cota
+# (corrigida depois da chamada com o usage real devolvido pela API)
+TOKENS_ESTIMADOS_IMAGEM = 1200
+
+# Versão dos prompts e do tratamento da resposta, parte da chave do cache de
+# OCR (services/ocr_cache_service.py). Incremente ao mudar a extração de um
+# jeito que não altere o texto dos prompts (ex: _processar_resposta)
+VERSAO_PROMPT = 2
+
+# Beneficiários conhecidos para categorizar comprovantes lidos pelas regras
+# (utils/regras_comprovante.py). Casados por palavra inteira no nome sem
+# acentos: as palavras-chave de _categorizar_por_nome_arquivo são trechos
+# soltos ('das', 'luz', 'dj', 'extra') e erram em nomes de fornecedor
+# ("Casa das Carnes", "Padaria Luzia"). Sem acerto, fica Outros e o modelo
+# de texto categoriza.
+BENEFICIARIOS_CONHECIDOS = [
+    # Infraestrutura
+    ('celesc', 'Infraestrutura', 'Energia'),
+    ('casan', 'Infraestrutura', 'Energia'),
+    
+    # Administrativo
+    ('simples nacional', 'Administrativo', 'Impostos'),
+    ('receita federal', 'Administrativo', 'Impostos'),
+    ('secretaria da fazenda', 'Administrativo', 'Impostos'),
+    ('prefeitura municipal', 'Administrativo', 'Impostos'),
+    
+    # Operacional
+    ('stone', 'Operacional', 'Sistemas/Gestão'),
+    ('cielo', 'Operacional', 'Sistemas/Gestão'),
+    ('getnet', 'Operacional', 'Sistemas/Gestão'),
+    ('pagseguro', 'Operacional', 'Sistemas/Gestão'),
+    ('sumup', 'Operacional', 'Sistemas/Gestão'),
+    ('mercado pago', 'Operacional', 'Sistemas/Gestão'),
+    ('spotify', 'Operacional', 'Música/Streaming'),
+    ('deezer', 'Operacional', 'Música/Streaming'),
+    
+    # Marketing e Eventos
+    ('facebook', 'Marketing e Eventos', 'Marketing'),
+    ('instagram', 'Marketing e Eventos', 'Marketing'),
+]
+
 
 class GroqService:
     """
@@ -147,6 +247,13 @@ class GroqService:
         self.model = Config.GROQ_MODEL
         self.client = None
         
+        # Modelos que recusaram o response_format: seguem só com o prompt
+        self._modelos_sem_esquema = set()
+        
+        # Quantas extrações cada nível do roteamento atendeu e por que escalou
+        self._roteamento = {'rapido': 0, 'completo': 0, 'escalados': {'falha': 0, 'confianca': 0}}
+        self._roteamento_trava = threading.Lock()
+        
         # Tenta pegar a API key diretamente do ambiente (prioridade)
         # Isso permite que o WSGI defina a variável antes do config carregar
         api_key = os.environ.get('GROQ_API_KEY') or Config.GROQ_API_KEY
@@ -159,7 +266,7 @@ class GroqService:
                 print(f"Tentando inicializar com chave: {masked_key}")
                 print(f"Tamanho da chave: {len(api_key)}")
                 
-                self.client = Groq(api_key=api_key)
+                self.client = self._criar_cliente(api_key)
                 logger.info(f"Cliente Groq inicializado com modelo {self.model}")
                 print(f"--- SUCESSO GROQ ---")
             except Exception as e:
@@ -172,12 +279,23 @@ class GroqService:
                 "O serviço de OCR não funcionará."
             )
     
-    def processar_nota(self, imagem_base64: str, nome_arquivo: str = None) -> dict:
+    @staticmethod
+    def _criar_cliente(api_key: str) -> Groq:
+        """
+        Cliente Groq sem as novas tentativas internas do SDK.
+        
+        Timeout, novas tentativas e disjuntor ficam com utils/resiliencia.py;
+        com as do SDK somadas, cada falha viraria até 9 chamadas.
+        """
+        return Groq(api_key=api_key, max_retries=0, timeout=Config.GROQ_TIMEOUT)
+    
+    def processar_nota(self, imagem_base64, nome_arquivo: str = None) -> dict:
         """
         Processa imagem de nota fiscal e extrai dados estruturados.
         
         Args:
-            imagem_base64: String base64 da imagem (com ou sem prefixo data:image)
+            imagem_base64: ArquivoUpload da imagem, string base64 (com ou sem prefixo
+                data:image) ou lista de ArquivoUpload com as páginas de um PDF
             nome_arquivo: Nome original do arquivo (usado para ajudar na categorização)
         
         Returns:
@@ -195,11 +313,11 @@ class GroqService:
             # Tenta reinicializar (pela força do ódio) caso a ENV tenha carregado depois
             if Config.GROQ_API_KEY:
                 try:
-                    self.client = Groq(api_key=Config.GROQ_API_KEY)
+                    self.client = self._criar_cliente(Config.GROQ_API_KEY)
                     logger.info("Cliente Groq reinicializado com sucesso no momento da chamada")
                 except Exception as e:
                     logger.error(f"Erro na reinicialização tardia: {e}")
-
+        
         if not self.client:
             logger.error("Tentativa de processar nota sem cliente Groq configurado")
             return {
@@ -207,8 +325,8 @@ class GroqService:
                 'erro': 'Serviço de OCR não configurado. Verifique a GROQ_API_KEY.'
             }
         
-        # Valida e prepara a imagem
-        imagem_preparada = self._preparar_imagem(imagem_base64)
+        # Valida e prepara a imagem (ou as páginas do PDF)
+        imagem_preparada = self._preparar_paginas(imagem_base64)
         if not imagem_preparada:
             return {
                 'sucesso': False,
@@ -220,65 +338,20 @@ class GroqService:
             logger.info(f"Iniciando processamento de nota fiscal via Groq (arquivo: {nome_arquivo or 'não informado'})")
             
             # Constrói prompt com nome do arquivo se disponível
-            prompt = self._construir_prompt(nome_arquivo)
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{imagem_preparada}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                temperature=0.1,  # Baixa para respostas mais determinísticas
-                max_tokens=500
-            )
+            prompt = self._prompt_paginas(self._construir_prompt(nome_arquivo), imagem_preparada)
             
-            texto_resposta = response.choices[0].message.content
-            logger.debug(f"Resposta da API Groq: {texto_resposta}")
-            
-            # Extrai e valida o JSON da resposta
-            resultado = self._processar_resposta(texto_resposta)
-            
-            # ===========================================
-            # LÓGICA DE CATEGORIZAÇÃO:
-            # 1. Primeiro: Verifica nome do arquivo
-            # 2. Segundo: Usa o que a IA identificou do comprovante
-            # 3. Fallback: Categoria/Subcategoria = Outros/Outros
-            # ===========================================
-            if resultado['sucesso'] and nome_arquivo:
-                # Tenta categorizar pelo nome do arquivo primeiro
-                cat_sub_arquivo = self._categorizar_por_nome_arquivo(nome_arquivo)
+            def processar(texto_resposta: str) -> dict:
+                logger.debug(f"Resposta da API Groq: {texto_resposta}")
                 
-                if cat_sub_arquivo:
-                    # Nome do arquivo tem informação útil - usa ela
-                    categoria_arquivo, subcategoria_arquivo = cat_sub_arquivo
-                    logger.info(f"Categoria detectada pelo nome do arquivo: {categoria_arquivo}/{subcategoria_arquivo}")
-                    resultado['dados']['categoria'] = categoria_arquivo
-                    resultado['dados']['subcategoria'] = subcategoria_arquivo
-                else:
-                    # Nome do arquivo não ajudou - verifica se IA conseguiu identificar
-                    categoria_ia = resultado['dados'].get('categoria', 'Outros')
-                    subcategoria_ia = resultado['dados'].get('subcategoria', 'Outros')
-                    
-                    # Se IA não conseguiu identificar (retornou Outros/Outros), mantém assim
-                    if categoria_ia == 'Outros' and subcategoria_ia == 'Outros':
-                        logger.info("Nenhuma categoria identificada - usando Outros/Outros")
-                    else:
-                        logger.info(f"Categoria detectada pela IA (comprovante): {categoria_ia}/{subcategoria_ia}")
+                # Extrai e valida o JSON da resposta
+                resultado = self._processar_resposta(texto_resposta)
+                
+                self._aplicar_categoria_por_nome(resultado, nome_arquivo)
+                if resultado['sucesso']:
+                    resultado['dados']['extracao'] = 'visao'
+                return resultado
             
-            return resultado
+            return self._extrair_com_roteamento(prompt, imagem_preparada, ESQUEMA_DESPESA, processar)
             
         except Exception as e:
             erro_str = str(e)
@@ -289,6 +362,8 @@ class GroqService:
                 msg_erro = 'Chave da API Groq inválida. Verifique a GROQ_API_KEY no arquivo .env'
             elif 'rate_limit' in erro_str.lower() or 'quota' in erro_str.lower():
                 msg_erro = 'Limite de uso da API atingido. Aguarde alguns minutos.'
+            elif 'circuito_aberto' in erro_str.lower():
+                msg_erro = 'Serviço de OCR instável no momento. Tente novamente em alguns instantes.'
             elif 'model' in erro_str.lower() and 'not found' in erro_str.lower():
                 msg_erro = f'Modelo {self.model} não encontrado. Verifique o GROQ_MODEL no config.'
             elif 'connection' in erro_str.lower() or 'timeout' in erro_str.lower():
@@ -301,12 +376,196 @@ class GroqService:
                 'erro': msg_erro
             }
     
-    def processar_receita(self, imagem_base64: str) -> dict:
+    def processar_notas_lote(self, imagens: List[ArquivoUpload]) -> List[dict]:
+        """
+        Extrai várias notas pequenas (ex: prints de PIX) numa única requisição.
+        
+        As imagens vão juntas ao primeiro nível do roteamento (_niveis_modelo),
+        que devolve um item por imagem identificado pelo índice
+        (ESQUEMA_LOTE_DESPESA). Cada item passa pela mesma normalização de
+        processar_nota e é gravado no cache de OCR com a chave que
+        processar_nota usaria para a imagem sozinha.
+        
+        Imagens sem item válido na resposta (ou todas, se a resposta do lote
+        não puder ser lida ou a chamada falhar) seguem para processar_nota,
+        uma a uma; extrações que falharam no lote não vão para o cache, para
+        a imagem sozinha ter outra chance. Resultados que pedem escalada
+        (_motivo_escalar) também seguem, mas já estão no cache: o roteamento
+        só chama o modelo completo.
+        
+        Args:
+            imagens: Imagens (não PDF) do upload, com nome_arquivo preenchido
+        
+        Returns:
+            list: Um resultado no formato de processar_nota por imagem, na mesma ordem
+        """
+        if len(imagens) > MAX_IMAGENS_POR_REQUISICAO:
+            return (self.processar_notas_lote(imagens[:MAX_IMAGENS_POR_REQUISICAO])
+                    + self.processar_notas_lote(imagens[MAX_IMAGENS_POR_REQUISICAO:]))
+        
+        resultados: List[Optional[dict]] = [None] * len(imagens)
+        niveis = self._niveis_modelo()
+        nivel, modelo = niveis[0]
+        
+        # Só entram no lote as imagens válidas e ainda sem resultado no cache
+        lote = []
+        if self.client and len(imagens) > 1:
+            for indice, imagem in enumerate(imagens):
+                preparada = self._preparar_imagem(imagem)
+                if not preparada:
+                    continue
+                prompt = self._construir_prompt(imagem.nome_arquivo)
+                chave_cache = (self._hash_imagem(preparada), modelo, self._versao_prompt(prompt))
+                if not buscar_resultado(*chave_cache):
+                    lote.append((indice, preparada, chave_cache))
+        
+        if len(lote) > 1:
+            logger.info(f"Processando {len(lote)} notas numa única requisição ao modelo {modelo}")
+            try:
+                documentos = self._extrair_lote(
+                    [preparada for _, preparada, _ in lote],
+                    [imagens[indice].nome_arquivo for indice, _, _ in lote],
+                    modelo
+                )
+            except Exception as e:
+                logger.warning(f"Falha no lote de {len(lote)} notas, processando uma a uma: {e}")
+                documentos = {}
+            
+            for posicao, (indice, _, chave_cache) in enumerate(lote):
+                if posicao not in documentos:
+                    continue
+                
+                resultado = self._normalizar_despesa(documentos[posicao])
+                if not resultado['sucesso']:
+                    # Fora do cache: a imagem sozinha tem outra chance
+                    continue
+                
+                self._aplicar_categoria_por_nome(resultado, imagens[indice].nome_arquivo)
+                resultado['dados'].update(extracao='visao', nivel_modelo=nivel, modelo=modelo, lote=len(lote))
+                gravar_resultado(*chave_cache, resultado)
+                
+                if len(niveis) == 1 or self._motivo_escalar(resultado) is None:
+                    self._registrar_nivel(nivel)
+                    resultados[indice] = resultado
+        
+        # Fora do lote, sem item na resposta ou a escalar: uma a uma
+        return [
+            resultado or self.processar_nota(imagem, imagem.nome_arquivo)
+            for resultado, imagem in zip(resultados, imagens)
+        ]
+    
+    def _extrair_lote(self, preparadas: List[ArquivoUpload], nomes: List[str], modelo: str) -> Dict[int, dict]:
+        """
+        Chamada única ao modelo de visão com várias notas e leitura do JSON por índice.
+        
+        Args:
+            preparadas: Imagens já passadas por _preparar_imagem
+            nomes: Nome do arquivo de cada imagem (mesma ordem)
+            modelo: Modelo de visão do lote
+        
+        Returns:
+            dict: {índice: campos da nota (sem os null)}; índices ausentes,
+                repetidos ou fora do intervalo ficam de fora
+        """
+        quantidade = len(preparadas)
+        nomes_numerados = ', '.join(f'{indice}: "{nome or "sem nome"}"' for indice, nome in enumerate(nomes))
+        prompt = PROMPT_DESPESA + PROMPT_LOTE.format(quantidade=quantidade, ultimo=quantidade - 1, nomes=nomes_numerados)
+        
+        response = self._chamar_visao(
+            prompt, preparadas, max_tokens=TOKENS_RESPOSTA_LOTE * quantidade,
+            esquema=ESQUEMA_LOTE_DESPESA, modelo=modelo
+        )
+        texto_resposta = response.choices[0].message.content
+        logger.debug(f"Resposta da API Groq (lote): {texto_resposta}")
+        
+        # Reserva: mesmo parser tolerante das notas avulsas
+        conteudo = ler_resposta_estruturada(texto_resposta, ESQUEMA_LOTE_DESPESA) or extrair_json_de_texto(texto_resposta)
+        documentos = conteudo.get('documentos') if isinstance(conteudo, dict) else conteudo
+        if not isinstance(documentos, list):
+            logger.warning(f"Resposta do lote sem a lista de documentos: {texto_resposta}")
+            return {}
+        
+        por_indice, repetidos = {}, set()
+        for documento in documentos:
+            indice = documento.get('indice') if isinstance(documento, dict) else None
+            if isinstance(indice, bool) or not isinstance(indice, int) or not 0 <= indice < quantidade:
+                continue
+            if indice in por_indice:
+                repetidos.add(indice)
+            por_indice[indice] = {campo: valor for campo, valor in documento.items() if valor is not None and campo != 'indice'}
+        
+        # Dois itens para a mesma imagem: não dá para saber qual vale
+        for indice in repetidos:
+            del por_indice[indice]
+        
+        if len(por_indice) < quantidade:
+            logger.warning(f"Lote com {quantidade - len(por_indice)} de {quantidade} notas sem resultado válido")
+        return por_indice
+    
+    def _aplicar_categoria_por_nome(self, resultado: dict, nome_arquivo: Optional[str]) -> None:
+        """
+        Sobrescreve categoria/subcategoria pelo nome do arquivo, quando ele ajuda.
+        
+        Args:
+            resultado: Retorno de _normalizar_despesa (alterado no lugar)
+            nome_arquivo: Nome original do arquivo
+        """
+        # ===========================================
+        # LÓGICA DE CATEGORIZAÇÃO:
+        # 1. Primeiro: Verifica nome do arquivo
+        # 2. Segundo: Usa o que a IA identificou do comprovante
+        # 3. Fallback: Categoria/Subcategoria = Outros/Outros
+        # ===========================================
+        if resultado['sucesso'] and nome_arquivo:
+            # Tenta categorizar pelo nome do arquivo primeiro
+            cat_sub_arquivo = self._categorizar_por_nome_arquivo(nome_arquivo)
+            
+            if cat_sub_arquivo:
+                # Nome do arquivo tem informação útil - usa ela
+                categoria_arquivo, subcategoria_arquivo = cat_sub_arquivo
+                logger.info(f"Categoria detectada pelo nome do arquivo: {categoria_arquivo}/{subcategoria_arquivo}")
+                resultado['dados']['categoria'] = categoria_arquivo
+                resultado['dados']['subcategoria'] = subcategoria_arquivo
+            else:
+                # Nome do arquivo não ajudou - verifica se IA conseguiu identificar
+                categoria_ia = resultado['dados'].get('categoria', 'Outros')
+                subcategoria_ia = resultado['dados'].get('subcategoria', 'Outros')
+                
+                # Se IA não conseguiu identificar (retornou Outros/Outros), mantém assim
+                if categoria_ia == 'Outros' and subcategoria_ia == 'Outros':
+                    logger.info("Nenhuma categoria identificada - usando Outros/Outros")
+                else:
+                    logger.info(f"Categoria detectada pela IA (comprovante): {categoria_ia}/{subcategoria_ia}")
+    
+    def _aplicar_categoria_por_estabelecimento(self, resultado: dict) -> None:
+        """
+        Categoriza pelo beneficiário (ex: 'CELESC DISTRIBUICAO S.A.') o que ficou em Outros.
+        
+        Só aceita nomes de BENEFICIARIOS_CONHECIDOS como palavras inteiras;
+        qualquer outro beneficiário continua em Outros.
+        
+        Args:
+            resultado: Retorno de _normalizar_despesa (alterado no lugar)
+        """
+        if not resultado['sucesso'] or resultado['dados'].get('categoria') != 'Outros':
+            return
+        
+        nome = unicodedata.normalize('NFKD', resultado['dados'].get('estabelecimento') or '')
+        nome = ''.join(c for c in nome if not unicodedata.combining(c)).lower()
+        
+        for chave, categoria, subcategoria in BENEFICIARIOS_CONHECIDOS:
+            if re.search(rf'\b{re.escape(chave)}\b', nome):
+                resultado['dados']['categoria'] = categoria
+                resultado['dados']['subcategoria'] = subcategoria
+                return
+    
+    def processar_receita(self, imagem_base64) -> dict:
         """
         Processa imagem de comprovante de receita (PIX, transferência) e extrai dados.
         
         Args:
-            imagem_base64: String base64 da imagem (com ou sem prefixo data:image)
+            imagem_base64: ArquivoUpload da imagem, string base64 (com ou sem prefixo
+                data:image) ou lista de ArquivoUpload com as páginas de um PDF
         
         Returns:
             dict: Dicionário com resultado do processamento:
@@ -320,8 +579,8 @@ class GroqService:
                 'erro': 'Serviço de OCR não configurado. Verifique a GROQ_API_KEY.'
             }
         
-        # Valida e prepara a imagem
-        imagem_preparada = self._preparar_imagem(imagem_base64)
+        # Valida e prepara a imagem (ou as páginas do PDF)
+        imagem_preparada = self._preparar_paginas(imagem_base64)
         if not imagem_preparada:
             return {
                 'sucesso': False,
@@ -331,34 +590,14 @@ class GroqService:
         try:
             logger.info("Iniciando processamento de comprovante de receita via Groq")
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": PROMPT_RECEITA
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{imagem_preparada}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=500
-            )
+            prompt = self._prompt_paginas(PROMPT_RECEITA, imagem_preparada)
             
-            texto_resposta = response.choices[0].message.content
-            logger.debug(f"Resposta da API Groq (receita): {texto_resposta}")
+            def processar(texto_resposta: str) -> dict:
+                logger.debug(f"Resposta da API Groq (receita): {texto_resposta}")
+                # Processa resposta específica para receita
+                return self._processar_resposta_receita(texto_resposta)
             
-            # Processa resposta específica para receita
-            return self._processar_resposta_receita(texto_resposta)
+            return self._extrair_com_roteamento(prompt, imagem_preparada, ESQUEMA_RECEITA, processar)
             
         except Exception as e:
             erro_str = str(e)
@@ -368,11 +607,369 @@ class GroqService:
                 'erro': f'Erro ao processar comprovante: {erro_str[:100]}'
             }
     
+    def processar_pdf_texto(self, pdf: ArquivoUpload, nome_arquivo: str = None, receita: bool = False) -> Optional[dict]:
+        """
+        Extrai os dados de um PDF digital pela camada de texto, sem o modelo de visão.
+        
+        Ordem de tentativa:
+            1. Regras locais (utils/regras_comprovante.py): sem chamada à API.
+               A despesa é categorizada pelo nome do arquivo ou, sem ele, pelo
+               beneficiário; se nenhum dos dois indica a categoria, segue para
+               o modelo de texto e a leitura das regras fica como reserva
+            2. Modelo só de texto (GROQ_MODEL_TEXTO) com o texto do PDF
+        
+        Args:
+            pdf: PDF do upload
+            nome_arquivo: Nome original do arquivo (categorização da despesa)
+            receita: True para comprovantes de receita (processar_receita)
+        
+        Returns:
+            dict: Resultado no formato de processar_nota/processar_receita, com
+                dados['extracao'] = 'regras' ou 'texto'; None se o PDF não tem
+                texto ou nenhuma etapa teve sucesso (o chamador segue para a visão)
+        """
+        if not Config.OCR_TEXTO_PDF_ATIVO or not pdf.eh_pdf:
+            return None
+        
+        texto = extrair_texto_digital(pdf.conteudo)
+        if not texto:
+            return None
+        
+        # 1. Regras locais
+        reserva = None
+        campos = extrair_campos_receita(texto) if receita else extrair_campos_despesa(texto)
+        if campos:
+            if receita:
+                resultado = self._normalizar_receita(campos)
+            else:
+                resultado = self._normalizar_despesa({**campos, 'categoria': 'Outros', 'subcategoria': 'Outros'})
+                self._aplicar_categoria_por_nome(resultado, nome_arquivo)
+                self._aplicar_categoria_por_estabelecimento(resultado)
+            if resultado['sucesso']:
+                logger.info(f"PDF digital lido pelas regras locais (arquivo: {nome_arquivo or 'não informado'})")
+                resultado['dados']['extracao'] = 'regras'
+                # Despesa sem categoria pelo nome do arquivo nem do beneficiário:
+                # o modelo de texto categoriza, e as regras ficam como reserva
+                if receita or resultado['dados']['categoria'] != 'Outros' or not self.client:
+                    return resultado
+                reserva = resultado
+        
+        # 2. Modelo só de texto
+        if not self.client:
+            return None
+        
+        try:
+            instrucoes = PROMPT_RECEITA if receita else self._construir_prompt(nome_arquivo)
+            prompt = PROMPT_TEXTO_PDF.format(prompt=instrucoes, texto=texto[:MAX_CARACTERES_TEXTO_PDF])
+            
+            chave_cache = (hash_arquivo(pdf.conteudo), Config.GROQ_MODEL_TEXTO, self._versao_prompt(prompt))
+            em_cache = buscar_resultado(*chave_cache)
+            if em_cache:
+                return em_cache
+            
+            response = self._chamar_texto(prompt, esquema=ESQUEMA_RECEITA if receita else ESQUEMA_DESPESA)
+            texto_resposta = response.choices[0].message.content
+            logger.debug(f"Resposta do modelo de texto: {texto_resposta}")
+            
+            if receita:
+                resultado = self._processar_resposta_receita(texto_resposta)
+            else:
+                resultado = self._processar_resposta(texto_resposta)
+                self._aplicar_categoria_por_nome(resultado, nome_arquivo)
+            if not resultado['sucesso']:
+                return reserva
+            
+            resultado['dados']['extracao'] = 'texto'
+            gravar_resultado(*chave_cache, resultado)
+            return resultado
+        
+        except Exception as e:
+            if reserva:
+                logger.warning(f"Falha no modelo de texto, mantendo a leitura das regras: {e}")
+                return reserva
+            logger.warning(f"Falha na extração pelo texto do PDF, usando visão: {e}")
+            return None
+    
+    def _niveis_modelo(self) -> List[tuple]:
+        """
+        Modelos de visão na ordem em que são tentados: [(nível, modelo), ...].
+        
+        Com OCR_ROTEAMENTO_ATIVO, o modelo rápido (GROQ_MODEL_RAPIDO) vem antes
+        do completo (GROQ_MODEL); sem ele, ou com os dois iguais, só o completo.
+        """
+        rapido = Config.GROQ_MODEL_RAPIDO
+        if Config.OCR_ROTEAMENTO_ATIVO and rapido and rapido != self.model:
+            return [('rapido', rapido), ('completo', self.model)]
+        return [('completo', self.model)]
+    
+    def _motivo_escalar(self, resultado: dict) -> Optional[str]:
+        """
+        Por que o resultado do modelo rápido não basta (None se basta).
+        
+        Returns:
+            str: 'falha' (JSON ilegível, _validar_resposta reprovou, campos
+                obrigatórios ausentes ou o modelo recusou o documento; na
+                receita, valor zerado ou sem data) ou
+                'confianca' (autoavaliação abaixo de OCR_CONFIANCA_MINIMA)
+        """
+        if not resultado['sucesso']:
+            return 'falha'
+        
+        # Receita não passa por _validar_resposta: valor zerado ou sem data também é falha
+        dados = resultado['dados']
+        if 'valor' in dados and (not dados['valor'] or not dados.get('data')):
+            return 'falha'
+        
+        confianca = dados.get('confianca')
+        if confianca is not None and confianca < Config.OCR_CONFIANCA_MINIMA:
+            return 'confianca'
+        return None
+    
+    def _extrair_com_roteamento(self, prompt: str, imagem_preparada, esquema: dict, processar) -> dict:
+        """
+        Extrai pelo modelo de visão, começando pelo nível mais barato.
+        
+        Cada nível tem sua entrada no cache de OCR (o modelo faz parte da
+        chave). O resultado do modelo rápido só é devolvido se
+        _motivo_escalar não vê problema; senão o modelo completo é chamado e
+        a resposta dele vale, mesmo que também falhe.
+        
+        Args:
+            prompt: Prompt completo (com o aviso de páginas, se houver)
+            imagem_preparada: Imagem ou lista de páginas de _preparar_paginas
+            esquema: ESQUEMA_DESPESA ou ESQUEMA_RECEITA
+            processar: Função texto da resposta -> resultado normalizado
+        
+        Returns:
+            dict: Resultado de `processar`, com dados['nivel_modelo'] e
+                dados['modelo'] de quem atendeu
+        """
+        hash_imagem = self._hash_imagem(imagem_preparada)
+        versao = self._versao_prompt(prompt)
+        niveis = self._niveis_modelo()
+        
+        for indice, (nivel, modelo) in enumerate(niveis):
+            # Mesmo arquivo, modelo e prompt: reaproveita a extração anterior
+            chave_cache = (hash_imagem, modelo, versao)
+            resultado = buscar_resultado(*chave_cache)
+            if not resultado:
+                response = self._chamar_visao(prompt, imagem_preparada, esquema=esquema, modelo=modelo)
+                resultado = processar(response.choices[0].message.content)
+                if resultado['sucesso']:
+                    resultado['dados'].update(nivel_modelo=nivel, modelo=modelo)
+                gravar_resultado(*chave_cache, resultado)
+            
+            motivo = self._motivo_escalar(resultado) if indice < len(niveis) - 1 else None
+            if motivo is None:
+                self._registrar_nivel(nivel)
+                return resultado
+            
+            logger.info(f"Resultado do modelo {modelo} insuficiente ({motivo}); escalando para o próximo nível")
+            self._registrar_nivel(None, motivo)
+    
+    def _registrar_nivel(self, nivel: Optional[str], motivo: Optional[str] = None) -> None:
+        """Conta a extração atendida pelo nível, ou a escalada pelo motivo."""
+        with self._roteamento_trava:
+            if motivo:
+                self._roteamento['escalados'][motivo] += 1
+            else:
+                self._roteamento[nivel] += 1
+    
+    def estatisticas_roteamento(self) -> dict:
+        """
+        Contadores do roteamento entre modelos, para ajustar OCR_CONFIANCA_MINIMA.
+        
+        Returns:
+            dict: {'rapido': n, 'completo': n, 'escalados': {'falha': n, 'confianca': n},
+                   'modelos': {'rapido': ..., 'completo': ...}}
+        """
+        with self._roteamento_trava:
+            estatisticas = {**self._roteamento, 'escalados': dict(self._roteamento['escalados'])}
+        estatisticas['modelos'] = dict(self._niveis_modelo())
+        return estatisticas
+    
+    def _chamar_visao(
+        self,
+        prompt: str,
+        imagem_preparada: Union[ArquivoUpload, List[ArquivoUpload]],
+        max_tokens: int = 500,
+        esquema: Optional[dict] = None,
+        modelo: Optional[str] = None
+    ):
+        """
+        Envia prompt + imagem(ns) ao modelo de visão respeitando a cota da chave.
+        
+        Antes da chamada retira do limitador compartilhado (utils/limitador.py)
+        uma requisição e a estimativa de tokens; depois corrige o saldo com o
+        consumo real. Várias threads podem chamar ao mesmo tempo. Timeout,
+        novas tentativas e disjuntor: _chamar_api.
+        
+        Args:
+            prompt: Texto do prompt
+            imagem_preparada: Imagem retornada por _preparar_imagem, ou a lista
+                de _preparar_paginas (todas vão na mesma requisição)
+            max_tokens: Limite de tokens da resposta
+            esquema: ESQUEMA_DESPESA/ESQUEMA_RECEITA para a saída estruturada
+                (_chamar_estruturado); None mantém a resposta em texto livre
+            modelo: Modelo de visão (padrão: self.model; ver _niveis_modelo)
+        
+        Returns:
+            Resposta do client.chat.completions.create
+        
+        Raises:
+            RuntimeError: Se a cota não liberar dentro de GROQ_ESPERA_MAXIMA,
+                o disjuntor estiver aberto ou o prazo acabar
+        """
+        imagens = imagem_preparada if isinstance(imagem_preparada, list) else [imagem_preparada]
+        estimado = len(prompt) // 4 + TOKENS_ESTIMADOS_IMAGEM * len(imagens) + max_tokens
+        
+        return self._chamar_estruturado(
+            estimado,
+            esquema,
+            model=modelo or self.model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt
+                        },
+                        *[
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": imagem.data_url()
+                                }
+                            }
+                            for imagem in imagens
+                        ]
+                    ]
+                }
+            ],
+            temperature=0.1,  # Baixa para respostas mais determinísticas
+            max_tokens=max_tokens
+        )
+    
+    def _chamar_texto(self, prompt: str, max_tokens: int = 500, esquema: Optional[dict] = None):
+        """
+        Envia um prompt só de texto ao modelo GROQ_MODEL_TEXTO (mais barato).
+        
+        Usa o mesmo limitador de cota, a mesma resiliência e a mesma saída
+        estruturada de _chamar_visao.
+        
+        Raises:
+            RuntimeError: Como em _chamar_visao
+        """
+        return self._chamar_estruturado(
+            len(prompt) // 4 + max_tokens,
+            esquema,
+            model=Config.GROQ_MODEL_TEXTO,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=max_tokens
+        )
+    
+    def _chamar_estruturado(self, estimado: int, esquema: Optional[dict], **parametros):
+        """
+        _chamar_api pedindo a resposta no esquema JSON (GROQ_SAIDA_ESTRUTURADA).
+        
+        Dois casos de 400 da API não viram erro para o usuário:
+            - json_validate_failed: o modelo respondeu, mas fora do esquema. A
+              geração vem no corpo do erro e segue para o parser tolerante, sem
+              pagar outra chamada
+            - response_format não suportado pelo modelo: repete sem o esquema
+              e não tenta mais com esse modelo neste processo
+        
+        Args:
+            estimado: Estimativa de tokens (como em _chamar_api)
+            esquema: ESQUEMA_DESPESA/ESQUEMA_RECEITA, ou None
+            **parametros: Repassados ao create (model, messages, ...)
+        
+        Returns:
+            Resposta do client.chat.completions.create (ou equivalente com a
+            geração recuperada do json_validate_failed)
+        """
+        modelo = parametros['model']
+        formato = formato_resposta(esquema) if esquema else None
+        if not formato or modelo in self._modelos_sem_esquema:
+            return self._chamar_api(estimado, **parametros)
+        
+        try:
+            return self._chamar_api(estimado, response_format=formato, **parametros)
+        except BadRequestError as e:
+            corpo = e.body.get('error', e.body) if isinstance(e.body, dict) else {}
+            
+            if corpo.get('code') == 'json_validate_failed' and corpo.get('failed_generation'):
+                logger.warning("Resposta fora do esquema rejeitada pela API; usando o parser tolerante")
+                mensagem = SimpleNamespace(content=corpo['failed_generation'])
+                return SimpleNamespace(choices=[SimpleNamespace(message=mensagem)], usage=None)
+            
+            if 'response_format' in str(e) or 'json_schema' in str(e):
+                logger.warning(f"Modelo {modelo} não aceita saída estruturada; seguindo só com o prompt")
+                self._modelos_sem_esquema.add(modelo)
+                return self._chamar_api(estimado, **parametros)
+            
+            raise
+    
+    def _chamar_api(self, estimado: int, **parametros):
+        """
+        client.chat.completions.create com cota, prazo, novas tentativas e disjuntor.
+        
+        Cada tentativa retira sua própria cota do limitador (uma nova tentativa
+        é outra requisição para a Groq) e recebe o timeout calculado por
+        chamar_com_resiliencia (utils/resiliencia.py).
+        
+        Com GROQ_HEDGE_ATIVO, a tentativa que passar do percentil de latência
+        do modelo ganha uma cópia (chamar_com_hedge), desde que o limitador
+        tenha pelo menos GROQ_HEDGE_FOLGA_MINIMA da cota livre.
+        
+        Args:
+            estimado: Estimativa de tokens da chamada (prompt + imagens + resposta)
+            **parametros: Repassados ao create (model, messages, ...)
+        
+        Returns:
+            Resposta do client.chat.completions.create
+        """
+        limitador = get_limitador_groq()
+        monitor = get_monitor_latencia()
+        modelo = parametros.get('model', self.model)
+        
+        def requisicao(timeout: float):
+            inicio = time.monotonic()
+            response = self.client.chat.completions.create(timeout=timeout, **parametros)
+            monitor.registrar(modelo, time.monotonic() - inicio)
+            
+            uso = getattr(response, 'usage', None)
+            limitador.ajustar(getattr(uso, 'total_tokens', None), estimado)
+            return response
+        
+        def pode_duplicar() -> bool:
+            # A cópia só sai com folga na cota, e já reserva a sua parte
+            return limitador.folga() >= Config.GROQ_HEDGE_FOLGA_MINIMA and limitador.tentar_adquirir(estimado) == 0
+        
+        def tentativa(timeout: float):
+            if not limitador.adquirir(estimado, timeout=Config.GROQ_ESPERA_MAXIMA):
+                # 'rate_limit' no texto gera a mensagem amigável de limite atingido
+                raise RuntimeError('rate_limit: cota de requisições/tokens da Groq esgotada')
+            
+            atraso = atraso_hedge(modelo)
+            if atraso is None or atraso >= timeout:
+                return requisicao(timeout)
+            return chamar_com_hedge(lambda: requisicao(timeout), atraso, pode_duplicar)
+        
+        return chamar_com_resiliencia(tentativa)
+    
     def _processar_resposta_receita(self, texto_resposta: str) -> dict:
         """
         Processa e valida a resposta da API Groq para comprovantes de receita.
+        
+        Como _processar_resposta: ESQUEMA_RECEITA primeiro, parser tolerante
+        como reserva.
         """
-        dados = extrair_json_de_texto(texto_resposta)
+        dados = ler_resposta_estruturada(texto_resposta, ESQUEMA_RECEITA)
+        if dados is None:
+            dados = extrair_json_de_texto(texto_resposta)
         
         if not dados:
             return {
@@ -380,7 +977,13 @@ class GroqService:
                 'erro': 'Não foi possível interpretar a resposta da IA.'
             }
         
-        if 'erro' in dados:
+        return self._normalizar_receita(dados)
+    
+    def _normalizar_receita(self, dados: dict) -> dict:
+        """
+        Normaliza os dados de uma receita (da IA ou das regras locais).
+        """
+        if dados.get('erro'):
             return {
                 'sucesso': False,
                 'erro': dados['erro']
@@ -397,6 +1000,7 @@ class GroqService:
             'valor': formatar_valor(dados.get('valor', 0)),
             'tipo_pagamento': tipo_pagamento
         }
+        self._copiar_confianca(dados, dados_normalizados)
         
         logger.info(
             f"Comprovante processado: {dados_normalizados['tipo_pagamento']} - "
@@ -408,6 +1012,21 @@ class GroqService:
             'dados': dados_normalizados
         }
     
+    def _copiar_confianca(self, dados: dict, dados_normalizados: dict) -> None:
+        """
+        Copia a autoavaliação do modelo (0 a 1) para os dados normalizados.
+        
+        Aceita também porcentagem (ex: 95); valor ausente ou inválido não é
+        copiado (as regras locais não informam confiança).
+        """
+        try:
+            confianca = float(dados['confianca'])
+        except (KeyError, TypeError, ValueError):
+            return
+        if 1 < confianca <= 100:
+            confianca /= 100
+        dados_normalizados['confianca'] = min(max(confianca, 0.0), 1.0)
+    
     def _normalizar_tipo_pagamento(self, tipo: str) -> str:
         """
         Normaliza o tipo de pagamento para um dos valores válidos.
@@ -429,44 +1048,82 @@ class GroqService:
         else:
             return 'Outros'
     
-    def _preparar_imagem(self, imagem_base64: str) -> Optional[str]:
+    def _preparar_imagem(self, imagem_base64) -> Optional[ArquivoUpload]:
         """
-        Remove prefixo data:image se existir e valida base64.
+        Decodifica a imagem (se ainda vier em base64), pré-processa e valida o tamanho.
+        
+        O pré-processamento (utils/imagem_ocr.py) reduz fotos grandes antes
+        da verificação de 4 MB, que só recusa o que continuar grande demais.
         
         Args:
-            imagem_base64: String base64 da imagem, possivelmente com prefixo
+            imagem_base64: ArquivoUpload, ou string base64 possivelmente com prefixo
         
         Returns:
-            str: String base64 limpa, ou None se inválida
+            ArquivoUpload: Imagem pronta para a API, ou None se inválida
         """
         if not imagem_base64:
             logger.warning("Imagem base64 vazia recebida")
             return None
         
         try:
-            # Remove prefixo data:image/xxx;base64, se existir
-            if 'base64,' in imagem_base64:
-                imagem_base64 = imagem_base64.split('base64,')[1]
-            
-            # Remove espaços e quebras de linha
-            imagem_base64 = imagem_base64.strip().replace('\n', '').replace('\r', '')
-            
-            # Valida se é base64 válido tentando decodificar
-            decoded = base64.b64decode(imagem_base64)
+            imagem = imagem_base64
+            if not isinstance(imagem, ArquivoUpload):
+                imagem = ArquivoUpload.de_base64(imagem_base64)
+            imagem = preprocessar_imagem(imagem)
             
             # Verifica tamanho (máximo ~4MB)
-            tamanho_mb = len(decoded) / (1024 * 1024)
+            tamanho_mb = imagem.tamanho / (1024 * 1024)
             if tamanho_mb > 4:
                 logger.warning(f"Imagem muito grande: {tamanho_mb:.2f}MB")
                 return None
             
             logger.debug(f"Imagem preparada: {tamanho_mb:.2f}MB")
-            return imagem_base64
+            return imagem
             
         except Exception as e:
             logger.error(f"Erro ao preparar imagem base64: {e}")
             return None
     
+    def _preparar_paginas(self, imagens) -> Optional[Union[ArquivoUpload, List[ArquivoUpload]]]:
+        """
+        Prepara uma imagem, ou cada página de um PDF multipágina.
+        
+        Args:
+            imagens: ArquivoUpload/base64, ou lista de ArquivoUpload (páginas)
+        
+        Returns:
+            ArquivoUpload ou lista de ArquivoUpload prontos para a API; None
+                se alguma página for inválida. Lista de uma página vira a imagem
+                sozinha (mesmo prompt e mesma chave de cache de antes)
+        """
+        if not isinstance(imagens, (list, tuple)):
+            return self._preparar_imagem(imagens)
+        
+        if len(imagens) > MAX_IMAGENS_POR_REQUISICAO:
+            logger.warning(f"{len(imagens)} páginas recebidas; enviando as {MAX_IMAGENS_POR_REQUISICAO} primeiras")
+        
+        preparadas = [self._preparar_imagem(imagem) for imagem in imagens[:MAX_IMAGENS_POR_REQUISICAO]]
+        if not preparadas or not all(preparadas):
+            return None
+        return preparadas[0] if len(preparadas) == 1 else preparadas
+    
+    def _prompt_paginas(self, prompt: str, imagem_preparada) -> str:
+        """Prompt com o aviso de PROMPT_PAGINAS quando há várias páginas."""
+        if isinstance(imagem_preparada, list):
+            return prompt + PROMPT_PAGINAS.format(quantidade=len(imagem_preparada))
+        return prompt
+    
+    def _hash_imagem(self, imagem_preparada: Union[ArquivoUpload, List[ArquivoUpload]]) -> str:
+        """SHA-256 dos bytes da imagem (chave do cache de OCR); das páginas em ordem, se várias."""
+        if isinstance(imagem_preparada, list):
+            hashes = ''.join(hash_arquivo(imagem.conteudo) for imagem in imagem_preparada)
+            return hashlib.sha256(hashes.encode('ascii')).hexdigest()
+        return hash_arquivo(imagem_preparada.conteudo)
+    
+    def _versao_prompt(self, prompt: str) -> str:
+        """Versão do prompt para o cache: VERSAO_PROMPT + hash do texto enviado."""
+        return f"v{VERSAO_PROMPT}-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]}"
+    
     def _construir_prompt(self, nome_arquivo: str = None) -> str:
         """
         Retorna o prompt do sistema para extração de dados.
@@ -496,14 +1153,20 @@ Por exemplo: se o nome contém "energia", classifique como "Energia"; se contém
         """
         Processa e valida a resposta da API Groq.
         
+        A resposta da saída estruturada é lida e validada contra
+        ESQUEMA_DESPESA; só se ela falhar (modelo sem suporte, geração fora
+        do esquema) entra o parser tolerante extrair_json_de_texto.
+        
         Args:
             texto_resposta: Texto retornado pela API
         
         Returns:
             dict: Resultado processado e validado
         """
-        # Tenta extrair JSON da resposta
-        dados = extrair_json_de_texto(texto_resposta)
+        dados = ler_resposta_estruturada(texto_resposta, ESQUEMA_DESPESA)
+        if dados is None:
+            # Reserva: JSON no meio de texto, bloco markdown, chaves soltas
+            dados = extrair_json_de_texto(texto_resposta)
         
         if not dados:
             logger.warning(f"Não foi possível extrair JSON da resposta: {texto_resposta}")
@@ -512,8 +1175,21 @@ Por exemplo: se o nome contém "energia", classifique como "Energia"; se contém
                 'erro': 'Não foi possível interpretar a resposta da IA.'
             }
         
-        # Verifica se a IA retornou erro (imagem ilegível, etc.)
-        if 'erro' in dados:
+        return self._normalizar_despesa(dados)
+    
+    def _normalizar_despesa(self, dados: dict) -> dict:
+        """
+        Valida e normaliza os dados de uma despesa (da IA ou das regras locais).
+        
+        Args:
+            dados: Campos extraídos ({'data', 'valor_total', ...} ou {'erro': ...})
+        
+        Returns:
+            dict: Resultado processado e validado
+        """
+        # Verifica se a IA retornou erro (imagem ilegível, etc.); no formato
+        # do esquema, 'erro': null significa que não houve erro
+        if dados.get('erro'):
             logger.info(f"IA retornou erro: {dados['erro']}")
             return {
                 'sucesso': False,
@@ -543,6 +1219,7 @@ Por exemplo: se o nome contém "energia", classifique como "Energia"; se contém
             'categoria': categoria_normalizada,
             'subcategoria': subcategoria_raw
         }
+        self._copiar_confianca(dados, dados_normalizados)
         
         logger.info(
             f"Nota processada com sucesso: {dados_normalizados['estabelecimento']} - "
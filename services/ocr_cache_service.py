@@ -0,0 +1,180 @@
+"""
+Serviço de cache dos resultados do OCR (ResultadoOCRCache).
+
+A equipe costuma reenviar o mesmo PDF ou foto; sem cache, cada envio é
+uma nova chamada paga ao modelo de visão. O GroqService consulta este
+cache antes de chamar a API, pela chave:
+
+    SHA-256 dos bytes do arquivo + modelo + versão do prompt
+
+O cache fica no banco principal, então vale para todos os workers e
+sobrevive a reinícios. Entradas expiram após OCR_CACHE_TTL_DIAS e, acima
+de OCR_CACHE_MAX_ITENS, as menos acessadas são descartadas. O admin pode
+esvaziar o cache pela tela de usuários (limpar_cache).
+
+Falhas do cache nunca impedem o OCR: viram um aviso no log e a extração
+segue pela API.
+
+Leituras e gravações usam uma conexão própria (db.engine.begin()), nunca a
+db.session de quem chama: o OCR roda no meio de uploads e do worker, e um
+commit ou rollback do cache levaria junto as alterações pendentes deles.
+"""
+
+# 1. Bibliotecas padrão
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+# 2. Bibliotecas externas
+from flask import has_app_context
+from sqlalchemy import delete, func, insert, select, update
+
+# 3. Imports locais
+from config import Config
+from models import db, ResultadoOCRCache
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+
+def hash_arquivo(conteudo: bytes) -> str:
+    """SHA-256 (hex) dos bytes decodificados do arquivo."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def _chave(hash_do_arquivo: str, modelo: str, versao_prompt: str) -> str:
+    """Chave única do resultado: arquivo + modelo + versão do prompt."""
+    return hashlib.sha256(f'{hash_do_arquivo}|{modelo}|{versao_prompt}'.encode('utf-8')).hexdigest()
+
+
+def _cache_disponivel() -> bool:
+    """True se o cache está ativo e há contexto da aplicação (sessão do banco)."""
+    return Config.OCR_CACHE_ATIVO and has_app_context()
+
+
+def buscar_resultado(hash_do_arquivo: str, modelo: str, versao_prompt: str) -> Optional[dict]:
+    """
+    Retorna o resultado guardado para o arquivo, se houver e não tiver expirado.
+    
+    Args:
+        hash_do_arquivo: hash_arquivo() dos bytes enviados à Groq
+        modelo: Modelo da Groq
+        versao_prompt: Versão do prompt (muda quando o prompt muda)
+    
+    Returns:
+        dict: Resultado da extração ({'sucesso': True, 'dados': {...}}), ou None
+    """
+    if not _cache_disponivel():
+        return None
+    
+    tabela = ResultadoOCRCache.__table__
+    chave = _chave(hash_do_arquivo, modelo, versao_prompt)
+    
+    try:
+        with db.engine.begin() as conexao:
+            entrada = conexao.execute(
+                select(tabela.c.resultado, tabela.c.created_at).where(tabela.c.chave == chave)
+            ).first()
+            if not entrada:
+                return None
+            
+            agora = datetime.utcnow()
+            if entrada.created_at < agora - timedelta(days=Config.OCR_CACHE_TTL_DIAS):
+                conexao.execute(delete(tabela).where(tabela.c.chave == chave))
+                return None
+            
+            resultado = json.loads(entrada.resultado)
+            conexao.execute(
+                update(tabela).where(tabela.c.chave == chave)
+                .values(acertos=tabela.c.acertos + 1, acessado_em=agora)
+            )
+        
+        logger.info(f"OCR em cache reaproveitado (arquivo {hash_do_arquivo[:12]})")
+        return resultado
+    
+    except Exception as e:
+        logger.warning(f"Falha ao ler cache de OCR: {e}")
+        return None
+
+
+def gravar_resultado(hash_do_arquivo: str, modelo: str, versao_prompt: str, resultado: dict) -> None:
+    """
+    Guarda o resultado de uma extração bem-sucedida e aplica TTL e limite.
+    
+    Args:
+        hash_do_arquivo: hash_arquivo() dos bytes enviados à Groq
+        modelo: Modelo da Groq
+        versao_prompt: Versão do prompt usado
+        resultado: Retorno da extração (só resultados com sucesso são guardados)
+    """
+    if not _cache_disponivel() or not resultado.get('sucesso'):
+        return
+    
+    tabela = ResultadoOCRCache.__table__
+    chave = _chave(hash_do_arquivo, modelo, versao_prompt)
+    agora = datetime.utcnow()
+    
+    try:
+        with db.engine.begin() as conexao:
+            conexao.execute(delete(tabela).where(tabela.c.chave == chave))
+            conexao.execute(insert(tabela).values(
+                chave=chave,
+                hash_arquivo=hash_do_arquivo,
+                modelo=modelo,
+                versao_prompt=versao_prompt,
+                resultado=json.dumps(resultado, ensure_ascii=False, default=str),
+                acertos=0,
+                created_at=agora,
+                acessado_em=agora
+            ))
+            _aplicar_limites(conexao)
+    
+    except Exception as e:
+        logger.warning(f"Falha ao gravar cache de OCR: {e}")
+
+
+def _aplicar_limites(conexao) -> None:
+    """
+    Remove entradas expiradas e as menos acessadas acima de OCR_CACHE_MAX_ITENS.
+    
+    Args:
+        conexao: Conexão aberta por gravar_resultado (mesma transação da gravação)
+    """
+    tabela = ResultadoOCRCache.__table__
+    limite_ttl = datetime.utcnow() - timedelta(days=Config.OCR_CACHE_TTL_DIAS)
+    conexao.execute(delete(tabela).where(tabela.c.created_at < limite_ttl))
+    
+    mantidas = select(tabela.c.chave).order_by(
+        tabela.c.acessado_em.desc()
+    ).limit(Config.OCR_CACHE_MAX_ITENS)
+    conexao.execute(delete(tabela).where(tabela.c.chave.not_in(mantidas)))
+
+
+def limpar_cache() -> int:
+    """
+    Remove todas as entradas do cache de OCR.
+    
+    Returns:
+        int: Quantidade de entradas removidas
+    """
+    removidas = ResultadoOCRCache.query.delete(synchronize_session=False)
+    db.session.commit()
+    
+    logger.info(f"Cache de OCR limpo: {removidas} entradas removidas")
+    return removidas
+
+
+def estatisticas_cache() -> dict:
+    """
+    Tamanho e aproveitamento do cache de OCR (exibidos na área de admin).
+    
+    Returns:
+        dict: {'itens': n, 'acertos': n}
+    """
+    itens, acertos = db.session.query(
+        func.count(ResultadoOCRCache.chave),
+        func.coalesce(func.sum(ResultadoOCRCache.acertos), 0)
+    ).one()
+    return {'itens': itens, 'acertos': acertos}
@@ -0,0 +1,680 @@
+"""
+Serviço da fila de OCR assíncrona (JobOCR / ArquivoJobOCR).
+
+Os uploads gravam os arquivos no disco, criam um job no SQLite (sem broker
+externo) e respondem na hora com o id do job. O worker
+(scripts/worker_ocr.py) pega os arquivos pendentes, chama a Groq e grava o
+resultado; o cliente acompanha o andamento em /upload-jobs/<id> ou recebe
+cada arquivo assim que ele fica pronto pelo stream SSE /upload-jobs/<id>/eventos
+(eventos_job), em conexões curtas retomadas pelo Last-Event-ID.
+
+Vários processos worker podem rodar ao mesmo tempo: cada arquivo é
+reivindicado com um único UPDATE ... RETURNING, e o SQLite serializa as
+escritas, então um arquivo nunca é processado por dois workers. Imagens
+pequenas do mesmo job são reivindicadas juntas (reivindicar_lote) e vão
+numa única requisição, como no upload em massa síncrono.
+"""
+
+# 1. Bibliotecas padrão
+import json
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+# 2. Bibliotecas externas
+from sqlalchemy import select, update
+
+# 3. Imports locais
+from config import Config
+from models import db, JobOCR, ArquivoJobOCR, StatusWorkerOCR
+from utils.arquivo_upload import ArquivoUpload, decodificar_item, nome_do_item
+from utils.file_handler import salvar_upload
+from utils.pdf_converter import renderizar_paginas_pdf
+from utils.resiliencia import get_disjuntor_groq, get_monitor_latencia
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Arquivo em andamento há mais tempo que isso é considerado abandonado
+# (worker encerrado no meio) e volta para a fila
+MINUTOS_TRAVADO = 10
+MAX_TENTATIVAS = 3
+
+# Stream de eventos (SSE): intervalo entre consultas ao banco e comentário
+# de keepalive para proxies não derrubarem a conexão ociosa. A duração de
+# cada conexão vem de Config.SSE_DURACAO_MAXIMA (o EventSource reconecta)
+SSE_INTERVALO = 0.5
+SSE_KEEPALIVE = 15
+
+# Status do worker para GET /api/ocr/status: publicado a cada arquivo
+# concluído e, com a fila vazia, a cada STATUS_HEARTBEAT segundos. Sem
+# publicar há STATUS_VALIDADE segundos, o worker é considerado parado;
+# depois de um dia a linha é removida
+STATUS_HEARTBEAT = 60
+STATUS_VALIDADE = 300
+STATUS_RETENCAO = timedelta(days=1)
+
+# Código de uma letra por status no id dos eventos (Last-Event-ID)
+_CODIGOS_STATUS = {
+    ArquivoJobOCR.STATUS_PENDENTE: 'P',
+    ArquivoJobOCR.STATUS_PROCESSANDO: 'R',
+    ArquivoJobOCR.STATUS_CONVERTENDO: 'C',
+    ArquivoJobOCR.STATUS_EXTRAINDO: 'X',
+    ArquivoJobOCR.STATUS_SUCESSO: 'S',
+    ArquivoJobOCR.STATUS_ERRO: 'E',
+}
+_STATUS_POR_CODIGO = {codigo: status for status, codigo in _CODIGOS_STATUS.items()}
+
+
+def _observacao(nome_arquivo: str) -> str:
+    """Observação da transação derivada do nome do arquivo ('nota_gelo.pdf' → 'nota gelo')."""
+    observacao = nome_arquivo.rsplit('.', 1)[0] if '.' in nome_arquivo else nome_arquivo
+    return observacao.replace('_', ' ').replace('-', ' ')
+
+
+def extrair_dados_nota(
+    upload: ArquivoUpload,
+    service,
+    ao_mudar_etapa: Optional[Callable[[str], None]] = None
+) -> dict:
+    """
+    Executa o OCR de uma nota: PDF → imagem, chamada à Groq e observação.
+    
+    PDFs digitais são lidos primeiro pela camada de texto
+    (GroqService.processar_pdf_texto); só os que não têm texto aproveitável
+    são renderizados e enviados ao modelo de visão, com todas as páginas
+    (até OCR_PDF_MAX_PAGINAS) numa única requisição.
+    
+    Usada pelo upload síncrono e pelo worker da fila.
+    
+    Args:
+        upload: Arquivo já decodificado (o nome original ajuda na categorização)
+        service: Instância de GroqService
+        ao_mudar_etapa: Chamada com STATUS_CONVERTENDO / STATUS_EXTRAINDO
+            no início de cada etapa (o worker grava no banco)
+    
+    Returns:
+        dict: {'sucesso': True, 'dados': {...}} ou {'sucesso': False, 'erro': '...'}
+    """
+    resultado = service.processar_pdf_texto(upload, upload.nome_arquivo) if upload.eh_pdf else None
+    
+    if resultado is None:
+        imagem_para_ocr = upload
+        if upload.eh_pdf:
+            if ao_mudar_etapa:
+                ao_mudar_etapa(ArquivoJobOCR.STATUS_CONVERTENDO)
+            # Todas as páginas (até OCR_PDF_MAX_PAGINAS) vão na mesma requisição
+            paginas = renderizar_paginas_pdf(upload.conteudo)
+            if not paginas:
+                return {'sucesso': False, 'erro': 'Não foi possível processar o PDF'}
+            imagem_para_ocr = [ArquivoUpload(pagina, upload.nome_arquivo) for pagina in paginas]
+        
+        if ao_mudar_etapa:
+            ao_mudar_etapa(ArquivoJobOCR.STATUS_EXTRAINDO)
+        resultado = service.processar_nota(imagem_para_ocr, upload.nome_arquivo)
+    
+    return _finalizar_resultado(upload, resultado)
+
+
+def _finalizar_resultado(upload: ArquivoUpload, resultado: dict) -> dict:
+    """Resultado do GroqService no formato do upload, com a observação pelo nome."""
+    if not resultado['sucesso']:
+        return {'sucesso': False, 'erro': resultado.get('erro', 'Erro ao processar')}
+    
+    dados = resultado['dados']
+    if upload.nome_arquivo:
+        dados['observacao'] = _observacao(upload.nome_arquivo)
+    
+    return {'sucesso': True, 'dados': dados}
+
+
+def agrupar_lotes(uploads: List[Optional[ArquivoUpload]]) -> List[List[int]]:
+    """
+    Agrupa os arquivos de um upload em massa para o OCR.
+    
+    Imagens de até OCR_LOTE_TAMANHO_MAXIMO_KB formam lotes de até
+    OCR_LOTE_MAX_IMAGENS (uma requisição por lote, em vez de uma por
+    arquivo, sob a mesma cota de RPM); PDFs e imagens grandes ficam sozinhos.
+    
+    Args:
+        uploads: Arquivos decodificados, na ordem do upload (None = já deu erro)
+    
+    Returns:
+        list: Índices de cada grupo (lote ou arquivo sozinho), sem os None
+    """
+    pequenas, grupos = [], []
+    for indice, upload in enumerate(uploads):
+        if upload is None:
+            continue
+        if Config.OCR_LOTE_ATIVO and not upload.eh_pdf and upload.tamanho <= Config.OCR_LOTE_TAMANHO_MAXIMO_KB * 1024:
+            pequenas.append(indice)
+        else:
+            grupos.append([indice])
+    
+    tamanho = max(1, Config.OCR_LOTE_MAX_IMAGENS)
+    return [pequenas[inicio:inicio + tamanho] for inicio in range(0, len(pequenas), tamanho)] + grupos
+
+
+def extrair_dados_lote(uploads: List[ArquivoUpload], service) -> List[dict]:
+    """
+    OCR de um grupo de agrupar_lotes: arquivo sozinho ou lote de imagens.
+    
+    Um arquivo segue por extrair_dados_nota; várias imagens vão numa única
+    requisição (GroqService.processar_notas_lote, que volta para a chamada
+    por imagem quando a resposta do lote não serve).
+    
+    Args:
+        uploads: Arquivos do grupo, já decodificados
+        service: Instância de GroqService
+    
+    Returns:
+        list: Um resultado no formato de extrair_dados_nota por arquivo, na mesma ordem
+    """
+    if len(uploads) == 1:
+        return [extrair_dados_nota(uploads[0], service)]
+    
+    resultados = service.processar_notas_lote(uploads)
+    return [_finalizar_resultado(upload, resultado) for upload, resultado in zip(uploads, resultados)]
+
+
+def enfileirar_arquivos(arquivos: list, origem: str = 'nota') -> JobOCR:
+    """
+    Salva os arquivos no disco e cria o job com um item por arquivo.
+    
+    Arquivos vazios ou que não puderam ser salvos já entram como ERRO,
+    para que o resultado do job mantenha a posição de cada arquivo.
+    
+    Args:
+        arquivos: [{"imagem": "...", "nome_arquivo": "...", "tipo_arquivo": "..."}, ...]
+            (JSON) ou ArquivoUpload já lidos do multipart
+        origem: 'nota' ou 'massa'
+    
+    Returns:
+        JobOCR: Job criado (já confirmado no banco)
+    """
+    job = JobOCR(origem=origem)
+    
+    for indice, arquivo in enumerate(arquivos):
+        item = ArquivoJobOCR(
+            indice=indice,
+            nome_arquivo=nome_do_item(arquivo, f'arquivo_{indice+1}')[:255],
+            tipo_arquivo='imagem'
+        )
+        
+        try:
+            upload = decodificar_item(arquivo, item.nome_arquivo)
+            item.tipo_arquivo = upload.tipo_arquivo
+            item.comprovante_url = salvar_upload(upload)
+        except ValueError as e:
+            item.status = ArquivoJobOCR.STATUS_ERRO
+            item.erro = str(e)[:300]
+            item.concluido_em = datetime.utcnow()
+        
+        job.arquivos.append(item)
+    
+    db.session.add(job)
+    db.session.commit()
+    
+    logger.info(f"Job OCR {job.id} criado ({origem}): {len(job.arquivos)} arquivos")
+    return job
+
+
+def obter_job(job_id: str) -> Optional[dict]:
+    """
+    Retorna o andamento e os resultados de um job.
+    
+    Args:
+        job_id: Id devolvido pelo upload
+    
+    Returns:
+        dict: JobOCR.to_dict(), ou None se o job não existe
+    """
+    job = db.session.get(JobOCR, job_id)
+    return job.to_dict() if job else None
+
+
+def reivindicar_proximo() -> Optional[int]:
+    """
+    Marca o próximo arquivo pendente como PROCESSANDO e retorna seu id.
+    
+    Returns:
+        int: Id do ArquivoJobOCR reivindicado, ou None se a fila está vazia
+    """
+    proximo = select(ArquivoJobOCR.id).where(
+        ArquivoJobOCR.status == ArquivoJobOCR.STATUS_PENDENTE
+    ).order_by(ArquivoJobOCR.id).limit(1).scalar_subquery()
+    
+    arquivo_id = db.session.execute(
+        update(ArquivoJobOCR.__table__)
+        .where(ArquivoJobOCR.__table__.c.id == proximo)
+        .values(
+            status=ArquivoJobOCR.STATUS_PROCESSANDO,
+            tentativas=ArquivoJobOCR.__table__.c.tentativas + 1,
+            iniciado_em=datetime.utcnow()
+        )
+        .returning(ArquivoJobOCR.__table__.c.id)
+    ).scalar()
+    db.session.commit()
+    
+    return arquivo_id
+
+
+def _cabe_no_lote(arquivo: ArquivoJobOCR) -> bool:
+    """True se o arquivo salvo é uma imagem pequena o bastante para um lote (ver agrupar_lotes)."""
+    if arquivo.tipo_arquivo != 'imagem' or not arquivo.comprovante_url:
+        return False
+    try:
+        return _caminho_arquivo_salvo(arquivo).stat().st_size <= Config.OCR_LOTE_TAMANHO_MAXIMO_KB * 1024
+    except OSError:
+        return False
+
+
+def reivindicar_lote(arquivo_id: int) -> List[int]:
+    """
+    Junta ao arquivo reivindicado outras imagens pequenas pendentes do mesmo job.
+    
+    Com OCR_LOTE_ATIVO, uma imagem pequena leva consigo até
+    OCR_LOTE_MAX_IMAGENS - 1 companheiras, reivindicadas num único
+    UPDATE ... RETURNING (só as que ainda estão pendentes).
+    
+    Args:
+        arquivo_id: Id retornado por reivindicar_proximo()
+    
+    Returns:
+        list: Ids do lote na ordem do upload (só [arquivo_id] se não há lote)
+    """
+    arquivo = db.session.get(ArquivoJobOCR, arquivo_id)
+    if not (Config.OCR_LOTE_ATIVO and Config.OCR_LOTE_MAX_IMAGENS > 1 and arquivo and _cabe_no_lote(arquivo)):
+        return [arquivo_id]
+    
+    pendentes = ArquivoJobOCR.query.filter(
+        ArquivoJobOCR.job_id == arquivo.job_id,
+        ArquivoJobOCR.status == ArquivoJobOCR.STATUS_PENDENTE,
+        ArquivoJobOCR.tipo_arquivo == 'imagem'
+    ).order_by(ArquivoJobOCR.indice).all()
+    candidatos = [a.id for a in pendentes if _cabe_no_lote(a)][:Config.OCR_LOTE_MAX_IMAGENS - 1]
+    if not candidatos:
+        return [arquivo_id]
+    
+    tabela = ArquivoJobOCR.__table__
+    companheiros = db.session.execute(
+        update(tabela)
+        .where(tabela.c.id.in_(candidatos), tabela.c.status == ArquivoJobOCR.STATUS_PENDENTE)
+        .values(
+            status=ArquivoJobOCR.STATUS_PROCESSANDO,
+            tentativas=tabela.c.tentativas + 1,
+            iniciado_em=datetime.utcnow()
+        )
+        .returning(tabela.c.id)
+    ).scalars().all()
+    db.session.commit()
+    
+    lote = ArquivoJobOCR.query.filter(ArquivoJobOCR.id.in_([arquivo_id, *companheiros]))
+    return [a.id for a in lote.order_by(ArquivoJobOCR.indice)]
+
+
+def recuperar_travados(minutos: int = MINUTOS_TRAVADO) -> int:
+    """
+    Devolve à fila arquivos abandonados por um worker que parou no meio.
+    
+    Depois de MAX_TENTATIVAS o arquivo é marcado como ERRO.
+    
+    Args:
+        minutos: Tempo em andamento a partir do qual o arquivo é abandonado
+    
+    Returns:
+        int: Quantidade de arquivos recuperados
+    """
+    limite = datetime.utcnow() - timedelta(minutes=minutos)
+    travados = ArquivoJobOCR.query.filter(
+        ArquivoJobOCR.status.in_(ArquivoJobOCR.STATUS_EM_ANDAMENTO),
+        ArquivoJobOCR.iniciado_em < limite
+    ).all()
+    
+    for arquivo in travados:
+        if arquivo.tentativas >= MAX_TENTATIVAS:
+            arquivo.status = ArquivoJobOCR.STATUS_ERRO
+            arquivo.erro = 'Processamento interrompido. Envie o arquivo novamente.'
+            arquivo.concluido_em = datetime.utcnow()
+        else:
+            arquivo.status = ArquivoJobOCR.STATUS_PENDENTE
+    
+    if travados:
+        db.session.commit()
+        logger.warning(f"{len(travados)} arquivos da fila de OCR recuperados")
+    
+    return len(travados)
+
+
+def codificar_enviados(enviados: dict) -> str:
+    """
+    Id SSE com o status já enviado de cada arquivo (uma letra por índice).
+    
+    Args:
+        enviados: {indice: status} mantido por eventos_job
+    
+    Returns:
+        str: Ex. 'SXP' (arquivo 0 concluído, 1 extraindo, 2 pendente); '-' = não enviado
+    """
+    if not enviados:
+        return ''
+    return ''.join(_CODIGOS_STATUS.get(enviados.get(indice), '-') for indice in range(max(enviados) + 1))
+
+
+def decodificar_enviados(ultimo_id: Optional[str]) -> dict:
+    """
+    Inverso de codificar_enviados, para retomar o stream pelo Last-Event-ID.
+    
+    Args:
+        ultimo_id: Cabeçalho Last-Event-ID da reconexão (ou None)
+    
+    Returns:
+        dict: {indice: status}; letras desconhecidas são ignoradas
+    """
+    return {
+        indice: _STATUS_POR_CODIGO[codigo]
+        for indice, codigo in enumerate((ultimo_id or '')[:1000])
+        if codigo in _STATUS_POR_CODIGO
+    }
+
+
+def eventos_job(
+    job_id: str,
+    intervalo: float = SSE_INTERVALO,
+    keepalive: float = SSE_KEEPALIVE,
+    duracao_maxima: Optional[float] = None,
+    enviados: Optional[dict] = None
+) -> Iterator[tuple]:
+    """
+    Acompanha um job e gera um evento a cada mudança de etapa de um arquivo.
+    
+    Consulta o banco a cada `intervalo` segundos (o worker roda em outro
+    processo) e só emite os arquivos cujo status mudou em relação a
+    `enviados`. Sem `enviados` a primeira consulta emite todos; numa
+    reconexão, o estado lido do Last-Event-ID (decodificar_enviados) evita
+    reenviar o que o navegador já recebeu.
+    
+    Args:
+        job_id: Id devolvido pelo upload
+        intervalo: Segundos entre consultas
+        keepalive: Segundos sem eventos até emitir um ('ping', None)
+        duracao_maxima: Segundos até encerrar o stream sem 'fim'
+            (default: Config.SSE_DURACAO_MAXIMA)
+        enviados: {indice: status} já enviados; atualizado a cada evento 'arquivo'
+    
+    Yields:
+        tuple: ('arquivo', {indice, status, sucesso, dados, ...}),
+               ('ping', None) ou, por último, ('fim', {job_id, status, total, concluidos})
+    """
+    if duracao_maxima is None:
+        duracao_maxima = Config.SSE_DURACAO_MAXIMA
+    enviados = {} if enviados is None else enviados
+    inicio = ultimo_evento = time.monotonic()
+    
+    while time.monotonic() - inicio < duracao_maxima:
+        # Encerra a transação de leitura anterior para enxergar o que o worker gravou
+        db.session.rollback()
+        arquivos = ArquivoJobOCR.query.filter_by(job_id=job_id).order_by(ArquivoJobOCR.indice).all()
+        if not arquivos:
+            return
+        
+        # Estado lido antes de qualquer yield: o 'fim' nunca chega antes do último arquivo
+        estado = [{'indice': a.indice, **a.to_dict()} for a in arquivos]
+        concluidos = sum(1 for a in arquivos if a.finalizado)
+        
+        for item in estado:
+            if enviados.get(item['indice']) != item['status']:
+                enviados[item['indice']] = item['status']
+                ultimo_evento = time.monotonic()
+                yield 'arquivo', item
+        
+        if concluidos == len(arquivos):
+            yield 'fim', {
+                'job_id': job_id,
+                'status': 'CONCLUIDO',
+                'total': len(arquivos),
+                'concluidos': concluidos
+            }
+            return
+        
+        if time.monotonic() - ultimo_evento >= keepalive:
+            ultimo_evento = time.monotonic()
+            yield 'ping', None
+        
+        time.sleep(intervalo)
+
+
+def _caminho_arquivo_salvo(arquivo: ArquivoJobOCR) -> Path:
+    """Caminho do arquivo em UPLOAD_FOLDER a partir da URL gravada."""
+    # Só o nome do arquivo é usado: a URL nunca aponta para fora da pasta de uploads
+    return Path(Config.UPLOAD_FOLDER) / Path(arquivo.comprovante_url).name
+
+
+def _ler_arquivo_salvo(arquivo: ArquivoJobOCR) -> ArquivoUpload:
+    """Lê o arquivo salvo em UPLOAD_FOLDER (bytes, sem passar por base64)."""
+    return ArquivoUpload.de_arquivo(_caminho_arquivo_salvo(arquivo), arquivo.nome_arquivo)
+
+
+def _gravar_resultado(arquivo: ArquivoJobOCR, resultado: dict) -> None:
+    """Grava o resultado de extrair_dados_nota no arquivo (sem commit)."""
+    if resultado['sucesso']:
+        arquivo.status = ArquivoJobOCR.STATUS_SUCESSO
+        arquivo.resultado = json.dumps(resultado['dados'], ensure_ascii=False)
+    else:
+        arquivo.status = ArquivoJobOCR.STATUS_ERRO
+        arquivo.erro = str(resultado['erro'])[:300]
+    
+    arquivo.concluido_em = datetime.utcnow()
+
+
+def processar_arquivo(arquivo_id: int, service) -> None:
+    """
+    Executa o OCR de um arquivo reivindicado e grava o resultado.
+    
+    Args:
+        arquivo_id: Id retornado por reivindicar_proximo()
+        service: Instância de GroqService
+    """
+    arquivo = db.session.get(ArquivoJobOCR, arquivo_id)
+    if not arquivo:
+        return
+    
+    def mudar_etapa(etapa: str) -> None:
+        # Confirma cada etapa para que o stream de eventos a enxergue
+        arquivo.status = etapa
+        db.session.commit()
+    
+    try:
+        resultado = extrair_dados_nota(_ler_arquivo_salvo(arquivo), service, ao_mudar_etapa=mudar_etapa)
+    except Exception as e:
+        logger.error(f"Erro ao processar arquivo {arquivo_id} da fila de OCR: {e}")
+        resultado = {'sucesso': False, 'erro': f'Erro interno: {str(e)[:50]}'}
+    
+    _gravar_resultado(arquivo, resultado)
+    db.session.commit()
+    
+    logger.info(f"Arquivo {arquivo_id} do job {arquivo.job_id}: {arquivo.status}")
+
+
+def processar_lote_arquivos(arquivo_ids: List[int], service) -> None:
+    """
+    Executa o OCR de um lote de imagens (reivindicar_lote) numa requisição.
+    
+    Usa extrair_dados_lote, o mesmo caminho do upload em massa síncrono, e
+    grava o resultado de cada imagem no seu ArquivoJobOCR. Um arquivo que
+    não pode ser lido do disco vira ERRO sem derrubar o resto do lote.
+    
+    Args:
+        arquivo_ids: Ids retornados por reivindicar_lote()
+        service: Instância de GroqService
+    """
+    arquivos, uploads = [], []
+    for arquivo_id in arquivo_ids:
+        arquivo = db.session.get(ArquivoJobOCR, arquivo_id)
+        if not arquivo:
+            continue
+        try:
+            uploads.append(_ler_arquivo_salvo(arquivo))
+            arquivos.append(arquivo)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao ler arquivo {arquivo_id} da fila de OCR: {e}")
+            _gravar_resultado(arquivo, {'sucesso': False, 'erro': 'Arquivo não encontrado. Envie novamente.'})
+    
+    # Confirma a etapa de todos para que o stream de eventos a enxergue
+    for arquivo in arquivos:
+        arquivo.status = ArquivoJobOCR.STATUS_EXTRAINDO
+    db.session.commit()
+    
+    if not arquivos:
+        return
+    
+    try:
+        resultados = extrair_dados_lote(uploads, service)
+    except Exception as e:
+        logger.error(f"Erro ao processar lote {arquivo_ids} da fila de OCR: {e}")
+        resultados = [{'sucesso': False, 'erro': f'Erro interno: {str(e)[:50]}'}] * len(arquivos)
+    
+    for arquivo, resultado in zip(arquivos, resultados):
+        _gravar_resultado(arquivo, resultado)
+    db.session.commit()
+    
+    logger.info(
+        f"Lote de {len(arquivos)} arquivos do job {arquivos[0].job_id}: "
+        f"{sum(1 for a in arquivos if a.status == ArquivoJobOCR.STATUS_SUCESSO)} com sucesso"
+    )
+
+
+def _id_worker() -> str:
+    """Identificação deste processo worker ('host:pid')."""
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def publicar_status_worker(service) -> None:
+    """
+    Grava o disjuntor, as latências e o roteamento deste processo no banco.
+    
+    Uma falha só é registrada no log: o status é informativo e não deve
+    interromper o worker.
+    
+    Args:
+        service: GroqService usado pelo worker
+    """
+    try:
+        dados = json.dumps({
+            'disjuntor': get_disjuntor_groq().estado(),
+            'latencia': get_monitor_latencia().resumo(),
+            'roteamento': service.estatisticas_roteamento()
+        }, ensure_ascii=False)
+        agora = datetime.utcnow()
+        
+        db.session.merge(StatusWorkerOCR(id=_id_worker(), dados=dados, atualizado_em=agora))
+        StatusWorkerOCR.query.filter(StatusWorkerOCR.atualizado_em < agora - STATUS_RETENCAO).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Falha ao publicar o status do worker de OCR: {e}")
+
+
+def obter_status_workers(validade: int = STATUS_VALIDADE) -> List[dict]:
+    """
+    Snapshots dos workers que publicaram há menos de `validade` segundos.
+    
+    Args:
+        validade: Segundos sem publicar a partir dos quais o worker é ignorado
+    
+    Returns:
+        list: StatusWorkerOCR.to_dict() do mais recente para o mais antigo
+    """
+    limite = datetime.utcnow() - timedelta(seconds=validade)
+    return [
+        status.to_dict()
+        for status in StatusWorkerOCR.query.filter(StatusWorkerOCR.atualizado_em >= limite)
+        .order_by(StatusWorkerOCR.atualizado_em.desc())
+    ]
+
+
+def _processar_em_contexto(app, arquivo_ids: List[int], service) -> None:
+    """Executa o arquivo ou lote numa thread do worker (contexto e sessão próprios)."""
+    with app.app_context():
+        if len(arquivo_ids) == 1:
+            processar_arquivo(arquivo_ids[0], service)
+        else:
+            processar_lote_arquivos(arquivo_ids, service)
+
+
+def executar_worker(
+    app,
+    service=None,
+    paralelo: Optional[int] = None,
+    intervalo: float = 1.0,
+    uma_vez: bool = False
+) -> int:
+    """
+    Laço do worker: reivindica arquivos pendentes e os processa em paralelo.
+    
+    Mantém até `paralelo` tarefas em andamento, cada uma um arquivo ou um
+    lote de imagens pequenas do mesmo job (reivindicar_lote); o limitador
+    da Groq (utils/limitador.py) controla o ritmo das chamadas à API. O
+    estado das chamadas vai para o banco (publicar_status_worker) a cada
+    tarefa concluída e a cada STATUS_HEARTBEAT segundos de fila vazia.
+    
+    Args:
+        app: Aplicação Flask (cada thread abre o próprio app_context)
+        service: GroqService (default: get_groq_service())
+        paralelo: Arquivos simultâneos (default: Config.UPLOAD_MAX_PARALELO)
+        intervalo: Segundos entre consultas à fila quando ela está vazia
+        uma_vez: Se True, esvazia a fila e retorna (útil em testes e cron)
+    
+    Returns:
+        int: Quantidade de arquivos processados
+    """
+    if service is None:
+        from services.groq_service import get_groq_service
+        service = get_groq_service()
+    
+    paralelo = paralelo or Config.UPLOAD_MAX_PARALELO
+    processados = 0
+    
+    with app.app_context():
+        recuperar_travados()
+        publicar_status_worker(service)
+    ultima_publicacao = time.monotonic()
+    
+    with ThreadPoolExecutor(max_workers=paralelo) as executor:
+        em_andamento = set()
+        
+        while True:
+            while len(em_andamento) < paralelo:
+                with app.app_context():
+                    arquivo_id = reivindicar_proximo()
+                    arquivo_ids = reivindicar_lote(arquivo_id) if arquivo_id is not None else None
+                if not arquivo_ids:
+                    break
+                em_andamento.add(executor.submit(_processar_em_contexto, app, arquivo_ids, service))
+                processados += len(arquivo_ids)
+            
+            if em_andamento:
+                concluidos, em_andamento = wait(em_andamento, timeout=intervalo, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    if futuro.exception():
+                        logger.error(f"Erro no worker de OCR: {futuro.exception()}")
+                if concluidos:
+                    with app.app_context():
+                        publicar_status_worker(service)
+                    ultima_publicacao = time.monotonic()
+            elif uma_vez:
+                break
+            else:
+                time.sleep(intervalo)
+                with app.app_context():
+                    recuperar_travados()
+                    if time.monotonic() - ultima_publicacao >= STATUS_HEARTBEAT:
+                        publicar_status_worker(service)
+                        ultima_publicacao = time.monotonic()
+    
+    return processados
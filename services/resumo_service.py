@@ -0,0 +1,75 @@
+"""
+Serviço de manutenção da tabela de rollup (ResumoTransacao).
+
+A manutenção incremental fica nos triggers de models.SQL_RESUMOS: cada
+INSERT, UPDATE ou DELETE em transacoes aplica um UPSERT nas linhas de
+dia, mês e ano afetadas, na mesma transação do banco. Como os triggers
+rodam no SQLite, valem também para query.delete(), query.update() e SQL
+direto, que não passam pelos eventos da sessão do ORM.
+
+Para bancos que já tinham dados, reconstruir_resumos() recalcula tudo
+a partir da tabela transacoes (scripts/reconstruir_resumos.py).
+"""
+
+# 1. Bibliotecas padrão
+import logging
+
+# 2. Bibliotecas externas
+from sqlalchemy import func, literal, text
+
+# 3. Imports locais
+from models import db, Transacao, ResumoTransacao
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+def reconstruir_resumos() -> int:
+    """
+    Recalcula toda a tabela de rollup a partir da tabela transacoes.
+    
+    Útil para bancos criados antes do rollup (ou dos triggers) e para
+    corrigir o rollup após uma restauração. Deve ser chamada dentro de um
+    app_context.
+    
+    Returns:
+        int: Quantidade de linhas de resumo geradas
+    """
+    tabela = ResumoTransacao.__table__
+    
+    try:
+        db.session.execute(tabela.delete())
+        
+        for granularidade, formato in ResumoTransacao.FORMATOS_PERIODO.items():
+            periodo = func.strftime(formato, Transacao.data)
+            status = func.coalesce(Transacao.status, '')
+            subcategoria = func.coalesce(Transacao.subcategoria, '')
+            
+            selecao = db.select(
+                literal(granularidade),
+                periodo,
+                Transacao.tipo,
+                status,
+                Transacao.categoria,
+                subcategoria,
+                func.sum(Transacao.valor_centavos),
+                func.count(Transacao.id)
+            ).group_by(periodo, Transacao.tipo, status, Transacao.categoria, subcategoria)
+            
+            db.session.execute(tabela.insert().from_select(
+                ['granularidade', 'periodo', 'tipo', 'status', 'categoria',
+                 'subcategoria', 'total_centavos', 'quantidade'],
+                selecao
+            ))
+        
+        # O rollup mudou por fora dos triggers: invalida o cache entre requisições
+        db.session.execute(text("UPDATE versao_dados SET versao = versao + 1 WHERE id = 1"))
+        db.session.commit()
+        
+        total_linhas = db.session.query(func.count(ResumoTransacao.id)).scalar()
+        logger.info(f"Rollup reconstruído: {total_linhas} linhas")
+        return total_linhas
+    
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erro ao reconstruir rollup: {e}")
+        raise
@@ -37,6 +37,84 @@ function csrfFetch(url, options = {}) {
     return fetch(url, options);
 }
 
+// =========================================
+// Fila de OCR (uploads assíncronos)
+// =========================================
+
+/**
+ * Aguarda um job de OCR terminar, consultando o andamento periodicamente
+ * @param {object} resposta - Resposta do upload ({job_id, status_url})
+ * @param {function} onProgresso - Callback opcional (concluidos, total)
+ * @returns {Promise<object>} Job concluído ({status, resultados: [...]})
+ */
+async function aguardarJobOCR(resposta, onProgresso = null) {
+    const intervaloMs = 1500;
+    const limiteMs = 10 * 60 * 1000;
+    const inicio = Date.now();
+
+    while (Date.now() - inicio < limiteMs) {
+        const response = await fetch(resposta.status_url);
+        const job = await response.json();
+
+        if (!job.sucesso) {
+            throw new Error(job.erro || 'Erro ao consultar o processamento');
+        }
+
+        if (onProgresso) onProgresso(job.concluidos, job.total);
+        if (job.status === 'CONCLUIDO') return job;
+
+        await new Promise(resolve => setTimeout(resolve, intervaloMs));
+    }
+
+    throw new Error('O processamento está demorando. Tente novamente em alguns minutos.');
+}
+
+/**
+ * Acompanha um job de OCR pelo stream SSE, arquivo a arquivo
+ * Sem EventSource (ou se o stream falhar) cai na consulta periódica.
+ * @param {object} resposta - Resposta do upload ({job_id, status_url, eventos_url})
+ * @param {function} onArquivo - Callback (indice, item) a cada mudança de um arquivo
+ * @returns {Promise<object>} Resumo do job concluído ({status, total, concluidos})
+ */
+function acompanharJobOCR(resposta, onArquivo) {
+    const porConsulta = async () => {
+        const job = await aguardarJobOCR(resposta);
+        job.resultados.forEach((item, indice) => onArquivo(indice, item));
+        return job;
+    };
+
+    if (!window.EventSource || !resposta.eventos_url) {
+        return porConsulta();
+    }
+
+    return new Promise((resolve, reject) => {
+        const fonte = new EventSource(resposta.eventos_url);
+
+        fonte.addEventListener('arquivo', (e) => {
+            const item = JSON.parse(e.data);
+            onArquivo(item.indice, item);
+        });
+
+        fonte.addEventListener('fim', (e) => {
+            fonte.close();
+            resolve(JSON.parse(e.data));
+        });
+
+        fonte.addEventListener('erro', () => {
+            fonte.close();
+            porConsulta().then(resolve, reject);
+        });
+
+        // O servidor encerra cada conexão após alguns segundos e o navegador
+        // reconecta com o Last-Event-ID; só desiste se fechou de vez
+        fonte.onerror = () => {
+            if (fonte.readyState === EventSource.CLOSED) {
+                porConsulta().then(resolve, reject);
+            }
+        };
+    });
+}
+
 // =========================================
 // Loading States - Funções Globais
 // =========================================
@@ -432,32 +510,31 @@ document.addEventListener('DOMContentLoaded', function () {
         loadingModal.show();
 
         try {
-            // Converter para base64
-            const base64 = await fileToBase64(file);
-
             // Atualizar preview conforme tipo
             if (isPDF) {
                 imgPreview.style.display = 'none';
                 pdfPreview.classList.remove('d-none');
                 pdfNome.textContent = file.name;
             } else {
-                imgPreview.src = base64;
+                if (imgPreview.src.startsWith('blob:')) URL.revokeObjectURL(imgPreview.src);
+                imgPreview.src = URL.createObjectURL(file);
                 imgPreview.style.display = 'block';
                 pdfPreview.classList.add('d-none');
             }
 
-            // Enviar para API (indicando se é PDF)
+            // Enviar para API como multipart (arquivo binário, sem base64)
             const response = await csrfFetch('/upload-nota', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    imagem: base64,
-                    tipo_arquivo: isPDF ? 'pdf' : 'imagem',
-                    nome_arquivo: file.name
-                })
+                body: arquivosParaFormData('imagem', [file])
             });
 
-            const result = await response.json();
+            let result = await response.json();
+
+            // Upload enfileirado: aguarda o worker extrair os dados
+            if (result.sucesso && result.job_id) {
+                const job = await aguardarJobOCR(result);
+                result = job.resultados[0];
+            }
 
             // Esconder loading
             loadingModal.hide();
@@ -551,17 +628,15 @@ document.addEventListener('DOMContentLoaded', function () {
     // =========================================
 
     /**
-     * Converte arquivo para string Base64
-     * @param {File} file - Arquivo a ser convertido
-     * @returns {Promise<string>} - String Base64
+     * Monta o corpo multipart/form-data de um upload (o navegador define o boundary)
+     * @param {string} campo - Nome do campo esperado pela rota
+     * @param {File[]} files - Arquivos enviados
+     * @returns {FormData} - Corpo da requisição
      */
-    function fileToBase64(file) {
-        return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.onload = () => resolve(reader.result);
-            reader.onerror = () => reject(new Error('Erro ao ler arquivo'));
-            reader.readAsDataURL(file);
-        });
+    function arquivosParaFormData(campo, files) {
+        const formData = new FormData();
+        files.forEach(file => formData.append(campo, file, file.name));
+        return formData;
     }
 
     /**
@@ -733,25 +808,7 @@ document.addEventListener('DOMContentLoaded', function () {
             massaModal.show();
 
             try {
-                // Converte todos os arquivos para base64
-                const arquivos = [];
-                for (let i = 0; i < files.length; i++) {
-                    const file = files[i];
-                    const base64 = await fileToBase64(file);
-                    const isPDF = file.type === 'application/pdf';
-                    arquivos.push({
-                        imagem: base64,
-                        nome_arquivo: file.name,
-                        tipo_arquivo: isPDF ? 'pdf' : 'imagem'
-                    });
-
-                    const progressoEl = document.getElementById('massa-progresso');
-                    if (progressoEl) {
-                        progressoEl.textContent = `${i + 1}/${files.length}`;
-                    }
-                }
-
-                // Envia para API
+                // Envia os arquivos binários (multipart) para a API
                 const loadingTextEl = document.getElementById('massa-loading-text');
                 if (loadingTextEl) {
                     loadingTextEl.textContent = 'Analisando com IA...';
@@ -759,13 +816,17 @@ document.addEventListener('DOMContentLoaded', function () {
 
                 const response = await csrfFetch('/upload-notas-massa', {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ arquivos })
+                    body: arquivosParaFormData('arquivos', files)
                 });
 
                 const result = await response.json();
 
-                if (result.sucesso) {
+                // Upload enfileirado: mostra cada arquivo assim que ele fica pronto
+                if (result.sucesso && result.job_id) {
+                    resultadosMassa = files.map(f => ({ nome_arquivo: f.name, status: 'PENDENTE', sucesso: null }));
+                    renderizarListaMassa(resultadosMassa);
+                    await acompanharJobOCR(result, atualizarItemMassa);
+                } else if (result.sucesso) {
                     resultadosMassa = result.resultados;
                     renderizarListaMassa(resultadosMassa);
                 } else {
@@ -782,99 +843,144 @@ document.addEventListener('DOMContentLoaded', function () {
             inputMassa.value = '';
         });
 
-        // Renderiza lista de itens para conferência
-        function renderizarListaMassa(resultados) {
-            document.getElementById('massa-loading').classList.add('d-none');
-            document.getElementById('massa-lista').classList.remove('d-none');
+        // Texto de cada etapa do OCR enquanto o arquivo não terminou
+        const ETAPAS_OCR = {
+            PENDENTE: 'Na fila',
+            PROCESSANDO: 'Iniciando...',
+            CONVERTENDO: 'Convertendo PDF...',
+            EXTRAINDO: 'Extraindo dados...'
+        };
 
-            const container = document.getElementById('massa-itens');
-            container.innerHTML = '';
-
-            let totalSucesso = 0;
-
-            resultados.forEach((item, index) => {
-                if (!item.sucesso) {
-                    // Item com erro
-                    container.innerHTML += `
-                        <div class="card mb-2 border-danger">
-                            <div class="card-body p-2">
-                                <div class="d-flex justify-content-between align-items-center">
-                                    <span class="text-danger"><i class="bi bi-x-circle"></i> ${item.nome_arquivo}</span>
-                                    <small class="text-muted">${item.erro}</small>
-                                </div>
+        // HTML do card de um item (em andamento, com erro ou formulário de conferência)
+        function htmlItemMassa(item, index) {
+            if (item.sucesso === null || item.sucesso === undefined) {
+                // Ainda na fila ou em processamento
+                return `
+                    <div class="card mb-2 border-secondary">
+                        <div class="card-body p-2">
+                            <div class="d-flex justify-content-between align-items-center">
+                                <span class="text-muted"><span class="spinner-border spinner-border-sm"></span> ${item.nome_arquivo}</span>
+                                <small class="text-muted">${ETAPAS_OCR[item.status] || 'Na fila'}</small>
                             </div>
                         </div>
-                    `;
-                    return;
-                }
+                    </div>
+                `;
+            }
 
-                totalSucesso++;
-                const dados = item.dados;
-
-                // Usa categorias baseado no tipo selecionado
-                const categorias = tipoAtual === 'RECEITA' ? CATEGORIAS_RECEITA : CATEGORIAS_DESPESA;
-                const categoriasOptions = categorias.map(c =>
-                    `<option value="${c.value}" ${dados.categoria === c.value || dados.subcategoria === c.value ? 'selected' : ''}>${c.label}</option>`
-                ).join('');
-
-                // Gera opções de subcategoria baseado na categoria detectada
-                const categoriaAtual = dados.categoria || 'Outros';
-                const subcategoriaAtual = dados.subcategoria || 'Outros';
-                const subcats = CATEGORIAS_SUBCATEGORIAS[categoriaAtual] || CATEGORIAS_SUBCATEGORIAS['Outros'];
-                const subcategoriasOptions = subcats.map(s =>
-                    `<option value="${s.value}" ${s.value === subcategoriaAtual ? 'selected' : ''}>${s.label}</option>`
-                ).join('');
-
-                container.innerHTML += `
-                    <div class="card mb-2 border-success item-massa" data-index="${index}">
+            if (!item.sucesso) {
+                // Item com erro
+                return `
+                    <div class="card mb-2 border-danger">
                         <div class="card-body p-2">
-                            <div class="row g-2 align-items-center">
-                                <div class="col-12 col-xl-2">
-                                    <small class="text-muted d-block text-truncate" title="${item.nome_arquivo}">${item.nome_arquivo}</small>
-                                </div>
-                                <div class="col-6 col-xl-1">
-                                    <input type="date" class="form-control form-control-sm" 
-                                        name="data_${index}" value="${dados.data || new Date().toISOString().split('T')[0]}">
-                                </div>
-                                <div class="col-6 col-xl-2">
-                                    <input type="number" step="0.01" class="form-control form-control-sm" 
-                                        name="valor_${index}" value="${dados.valor_total?.toFixed(2) || '0.00'}" placeholder="Valor">
-                                </div>
-                                <div class="col-6 col-xl-2">
-                                    <select class="form-select form-select-sm" name="categoria_${index}" 
-                                        onchange="atualizarSubcatMassa(this, ${index})">
-                                        <option value="Insumos" ${categoriaAtual === 'Insumos' ? 'selected' : ''}>🥬 Insumos</option>
-                                        <option value="Bebidas" ${categoriaAtual === 'Bebidas' ? 'selected' : ''}>🥤 Bebidas</option>
-                                        <option value="Operacional" ${categoriaAtual === 'Operacional' ? 'selected' : ''}>🔧 Operacional</option>
-                                        <option value="Pessoal" ${categoriaAtual === 'Pessoal' ? 'selected' : ''}>👥 Pessoal</option>
-                                        <option value="Infraestrutura" ${categoriaAtual === 'Infraestrutura' ? 'selected' : ''}>🏠 Infraestrutura</option>
-                                        <option value="Administrativo" ${categoriaAtual === 'Administrativo' ? 'selected' : ''}>🏛️ Administrativo</option>
-                                        <option value="Marketing e Eventos" ${categoriaAtual === 'Marketing e Eventos' ? 'selected' : ''}>🎉 Marketing e Eventos</option>
-                                        <option value="Veículos" ${categoriaAtual === 'Veículos' ? 'selected' : ''}>🚗 Veículos</option>
-                                        <option value="Aquisições" ${categoriaAtual === 'Aquisições' ? 'selected' : ''}>🛒 Aquisições</option>
-                                        <option value="Outros" ${categoriaAtual === 'Outros' ? 'selected' : ''}>📋 Outros</option>
-                                    </select>
-                                </div>
-                                <div class="col-6 col-xl-2">
-                                    <select class="form-select form-select-sm" name="subcategoria_${index}" id="subcat_${index}">
-                                        ${subcategoriasOptions}
-                                    </select>
-                                </div>
-                                <div class="col-12 col-xl-2">
-                                    <input type="text" class="form-control form-control-sm" 
-                                        name="estabelecimento_${index}" value="${dados.estabelecimento || ''}" placeholder="Estabelecimento">
-                                </div>
+                            <div class="d-flex justify-content-between align-items-center">
+                                <span class="text-danger"><i class="bi bi-x-circle"></i> ${item.nome_arquivo}</span>
+                                <small class="text-muted">${item.erro}</small>
                             </div>
-                            <input type="hidden" name="comprovante_${index}" value="${item.comprovante_url || ''}">
-                            <input type="hidden" name="descricao_${index}" value="${dados.observacao || ''}">
                         </div>
                     </div>
                 `;
-            });
+            }
+
+            const dados = item.dados;
+
+            // Usa categorias baseado no tipo selecionado
+            const categorias = tipoAtual === 'RECEITA' ? CATEGORIAS_RECEITA : CATEGORIAS_DESPESA;
+            const categoriasOptions = categorias.map(c =>
+                `<option value="${c.value}" ${dados.categoria === c.value || dados.subcategoria === c.value ? 'selected' : ''}>${c.label}</option>`
+            ).join('');
+
+            // Gera opções de subcategoria baseado na categoria detectada
+            const categoriaAtual = dados.categoria || 'Outros';
+            const subcategoriaAtual = dados.subcategoria || 'Outros';
+            const subcats = CATEGORIAS_SUBCATEGORIAS[categoriaAtual] || CATEGORIAS_SUBCATEGORIAS['Outros'];
+            const subcategoriasOptions = subcats.map(s =>
+                `<option value="${s.value}" ${s.value === subcategoriaAtual ? 'selected' : ''}>${s.label}</option>`
+            ).join('');
+
+            return `
+                <div class="card mb-2 border-success item-massa" data-index="${index}">
+                    <div class="card-body p-2">
+                        <div class="row g-2 align-items-center">
+                            <div class="col-12 col-xl-2">
+                                <small class="text-muted d-block text-truncate" title="${item.nome_arquivo}">${item.nome_arquivo}</small>
+                            </div>
+                            <div class="col-6 col-xl-1">
+                                <input type="date" class="form-control form-control-sm" 
+                                    name="data_${index}" value="${dados.data || new Date().toISOString().split('T')[0]}">
+                            </div>
+                            <div class="col-6 col-xl-2">
+                                <input type="number" step="0.01" class="form-control form-control-sm" 
+                                    name="valor_${index}" value="${dados.valor_total?.toFixed(2) || '0.00'}" placeholder="Valor">
+                            </div>
+                            <div class="col-6 col-xl-2">
+                                <select class="form-select form-select-sm" name="categoria_${index}" 
+                                    onchange="atualizarSubcatMassa(this, ${index})">
+                                    <option value="Insumos" ${categoriaAtual === 'Insumos' ? 'selected' : ''}>🥬 Insumos</option>
+                                    <option value="Bebidas" ${categoriaAtual === 'Bebidas' ? 'selected' : ''}>🥤 Bebidas</option>
+                                    <option value="Operacional" ${categoriaAtual === 'Operacional' ? 'selected' : ''}>🔧 Operacional</option>
+                                    <option value="Pessoal" ${categoriaAtual === 'Pessoal' ? 'selected' : ''}>👥 Pessoal</option>
+                                    <option value="Infraestrutura" ${categoriaAtual === 'Infraestrutura' ? 'selected' : ''}>🏠 Infraestrutura</option>
+                                    <option value="Administrativo" ${categoriaAtual === 'Administrativo' ? 'selected' : ''}>🏛️ Administrativo</option>
+                                    <option value="Marketing e Eventos" ${categoriaAtual === 'Marketing e Eventos' ? 'selected' : ''}>🎉 Marketing e Eventos</option>
+                                    <option value="Veículos" ${categoriaAtual === 'Veículos' ? 'selected' : ''}>🚗 Veículos</option>
+                                    <option value="Aquisições" ${categoriaAtual === 'Aquisições' ? 'selected' : ''}>🛒 Aquisições</option>
+                                    <option value="Outros" ${categoriaAtual === 'Outros' ? 'selected' : ''}>📋 Outros</option>
+                                </select>
+                            </div>
+                            <div class="col-6 col-xl-2">
+                                <select class="form-select form-select-sm" name="subcategoria_${index}" id="subcat_${index}">
+                                    ${subcategoriasOptions}
+                                </select>
+                            </div>
+                            <div class="col-12 col-xl-2">
+                                <input type="text" class="form-control form-control-sm" 
+                                    name="estabelecimento_${index}" value="${dados.estabelecimento || ''}" placeholder="Estabelecimento">
+                            </div>
+                        </div>
+                        <input type="hidden" name="comprovante_${index}" value="${item.comprovante_url || ''}">
+                        <input type="hidden" name="descricao_${index}" value="${dados.observacao || ''}">
+                    </div>
+                </div>
+            `;
+        }
+
+        // Renderiza lista de itens para conferência
+        function renderizarListaMassa(resultados) {
+            document.getElementById('massa-loading').classList.add('d-none');
+            document.getElementById('massa-lista').classList.remove('d-none');
+
+            const container = document.getElementById('massa-itens');
+            container.innerHTML = resultados.map((item, index) =>
+                `<div id="massa-item-${index}">${htmlItemMassa(item, index)}</div>`
+            ).join('');
+
+            atualizarConfirmarMassa();
+        }
+
+        // Atualiza só o card de um item (os formulários já exibidos são preservados)
+        function atualizarItemMassa(index, item) {
+            // Modal fechado durante o processamento: lista já descartada
+            const wrapper = document.getElementById(`massa-item-${index}`);
+            if (!wrapper) return;
+
+            // Formulário já exibido: não sobrescreve o que o usuário digitou
+            const anterior = resultadosMassa[index];
+            if (anterior && anterior.sucesso) return;
+
+            resultadosMassa[index] = item;
+            wrapper.innerHTML = htmlItemMassa(item, index);
+            atualizarConfirmarMassa();
+        }
+
+        // Mostra o botão de confirmar com o total pronto (bloqueado enquanto houver itens em andamento)
+        function atualizarConfirmarMassa() {
+            const totalSucesso = resultadosMassa.filter(item => item.sucesso).length;
+            const emAndamento = resultadosMassa.some(item => item.sucesso === null || item.sucesso === undefined);
 
-            // Mostra botão de confirmar
+            const btn = document.getElementById('btn-confirmar-massa');
             if (totalSucesso > 0) {
-                document.getElementById('btn-confirmar-massa').classList.remove('d-none');
+                btn.classList.remove('d-none');
+                btn.disabled = emAndamento;
                 const massaTotalEl = document.getElementById('massa-total');
                 if (massaTotalEl) {
                     massaTotalEl.textContent = totalSucesso;
@@ -7,6 +7,11 @@ Este módulo contém fixtures compartilhadas para todos os testes:
 - db_session: Sessão de banco para testes com transação
 """
 
+import os
+
+# Limitador da Groq em memória: os testes não gravam em instance/limitador.db
+os.environ.setdefault('GROQ_LIMITADOR', 'processo')
+
 import pytest
 from app import create_app
 from models import db as _db
@@ -0,0 +1,131 @@
+"""
+Testes para o arquivo de upload decodificado uma vez (utils/arquivo_upload.py).
+
+Testa:
+- Decodificação com e sem prefixo data: e com quebras de linha
+- Tipo pelos magic bytes (prevalece sobre o tipo declarado)
+- Erros de arquivo vazio ou base64 inválido
+- Gravação no disco com a extensão do tipo detectado
+- Rotas de upload em multipart/form-data (arquivos binários)
+"""
+
+import base64
+import io
+import pytest
+from pathlib import Path
+
+from config import Config
+from routes import upload as rotas_upload
+from utils.arquivo_upload import ArquivoUpload, detectar_mime
+from utils.file_handler import salvar_upload
+
+PDF = b'%PDF-1.4\n' + b'0' * 100
+PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 100
+
+
+# =============================================================================
+# TESTES: ArquivoUpload
+# =============================================================================
+
+class TestArquivoUpload:
+    """Testes para a decodificação e a detecção de tipo."""
+    
+    def test_decodifica_com_prefixo_e_quebras_de_linha(self):
+        """Testa que prefixo data: e quebras de linha não alteram os bytes."""
+        texto = base64.encodebytes(PNG).decode()  # Quebra a cada 76 caracteres
+        
+        assert '\n' in texto
+        assert ArquivoUpload.de_base64(texto).conteudo == PNG
+        assert ArquivoUpload.de_base64('data:image/png;base64,' + texto).conteudo == PNG
+    
+    def test_magic_bytes_prevalecem_sobre_o_tipo_declarado(self):
+        """Testa PDF enviado como imagem, imagem enviada como PDF e tipo desconhecido."""
+        pdf = ArquivoUpload.de_base64('data:image/jpeg;base64,' + base64.b64encode(PDF).decode())
+        png = ArquivoUpload.de_base64(base64.b64encode(PNG).decode(), tipo_arquivo='pdf')
+        desconhecido = ArquivoUpload.de_base64(base64.b64encode(b'texto').decode(), tipo_arquivo='pdf')
+        
+        assert (pdf.eh_pdf, pdf.tipo_arquivo, pdf.extensao) == (True, 'pdf', 'pdf')
+        assert (png.eh_pdf, png.mime, png.extensao) == (False, 'image/png', 'png')
+        assert desconhecido.eh_pdf
+        assert detectar_mime(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'image/webp'
+    
+    @pytest.mark.parametrize('texto', ['', 'data:image/jpeg;base64,', 'não é base64', 'abc'])
+    def test_arquivo_vazio_ou_invalido(self, texto):
+        """Testa que entradas vazias ou inválidas levantam ValueError."""
+        with pytest.raises(ValueError):
+            ArquivoUpload.de_base64(texto)
+    
+    def test_salvar_upload_usa_extensao_detectada(self, tmp_path, monkeypatch):
+        """Testa que o arquivo salvo tem os mesmos bytes e a extensão do tipo."""
+        monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+        
+        url = salvar_upload(ArquivoUpload(PNG, 'nota.jpg'), prefixo='comprovante')
+        
+        assert url.startswith('/static/uploads/comprovante_') and url.endswith('.png')
+        assert (tmp_path / Path(url).name).read_bytes() == PNG
+
+
+class ServicoFalso:
+    """Substitui o GroqService: devolve o nome e o tipo do arquivo recebido."""
+    
+    def processar_pdf_texto(self, pdf, nome_arquivo=None, receita=False):
+        return None  # Sem camada de texto: segue para a visão
+    
+    def processar_nota(self, imagem, nome_arquivo=None):
+        return {'sucesso': True, 'dados': {'arquivo': nome_arquivo, 'mime': imagem.mime}}
+    
+    def processar_receita(self, imagem):
+        # PDFs chegam como lista de páginas renderizadas
+        paginas = imagem if isinstance(imagem, list) else [imagem]
+        return {'sucesso': True, 'dados': {'mime': paginas[0].mime}}
+
+
+@pytest.fixture
+def rotas(app, tmp_path, monkeypatch):
+    """Rotas de upload sem login, com OCR síncrono, pasta temporária e IA falsa."""
+    monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+    monkeypatch.setattr(Config, 'OCR_ASSINCRONO', False)
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', tmp_path)
+    monkeypatch.setattr(rotas_upload, 'get_groq_service', lambda: ServicoFalso())
+    return tmp_path
+
+
+# =============================================================================
+# TESTES: Rotas de upload em multipart
+# =============================================================================
+
+class TestUploadMultipart:
+    """Testes para as variantes multipart de /upload-nota, /upload-notas-massa e /upload-comprovante."""
+    
+    def test_massa_multipart_mantem_a_ordem_e_erros_por_arquivo(self, client, rotas):
+        """Testa arquivos binários processados na ordem, com o vazio como erro."""
+        response = client.post('/upload-notas-massa', content_type='multipart/form-data', data={
+            'arquivos': [(io.BytesIO(PNG), 'gelo.png'), (io.BytesIO(b''), 'vazio.jpg')]
+        })
+        
+        primeiro, segundo = response.get_json()['resultados']
+        assert primeiro['dados'] == {'arquivo': 'gelo.png', 'mime': 'image/png', 'observacao': 'gelo'}
+        assert (rotas / Path(primeiro['comprovante_url']).name).read_bytes() == PNG
+        assert segundo == {'sucesso': False, 'erro': 'Arquivo vazio', 'nome_arquivo': 'vazio.jpg'}
+    
+    def test_comprovante_e_nota_multipart(self, client, rotas, monkeypatch):
+        """Testa o comprovante em PDF (IA recebe a página renderizada) e a nota única."""
+        monkeypatch.setattr(rotas_upload, 'renderizar_paginas_pdf', lambda pdf: [b'\xff\xd8\xff'])
+        
+        comprovante = client.post('/upload-comprovante', content_type='multipart/form-data',
+                                  data={'arquivo': (io.BytesIO(PDF), 'pix.pdf')}).get_json()
+        nota = client.post('/upload-nota', content_type='multipart/form-data',
+                           data={'imagem': (io.BytesIO(PNG), 'nota.png')}).get_json()
+        
+        assert comprovante['url'].endswith('.pdf') and comprovante['dados'] == {'mime': 'image/jpeg'}
+        assert nota['dados']['arquivo'] == 'nota.png'
+    
+    def test_limite_de_tamanho_durante_a_leitura(self, app, client, rotas, monkeypatch):
+        """Testa que partes acima de MAX_CONTENT_LENGTH resultam em 413."""
+        monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+        
+        response = client.post('/upload-nota', content_type='multipart/form-data',
+                               data={'imagem': (io.BytesIO(PNG * 20), 'grande.png')})
+        
+        assert response.status_code == 413
+        assert 'muito grande' in response.get_json()['erro']
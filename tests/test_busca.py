@@ -0,0 +1,124 @@
+"""
+Testes para a busca textual (índice FTS5 sobre transacoes).
+
+Testa:
+- Busca por prefixo, sem acentos e sem diferenciar maiúsculas
+- Ranking por relevância e busca em vários anos
+- Sincronização do índice em edição e exclusão
+- Filtro "busca" do snapshot do mês usando o índice
+- Migração do índice em bancos existentes
+"""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import text
+
+from models import db, Transacao, buscar_transacoes, get_snapshot_mes
+from utils.migracoes import aplicar_migracoes
+
+
+@pytest.fixture
+def transacoes_busca(app):
+    """Transações em 2014-2016 (anos exclusivos destes testes), removidas ao final."""
+    with app.app_context():
+        transacoes = [
+            Transacao(tipo='DESPESA', valor=300.0, categoria='Insumos',
+                      estabelecimento='Atacadão Distribuidora', descricao='Camarão rosa',
+                      data=datetime(2014, 1, 10)),
+            Transacao(tipo='DESPESA', valor=120.0, categoria='Insumos',
+                      estabelecimento='ATACADAO', data=datetime(2016, 1, 15)),
+            Transacao(tipo='DESPESA', valor=80.0, categoria='Bebidas',
+                      descricao='Gelo', estabelecimento='Distribuidora Praia',
+                      texto_comprovante='NFC-e  Item 1  GELO EM CUBOS  Atacadão',
+                      data=datetime(2015, 12, 1)),
+            Transacao(tipo='RECEITA', valor=900.0, categoria='PIX',
+                      descricao='Evento Atacadão', data=datetime(2016, 1, 20)),
+        ]
+        db.session.add_all(transacoes)
+        db.session.commit()
+        
+        yield transacoes
+        
+        db.session.expire_all()
+        for t in Transacao.query.filter(Transacao.data >= datetime(2014, 1, 1),
+                                        Transacao.data < datetime(2017, 1, 1)).all():
+            db.session.delete(t)
+        db.session.commit()
+
+
+# =============================================================================
+# TESTES: buscar_transacoes
+# =============================================================================
+
+class TestBuscarTransacoes:
+    """Testes para a busca ranqueada em todos os anos."""
+    
+    def test_busca_ignora_acentos_e_maiusculas(self, app, transacoes_busca):
+        """Testa que 'atacadao' encontra 'Atacadão' e 'ATACADAO' em anos diferentes."""
+        with app.app_context():
+            ids = {t.id for t in buscar_transacoes('atacadao')}
+            
+            assert ids == {t.id for t in transacoes_busca}
+    
+    def test_busca_por_prefixo_e_texto_do_comprovante(self, app, transacoes_busca):
+        """Testa prefixos e palavras que só existem no texto da nota."""
+        with app.app_context():
+            assert [t.id for t in buscar_transacoes('camar')] == [transacoes_busca[0].id]
+            assert [t.id for t in buscar_transacoes('cubos')] == [transacoes_busca[2].id]
+    
+    def test_estabelecimento_pesa_mais_no_ranking(self, app, transacoes_busca):
+        """Testa que o fornecedor no estabelecimento vem antes do texto da nota."""
+        with app.app_context():
+            resultado = buscar_transacoes('atacadao', tipo='DESPESA')
+            
+            assert resultado[-1].id == transacoes_busca[2].id
+            assert all(t.tipo == 'DESPESA' for t in resultado)
+    
+    def test_busca_vazia_ou_so_simbolos(self, app, transacoes_busca):
+        """Testa que termos sem palavras não geram erro de sintaxe do FTS."""
+        with app.app_context():
+            assert buscar_transacoes('') == []
+            assert buscar_transacoes('"*(-') == []
+    
+    def test_indice_acompanha_edicao_e_exclusao(self, app, transacoes_busca):
+        """Testa que os triggers mantêm o índice sincronizado."""
+        with app.app_context():
+            t = db.session.get(Transacao, transacoes_busca[1].id)
+            t.estabelecimento = 'Makro'
+            db.session.commit()
+            
+            assert [r.id for r in buscar_transacoes('makro')] == [t.id]
+            assert t.id not in {r.id for r in buscar_transacoes('atacadao')}
+            
+            db.session.delete(t)
+            db.session.commit()
+            
+            assert buscar_transacoes('makro') == []
+    
+    def test_filtro_busca_do_snapshot(self, app, transacoes_busca):
+        """Testa que o filtro 'busca' do dashboard usa o índice textual."""
+        with app.app_context():
+            snapshot = get_snapshot_mes(2016, 1, filtros={'busca': 'ATACADÃO'})
+            
+            assert {t.id for t in snapshot['transacoes']} == {
+                transacoes_busca[1].id, transacoes_busca[3].id
+            }
+
+
+# =============================================================================
+# TESTES: Migração
+# =============================================================================
+
+class TestMigracaoIndiceBusca:
+    """Testes para a criação do índice em bancos existentes."""
+    
+    def test_migracao_indexa_transacoes_existentes(self, app, transacoes_busca):
+        """Testa que um banco sem índice é indexado pela migração."""
+        with app.app_context():
+            db.session.execute(text('DROP TABLE transacoes_fts'))
+            db.session.commit()
+            
+            aplicadas = aplicar_migracoes()
+            
+            assert aplicadas['indice_busca'] >= len(transacoes_busca)
+            assert len(buscar_transacoes('atacadao')) == len(transacoes_busca)
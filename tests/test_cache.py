@@ -0,0 +1,172 @@
+"""
+Testes para o cache de consultas em utils/cache.py.
+
+Testa:
+- Memoização por requisição (flask.g) com argumentos mutáveis
+- Invalidação do cache quando a sessão grava ou confirma
+- Versão global dos dados incrementada a cada escrita em transacoes
+- Cache entre requisições (backends LRU e SQLite) chaveado pela versão
+"""
+
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import models
+from models import db, Transacao, get_totais_ano, get_totais_mes, get_versao_dados
+from utils.cache import (
+    memoizar_por_requisicao, cache_entre_requisicoes, CacheLRU, CacheSQLite
+)
+
+
+# =============================================================================
+# TESTES: Memoização por requisição
+# =============================================================================
+
+class TestMemoizacaoPorRequisicao:
+    """Testes para o decorator memoizar_por_requisicao."""
+    
+    def test_chamadas_repetidas_executam_uma_vez(self, app):
+        """Testa que a mesma chamada no mesmo contexto reaproveita o resultado."""
+        chamadas = []
+        
+        @memoizar_por_requisicao
+        def consulta(ano, filtros=None):
+            chamadas.append((ano, filtros))
+            return {'ano': ano}
+        
+        with app.app_context():
+            primeiro = consulta(2020, filtros={'busca': 'gelo'})
+            segundo = consulta(2020, filtros={'busca': 'gelo'})
+            consulta(2021)
+            
+            assert primeiro is segundo
+            assert len(chamadas) == 2
+        
+        with app.app_context():
+            consulta(2020, filtros={'busca': 'gelo'})
+            
+            assert len(chamadas) == 3  # Novo contexto, cache vazio
+    
+    def test_commit_invalida_cache(self, app):
+        """Testa que uma escrita confirmada descarta os resultados memoizados."""
+        with app.app_context():
+            antes = get_totais_mes(2013, 6)
+            assert get_totais_mes(2013, 6) is antes
+            
+            t = Transacao(tipo='RECEITA', valor=75.0, categoria='PIX', data=datetime(2013, 6, 1))
+            db.session.add(t)
+            db.session.commit()
+            
+            assert get_totais_mes(2013, 6)['receitas'] == antes['receitas'] + 75.0
+            
+            db.session.delete(t)
+            db.session.commit()
+            
+            assert get_totais_mes(2013, 6) == antes
+
+
+# =============================================================================
+# TESTES: Versão dos dados
+# =============================================================================
+
+class TestVersaoDados:
+    """Testes para os triggers que incrementam versao_dados."""
+    
+    def test_escritas_incrementam_versao(self, app):
+        """Testa INSERT, UPDATE e DELETE, inclusive por SQL puro."""
+        with app.app_context():
+            inicial = get_versao_dados()
+            
+            t = Transacao(tipo='DESPESA', valor=10.0, categoria='Outros', data=datetime(2013, 7, 1))
+            db.session.add(t)
+            db.session.commit()
+            assert get_versao_dados() == inicial + 1
+            
+            db.session.execute(text("UPDATE transacoes SET valor_centavos = 2000 WHERE id = :id"), {"id": t.id})
+            db.session.commit()
+            assert get_versao_dados() == inicial + 2
+            
+            db.session.delete(db.session.get(Transacao, t.id))
+            db.session.commit()
+            assert get_versao_dados() == inicial + 3
+
+
+# =============================================================================
+# TESTES: Cache entre requisições
+# =============================================================================
+
+class TestCacheEntreRequisicoes:
+    """Testes para o decorator cache_entre_requisicoes e os backends."""
+    
+    def test_reaproveita_entre_contextos_ate_a_proxima_escrita(self, app):
+        """Testa que o resultado sobrevive à requisição e expira com a versão."""
+        chamadas = []
+        
+        @cache_entre_requisicoes
+        def agregado(ano):
+            chamadas.append(ano)
+            return {'ano': ano, 'chamada': len(chamadas)}
+        
+        with app.app_context():
+            primeiro = agregado(2013)
+        with app.app_context():
+            assert agregado(2013) == primeiro
+            assert len(chamadas) == 1
+            
+            t = Transacao(tipo='RECEITA', valor=5.0, categoria='PIX', data=datetime(2013, 8, 1))
+            db.session.add(t)
+            db.session.commit()
+            id_transacao = t.id
+        
+        with app.app_context():
+            assert agregado(2013)['chamada'] == 2
+            
+            db.session.delete(db.session.get(Transacao, id_transacao))
+            db.session.commit()
+    
+    def test_falha_de_banco_nao_fica_no_cache(self, app, monkeypatch):
+        """Testa que os zeros de um "database is locked" não são servidos depois."""
+        chamadas = []
+        
+        def somar_resumos(*args, **kwargs):
+            chamadas.append(args)
+            if len(chamadas) == 1:
+                raise OperationalError('SELECT', {}, Exception('database is locked'))
+            return [('RECEITA', 1000, 1)]
+        
+        monkeypatch.setattr(models, '_somar_resumos', somar_resumos)
+        
+        with app.app_context():
+            assert get_totais_ano(2009)['receitas'] == 0.0
+        with app.app_context():
+            assert get_totais_ano(2009)['receitas'] == 10.0
+        with app.app_context():
+            assert get_totais_ano(2009)['receitas'] == 10.0
+        
+        assert len(chamadas) == 2
+    
+    def test_lru_devolve_copias_e_respeita_limite(self):
+        """Testa descarte do item menos usado no backend em memória."""
+        cache = CacheLRU(max_itens=2)
+        cache.gravar('a', b'1', 1)
+        cache.gravar('b', b'2', 1)
+        cache.obter('a')
+        cache.gravar('c', b'3', 1)
+        
+        assert cache.obter('b') is None
+        assert cache.obter('a') == b'1'
+        assert cache.obter('c') == b'3'
+    
+    def test_sqlite_compartilhado_entre_processos(self, tmp_path):
+        """Testa duas instâncias no mesmo arquivo (como dois workers)."""
+        worker_1 = CacheSQLite(tmp_path / 'cache.db', max_itens=10)
+        worker_2 = CacheSQLite(tmp_path / 'cache.db', max_itens=10)
+        
+        worker_1.gravar('totais-v1', b'antigo', 1)
+        assert worker_2.obter('totais-v1') == b'antigo'
+        
+        # Gravar uma versão nova descarta as entradas de versões anteriores
+        worker_2.gravar('totais-v2', b'novo', 2)
+        assert worker_1.obter('totais-v1') is None
+        assert worker_1.obter('totais-v2') == b'novo'
@@ -0,0 +1,140 @@
+"""
+Testes para a saída estruturada do OCR (utils/esquema_ocr.py).
+
+Testa:
+- Validação de respostas contra ESQUEMA_DESPESA e ESQUEMA_RECEITA
+- GroqService pedindo o esquema à API e lendo a resposta estruturada
+- Parser tolerante como reserva (json_validate_failed, modelo sem suporte)
+"""
+
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from groq import BadRequestError
+
+from config import Config
+from services.groq_service import GroqService
+from utils import limitador
+from utils.arquivo_upload import ArquivoUpload
+from utils.esquema_ocr import ESQUEMA_DESPESA, ESQUEMA_RECEITA, ler_resposta_estruturada, validar_esquema
+from utils.limitador import LimitadorTokens
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+DESPESA = {
+    'data': '2025-10-01', 'estabelecimento': 'Peixaria Central', 'valor_total': 312.9,
+    'categoria': 'Insumos', 'subcategoria': 'Frutos do Mar', 'confianca': 0.9, 'erro': None
+}
+
+
+def resposta(conteudo: str):
+    """Resposta no formato do client.chat.completions.create."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=conteudo))],
+        usage=SimpleNamespace(total_tokens=1500)
+    )
+
+
+def erro_400(corpo: dict) -> BadRequestError:
+    """BadRequestError do SDK com o corpo JSON informado."""
+    requisicao = httpx.Request('POST', 'https://api.groq.com/openai/v1/chat/completions')
+    return BadRequestError(f'Error code: 400 - {corpo}', response=httpx.Response(400, request=requisicao), body=corpo)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """GroqService sem cache, com o create substituído por cada teste (service.respostas)."""
+    monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+    monkeypatch.setattr(Config, 'GROQ_SAIDA_ESTRUTURADA', 'json_schema')
+    # Cota própria: as chamadas falsas não devem esperar pela cota dos outros testes
+    monkeypatch.setattr(limitador, '_limitador_groq', LimitadorTokens(1000, 10**7))
+    
+    service = GroqService()
+    service.chamadas = []
+    service.respostas = []
+    
+    def create(**kwargs):
+        service.chamadas.append(kwargs)
+        proxima = service.respostas.pop(0)
+        if isinstance(proxima, Exception):
+            raise proxima
+        return resposta(proxima)
+    
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return service
+
+
+# =============================================================================
+# TESTES: validar_esquema / ler_resposta_estruturada
+# =============================================================================
+
+class TestValidarEsquema:
+    """Testes para o validador do subconjunto de JSON Schema."""
+    
+    def test_resposta_valida_sem_campos_null(self):
+        """Testa a despesa completa e a remoção dos campos null (erro incluído)."""
+        assert validar_esquema(DESPESA, ESQUEMA_DESPESA) == []
+        
+        dados = ler_resposta_estruturada(json.dumps({**DESPESA, 'estabelecimento': None}), ESQUEMA_DESPESA)
+        assert 'erro' not in dados and 'estabelecimento' not in dados
+        assert dados['valor_total'] == 312.9
+    
+    def test_tipos_enum_campos_ausentes_e_extras(self):
+        """Testa cada tipo de problema e a recusa de texto que não é JSON puro."""
+        receita = {'data': '2025-10-01', 'origem': 'Cliente', 'valor': '150,00', 'tipo_pagamento': 'Boleto', 'extra': 1}
+        
+        erros = validar_esquema(receita, ESQUEMA_RECEITA)
+        
+        assert '$.valor: esperado number/null, recebido str' in erros
+        assert "$.tipo_pagamento: valor fora da lista permitida: 'Boleto'" in erros
+        assert '$.erro: campo obrigatório ausente' in erros
+        assert '$.extra: campo não previsto' in erros
+        assert validar_esquema({**DESPESA, 'valor_total': True}, ESQUEMA_DESPESA)
+        assert ler_resposta_estruturada('```json\n{}\n```', ESQUEMA_DESPESA) is None
+
+
+# =============================================================================
+# TESTES: GroqService com saída estruturada
+# =============================================================================
+
+class TestSaidaEstruturada:
+    """Testes para o response_format e as reservas do GroqService."""
+    
+    def test_pede_esquema_e_le_a_resposta(self, service):
+        """Testa o json_schema enviado à API e a despesa extraída."""
+        service.respostas = [json.dumps(DESPESA)]
+        
+        resultado = service.processar_nota(ArquivoUpload(PNG, 'nota.png'))
+        
+        formato = service.chamadas[0]['response_format']
+        assert formato['type'] == 'json_schema' and formato['json_schema']['name'] == 'despesa'
+        assert resultado['sucesso'] and resultado['dados']['subcategoria'] == 'Frutos do Mar'
+    
+    def test_geracao_fora_do_esquema_vai_ao_parser_tolerante(self, service):
+        """Testa json_validate_failed aproveitando a geração, sem outra chamada."""
+        gerado = 'Segue o JSON:\n```json\n' + json.dumps({**DESPESA, 'valor_total': '312,90'}) + '\n```'
+        service.respostas = [erro_400({'error': {
+            'message': 'Failed to validate JSON', 'code': 'json_validate_failed', 'failed_generation': gerado
+        }})]
+        
+        resultado = service.processar_nota(ArquivoUpload(PNG, 'nota.png'))
+        
+        assert len(service.chamadas) == 1
+        assert resultado['sucesso'] and resultado['dados']['valor_total'] == 312.9
+    
+    def test_modelo_sem_suporte_segue_so_com_o_prompt(self, service):
+        """Testa a repetição sem response_format e o modelo lembrado nas próximas chamadas."""
+        recibo = json.dumps({'data': '2025-10-01', 'origem': 'Cliente', 'valor': 150.0, 'tipo_pagamento': 'PIX'})
+        service.respostas = [
+            erro_400({'error': {'message': 'response_format `json_schema` is not supported with this model'}}),
+            recibo,
+            recibo,
+        ]
+        
+        primeira = service.processar_receita(ArquivoUpload(PNG, 'pix.png'))
+        segunda = service.processar_receita(ArquivoUpload(PNG + b'\x01', 'pix.png'))
+        
+        assert primeira['sucesso'] and segunda['sucesso']
+        assert ['response_format' in chamada for chamada in service.chamadas] == [True, False, False]
@@ -6,6 +6,7 @@ Testa:
 - validar_data: Validação de formato de data YYYY-MM-DD
 - extrair_json_de_texto: Extração de JSON de texto
 - converter_data_para_formato_padrao: Conversão de datas
+- para_centavos / de_centavos: Conversão entre reais e centavos inteiros
 """
 
 import pytest
@@ -13,7 +14,9 @@ from utils.helpers import (
     formatar_valor,
     validar_data,
     extrair_json_de_texto,
-    converter_data_para_formato_padrao
+    converter_data_para_formato_padrao,
+    para_centavos,
+    de_centavos
 )
 
 
@@ -173,3 +176,24 @@ class TestConverterDataParaFormatoPadrao:
     def test_converter_formato_invalido(self):
         """Testa formato não reconhecido."""
         assert converter_data_para_formato_padrao("December 26, 2025") is None
+
+
+# =============================================================================
+# TESTES: para_centavos / de_centavos
+# =============================================================================
+
+class TestCentavos:
+    """Testes para a conversão entre reais e centavos."""
+    
+    def test_para_centavos_arredonda_pela_representacao_decimal(self):
+        """Testa que 0.285 vira 29 (round(0.285 * 100) daria 28)."""
+        assert para_centavos(0.285) == 29
+        assert para_centavos(150.5) == 15050
+        assert para_centavos('19.99') == 1999
+        assert para_centavos(100) == 10000
+    
+    def test_soma_em_centavos_e_exata(self):
+        """Testa que somar centavos não acumula erro de ponto flutuante."""
+        assert 0.1 + 0.2 != 0.3
+        assert de_centavos(para_centavos(0.1) + para_centavos(0.2)) == 0.3
+        assert de_centavos(None) == 0.0
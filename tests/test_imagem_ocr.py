@@ -0,0 +1,91 @@
+"""
+Testes para o pré-processamento de imagens do OCR (utils/imagem_ocr.py).
+
+Testa:
+- Rotação pelo EXIF, recorte do documento, tons de cinza e redução
+- Imagens que não ganham nada ou não abrem voltam sem alteração
+- GroqService aceitando fotos que antes passavam do limite de 4 MB
+"""
+
+import io
+import os
+
+from PIL import Image, ImageDraw, ImageStat
+
+from config import Config
+from services.groq_service import GroqService
+from utils.arquivo_upload import ArquivoUpload
+from utils.imagem_ocr import preprocessar_imagem
+
+
+def foto_de_cupom(tamanho=(2000, 1500), ruido=False) -> bytes:
+    """Cupom branco sobre mesa escura, salvo "deitado" com orientação 6 no EXIF."""
+    if ruido:
+        fundo = Image.frombytes('RGB', tamanho, os.urandom(tamanho[0] * tamanho[1] * 3))
+        fundo = Image.blend(fundo, Image.new('RGB', tamanho, (60, 40, 30)), 0.3)
+    else:
+        fundo = Image.new('RGB', tamanho, (60, 40, 30))
+    cupom = Image.new('RGB', (tamanho[0] // 2, tamanho[1] // 2), (250, 250, 250))
+    ImageDraw.Draw(cupom).text((20, 20), 'TOTAL R$ 42,50', fill=(0, 0, 0))
+    fundo.paste(cupom, (tamanho[0] // 4, tamanho[1] // 4))
+    
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    saida = io.BytesIO()
+    fundo.save(saida, 'JPEG', quality=95, exif=exif)
+    return saida.getvalue()
+
+
+# =============================================================================
+# TESTES: preprocessar_imagem
+# =============================================================================
+
+class TestPreprocessamento:
+    """Testes para as etapas do pré-processamento."""
+    
+    def test_rotaciona_recorta_e_reduz(self, monkeypatch):
+        """Testa foto deitada: fica em pé, só com o cupom, no lado máximo."""
+        monkeypatch.setattr(Config, 'OCR_IMAGEM_LADO_MAXIMO', 400)
+        
+        processada = preprocessar_imagem(ArquivoUpload(foto_de_cupom(), 'cupom.jpg'))
+        
+        with Image.open(io.BytesIO(processada.conteudo)) as imagem:
+            assert processada.mime == 'image/jpeg' and processada.nome_arquivo == 'cupom.jpg'
+            assert imagem.height == 400 and imagem.width < imagem.height  # Em pé
+            assert ImageStat.Stat(imagem).mean[0] > 200  # Sobra o papel, não a mesa
+            assert imagem.getexif().get(0x0112, 1) == 1
+    
+    def test_colorida_mantem_rgb_e_sem_ganho_mantem_original(self):
+        """Testa que fotos coloridas não viram cinza e que o original pequeno é mantido."""
+        colorida = io.BytesIO()
+        Image.frombytes('RGB', (400, 300), os.urandom(400 * 300 * 3)).save(colorida, 'PNG')
+        cinza = io.BytesIO()
+        Image.frombytes('L', (300, 200), os.urandom(300 * 200)).save(cinza, 'JPEG', quality=60)
+        
+        processada = preprocessar_imagem(ArquivoUpload(colorida.getvalue()))
+        pequena = ArquivoUpload(cinza.getvalue())
+        
+        with Image.open(io.BytesIO(processada.conteudo)) as imagem:
+            assert (processada.mime, imagem.mode) == ('image/jpeg', 'RGB')
+        assert preprocessar_imagem(pequena) is pequena
+    
+    def test_falhas_e_desativado_devolvem_original(self, monkeypatch):
+        """Testa bytes que o Pillow não abre, PDFs e o pré-processamento desligado."""
+        invalida = ArquivoUpload(b'\xff\xd8\xff' + b'corrompido')
+        pdf = ArquivoUpload(b'%PDF-1.4')
+        foto = ArquivoUpload(foto_de_cupom())
+        
+        assert preprocessar_imagem(invalida) is invalida
+        assert preprocessar_imagem(pdf) is pdf
+        
+        monkeypatch.setattr(Config, 'OCR_PREPROCESSAMENTO_ATIVO', False)
+        assert preprocessar_imagem(foto) is foto
+    
+    def test_groq_aceita_foto_acima_de_4mb(self):
+        """Testa que _preparar_imagem reduz a foto em vez de recusá-la."""
+        foto = ArquivoUpload(foto_de_cupom((3000, 2250), ruido=True))
+        assert foto.tamanho > 4 * 1024 * 1024
+        
+        preparada = GroqService()._preparar_imagem(foto)
+        
+        assert preparada is not None and preparada.tamanho < 1024 * 1024
@@ -0,0 +1,132 @@
+"""
+Testes para o limitador de cota da Groq (utils/limitador.py).
+
+Testa:
+- Rajada inicial até a cota e espera calculada pela taxa de reposição
+- Limite de tokens por minuto e correção pelo consumo real
+- Timeout de adquirir() e uso concorrente por várias threads
+- Folga relativa da cota (usada pelo hedge)
+- Baldes em SQLite compartilhados entre processos
+"""
+
+import multiprocessing
+import threading
+
+from utils.limitador import LimitadorTokens, LimitadorTokensSQLite
+
+
+class RelogioFalso:
+    """Relógio controlado pelo teste (substitui time.monotonic)."""
+    
+    def __init__(self):
+        self.agora = 0.0
+    
+    def __call__(self) -> float:
+        return self.agora
+
+
+# =============================================================================
+# TESTES: LimitadorTokens
+# =============================================================================
+
+class TestLimitadorTokens:
+    """Testes para o token bucket de requisições e tokens por minuto."""
+    
+    def test_rajada_ate_rpm_e_reposicao_proporcional(self):
+        """Testa que 30 RPM libera 30 chamadas e depois uma a cada 2s."""
+        relogio = RelogioFalso()
+        limitador = LimitadorTokens(requisicoes_por_minuto=30, tokens_por_minuto=10**6, relogio=relogio)
+        
+        assert all(limitador.tentar_adquirir(100) == 0 for _ in range(30))
+        assert limitador.tentar_adquirir(100) == 2.0
+        
+        relogio.agora = 2.0
+        assert limitador.tentar_adquirir(100) == 0
+    
+    def test_tpm_e_ajuste_pelo_consumo_real(self):
+        """Testa que o balde de tokens segura chamadas e devolve a sobra estimada."""
+        relogio = RelogioFalso()
+        limitador = LimitadorTokens(requisicoes_por_minuto=100, tokens_por_minuto=6000, relogio=relogio)
+        
+        assert limitador.tentar_adquirir(2000) == 0
+        assert limitador.tentar_adquirir(2000) == 0
+        assert limitador.tentar_adquirir(2000) == 0
+        assert limitador.tentar_adquirir(2000) == 20.0  # 2000 tokens a 100/s
+        
+        # A última chamada gastou só 800 dos 2000 estimados
+        limitador.ajustar(800, estimado=2000)
+        assert limitador.tentar_adquirir(1200) == 0
+    
+    def test_folga_pelo_balde_mais_vazio(self):
+        """Testa a fração livre pelo menor saldo entre requisições e tokens."""
+        relogio = RelogioFalso()
+        limitador = LimitadorTokens(requisicoes_por_minuto=10, tokens_por_minuto=10000, relogio=relogio)
+        assert limitador.folga() == 1.0
+        
+        limitador.tentar_adquirir(6000)
+        assert limitador.folga() == 0.4  # 9/10 requisições, 4000/10000 tokens
+    
+    def test_adquirir_respeita_timeout(self):
+        """Testa que adquirir() desiste quando a espera excede o timeout."""
+        limitador = LimitadorTokens(requisicoes_por_minuto=1, tokens_por_minuto=1000)
+        
+        assert limitador.adquirir(10, timeout=0.1) is True
+        assert limitador.adquirir(10, timeout=0.1) is False
+    
+    def test_threads_nunca_excedem_a_cota(self):
+        """Testa que chamadas concorrentes não retiram mais que o saldo."""
+        limitador = LimitadorTokens(requisicoes_por_minuto=5, tokens_por_minuto=10**6)
+        adquiridas = []
+        
+        def chamar():
+            if limitador.tentar_adquirir(1) == 0:
+                adquiridas.append(1)
+        
+        threads = [threading.Thread(target=chamar) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert len(adquiridas) == 5
+
+
+def _consumir_cota(caminho: str, fila) -> None:
+    """Processo filho: quantas requisições consegue do balde compartilhado."""
+    limitador = LimitadorTokensSQLite(caminho, requisicoes_por_minuto=2, tokens_por_minuto=10**6)
+    fila.put(sum(1 for _ in range(5) if limitador.tentar_adquirir(1) == 0))
+
+
+# =============================================================================
+# TESTES: LimitadorTokensSQLite
+# =============================================================================
+
+class TestLimitadorSQLite:
+    """Testes para a cota compartilhada entre processos."""
+    
+    def test_instancias_dividem_o_mesmo_balde(self, tmp_path):
+        """Testa que duas instâncias (processos distintos) somam a mesma cota."""
+        relogio = RelogioFalso()
+        a = LimitadorTokensSQLite(tmp_path / 'limitador.db', 3, 6000, relogio=relogio)
+        b = LimitadorTokensSQLite(tmp_path / 'limitador.db', 3, 6000, relogio=relogio)
+        
+        assert [a.tentar_adquirir(100), b.tentar_adquirir(100), a.tentar_adquirir(100)] == [0, 0, 0]
+        assert b.tentar_adquirir(100) == 20.0
+        
+        b.ajustar(1100, estimado=100)
+        relogio.agora = 20.0
+        assert a.tentar_adquirir(100) == 0
+        assert round(b.folga(), 2) == 0.0
+    
+    def test_processos_nao_excedem_a_cota(self, tmp_path):
+        """Testa três processos disputando uma cota de 2 RPM: só 2 passam no total."""
+        caminho = str(tmp_path / 'limitador.db')
+        contexto = multiprocessing.get_context('spawn')
+        fila = contexto.Queue()
+        processos = [contexto.Process(target=_consumir_cota, args=(caminho, fila)) for _ in range(3)]
+        for processo in processos:
+            processo.start()
+        for processo in processos:
+            processo.join(timeout=30)
+        
+        assert sum(fila.get(timeout=5) for _ in processos) == 2
@@ -0,0 +1,158 @@
+"""
+Testes para o OCR em lote do upload em massa (várias notas por requisição).
+
+Testa:
+- Agrupamento: imagens pequenas em lotes, PDFs e imagens grandes sozinhos
+- GroqService.processar_notas_lote separando a resposta por índice
+- Volta para uma chamada por imagem com a resposta do lote malformada
+- /upload-notas-massa com uma única requisição para as imagens pequenas
+"""
+
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from routes import upload as rotas_upload
+from services.groq_service import GroqService
+from services.ocr_job_service import agrupar_lotes
+from utils import limitador
+from utils.arquivo_upload import ArquivoUpload
+from utils.limitador import LimitadorTokens
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+PDF = b'%PDF-1.4\n' + b'0' * 64
+
+
+def nota(indice: int, **campos) -> dict:
+    """Item de despesa da resposta do lote."""
+    return {'indice': indice, 'data': '2025-10-01', 'estabelecimento': f'Fornecedor {indice}',
+            'valor_total': 10.0 * (indice + 1), 'categoria': 'Outros', 'subcategoria': 'Outros',
+            'confianca': 0.9, 'erro': None, **campos}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """GroqService de um modelo só, sem cache; service.respostas em ordem, service.chamadas registra o create."""
+    monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+    monkeypatch.setattr(Config, 'OCR_ROTEAMENTO_ATIVO', False)
+    monkeypatch.setattr(limitador, '_limitador_groq', LimitadorTokens(1000, 10**7))
+    
+    service = GroqService()
+    service.chamadas = []
+    service.respostas = []
+    
+    def create(**kwargs):
+        service.chamadas.append(kwargs)
+        conteudo = service.respostas.pop(0)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=conteudo))],
+            usage=SimpleNamespace(total_tokens=1500)
+        )
+    
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return service
+
+
+def imagens(*nomes) -> list:
+    """Uma imagem pequena (conteúdo distinto) por nome."""
+    return [ArquivoUpload(PNG + bytes([indice]), nome) for indice, nome in enumerate(nomes)]
+
+
+def imagens_na_chamada(chamada: dict) -> int:
+    """Quantidade de imagens enviadas numa chamada ao create."""
+    return sum(1 for parte in chamada['messages'][0]['content'] if parte['type'] == 'image_url')
+
+
+# =============================================================================
+# TESTES: agrupar_lotes
+# =============================================================================
+
+class TestAgruparLotes:
+    """Testes para a divisão dos arquivos do upload em grupos de OCR."""
+    
+    def test_pequenas_em_lotes_e_o_resto_sozinho(self, monkeypatch):
+        """Testa lotes de até OCR_LOTE_MAX_IMAGENS, com PDF, imagem grande e erro fora."""
+        monkeypatch.setattr(Config, 'OCR_LOTE_MAX_IMAGENS', 2)
+        monkeypatch.setattr(Config, 'OCR_LOTE_TAMANHO_MAXIMO_KB', 1)
+        grande = ArquivoUpload(PNG * 20, 'grande.png')
+        uploads = [*imagens('a.png', 'b.png'), ArquivoUpload(PDF, 'c.pdf'), None, grande, *imagens('d.png')]
+        
+        assert agrupar_lotes(uploads) == [[0, 1], [5], [2], [4]]
+        
+        monkeypatch.setattr(Config, 'OCR_LOTE_ATIVO', False)
+        assert agrupar_lotes(uploads) == [[0], [1], [2], [4], [5]]
+
+
+# =============================================================================
+# TESTES: GroqService.processar_notas_lote
+# =============================================================================
+
+class TestProcessarNotasLote:
+    """Testes para a requisição única e a volta para uma chamada por imagem."""
+    
+    def test_uma_requisicao_para_o_lote(self, service):
+        """Testa a resposta fora de ordem separada por índice e a categoria pelo nome."""
+        service.respostas = [json.dumps({'documentos': [nota(2), nota(0), nota(1)]})]
+        
+        resultados = service.processar_notas_lote(imagens('pix_1.png', 'energia.png', 'pix_3.png'))
+        
+        assert len(service.chamadas) == 1 and imagens_na_chamada(service.chamadas[0]) == 3
+        assert service.chamadas[0]['response_format']['json_schema']['name'] == 'lote_despesa'
+        assert '1: "energia.png"' in service.chamadas[0]['messages'][0]['content'][0]['text']
+        assert [r['dados']['valor_total'] for r in resultados] == [10.0, 20.0, 30.0]
+        assert resultados[1]['dados']['subcategoria'] == 'Energia'
+        assert all(r['dados']['lote'] == 3 for r in resultados)
+    
+    def test_resposta_malformada_volta_para_uma_por_imagem(self, service):
+        """Testa texto sem JSON no lote: cada imagem vai sozinha."""
+        avulsa = json.dumps({k: v for k, v in nota(0).items() if k != 'indice'})
+        service.respostas = ['Não consegui separar os documentos.', avulsa, avulsa]
+        
+        resultados = service.processar_notas_lote(imagens('a.png', 'b.png'))
+        
+        assert [imagens_na_chamada(chamada) for chamada in service.chamadas] == [2, 1, 1]
+        assert all(r['sucesso'] and 'lote' not in r['dados'] for r in resultados)
+    
+    def test_so_o_item_invalido_vai_sozinho(self, service):
+        """Testa índice repetido e item sem valor: só essas imagens são refeitas."""
+        service.respostas = [
+            json.dumps({'documentos': [nota(0), nota(1), nota(1), nota(2, valor_total=None)]}),
+            json.dumps(nota(1)),
+            json.dumps(nota(2)),
+        ]
+        
+        resultados = service.processar_notas_lote(imagens('a.png', 'b.png', 'c.png'))
+        
+        assert [imagens_na_chamada(chamada) for chamada in service.chamadas] == [3, 1, 1]
+        assert resultados[0]['dados']['lote'] == 3
+        assert [r['sucesso'] for r in resultados] == [True, True, True]
+
+
+# =============================================================================
+# TESTES: /upload-notas-massa
+# =============================================================================
+
+class TestUploadMassaEmLote:
+    """Testes para o upload em massa usando o lote."""
+    
+    def test_imagens_pequenas_numa_requisicao(self, app, client, service, tmp_path, monkeypatch):
+        """Testa 3 prints numa chamada e o PDF vazio como erro na sua posição."""
+        monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+        monkeypatch.setattr(Config, 'OCR_ASSINCRONO', False)
+        monkeypatch.setattr(Config, 'UPLOAD_FOLDER', tmp_path)
+        monkeypatch.setattr(rotas_upload, 'get_groq_service', lambda: service)
+        service.respostas = [json.dumps({'documentos': [nota(0), nota(1), nota(2)]})]
+        
+        response = client.post('/upload-notas-massa', content_type='multipart/form-data', data={
+            'arquivos': [(io.BytesIO(PNG + bytes([i])), f'pix_{i}.png') for i in range(2)]
+                        + [(io.BytesIO(b''), 'vazio.pdf'), (io.BytesIO(PNG + b'\x09'), 'pix_9.png')]
+        }).get_json()
+        
+        assert len(service.chamadas) == 1
+        assert response['total_processados'] == 3 and response['total_erros'] == 1
+        assert [r['nome_arquivo'] for r in response['resultados']] == ['pix_0.png', 'pix_1.png', 'vazio.pdf', 'pix_9.png']
+        assert response['resultados'][3]['dados']['valor_total'] == 30.0
+        assert response['resultados'][3]['dados']['observacao'] == 'pix 9'
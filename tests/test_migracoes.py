@@ -0,0 +1,137 @@
+"""
+Testes para as migrações de banco em utils/migracoes.py.
+
+Testa:
+- Criação dos índices de transacoes em bancos que ainda não os têm
+- Conversão de valor (REAL) para valor_centavos (INTEGER) em bancos antigos
+- Idempotência de aplicar_migracoes
+"""
+
+import pytest
+from datetime import date
+from sqlalchemy import func, inspect, text
+
+from app import create_app
+from models import db, Transacao, ResumoTransacao, buscar_transacoes, get_versao_dados
+from utils.migracoes import aplicar_migracoes
+
+# Esquema anterior à coluna valor_centavos (valor e total em REAL)
+SQL_ESQUEMA_ANTIGO = [
+    """
+    CREATE TABLE transacoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, tipo VARCHAR(10) NOT NULL,
+        valor FLOAT NOT NULL, data DATETIME NOT NULL, categoria VARCHAR(50) NOT NULL,
+        subcategoria VARCHAR(50), descricao VARCHAR(200), estabelecimento VARCHAR(100),
+        comprovante_url VARCHAR(500), texto_comprovante TEXT, status VARCHAR(20),
+        created_at DATETIME
+    )
+    """,
+    "CREATE INDEX ix_transacoes_tipo_data_valor ON transacoes (tipo, data, valor)",
+    """
+    CREATE TABLE resumos_transacoes (
+        id INTEGER PRIMARY KEY, granularidade VARCHAR(3) NOT NULL, periodo VARCHAR(10) NOT NULL,
+        tipo VARCHAR(10) NOT NULL, status VARCHAR(20) NOT NULL, categoria VARCHAR(50) NOT NULL,
+        subcategoria VARCHAR(50) NOT NULL, total FLOAT NOT NULL, quantidade INTEGER NOT NULL
+    )
+    """,
+    """
+    INSERT INTO transacoes (tipo, valor, data, categoria, descricao, status) VALUES
+        ('DESPESA', 0.285, '2019-03-01 10:00:00', 'Bebidas', 'Gelo', 'CONFIRMADO'),
+        ('DESPESA', 19.99, '2019-03-02 10:00:00', 'Insumos', 'Camarão', 'CONFIRMADO'),
+        ('DESPESA', 100.1, '2019-03-03 10:00:00', 'Insumos', 'Peixe', 'CONFIRMADO')
+    """,
+]
+
+
+def _indices_transacoes() -> set:
+    """Nomes dos índices existentes na tabela transacoes."""
+    return {i['name'] for i in inspect(db.engine).get_indexes('transacoes')}
+
+
+# =============================================================================
+# TESTES: Índices de transacoes
+# =============================================================================
+
+class TestIndicesTransacoes:
+    """Testes para a migração de índices da tabela transacoes."""
+    
+    def test_cria_indices_ausentes_sem_perder_dados(self, app):
+        """Testa que um banco antigo (sem índices) é atualizado sem perda de dados."""
+        with app.app_context():
+            t = Transacao(tipo='DESPESA', valor=10.0, categoria='Outros', data=date(2018, 1, 5))
+            db.session.add(t)
+            db.session.commit()
+            
+            for indice in Transacao.__table__.indexes:
+                db.session.execute(text(f'DROP INDEX IF EXISTS {indice.name}'))
+            db.session.commit()
+            assert not _indices_transacoes() & {i.name for i in Transacao.__table__.indexes}
+            
+            aplicadas = aplicar_migracoes()
+            
+            assert set(aplicadas['indices_transacoes']) == {i.name for i in Transacao.__table__.indexes}
+            assert {i.name for i in Transacao.__table__.indexes} <= _indices_transacoes()
+            assert db.session.get(Transacao, t.id).valor == 10.0
+            
+            db.session.delete(t)
+            db.session.commit()
+    
+    def test_aplicar_migracoes_idempotente(self, app):
+        """Testa que uma segunda execução não altera nada."""
+        with app.app_context():
+            aplicar_migracoes()
+            
+            assert aplicar_migracoes() == {}
+
+
+# =============================================================================
+# TESTES: Valores em centavos
+# =============================================================================
+
+class TestValoresEmCentavos:
+    """Testes para a migração de transacoes.valor para valor_centavos."""
+    
+    def test_banco_antigo_convertido_com_triggers_funcionando(self, tmp_path):
+        """Testa conversão exata, rollup refeito e triggers de busca/versão intactos."""
+        app_antigo = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'antigo.db'}",
+            'SECRET_KEY': 'test-secret-key'
+        })
+        
+        with app_antigo.app_context():
+            for sql in SQL_ESQUEMA_ANTIGO:
+                db.session.execute(text(sql))
+            db.session.commit()
+            
+            db.create_all()
+            aplicadas = aplicar_migracoes()
+            
+            assert aplicadas['valores_em_centavos'] == ['transacoes', 'resumos_transacoes']
+            assert aplicadas['triggers_resumos'] > 0
+            colunas = {c['name'] for c in inspect(db.engine).get_columns('transacoes')}
+            assert 'valor' not in colunas and 'valor_centavos' in colunas
+            
+            transacoes = Transacao.query.order_by(Transacao.data).all()
+            assert [t.valor_centavos for t in transacoes] == [29, 1999, 10010]
+            assert transacoes[1].to_dict()['valor'] == 19.99
+            
+            total_ano = db.session.query(func.sum(ResumoTransacao.total_centavos)).filter(
+                ResumoTransacao.granularidade == 'ano', ResumoTransacao.periodo == '2019'
+            ).scalar()
+            assert total_ano == 12038
+            
+            versao = get_versao_dados()
+            db.session.add(Transacao(tipo='DESPESA', valor='12.30', categoria='Bebidas',
+                                     descricao='Gelo em cubos', data=date(2019, 3, 4)))
+            db.session.commit()
+            
+            assert get_versao_dados() == versao + 1
+            assert len(buscar_transacoes('gelo')) == 2
+            assert db.session.query(func.sum(ResumoTransacao.total_centavos)).filter(
+                ResumoTransacao.granularidade == 'ano', ResumoTransacao.periodo == '2019'
+            ).scalar() == 13268
+            assert aplicar_migracoes() == {}
+            
+            db.session.remove()
+            db.engine.dispose()
@@ -4,11 +4,17 @@ Testes para modelos de dados do models.py.
 Testa:
 - Transacao: Criação, validação, conversão para dict
 - Funções de consulta: get_transacoes_mes, get_totais_mes
+- Agregações em SQL: categorias, subcategorias e totais diários
+- Snapshot do mês: agregados + página filtrada numa única passada
 """
 
 import pytest
 from datetime import datetime, date
-from models import db, Transacao, get_transacoes_mes, get_totais_mes
+from models import (
+    db, Transacao, get_transacoes_mes, get_totais_mes,
+    get_gastos_por_categoria, get_receitas_por_categoria,
+    get_gastos_por_subcategoria, get_totais_diarios_mes, get_snapshot_mes
+)
 
 
 # =============================================================================
@@ -150,3 +156,147 @@ class TestConsultas:
             assert totais['despesas'] == 500.0
             assert totais['receitas'] == 1000.0
             assert totais['lucro'] == 500.0
+
+
+# =============================================================================
+# TESTES: Agregações em SQL
+# =============================================================================
+
+class TestAgregacoesSQL:
+    """Testes para as agregações mensais feitas com GROUP BY no banco."""
+    
+    @pytest.fixture
+    def transacoes_mes(self, app):
+        """Cria um conjunto de transações em 03/2019 (mês exclusivo destes testes)."""
+        with app.app_context():
+            transacoes = [
+                Transacao(tipo='DESPESA', valor=100.0, categoria='Insumos',
+                          subcategoria='Gelo', data=datetime(2019, 3, 1, 10, 0)),
+                Transacao(tipo='DESPESA', valor=50.0, categoria='Insumos',
+                          subcategoria=None, data=datetime(2019, 3, 1, 18, 0)),
+                Transacao(tipo='DESPESA', valor=25.0, categoria='Insumos',
+                          subcategoria='', data=datetime(2019, 3, 2)),
+                Transacao(tipo='DESPESA', valor=30.0, categoria='Bebidas',
+                          subcategoria='Cervejas', data=datetime(2019, 3, 31, 23, 59)),
+                Transacao(tipo='RECEITA', valor=400.0, categoria='PIX',
+                          data=datetime(2019, 3, 2)),
+                Transacao(tipo='RECEITA', valor=600.0, categoria='Vendas',
+                          data=datetime(2019, 3, 31)),
+                # Fora do mês: não deve entrar em nenhuma soma
+                Transacao(tipo='DESPESA', valor=999.0, categoria='Insumos',
+                          data=datetime(2019, 4, 1)),
+            ]
+            db.session.add_all(transacoes)
+            db.session.commit()
+            
+            yield transacoes
+            
+            # O app de teste é compartilhado na sessão: remove o que foi criado
+            for t in transacoes:
+                db.session.delete(t)
+            db.session.commit()
+    
+    def test_totais_mes(self, app, transacoes_mes):
+        """Testa soma de receitas e despesas por tipo."""
+        with app.app_context():
+            totais = get_totais_mes(2019, 3)
+            
+            assert totais == {'receitas': 1000.0, 'despesas': 205.0, 'lucro': 795.0}
+    
+    def test_gastos_por_categoria(self, app, transacoes_mes):
+        """Testa agrupamento de despesas por categoria."""
+        with app.app_context():
+            gastos = get_gastos_por_categoria(2019, 3)
+            
+            assert gastos == {'Insumos': 175.0, 'Bebidas': 30.0}
+    
+    def test_receitas_por_categoria(self, app, transacoes_mes):
+        """Testa agrupamento de receitas por categoria."""
+        with app.app_context():
+            receitas = get_receitas_por_categoria(2019, 3)
+            
+            assert receitas == {'PIX': 400.0, 'Vendas': 600.0}
+    
+    def test_gastos_por_subcategoria_agrupa_vazias(self, app, transacoes_mes):
+        """Testa que subcategoria NULL e vazia caem em 'Sem subcategoria'."""
+        with app.app_context():
+            gastos = get_gastos_por_subcategoria(2019, 3, 'Insumos')
+            
+            assert gastos == {'Gelo': 100.0, 'Sem subcategoria': 75.0}
+    
+    def test_totais_diarios_mes(self, app, transacoes_mes):
+        """Testa série diária alinhada pelos dias do mês."""
+        with app.app_context():
+            dados = get_totais_diarios_mes(2019, 3)
+            
+            assert dados['dias'] == list(range(1, 32))
+            assert dados['despesas'][0] == 150.0
+            assert dados['despesas'][1] == 25.0
+            assert dados['despesas'][30] == 30.0
+            assert dados['receitas'][1] == 400.0
+            assert dados['receitas'][30] == 600.0
+            assert sum(dados['despesas']) == 205.0
+    
+    def test_snapshot_consistente_com_funcoes_individuais(self, app, transacoes_mes):
+        """Testa que o snapshot reproduz os resultados das funções separadas."""
+        with app.app_context():
+            snapshot = get_snapshot_mes(2019, 3)
+            
+            assert snapshot['totais'] == get_totais_mes(2019, 3)
+            assert snapshot['gastos_por_categoria'] == get_gastos_por_categoria(2019, 3)
+            assert snapshot['receitas_por_categoria'] == get_receitas_por_categoria(2019, 3)
+            assert snapshot['totais_diarios'] == get_totais_diarios_mes(2019, 3)
+            assert snapshot['quantidades'] == {'RECEITA': 2, 'DESPESA': 4, 'total': 6}
+            assert len(snapshot['transacoes']) == 6
+    
+    def test_snapshot_filtra_e_pagina(self, app, transacoes_mes):
+        """Testa filtro por tipo/categoria e paginação da lista de transações."""
+        with app.app_context():
+            snapshot = get_snapshot_mes(
+                2019, 3,
+                tipo='DESPESA',
+                filtros={'categoria': 'Insumos'},
+                pagina=5,
+                por_pagina=2
+            )
+            
+            assert snapshot['total_filtrado'] == 3
+            assert snapshot['total_paginas'] == 2
+            assert snapshot['pagina'] == 2  # Página fora do limite é ajustada
+            assert [t.valor for t in snapshot['transacoes']] == [100.0]
+    
+    def test_snapshot_filtros_valor_e_data(self, app, transacoes_mes):
+        """Testa faixa de valor e data_fim inclusiva (até o fim do dia)."""
+        with app.app_context():
+            snapshot = get_snapshot_mes(2019, 3, filtros={
+                'valor_min': 30.0,
+                'valor_max': 100.0,
+                'data_inicio': date(2019, 3, 1),
+                'data_fim': date(2019, 3, 31)
+            })
+            
+            assert sorted(t.valor for t in snapshot['transacoes']) == [30.0, 50.0, 100.0]
+            assert snapshot['total_filtrado'] == 3
+    
+    def test_snapshot_cursor_igual_a_offset(self, app, transacoes_mes):
+        """Testa que a página via cursor (keyset) é a mesma obtida com OFFSET."""
+        with app.app_context():
+            primeira = get_snapshot_mes(2019, 3, pagina=1, por_pagina=4)
+            por_offset = get_snapshot_mes(2019, 3, pagina=2, por_pagina=4)
+            por_cursor = get_snapshot_mes(
+                2019, 3, pagina=2, por_pagina=4,
+                cursor=primeira['cursor_proximo']
+            )
+            
+            assert primeira['cursor_proximo']
+            assert [t.id for t in por_cursor['transacoes']] == [t.id for t in por_offset['transacoes']]
+            assert len(por_cursor['transacoes']) == 2
+            assert por_cursor['cursor_proximo'] is None  # Última página
+
+    def test_snapshot_sem_transacoes(self, app, transacoes_mes):
+        """Testa que incluir_transacoes=False retorna apenas os agregados."""
+        with app.app_context():
+            snapshot = get_snapshot_mes(2019, 3, incluir_transacoes=False)
+            
+            assert snapshot['transacoes'] == []
+            assert snapshot['totais']['lucro'] == 795.0
@@ -0,0 +1,118 @@
+"""
+Testes para o cache de resultados do OCR (services/ocr_cache_service.py).
+
+Testa:
+- Reenvio do mesmo arquivo sem nova chamada à Groq
+- Chave com modelo e prompt (mudanças invalidam o resultado guardado)
+- Expiração (TTL), limite de itens e limpeza pelo admin
+- Sessão de quem chama intocada (sem commit nem rollback do cache)
+"""
+
+import base64
+import json
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from config import Config
+from models import db, ResultadoOCRCache, User
+from services.groq_service import GroqService
+from services.ocr_cache_service import (
+    buscar_resultado, gravar_resultado, limpar_cache, estatisticas_cache
+)
+
+IMAGEM = base64.b64encode(b'\xff\xd8\xff' + b'nota' * 32).decode()
+RESPOSTA = {'data': datetime.now().strftime('%Y-%m-%d'), 'estabelecimento': 'Fábrica de Gelo',
+            'valor_total': 42.5, 'categoria': 'Insumos', 'subcategoria': 'Gelo'}
+
+
+class CompletionsFalso:
+    """Substitui client.chat.completions: conta as chamadas e responde RESPOSTA."""
+    
+    def __init__(self):
+        self.chamadas = 0
+    
+    def create(self, **kwargs):
+        self.chamadas += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(RESPOSTA)))],
+            usage=SimpleNamespace(total_tokens=900)
+        )
+
+
+@pytest.fixture
+def servico(app, monkeypatch):
+    """GroqService com cliente falso e cache vazio ao final."""
+    # Um modelo só (self.model); o roteamento entre modelos tem testes próprios
+    monkeypatch.setattr(Config, 'OCR_ROTEAMENTO_ATIVO', False)
+    service = GroqService()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=CompletionsFalso()))
+    
+    yield service
+    
+    with app.app_context():
+        limpar_cache()
+
+
+# =============================================================================
+# TESTES: Cache de OCR
+# =============================================================================
+
+class TestCacheOCR:
+    """Testes para o cache consultado pelo GroqService."""
+    
+    def test_reenvio_nao_chama_a_api(self, app, servico):
+        """Testa que o mesmo arquivo volta do cache e outro prompt/modelo não."""
+        completions = servico.client.chat.completions
+        
+        with app.app_context():
+            primeiro = servico.processar_nota(IMAGEM, 'gelo.jpg')
+            segundo = servico.processar_nota('data:image/jpeg;base64,' + IMAGEM, 'gelo.jpg')
+            
+            assert completions.chamadas == 1
+            assert segundo == primeiro and segundo['dados']['valor_total'] == 42.5
+            assert estatisticas_cache() == {'itens': 1, 'acertos': 1}
+            
+            servico.processar_nota(IMAGEM, 'aluguel.jpg')  # Nome entra no prompt
+            servico.model = 'outro-modelo'
+            servico.processar_nota(IMAGEM, 'gelo.jpg')
+            
+            assert completions.chamadas == 3
+    
+    def test_ttl_e_limite_de_itens(self, app, servico, monkeypatch):
+        """Testa expiração por idade e descarte dos menos acessados."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_MAX_ITENS', 2)
+        resultado = {'sucesso': True, 'dados': {'valor_total': 1.0}}
+        
+        with app.app_context():
+            for hash_do_arquivo in ('a', 'b'):
+                gravar_resultado(hash_do_arquivo, 'modelo', 'v1', resultado)
+            buscar_resultado('a', 'modelo', 'v1')  # 'b' passa a ser o menos acessado
+            gravar_resultado('c', 'modelo', 'v1', resultado)
+            
+            assert {e.hash_arquivo for e in ResultadoOCRCache.query} == {'a', 'c'}
+            
+            entrada = ResultadoOCRCache.query.filter_by(hash_arquivo='a').one()
+            entrada.created_at = datetime.utcnow() - timedelta(days=Config.OCR_CACHE_TTL_DIAS + 1)
+            db.session.commit()
+            
+            assert buscar_resultado('a', 'modelo', 'v1') is None
+            assert limpar_cache() == 1
+            assert estatisticas_cache() == {'itens': 0, 'acertos': 0}
+    
+    def test_nao_altera_a_sessao_de_quem_chama(self, app, servico, monkeypatch):
+        """Testa que acerto, gravação e falha do cache não fazem commit nem rollback da sessão."""
+        resultado = {'sucesso': True, 'dados': {'valor_total': 1.0}}
+        
+        with app.app_context():
+            usuario = User(email='pendente@teste.com', password_hash='x', nome='Pendente')
+            db.session.add(usuario)
+            
+            gravar_resultado('a', 'modelo', 'v1', resultado)
+            assert buscar_resultado('a', 'modelo', 'v1') == resultado
+            
+            monkeypatch.setattr(json, 'loads', lambda texto: 1 / 0)
+            assert buscar_resultado('a', 'modelo', 'v1') is None
+            
+            assert usuario in db.session.new
+            db.session.rollback()
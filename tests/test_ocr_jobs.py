@@ -0,0 +1,272 @@
+"""
+Testes para a fila de OCR assíncrona (services/ocr_job_service.py).
+
+Testa:
+- Enfileiramento (arquivos salvos, vazios já marcados como erro)
+- Worker processando a fila em paralelo com resultados na ordem do upload
+- Imagens pequenas do mesmo job reivindicadas juntas e enviadas num lote
+- Reivindicação atômica e recuperação de arquivos abandonados
+- Etapas de cada arquivo e o stream de eventos (SSE) do job
+- Conexões SSE curtas retomadas pelo Last-Event-ID
+- Estado das chamadas publicado pelo worker e lido por GET /api/ocr/status
+"""
+
+import base64
+import json
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+
+from app import create_app
+from config import Config
+from models import db, ArquivoJobOCR
+from services import ocr_job_service
+from services.ocr_job_service import (
+    enfileirar_arquivos, eventos_job, executar_worker, extrair_dados_nota, obter_job,
+    reivindicar_proximo, recuperar_travados, MAX_TENTATIVAS
+)
+from utils.arquivo_upload import ArquivoUpload
+
+IMAGEM = 'data:image/jpeg;base64,' + base64.b64encode(b'\xff\xd8\xff' + b'0' * 64).decode()
+
+
+class ServicoFalso:
+    """Substitui o GroqService: responde com o nome do arquivo após um atraso."""
+    
+    def __init__(self):
+        self.threads = set()
+        self.lotes = []
+    
+    def processar_pdf_texto(self, pdf, nome_arquivo=None, receita=False):
+        return None  # Sem camada de texto: segue para a visão
+    
+    def processar_nota(self, imagem, nome_arquivo=None):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+        if 'ilegivel' in nome_arquivo:
+            return {'sucesso': False, 'erro': 'Imagem ilegível'}
+        return {'sucesso': True, 'dados': {'valor_total': 10.0, 'arquivo': nome_arquivo}}
+    
+    def estatisticas_roteamento(self):
+        return {'rapido': 7, 'completo': 1, 'escalados': {'falha': 1, 'confianca': 0}, 'modelos': {}}
+    
+    def processar_notas_lote(self, imagens):
+        self.lotes.append([imagem.nome_arquivo for imagem in imagens])
+        return [self.processar_nota(imagem, imagem.nome_arquivo) for imagem in imagens]
+
+
+@pytest.fixture
+def app(tmp_path_factory):
+    """
+    Aplicação com banco SQLite em arquivo.
+    
+    Substitui a fixture de conftest.py (banco em memória numa única conexão):
+    as threads do worker precisam de conexões próprias, como em produção.
+    """
+    caminho = tmp_path_factory.mktemp('fila') / 'fila.db'
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{caminho}",
+        'WTF_CSRF_ENABLED': False,
+        'SECRET_KEY': 'test-secret-key'
+    })
+    
+    with app.app_context():
+        db.create_all()
+    
+    yield app
+    
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def fila(tmp_path, monkeypatch):
+    """Pasta de uploads temporária."""
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', tmp_path)
+
+
+# =============================================================================
+# TESTES: Fila de OCR
+# =============================================================================
+
+class TestFilaOCR:
+    """Testes para o enfileiramento e o worker."""
+    
+    def test_worker_processa_job_na_ordem_do_upload(self, app, fila, tmp_path, monkeypatch):
+        """Testa o ciclo completo: upload → worker → resultados por arquivo."""
+        monkeypatch.setattr(Config, 'OCR_LOTE_ATIVO', False)  # Um arquivo por tarefa
+        arquivos = [{'imagem': IMAGEM, 'nome_arquivo': f'nota_{i}.jpg'} for i in range(5)]
+        arquivos.insert(2, {'imagem': '', 'nome_arquivo': 'vazio.jpg'})
+        arquivos.append({'imagem': IMAGEM, 'nome_arquivo': 'ilegivel.jpg'})
+        
+        with app.app_context():
+            job_id = enfileirar_arquivos(arquivos, origem='massa').id
+            
+            pendente = obter_job(job_id)
+            assert pendente['status'] == 'PENDENTE'
+            assert pendente['resultados'][2]['sucesso'] is False
+            assert len(list(tmp_path.iterdir())) == 6
+        
+        servico = ServicoFalso()
+        assert executar_worker(app, service=servico, paralelo=3, intervalo=0.01, uma_vez=True) == 6
+        assert len(servico.threads) > 1
+        
+        with app.app_context():
+            job = obter_job(job_id)
+        
+        assert job['status'] == 'CONCLUIDO'
+        assert job['concluidos'] == job['total'] == 7
+        assert [r['nome_arquivo'] for r in job['resultados']] == [a['nome_arquivo'] for a in arquivos]
+        assert [r['sucesso'] for r in job['resultados']] == [True, True, False, True, True, True, False]
+        assert job['resultados'][0]['dados']['observacao'] == 'nota 0'
+        assert job['resultados'][-1]['erro'] == 'Imagem ilegível'
+    
+    def test_worker_envia_imagens_pequenas_em_lote(self, app, fila, monkeypatch):
+        """Testa lotes de até OCR_LOTE_MAX_IMAGENS e a imagem grande sozinha."""
+        monkeypatch.setattr(Config, 'OCR_LOTE_MAX_IMAGENS', 3)
+        monkeypatch.setattr(Config, 'OCR_LOTE_TAMANHO_MAXIMO_KB', 1)
+        grande = 'data:image/jpeg;base64,' + base64.b64encode(b'\xff\xd8\xff' + b'0' * 4096).decode()
+        arquivos = [{'imagem': IMAGEM, 'nome_arquivo': f'nota_{i}.jpg'} for i in range(4)]
+        arquivos.insert(1, {'imagem': grande, 'nome_arquivo': 'grande.jpg'})
+        arquivos.append({'imagem': IMAGEM, 'nome_arquivo': 'ilegivel.jpg'})
+        
+        with app.app_context():
+            job_id = enfileirar_arquivos(arquivos, origem='massa').id
+        
+        servico = ServicoFalso()
+        assert executar_worker(app, service=servico, paralelo=1, intervalo=0.01, uma_vez=True) == 6
+        
+        assert servico.lotes == [['nota_0.jpg', 'nota_1.jpg', 'nota_2.jpg'], ['nota_3.jpg', 'ilegivel.jpg']]
+        with app.app_context():
+            job = obter_job(job_id)
+        assert job['status'] == 'CONCLUIDO'
+        assert [r['dados'] and r['dados']['arquivo'] for r in job['resultados']] == [
+            'nota_0.jpg', 'grande.jpg', 'nota_1.jpg', 'nota_2.jpg', 'nota_3.jpg', None
+        ]
+        assert job['resultados'][-1]['erro'] == 'Imagem ilegível'
+    
+    def test_status_do_worker_na_api(self, app, client, fila, monkeypatch):
+        """Testa o snapshot publicado pelo worker servido pelo processo web."""
+        monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+        monkeypatch.setattr(Config, 'OCR_ASSINCRONO', True)
+        with app.app_context():
+            enfileirar_arquivos([{'imagem': IMAGEM}])
+        
+        executar_worker(app, service=ServicoFalso(), paralelo=1, intervalo=0.01, uma_vez=True)
+        status = client.get('/api/ocr/status').get_json()
+        
+        assert status['origem'] == 'worker' and len(status['workers']) == 1
+        assert status['roteamento']['rapido'] == 7
+        assert status['disjuntor']['estado'] == 'fechado'
+        
+        with app.app_context():
+            assert ocr_job_service.obter_status_workers(validade=0) == []
+    
+    def test_reivindicacao_e_recuperacao_de_travados(self, app, fila):
+        """Testa que cada arquivo é pego uma vez e que abandonados voltam à fila."""
+        with app.app_context():
+            job = enfileirar_arquivos([{'imagem': IMAGEM}, {'imagem': IMAGEM}])
+            
+            primeiro, segundo = reivindicar_proximo(), reivindicar_proximo()
+            assert primeiro != segundo
+            assert reivindicar_proximo() is None
+            assert obter_job(job.id)['status'] == 'PROCESSANDO'
+            
+            # Worker morreu há 30 minutos com os dois arquivos em andamento
+            for arquivo in ArquivoJobOCR.query.filter_by(job_id=job.id):
+                arquivo.iniciado_em = datetime.utcnow() - timedelta(minutes=30)
+            db.session.get(ArquivoJobOCR, segundo).tentativas = MAX_TENTATIVAS
+            db.session.commit()
+            
+            assert recuperar_travados() == 2
+            assert db.session.get(ArquivoJobOCR, primeiro).status == ArquivoJobOCR.STATUS_PENDENTE
+            assert db.session.get(ArquivoJobOCR, segundo).status == ArquivoJobOCR.STATUS_ERRO
+            assert reivindicar_proximo() == primeiro
+
+
+# =============================================================================
+# TESTES: Andamento por arquivo (SSE)
+# =============================================================================
+
+class TestEventosJob:
+    """Testes para as etapas dos arquivos e o stream /upload-jobs/<id>/eventos."""
+    
+    def test_extracao_informa_etapas(self, monkeypatch):
+        """Testa que PDFs passam por CONVERTENDO antes de EXTRAINDO."""
+        monkeypatch.setattr(ocr_job_service, 'renderizar_paginas_pdf', lambda pdf: [b'\xff\xd8\xff'])
+        etapas = []
+        
+        extrair_dados_nota(ArquivoUpload(b'%PDF-1.4', 'nota.pdf'), ServicoFalso(), ao_mudar_etapa=etapas.append)
+        extrair_dados_nota(ArquivoUpload.de_base64(IMAGEM, 'nota.jpg'), ServicoFalso(), ao_mudar_etapa=etapas.append)
+        
+        assert etapas == [
+            ArquivoJobOCR.STATUS_CONVERTENDO, ArquivoJobOCR.STATUS_EXTRAINDO,
+            ArquivoJobOCR.STATUS_EXTRAINDO
+        ]
+    
+    def test_eventos_somente_quando_o_arquivo_muda(self, app, fila):
+        """Testa o estado inicial completo, mudanças individuais e o evento final."""
+        with app.app_context():
+            job = enfileirar_arquivos([{'imagem': IMAGEM}, {'imagem': IMAGEM}])
+            primeiro, segundo = job.arquivos
+            eventos = eventos_job(job.id, intervalo=0)
+            
+            assert [next(eventos) for _ in range(2)] == [
+                ('arquivo', {'indice': 0, **primeiro.to_dict()}),
+                ('arquivo', {'indice': 1, **segundo.to_dict()})
+            ]
+            
+            primeiro.status = ArquivoJobOCR.STATUS_EXTRAINDO
+            db.session.commit()
+            evento, dados = next(eventos)
+            assert (evento, dados['indice'], dados['status']) == ('arquivo', 0, 'EXTRAINDO')
+            
+            primeiro.status = ArquivoJobOCR.STATUS_SUCESSO
+            segundo.status = ArquivoJobOCR.STATUS_ERRO
+            db.session.commit()
+            
+            assert [(e, d.get('indice'), d['status']) for e, d in eventos] == [
+                ('arquivo', 0, 'SUCESSO'), ('arquivo', 1, 'ERRO'), ('fim', None, 'CONCLUIDO')
+            ]
+    
+    def test_rota_sse_transmite_resultados(self, app, client, fila, monkeypatch):
+        """Testa o formato text/event-stream da rota e o 404 de job inexistente."""
+        monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+        with app.app_context():
+            job_id = enfileirar_arquivos([{'imagem': IMAGEM, 'nome_arquivo': 'gelo.jpg'}]).id
+        executar_worker(app, service=ServicoFalso(), paralelo=1, intervalo=0.01, uma_vez=True)
+        
+        response = client.get(f'/upload-jobs/{job_id}/eventos')
+        
+        assert response.mimetype == 'text/event-stream'
+        blocos = response.get_data(as_text=True).strip().split('\n\n')
+        assert blocos[0] == 'retry: 1000'
+        assert blocos[1].startswith('id: S\nevent: arquivo\ndata: ')
+        assert json.loads(blocos[1].split('data: ', 1)[1])['dados']['observacao'] == 'gelo'
+        assert blocos[-1].startswith('event: fim\n')
+        assert client.get('/upload-jobs/inexistente/eventos').status_code == 404
+    
+    def test_conexao_curta_retomada_pelo_last_event_id(self, app, client, fila, monkeypatch):
+        """Testa o stream encerrado sem 'fim' e a reconexão só com o que mudou."""
+        monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+        monkeypatch.setattr(Config, 'SSE_DURACAO_MAXIMA', 0.05)
+        with app.app_context():
+            job = enfileirar_arquivos([{'imagem': IMAGEM}, {'imagem': IMAGEM}])
+            job_id, segundo = job.id, job.arquivos[1]
+        
+        primeira = client.get(f'/upload-jobs/{job_id}/eventos').get_data(as_text=True)
+        assert 'event: fim' not in primeira
+        assert primeira.strip().split('\n\n')[-1].startswith('id: PP\n')
+        
+        with app.app_context():
+            arquivo = db.session.get(ArquivoJobOCR, segundo.id)
+            arquivo.status = ArquivoJobOCR.STATUS_EXTRAINDO
+            db.session.commit()
+        
+        retomada = client.get(f'/upload-jobs/{job_id}/eventos', headers={'Last-Event-ID': 'PP'})
+        blocos = retomada.get_data(as_text=True).strip().split('\n\n')
+        assert len(blocos) == 2 and blocos[1].startswith('id: PX\nevent: arquivo')
+        assert json.loads(blocos[1].split('data: ', 1)[1])['indice'] == 1
@@ -0,0 +1,128 @@
+"""
+Testes para a renderização de PDFs multipágina (utils/pdf_converter.py).
+
+Testa:
+- Páginas renderizadas em ordem, limitadas por OCR_PDF_MAX_PAGINAS
+- Pool de processos e renderização em sequência com o mesmo resultado
+- Renderização adaptativa (DPI pelo texto, recorte, cinza) e o modo fixo
+- GroqService enviando as páginas numa única requisição
+"""
+
+import io
+import json
+from types import SimpleNamespace
+
+import fitz
+from PIL import Image
+
+from config import Config
+from services.groq_service import GroqService
+from utils.arquivo_upload import ArquivoUpload
+from utils.pdf_converter import renderizar_paginas_pdf
+
+
+def pdf_com_paginas(quantidade: int) -> bytes:
+    """PDF com páginas de alturas diferentes (a altura identifica a página)."""
+    with fitz.open() as documento:
+        for indice in range(quantidade):
+            pagina = documento.new_page(width=200, height=100 * (indice + 1))
+            pagina.insert_text((20, 40), f'Pagina {indice + 1}')
+        return documento.tobytes()
+
+
+def alturas(imagens: list) -> list:
+    """Altura (px) de cada JPEG."""
+    return [Image.open(io.BytesIO(imagem)).height for imagem in imagens]
+
+
+# =============================================================================
+# TESTES: renderizar_paginas_pdf
+# =============================================================================
+
+class TestRenderizarPaginas:
+    """Testes para a seleção de páginas e o pool de renderização."""
+    
+    def test_pool_e_sequencia_renderizam_as_mesmas_paginas(self, monkeypatch):
+        """Testa o limite de páginas, a ordem pedida e o modo sem pool."""
+        monkeypatch.setattr(Config, 'OCR_PDF_MAX_PAGINAS', 3)
+        monkeypatch.setattr(Config, 'OCR_PDF_PROCESSOS', 2)  # Como no worker de OCR
+        pdf = pdf_com_paginas(4)
+        
+        no_pool = renderizar_paginas_pdf(pdf, dpi=72)
+        ultima_e_primeira = renderizar_paginas_pdf(pdf, paginas=[-1, 0, 9], dpi=72)
+        monkeypatch.setattr(Config, 'OCR_PDF_PROCESSOS', 0)
+        em_sequencia = renderizar_paginas_pdf(pdf, dpi=72)
+        
+        assert alturas(no_pool) == [100, 200, 300]
+        assert alturas(ultima_e_primeira) == [400, 100]
+        assert em_sequencia == no_pool
+    
+    def test_pdf_invalido_retorna_lista_vazia(self):
+        """Testa bytes que não são PDF."""
+        assert renderizar_paginas_pdf(b'%PDF-1.4 corrompido') == []
+
+
+class TestRenderizacaoAdaptativa:
+    """Testes para DPI pelo texto, recorte no conteúdo e tons de cinza."""
+    
+    @staticmethod
+    def pdf_com_texto(tamanho: float, cor=None) -> bytes:
+        """A4 com um parágrafo no topo (e um retângulo colorido, se pedido)."""
+        with fitz.open() as documento:
+            pagina = documento.new_page()
+            for linha in range(5):
+                pagina.insert_text((50, 60 + linha * tamanho * 1.5), 'TOTAL R$ 42,50 ' * 3, fontsize=tamanho)
+            if cor:
+                pagina.draw_rect(fitz.Rect(50, 150, 250, 250), color=None, fill=cor)
+            return documento.tobytes()
+    
+    def test_dpi_pelo_texto_recorte_e_cinza(self):
+        """Testa texto menor renderizado com mais DPI, só a área do conteúdo, em cinza."""
+        with Image.open(io.BytesIO(renderizar_paginas_pdf(self.pdf_com_texto(6))[0])) as pequeno, \
+                Image.open(io.BytesIO(renderizar_paginas_pdf(self.pdf_com_texto(12))[0])) as grande:
+            assert pequeno.mode == grande.mode == 'L'
+            assert grande.height < 595  # Recortada: A4 inteira a 96 DPI teria 1123 px
+            # Caixa do texto 2x maior em pt, mas cada pt vale metade dos pixels
+            assert abs(pequeno.width - grande.width) < 0.2 * grande.width
+    
+    def test_cor_mantida_e_modo_fixo(self, monkeypatch):
+        """Testa página com cor em RGB e OCR_PDF_RENDER_ADAPTATIVO=False (150 DPI, página inteira)."""
+        colorida = renderizar_paginas_pdf(self.pdf_com_texto(10, cor=(0.8, 0.1, 0.1)))[0]
+        monkeypatch.setattr(Config, 'OCR_PDF_RENDER_ADAPTATIVO', False)
+        fixa = renderizar_paginas_pdf(self.pdf_com_texto(10))[0]
+        
+        assert Image.open(io.BytesIO(colorida)).mode == 'RGB'
+        assert Image.open(io.BytesIO(fixa)).size == (1240, 1755)
+
+
+# =============================================================================
+# TESTES: Várias páginas numa requisição
+# =============================================================================
+
+class TestVisaoMultipagina:
+    """Testes para GroqService.processar_nota com a lista de páginas."""
+    
+    def test_paginas_na_mesma_requisicao(self, monkeypatch):
+        """Testa uma chamada com todas as imagens e o aviso de páginas no prompt."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+        chamadas = []
+        
+        def create(**kwargs):
+            chamadas.append(kwargs['messages'][0]['content'])
+            resposta = {'data': '2025-10-01', 'estabelecimento': 'Distribuidora', 'valor_total': 980.0,
+                        'categoria': 'Bebidas', 'subcategoria': 'Cervejas'}
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(resposta)))],
+                usage=SimpleNamespace(total_tokens=2500)
+            )
+        
+        service = GroqService()
+        service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        paginas = [ArquivoUpload(imagem, 'nota.pdf') for imagem in renderizar_paginas_pdf(pdf_com_paginas(2))]
+        
+        resultado = service.processar_nota(paginas)
+        
+        texto, *imagens = chamadas[0]
+        assert resultado['sucesso'] and len(chamadas) == 1
+        assert [imagem['type'] for imagem in imagens] == ['image_url', 'image_url']
+        assert 'as 2 imagens são páginas do MESMO documento' in texto['text']
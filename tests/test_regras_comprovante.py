@@ -0,0 +1,175 @@
+"""
+Testes para a leitura de PDFs digitais sem o modelo de visão.
+
+Testa:
+- Motor de regras (utils/regras_comprovante.py) em layouts de PIX e boleto
+- Campos ausentes devolvendo None (o OCR segue para o modelo)
+- GroqService.processar_pdf_texto: regras, modelo de texto e PDF sem texto
+"""
+
+import json
+from types import SimpleNamespace
+
+import fitz
+
+from config import Config
+from services.groq_service import GroqService
+from utils.arquivo_upload import ArquivoUpload
+from utils.regras_comprovante import extrair_campos_despesa, extrair_campos_receita
+
+COMPROVANTE_PIX = """Comprovante de transferência
+12 OUT 2025 - 14:32:10
+Valor
+R$ 1.250,00
+Tipo de transferência
+Pix
+Destino
+Nome Fábrica de Gelo Polar LTDA
+CNPJ 12.345.678/0001-90
+Origem
+Nome MONA BEACH CLUB
+"""
+
+BOLETO = """CELESC DISTRIBUICAO S.A.
+Beneficiário: CELESC DISTRIBUICAO S.A.
+CNPJ: 08.336.783/0001-90
+Data de vencimento 20/10/2025
+Data do pagamento: 18/10/2025
+Valor do documento 231,40
+Juros 0,00
+Valor pago R$ 231,40
+"""
+
+CUPOM = """SUPERMERCADO
+SUBTOTAL 40,00
+TOTAL R$ 42,50
+Emissão 01/10/2025
+"""
+
+
+def pdf(texto: str = '') -> ArquivoUpload:
+    """PDF de uma página com o texto dado (sem texto = PDF "escaneado")."""
+    with fitz.open() as documento:
+        pagina = documento.new_page()
+        if texto:
+            pagina.insert_text((72, 72), texto)
+        return ArquivoUpload(documento.tobytes(), 'comprovante.pdf')
+
+
+class CompletionsFalso:
+    """Substitui client.chat.completions: guarda os modelos chamados."""
+    
+    def __init__(self, resposta: dict):
+        self.resposta = resposta
+        self.modelos = []
+    
+    def create(self, model, **kwargs):
+        self.modelos.append(model)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(self.resposta)))],
+            usage=SimpleNamespace(total_tokens=300)
+        )
+
+
+def servico_falso(resposta: dict) -> GroqService:
+    service = GroqService()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=CompletionsFalso(resposta)))
+    return service
+
+
+# =============================================================================
+# TESTES: Motor de regras
+# =============================================================================
+
+class TestRegrasComprovante:
+    """Testes para extrair_campos_despesa / extrair_campos_receita."""
+    
+    def test_pix_e_boleto(self):
+        """Testa rótulos em linhas separadas, na mesma linha e a prioridade do pagamento."""
+        assert extrair_campos_despesa(COMPROVANTE_PIX) == {
+            'data': '2025-10-12', 'estabelecimento': 'Fábrica de Gelo Polar LTDA', 'valor_total': 1250.0
+        }
+        assert extrair_campos_despesa(BOLETO) == {
+            'data': '2025-10-18', 'estabelecimento': 'CELESC DISTRIBUICAO S.A.', 'valor_total': 231.4
+        }
+        assert extrair_campos_receita(COMPROVANTE_PIX) == {
+            'data': '2025-10-12', 'origem': 'MONA BEACH CLUB', 'valor': 1250.0, 'tipo_pagamento': 'PIX'
+        }
+    
+    def test_campo_ausente_retorna_none(self):
+        """Testa que sem beneficiário, valor ou data as regras não arriscam."""
+        assert extrair_campos_despesa(CUPOM) is None  # Sem rótulo de beneficiário
+        assert extrair_campos_despesa(BOLETO.replace('231,40', '-')) is None
+        assert extrair_campos_despesa('Beneficiário: Fulano\nValor pago 10,00') is None
+
+
+# =============================================================================
+# TESTES: GroqService.processar_pdf_texto
+# =============================================================================
+
+class TestPdfTexto:
+    """Testes para a leitura pela camada de texto antes da visão."""
+    
+    def test_regras_dispensam_a_api(self, monkeypatch):
+        """Testa PDF digital lido só pelas regras, com categoria pelo nome do arquivo."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+        service = servico_falso({})
+        resultado = service.processar_pdf_texto(pdf(BOLETO), 'conta_energia.pdf')
+        
+        assert resultado['sucesso'] and resultado['dados']['extracao'] == 'regras'
+        assert resultado['dados']['valor_total'] == 231.4
+        assert resultado['dados']['categoria'] == 'Infraestrutura'
+        assert service.client.chat.completions.modelos == []
+    
+    def test_categoria_pelo_beneficiario(self, monkeypatch):
+        """Testa a CELESC categorizada sem API e o modelo de texto para beneficiário desconhecido."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+        service = servico_falso({'data': '2025-10-12', 'estabelecimento': 'Fábrica de Gelo Polar LTDA',
+                                 'valor_total': 1250.0, 'categoria': 'Insumos', 'subcategoria': 'Gelo'})
+        
+        celesc = service.processar_pdf_texto(pdf(BOLETO), 'comprovante.pdf')
+        
+        assert celesc['dados']['extracao'] == 'regras'
+        assert (celesc['dados']['categoria'], celesc['dados']['subcategoria']) == ('Infraestrutura', 'Energia')
+        assert service.client.chat.completions.modelos == []
+        
+        fornecedor = service.processar_pdf_texto(pdf(COMPROVANTE_PIX.replace('Gelo', 'Polo')), 'comprovante.pdf')
+        
+        assert fornecedor['dados']['extracao'] == 'texto'
+        assert fornecedor['dados']['subcategoria'] == 'Gelo'
+        assert service.client.chat.completions.modelos == [Config.GROQ_MODEL_TEXTO]
+    
+    def test_beneficiario_nao_casa_trechos_de_palavras(self, monkeypatch):
+        """Testa que nomes de fornecedor com 'das', 'extra', 'luz', 'dj' ou '99' ficam em Outros."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+        service = servico_falso({'data': '2025-10-12', 'estabelecimento': 'Casa das Carnes Ltda',
+                                 'valor_total': 1250.0, 'categoria': 'Insumos', 'subcategoria': 'Carnes'})
+        
+        for nome in ['Casa das Carnes Ltda', 'Supermercado Extra', 'Padaria Luzia',
+                     'Djalma Mercearia', 'Loja 99 Centavos']:
+            resultado = service._normalizar_despesa({'data': '2025-10-12', 'estabelecimento': nome,
+                                                     'valor_total': 10.0, 'categoria': 'Outros',
+                                                     'subcategoria': 'Outros'})
+            service._aplicar_categoria_por_estabelecimento(resultado)
+            assert (resultado['dados']['categoria'], resultado['dados']['subcategoria']) == ('Outros', 'Outros')
+        
+        carnes = service.processar_pdf_texto(pdf(COMPROVANTE_PIX.replace('Fábrica de Gelo Polar LTDA', 'Casa das Carnes Ltda')),
+                                             'comprovante.pdf')
+        
+        assert carnes['dados']['extracao'] == 'texto'
+        assert carnes['dados']['subcategoria'] == 'Carnes'
+    
+    def test_modelo_de_texto_e_pdf_escaneado(self, monkeypatch):
+        """Testa o modelo de texto quando as regras falham e None sem camada de texto."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+        service = servico_falso({'data': '2025-10-01', 'estabelecimento': 'Supermercado',
+                                 'valor_total': 42.5, 'categoria': 'Insumos', 'subcategoria': 'Outros'})
+        
+        resultado = service.processar_pdf_texto(pdf(CUPOM * 3))
+        
+        assert resultado['dados']['extracao'] == 'texto'
+        assert service.client.chat.completions.modelos == [Config.GROQ_MODEL_TEXTO]
+        assert service.processar_pdf_texto(pdf()) is None
+        
+        monkeypatch.setattr(Config, 'OCR_TEXTO_PDF_ATIVO', False)
+        assert service.processar_pdf_texto(pdf(CUPOM * 3)) is None
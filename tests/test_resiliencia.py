@@ -0,0 +1,252 @@
+"""
+Testes para a resiliência das chamadas à Groq (utils/resiliencia.py).
+
+Testa:
+- Disjuntor: abertura, recusa rápida, chamada de teste e fechamento
+- Novas tentativas com Retry-After, backoff e prazo total
+- Erros que não adianta repetir e a mensagem do GroqService com o circuito aberto
+- Hedge: cópia após o percentil de latência, suprimida sem folga na cota
+"""
+
+import threading
+
+import httpx
+import pytest
+from groq import BadRequestError, InternalServerError, RateLimitError
+
+from config import Config
+from services.groq_service import GroqService
+from utils import resiliencia
+from utils.arquivo_upload import ArquivoUpload
+from utils.resiliencia import Disjuntor, MonitorLatencia, atraso_hedge, chamar_com_hedge, chamar_com_resiliencia
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+class RelogioFalso:
+    """Relógio controlado pelo teste; dormir() avança o tempo."""
+    
+    def __init__(self):
+        self.agora = 0.0
+        self.esperas = []
+    
+    def __call__(self) -> float:
+        return self.agora
+    
+    def dormir(self, segundos: float) -> None:
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+def erro_groq(classe, status: int, **cabecalhos):
+    """Erro do SDK da Groq com a resposta HTTP (e cabeçalhos) informada."""
+    requisicao = httpx.Request('POST', 'https://api.groq.com/openai/v1/chat/completions')
+    resposta = httpx.Response(status, headers=cabecalhos, request=requisicao)
+    return classe(f'Erro {status}', response=resposta, body=None)
+
+
+def falhas_em_sequencia(*erros):
+    """Função de chamada que levanta os erros na ordem e depois responde 'ok'."""
+    pendentes = list(erros)
+    timeouts = []
+    
+    def chamada(timeout):
+        timeouts.append(timeout)
+        if pendentes:
+            raise pendentes.pop(0)
+        return 'ok'
+    
+    chamada.timeouts = timeouts
+    return chamada
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio falso e configuração previsível (3 tentativas, prazo de 60s)."""
+    monkeypatch.setattr(Config, 'GROQ_TENTATIVAS', 3)
+    monkeypatch.setattr(Config, 'GROQ_PRAZO', 60.0)
+    monkeypatch.setattr(Config, 'GROQ_TIMEOUT', 30.0)
+    monkeypatch.setattr(Config, 'GROQ_BACKOFF_BASE', 1.0)
+    monkeypatch.setattr(Config, 'GROQ_BACKOFF_MAXIMO', 20.0)
+    return RelogioFalso()
+
+
+# =============================================================================
+# TESTES: Disjuntor
+# =============================================================================
+
+class TestDisjuntor:
+    """Testes para os estados do circuit breaker."""
+    
+    def test_abre_recusa_e_fecha_apos_teste(self, relogio):
+        """Testa 3 falhas abrindo o circuito, uma única chamada de teste e o fechamento."""
+        disjuntor = Disjuntor(falhas_para_abrir=3, tempo_aberto=30, relogio=relogio)
+        for _ in range(3):
+            assert disjuntor.permitir()
+            disjuntor.registrar_falha()
+        
+        assert not disjuntor.permitir()
+        assert disjuntor.estado() == {
+            'estado': 'aberto', 'falhas_consecutivas': 3, 'aberturas': 1, 'recusadas': 1, 'reabre_em': 30.0
+        }
+        
+        relogio.agora = 30
+        assert disjuntor.permitir()        # Chamada de teste
+        assert not disjuntor.permitir()    # As outras esperam o resultado
+        disjuntor.registrar_sucesso()
+        assert disjuntor.estado()['estado'] == 'fechado' and disjuntor.permitir()
+    
+    def test_teste_com_falha_reabre(self, relogio):
+        """Testa que uma falha no meio aberto reabre o circuito na hora."""
+        disjuntor = Disjuntor(falhas_para_abrir=1, tempo_aberto=10, relogio=relogio)
+        disjuntor.registrar_falha()
+        
+        relogio.agora = 10
+        assert disjuntor.permitir()
+        disjuntor.registrar_falha()
+        
+        assert disjuntor.estado()['estado'] == 'aberto' and disjuntor.estado()['aberturas'] == 2
+        assert not disjuntor.permitir()
+
+
+# =============================================================================
+# TESTES: chamar_com_resiliencia
+# =============================================================================
+
+class TestChamarComResiliencia:
+    """Testes para novas tentativas, Retry-After e prazo."""
+    
+    def chamar(self, funcao, relogio, disjuntor=None):
+        disjuntor = disjuntor or Disjuntor(5, 30, relogio=relogio)
+        return chamar_com_resiliencia(funcao, disjuntor, dormir=relogio.dormir, relogio=relogio)
+    
+    def test_respeita_retry_after_e_recupera(self, relogio):
+        """Testa 429 com Retry-After de 7s e 503 antes de responder."""
+        chamada = falhas_em_sequencia(
+            erro_groq(RateLimitError, 429, **{'retry-after': '7'}),
+            erro_groq(InternalServerError, 503),
+        )
+        disjuntor = Disjuntor(5, 30, relogio=relogio)
+        
+        assert self.chamar(chamada, relogio, disjuntor) == 'ok'
+        assert 7 <= relogio.esperas[0] <= 8
+        assert 0 <= relogio.esperas[1] <= 2  # Full jitter da 2ª tentativa: até base * 2
+        assert disjuntor.estado()['falhas_consecutivas'] == 0
+        assert chamada.timeouts[0] == 30.0
+    
+    def test_desiste_no_limite_de_tentativas_e_do_prazo(self, relogio):
+        """Testa 3 falhas seguidas e um Retry-After maior que o prazo restante."""
+        erros = [erro_groq(InternalServerError, 500) for _ in range(3)]
+        chamada = falhas_em_sequencia(*erros)
+        
+        with pytest.raises(InternalServerError):
+            self.chamar(chamada, relogio)
+        assert len(chamada.timeouts) == 3
+        
+        longo = falhas_em_sequencia(erro_groq(RateLimitError, 429, **{'retry-after': '120'}))
+        with pytest.raises(RateLimitError):
+            self.chamar(longo, relogio)
+        assert len(longo.timeouts) == 1
+    
+    def test_erro_do_cliente_nao_repete_e_circuito_aberto_falha_na_hora(self, relogio):
+        """Testa 400 sem nova tentativa e a recusa sem chamar a API."""
+        chamada = falhas_em_sequencia(erro_groq(BadRequestError, 400))
+        with pytest.raises(BadRequestError):
+            self.chamar(chamada, relogio)
+        assert len(chamada.timeouts) == 1 and relogio.esperas == []
+        
+        aberto = Disjuntor(1, 30, relogio=relogio)
+        aberto.registrar_falha()
+        nunca = falhas_em_sequencia()
+        with pytest.raises(RuntimeError, match='circuito_aberto'):
+            self.chamar(nunca, relogio, aberto)
+        assert nunca.timeouts == []
+    
+    def test_groq_service_com_circuito_aberto(self, monkeypatch):
+        """Testa a mensagem amigável do processar_nota com o circuito aberto."""
+        monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+        aberto = Disjuntor(1, 30)
+        aberto.registrar_falha()
+        monkeypatch.setattr(resiliencia, '_disjuntor_groq', aberto)
+        
+        service = GroqService()
+        service.client = object()  # Não deve ser usado
+        resultado = service.processar_nota(ArquivoUpload(PNG, 'nota.png'))
+        
+        assert resultado == {
+            'sucesso': False,
+            'erro': 'Serviço de OCR instável no momento. Tente novamente em alguns instantes.'
+        }
+    
+    def test_estado_exposto_na_api(self, app, client, monkeypatch):
+        """Testa GET /api/ocr/status com o estado do disjuntor do processo."""
+        monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+        monkeypatch.setattr(resiliencia, '_disjuntor_groq', Disjuntor(5, 30))
+        
+        resposta = client.get('/api/ocr/status').get_json()
+        
+        assert resposta['sucesso'] and resposta['disjuntor']['estado'] == 'fechado'
+        assert 'hedge' in resposta['latencia']
+
+
+# =============================================================================
+# TESTES: Hedge
+# =============================================================================
+
+class TestHedge:
+    """Testes para a cópia da chamada lenta e o percentil de latência."""
+    
+    @pytest.fixture
+    def monitor(self, monkeypatch):
+        monitor = MonitorLatencia()
+        monkeypatch.setattr(resiliencia, '_monitor_latencia', monitor)
+        return monitor
+    
+    def test_copia_vence_a_chamada_lenta(self, monitor):
+        """Testa a primeira chamada travada e a cópia respondendo antes."""
+        liberar = threading.Event()
+        chamadas = []
+        
+        def funcao():
+            chamadas.append(1)
+            if len(chamadas) == 1:
+                liberar.wait(5)  # Original lenta
+                return 'original'
+            return 'copia'
+        
+        try:
+            assert chamar_com_hedge(funcao, atraso=0.01, pode_duplicar=lambda: True) == 'copia'
+        finally:
+            liberar.set()
+        assert monitor.resumo()['hedge'] == {'disparados': 1, 'vencidos_pela_copia': 1, 'suprimidos_por_cota': 0}
+    
+    def test_sem_folga_nao_duplica(self, monitor):
+        """Testa a cópia suprimida quando o limitador não tem folga."""
+        liberar = threading.Event()
+        chamadas = []
+        
+        def funcao():
+            chamadas.append(1)
+            liberar.wait(0.05)
+            return 'original'
+        
+        assert chamar_com_hedge(funcao, atraso=0.01, pode_duplicar=lambda: False) == 'original'
+        assert len(chamadas) == 1
+        assert monitor.resumo()['hedge']['suprimidos_por_cota'] == 1
+    
+    def test_atraso_pelo_percentil_com_amostras_minimas(self, monitor, monkeypatch):
+        """Testa o hedge desligado, sem amostras suficientes e o p95 das latências."""
+        monkeypatch.setattr(Config, 'GROQ_HEDGE_PERCENTIL', 95)
+        monkeypatch.setattr(Config, 'GROQ_HEDGE_MINIMO_AMOSTRAS', 20)
+        for segundos in range(1, 20):
+            monitor.registrar('scout', float(segundos))
+        
+        monkeypatch.setattr(Config, 'GROQ_HEDGE_ATIVO', False)
+        assert atraso_hedge('scout') is None
+        
+        monkeypatch.setattr(Config, 'GROQ_HEDGE_ATIVO', True)
+        assert atraso_hedge('scout') is None  # 19 amostras
+        
+        monitor.registrar('scout', 20.0)
+        assert atraso_hedge('scout') == 20.0
+        assert monitor.resumo()['modelos']['scout'] == {'amostras': 20, 'p50': 11.0, 'p95': 20.0}
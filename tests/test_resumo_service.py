@@ -0,0 +1,190 @@
+"""
+Testes para a tabela de rollup e services/resumo_service.py.
+
+Testa:
+- Manutenção incremental em inserção, edição e exclusão de transações
+- Rollup correto após query.update(), query.delete() e SQL direto
+- reconstruir_resumos equivalente à manutenção incremental
+- Leituras anuais (totais, série mensal, rankings) a partir do rollup
+- Análise de vários anos numa única consulta
+"""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import text
+
+from models import (
+    db, Transacao, ResumoTransacao,
+    get_totais_ano, get_totais_mensais_ano,
+    get_ranking_categorias_ano, get_ranking_receitas_ano, get_analise_anos
+)
+from services.resumo_service import reconstruir_resumos
+
+
+def _resumos(granularidade: str, prefixo: str) -> dict:
+    """Linhas de resumo de um período: {(periodo, tipo, categoria, subcategoria): (total, qtd)}."""
+    linhas = ResumoTransacao.query.filter(
+        ResumoTransacao.granularidade == granularidade,
+        ResumoTransacao.periodo.like(f'{prefixo}%')
+    ).all()
+    return {
+        (r.periodo, r.tipo, r.categoria, r.subcategoria): (r.total_centavos / 100, r.quantidade)
+        for r in linhas
+    }
+
+
+@pytest.fixture
+def transacoes_2017(app):
+    """Transações em 2017 (ano exclusivo destes testes), removidas ao final."""
+    with app.app_context():
+        transacoes = [
+            Transacao(tipo='DESPESA', valor=100.0, categoria='Insumos', subcategoria='Gelo',
+                      data=datetime(2017, 2, 10, 9, 30)),
+            Transacao(tipo='DESPESA', valor=40.0, categoria='Insumos', subcategoria='Gelo',
+                      data=datetime(2017, 2, 10, 20, 0)),
+            Transacao(tipo='DESPESA', valor=70.0, categoria='Bebidas',
+                      data=datetime(2017, 5, 1)),
+            Transacao(tipo='RECEITA', valor=500.0, categoria='PIX',
+                      data=datetime(2017, 2, 11)),
+            Transacao(tipo='RECEITA', valor=80.0, categoria='Vendas', status='PENDENTE',
+                      data=datetime(2017, 5, 2)),
+        ]
+        db.session.add_all(transacoes)
+        db.session.commit()
+        
+        yield transacoes
+        
+        # Os testes editam em outro app_context (outra sessão): descarta o
+        # estado em cache para que a exclusão use os valores atuais do banco
+        db.session.expire_all()
+        for t in Transacao.query.filter(Transacao.data < datetime(2018, 1, 1),
+                                        Transacao.data >= datetime(2017, 1, 1)).all():
+            db.session.delete(t)
+        db.session.commit()
+
+
+# =============================================================================
+# TESTES: Manutenção incremental
+# =============================================================================
+
+class TestManutencaoIncremental:
+    """Testes para a atualização do rollup a cada escrita."""
+    
+    def test_insercao_gera_linhas_dia_mes_ano(self, app, transacoes_2017):
+        """Testa que inserções somam nas três granularidades."""
+        with app.app_context():
+            assert _resumos('dia', '2017-02-10') == {
+                ('2017-02-10', 'DESPESA', 'Insumos', 'Gelo'): (140.0, 2)
+            }
+            assert _resumos('mes', '2017-02')[('2017-02', 'RECEITA', 'PIX', '')] == (500.0, 1)
+            assert _resumos('ano', '2017')[('2017', 'DESPESA', 'Bebidas', '')] == (70.0, 1)
+    
+    def test_edicao_move_valor_entre_linhas(self, app, transacoes_2017):
+        """Testa que editar categoria, data e valor desloca o total corretamente."""
+        with app.app_context():
+            t = db.session.get(Transacao, transacoes_2017[1].id)
+            t.categoria = 'Bebidas'
+            t.subcategoria = None
+            t.data = datetime(2017, 5, 1, 12, 0)
+            t.valor = 45.0
+            db.session.commit()
+            
+            assert _resumos('dia', '2017-02-10') == {
+                ('2017-02-10', 'DESPESA', 'Insumos', 'Gelo'): (100.0, 1)
+            }
+            assert _resumos('dia', '2017-05-01') == {
+                ('2017-05-01', 'DESPESA', 'Bebidas', ''): (115.0, 2)
+            }
+    
+    def test_exclusao_remove_linhas_zeradas(self, app, transacoes_2017):
+        """Testa que a exclusão subtrai e remove linhas que ficam vazias."""
+        with app.app_context():
+            db.session.delete(db.session.get(Transacao, transacoes_2017[2].id))
+            db.session.commit()
+            
+            assert _resumos('dia', '2017-05-01') == {}
+            assert ('2017', 'DESPESA', 'Bebidas', '') not in _resumos('ano', '2017')
+    
+    def test_escritas_em_massa_fora_do_orm(self, app, transacoes_2017):
+        """Testa query.update(), SQL direto e query.delete(), que não passam pela sessão."""
+        with app.app_context():
+            Transacao.query.filter(Transacao.categoria == 'Bebidas').update({'categoria': 'Insumos'})
+            db.session.execute(text(
+                "UPDATE transacoes SET valor_centavos = 60000 WHERE categoria = 'PIX' "
+                "AND data >= '2017-01-01' AND data < '2018-01-01'"
+            ))
+            db.session.commit()
+            
+            assert _resumos('ano', '2017')[('2017', 'DESPESA', 'Insumos', '')] == (70.0, 1)
+            assert ('2017', 'DESPESA', 'Bebidas', '') not in _resumos('ano', '2017')
+            assert get_totais_ano(2017)['receitas'] == 600.0
+            
+            Transacao.query.filter(Transacao.data >= datetime(2017, 1, 1),
+                                   Transacao.data < datetime(2018, 1, 1)).delete()
+            db.session.commit()
+            
+            assert {g: _resumos(g, '2017') for g in ('dia', 'mes', 'ano')} == {'dia': {}, 'mes': {}, 'ano': {}}
+    
+    def test_reconstrucao_igual_a_incremental(self, app, transacoes_2017):
+        """Testa que reconstruir_resumos produz o mesmo rollup."""
+        with app.app_context():
+            t = db.session.get(Transacao, transacoes_2017[0].id)
+            t.valor = 130.0
+            db.session.commit()
+            
+            incremental = {g: _resumos(g, '2017') for g in ('dia', 'mes', 'ano')}
+            reconstruir_resumos()
+            
+            assert {g: _resumos(g, '2017') for g in ('dia', 'mes', 'ano')} == incremental
+
+
+# =============================================================================
+# TESTES: Leituras anuais
+# =============================================================================
+
+class TestLeiturasAnuais:
+    """Testes para as funções anuais lidas do rollup (apenas CONFIRMADO)."""
+    
+    def test_totais_ano(self, app, transacoes_2017):
+        """Testa totais do ano ignorando transações pendentes."""
+        with app.app_context():
+            assert get_totais_ano(2017) == {'receitas': 500.0, 'despesas': 210.0, 'lucro': 290.0}
+    
+    def test_totais_mensais_ano(self, app, transacoes_2017):
+        """Testa série mensal do ano."""
+        with app.app_context():
+            dados = get_totais_mensais_ano(2017)
+            
+            assert dados['despesas'][1] == 140.0
+            assert dados['despesas'][4] == 70.0
+            assert dados['receitas'][1] == 500.0
+            assert dados['receitas'][4] == 0.0
+    
+    def test_rankings(self, app, transacoes_2017):
+        """Testa rankings de despesas e receitas do ano."""
+        with app.app_context():
+            assert get_ranking_categorias_ano(2017) == [
+                {'categoria': 'Insumos', 'valor': 140.0},
+                {'categoria': 'Bebidas', 'valor': 70.0}
+            ]
+            assert get_ranking_receitas_ano(2017, limite=1) == [{'categoria': 'PIX', 'valor': 500.0}]
+    
+    def test_analise_anos_consistente_com_funcoes_anuais(self, app, transacoes_2017):
+        """Testa que a consulta de N anos reproduz as funções por ano."""
+        with app.app_context():
+            analise = get_analise_anos(2018, num_anos=3, limite_ranking=5)
+            
+            assert analise['anos'] == [2016, 2017, 2018]
+            dados_2017 = analise['por_ano'][2017]
+            assert dados_2017['totais'] == get_totais_ano(2017)
+            assert dados_2017['dados_mensais'] == get_totais_mensais_ano(2017)
+            assert dados_2017['ranking_despesas'] == get_ranking_categorias_ano(2017)
+            assert dados_2017['ranking_receitas'] == get_ranking_receitas_ano(2017)
+    
+    def test_analise_anos_variacoes(self, app, transacoes_2017):
+        """Testa variações ano a ano (None quando o ano base está vazio)."""
+        with app.app_context():
+            por_ano = get_analise_anos(2018, num_anos=2)['por_ano']
+            
+            assert por_ano[2017]['variacoes'] == {'receitas': None, 'despesas': None, 'lucro': None}
+            assert por_ano[2018]['variacoes'] == {'receitas': -100.0, 'despesas': -100.0, 'lucro': -100.0}
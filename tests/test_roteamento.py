@@ -0,0 +1,103 @@
+"""
+Testes para o roteamento entre modelos de visão (GroqService).
+
+Testa:
+- Modelo rápido atendendo sozinho quando a extração é boa
+- Escalada para o GROQ_MODEL por confiança baixa ou extração falha
+- Nível registrado nos dados e nos contadores de GET /api/ocr/status
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from services import groq_service
+from services.groq_service import GroqService
+from utils import limitador
+from utils.arquivo_upload import ArquivoUpload
+from utils.limitador import LimitadorTokens
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+DESPESA = {'data': '2025-10-01', 'estabelecimento': 'Fábrica de Gelo', 'valor_total': 42.5,
+           'categoria': 'Insumos', 'subcategoria': 'Gelo', 'confianca': 0.95}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """GroqService com roteamento rápido -> completo e respostas por modelo (service.respostas)."""
+    monkeypatch.setattr(Config, 'OCR_CACHE_ATIVO', False)
+    monkeypatch.setattr(Config, 'OCR_ROTEAMENTO_ATIVO', True)
+    monkeypatch.setattr(Config, 'OCR_CONFIANCA_MINIMA', 0.7)
+    monkeypatch.setattr(Config, 'GROQ_MODEL_RAPIDO', 'scout')
+    monkeypatch.setattr(limitador, '_limitador_groq', LimitadorTokens(1000, 10**7))
+    
+    service = GroqService()
+    service.model = 'maverick'
+    service.modelos_chamados = []
+    service.respostas = {}
+    
+    def create(**kwargs):
+        service.modelos_chamados.append(kwargs['model'])
+        conteudo = json.dumps(service.respostas[kwargs['model']])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=conteudo))],
+            usage=SimpleNamespace(total_tokens=1500)
+        )
+    
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return service
+
+
+# =============================================================================
+# TESTES: Roteamento entre modelos
+# =============================================================================
+
+class TestRoteamentoModelos:
+    """Testes para o modelo rápido primeiro e a escalada para o completo."""
+    
+    def test_modelo_rapido_basta(self, service):
+        """Testa uma chamada só, ao modelo rápido, com o nível registrado."""
+        service.respostas = {'scout': DESPESA}
+        
+        resultado = service.processar_nota(ArquivoUpload(PNG, 'nota.png'))
+        
+        assert service.modelos_chamados == ['scout']
+        assert resultado['dados']['nivel_modelo'] == 'rapido' and resultado['dados']['modelo'] == 'scout'
+        assert service.estatisticas_roteamento()['rapido'] == 1
+    
+    def test_escala_por_confianca_baixa_e_por_falha(self, service):
+        """Testa confiança em porcentagem abaixo do limite e receita sem valor."""
+        service.respostas = {
+            'scout': {**DESPESA, 'confianca': 40},
+            'maverick': {**DESPESA, 'valor_total': 45.0},
+        }
+        baixa = service.processar_nota(ArquivoUpload(PNG, 'nota.png'))
+        
+        recibo = {'data': '2025-10-01', 'origem': 'Cliente', 'valor': 150.0, 'tipo_pagamento': 'PIX'}
+        service.respostas = {'scout': {**recibo, 'valor': None}, 'maverick': recibo}
+        falha = service.processar_receita(ArquivoUpload(PNG, 'pix.png'))
+        
+        assert service.modelos_chamados == ['scout', 'maverick', 'scout', 'maverick']
+        assert baixa['dados']['valor_total'] == 45.0 and baixa['dados']['nivel_modelo'] == 'completo'
+        assert falha['dados']['valor'] == 150.0 and falha['dados']['nivel_modelo'] == 'completo'
+        assert service.estatisticas_roteamento() == {
+            'rapido': 0, 'completo': 2, 'escalados': {'falha': 1, 'confianca': 1},
+            'modelos': {'rapido': 'scout', 'completo': 'maverick'}
+        }
+    
+    def test_roteamento_desligado_e_status(self, service, app, client, monkeypatch):
+        """Testa só o GROQ_MODEL sem roteamento e os contadores na API."""
+        monkeypatch.setattr(Config, 'OCR_ROTEAMENTO_ATIVO', False)
+        service.respostas = {'maverick': {**DESPESA, 'confianca': 0.1}}
+        
+        resultado = service.processar_nota(ArquivoUpload(PNG, 'nota.png'))
+        
+        assert service.modelos_chamados == ['maverick'] and resultado['dados']['nivel_modelo'] == 'completo'
+        
+        monkeypatch.setitem(app.config, 'LOGIN_DISABLED', True)
+        monkeypatch.setattr(groq_service, '_groq_service', service)
+        roteamento = client.get('/api/ocr/status').get_json()['roteamento']
+        assert roteamento['completo'] == 1 and roteamento['modelos'] == {'completo': 'maverick'}
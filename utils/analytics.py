@@ -11,6 +11,9 @@ import re
 from collections import Counter
 from typing import Optional
 
+from models import get_totais_ano, get_transacoes_ano
+from utils.cache import memoizar_por_requisicao, cache_entre_requisicoes
+
 logger = logging.getLogger(__name__)
 
 # Palavras comuns a serem ignoradas na análise
@@ -209,3 +212,22 @@ def get_analise_completa(transacoes_despesas: list, totais: dict) -> dict:
         'palavras_chave': extrair_palavras_chave(transacoes_despesas, limite=15),
         'insights': gerar_insights(transacoes_despesas, totais)
     }
+
+
+@memoizar_por_requisicao
+@cache_entre_requisicoes
+def get_analise_ano(ano: int) -> dict:
+    """
+    Análise completa das despesas confirmadas de um ano.
+    
+    Carrega as transações do ano apenas quando o resultado não está no
+    cache entre requisições (anos fechados quase nunca mudam).
+    
+    Args:
+        ano: Ano desejado
+    
+    Returns:
+        dict: Mesmo formato de get_analise_completa
+    """
+    transacoes_despesas = get_transacoes_ano(ano, tipo='DESPESA')
+    return get_analise_completa(transacoes_despesas, get_totais_ano(ano))
@@ -0,0 +1,218 @@
+"""
+Módulo do arquivo enviado nos uploads (imagem ou PDF), decodificado uma vez.
+
+Os uploads chegam em base64 (até 16 MB de texto). Cada etapa — detecção de
+PDF, gravação no disco, conversão do PDF e preparo para a Groq — removia o
+prefixo data:, limpava e decodificava a string de novo. ArquivoUpload
+decodifica uma única vez, identifica o tipo pelos magic bytes e é passado
+adiante: todas as etapas usam os mesmos bytes, e o base64 só é gerado de
+novo, uma vez, na chamada à API.
+
+Uso:
+    >>> upload = ArquivoUpload.de_base64(data['imagem'], 'nota.pdf')
+    >>> upload.eh_pdf, upload.extensao
+    (True, 'pdf')
+"""
+
+# 1. Bibliotecas padrão
+import base64
+import binascii
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Assinaturas (magic bytes) dos formatos aceitos
+ASSINATURAS = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+# Extensão do arquivo salvo por tipo (tipos desconhecidos são salvos como .jpg)
+EXTENSOES = {
+    'application/pdf': 'pdf',
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+
+def detectar_mime(conteudo: bytes) -> Optional[str]:
+    """
+    Identifica o tipo do arquivo pelos primeiros bytes.
+    
+    Args:
+        conteudo: Bytes do arquivo (ou memoryview)
+    
+    Returns:
+        str: MIME type ('application/pdf', 'image/jpeg', ...), ou None se desconhecido
+    """
+    cabecalho = bytes(conteudo[:12])
+    
+    for assinatura, mime in ASSINATURAS:
+        if cabecalho.startswith(assinatura):
+            return mime
+    
+    if cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP':
+        return 'image/webp'
+    
+    return None
+
+
+class ArquivoUpload:
+    """
+    Arquivo de um upload já decodificado, compartilhado pelas etapas.
+    
+    O tipo vem dos magic bytes; o tipo declarado pelo cliente (prefixo
+    data: ou tipo_arquivo) só é usado quando os bytes não são reconhecidos.
+    
+    Attributes:
+        conteudo: Bytes do arquivo
+        nome_arquivo: Nome original enviado pelo cliente ('' se ausente)
+        mime: MIME type do conteúdo
+    """
+    
+    __slots__ = ('conteudo', 'nome_arquivo', 'mime')
+    
+    def __init__(self, conteudo: bytes, nome_arquivo: str = '', mime_declarado: Optional[str] = None):
+        self.conteudo = conteudo
+        self.nome_arquivo = nome_arquivo or ''
+        self.mime = detectar_mime(conteudo) or mime_declarado or 'application/octet-stream'
+    
+    @classmethod
+    def de_base64(
+        cls,
+        arquivo_base64: str,
+        nome_arquivo: str = '',
+        tipo_arquivo: Optional[str] = None
+    ) -> 'ArquivoUpload':
+        """
+        Decodifica o base64 recebido no JSON (com ou sem prefixo data:).
+        
+        A string é convertida para bytes uma vez e o prefixo é pulado com
+        um memoryview, sem cópias intermediárias; quebras de linha e
+        espaços são ignorados pelo decodificador.
+        
+        Args:
+            arquivo_base64: Arquivo em base64
+            nome_arquivo: Nome original do arquivo
+            tipo_arquivo: 'imagem' ou 'pdf' declarado pelo cliente (opcional)
+        
+        Returns:
+            ArquivoUpload: Arquivo decodificado
+        
+        Raises:
+            ValueError: Se o arquivo estiver vazio ou o base64 for inválido
+        """
+        if not arquivo_base64:
+            raise ValueError('Arquivo vazio')
+        
+        mime_declarado = 'application/pdf' if tipo_arquivo == 'pdf' else None
+        inicio = 0
+        
+        # Prefixo data:<mime>;base64, (só nos primeiros caracteres)
+        separador = arquivo_base64.find('base64,', 0, 200)
+        if separador != -1:
+            if arquivo_base64.startswith('data:'):
+                mime_declarado = arquivo_base64[5:separador].rstrip(';') or mime_declarado
+            inicio = separador + len('base64,')
+        
+        try:
+            dados = memoryview(arquivo_base64.encode('ascii'))[inicio:]
+            conteudo = binascii.a2b_base64(dados)
+        except (UnicodeEncodeError, binascii.Error) as e:
+            raise ValueError(f'Arquivo em base64 inválido: {e}')
+        
+        if not conteudo:
+            raise ValueError('Arquivo vazio')
+        
+        return cls(conteudo, nome_arquivo, mime_declarado)
+    
+    @classmethod
+    def de_multipart(cls, parte) -> 'ArquivoUpload':
+        """
+        Lê uma parte de arquivo de um upload multipart/form-data.
+        
+        O Werkzeug grava cada parte num SpooledTemporaryFile (em memória até
+        500 KB, depois em disco) enquanto lê a requisição, já limitado a
+        MAX_CONTENT_LENGTH; aqui os bytes são lidos uma única vez, sem base64.
+        
+        Args:
+            parte: FileStorage de request.files
+        
+        Returns:
+            ArquivoUpload: Arquivo lido (conteúdo vazio se a parte veio vazia)
+        """
+        return cls(parte.read(), parte.filename or '', parte.mimetype or None)
+    
+    @classmethod
+    def de_arquivo(cls, caminho: Path, nome_arquivo: str = '') -> 'ArquivoUpload':
+        """
+        Lê um arquivo já salvo no disco (ex: pelo worker da fila de OCR).
+        
+        Raises:
+            OSError: Se o arquivo não puder ser lido
+        """
+        return cls(Path(caminho).read_bytes(), nome_arquivo)
+    
+    @property
+    def eh_pdf(self) -> bool:
+        """True se o conteúdo é um PDF."""
+        return self.mime == 'application/pdf'
+    
+    @property
+    def tipo_arquivo(self) -> str:
+        """'pdf' ou 'imagem' (valores usados pelas rotas e pela fila de OCR)."""
+        return 'pdf' if self.eh_pdf else 'imagem'
+    
+    @property
+    def extensao(self) -> str:
+        """Extensão usada ao salvar o arquivo."""
+        return EXTENSOES.get(self.mime, 'jpg')
+    
+    @property
+    def tamanho(self) -> int:
+        """Tamanho do conteúdo em bytes."""
+        return len(self.conteudo)
+    
+    def data_url(self) -> str:
+        """Conteúdo como data URL base64 (formato aceito pela API da Groq)."""
+        return f"data:{self.mime};base64,{base64.b64encode(self.conteudo).decode('ascii')}"
+
+
+def nome_do_item(arquivo: Union[dict, ArquivoUpload], nome_padrao: str = '') -> str:
+    """Nome original de um item de upload (dict do JSON ou ArquivoUpload do multipart)."""
+    if isinstance(arquivo, ArquivoUpload):
+        return arquivo.nome_arquivo or nome_padrao
+    return arquivo.get('nome_arquivo') or nome_padrao
+
+
+def decodificar_item(arquivo: Union[dict, ArquivoUpload], nome_padrao: str = '') -> ArquivoUpload:
+    """
+    Normaliza um item de upload de nota para ArquivoUpload.
+    
+    Args:
+        arquivo: {"imagem": "...", "nome_arquivo": "...", "tipo_arquivo": "..."}
+            (JSON) ou ArquivoUpload já lido do multipart
+        nome_padrao: Nome usado quando o item não traz nome
+    
+    Returns:
+        ArquivoUpload: Arquivo decodificado
+    
+    Raises:
+        ValueError: Se o arquivo estiver vazio ou o base64 for inválido
+    """
+    if isinstance(arquivo, ArquivoUpload):
+        if not arquivo.conteudo:
+            raise ValueError('Arquivo vazio')
+        return arquivo
+    
+    return ArquivoUpload.de_base64(
+        arquivo.get('imagem'), nome_do_item(arquivo, nome_padrao), arquivo.get('tipo_arquivo')
+    )
@@ -0,0 +1,328 @@
+"""
+Módulo de cache de consultas do GestorBot.
+
+Dois níveis de cache:
+
+1. Memoização por requisição: as funções de consulta de models.py
+   decoradas com @memoizar_por_requisicao guardam o resultado em flask.g,
+   indexado pelos argumentos. Chamadas repetidas na mesma requisição (ex:
+   totais do mês usados pelo dashboard e pelo relatório) não voltam ao
+   banco. O cache é descartado sempre que a sessão grava algo (flush),
+   confirma (commit) ou desfaz (rollback) uma transação, e morre junto com
+   o contexto da requisição. Os resultados são compartilhados entre as
+   chamadas e devem ser tratados como somente leitura.
+
+2. Cache entre requisições (@cache_entre_requisicoes): resultados de
+   agregados (dicts/listas, nunca objetos ORM) num backend plugável — LRU
+   em memória ou arquivo SQLite compartilhado. A chave inclui a versão
+   global dos dados (tabela versao_dados, incrementada por triggers a cada
+   escrita em transacoes); como a versão é lida do banco, uma escrita em
+   qualquer worker torna obsoletas as entradas de todos os processos.
+   Resultados de reserva (zeros devolvidos após um erro de banco, marcados
+   com marcar_falha_consulta) não são gravados.
+"""
+
+# 1. Bibliotecas padrão
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Optional
+
+# 2. Bibliotecas externas
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Atributo de flask.g onde ficam os resultados memoizados
+ATRIBUTO_CACHE = '_cache_consultas'
+
+# Atributo de flask.g que marca a chamada atual como falha (não cacheável)
+ATRIBUTO_FALHA = '_falha_consulta'
+
+
+def _congelar(valor):
+    """Converte argumentos mutáveis (dict, list, set) em equivalentes hasheáveis."""
+    if isinstance(valor, dict):
+        return tuple(sorted((chave, _congelar(v)) for chave, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, set):
+        return frozenset(_congelar(v) for v in valor)
+    return valor
+
+
+def chave_chamada(funcao: Callable, args: tuple, kwargs: dict) -> tuple:
+    """
+    Monta a chave de cache de uma chamada: nome da função + argumentos.
+    
+    Args:
+        funcao: Função chamada
+        args: Argumentos posicionais
+        kwargs: Argumentos nomeados
+    
+    Returns:
+        tuple: Chave hasheável
+    """
+    return (funcao.__module__, funcao.__qualname__, _congelar(args), _congelar(kwargs))
+
+
+def memoizar_por_requisicao(funcao: Callable) -> Callable:
+    """
+    Decorator que memoiza o resultado da função no contexto atual (flask.g).
+    
+    Fora de um app_context a função é executada normalmente.
+    
+    Example:
+        >>> @memoizar_por_requisicao
+        ... def get_totais_mes(ano, mes):
+        ...     ...
+    """
+    @wraps(funcao)
+    def wrapper(*args, **kwargs):
+        if not has_app_context():
+            return funcao(*args, **kwargs)
+        
+        cache = g.setdefault(ATRIBUTO_CACHE, {})
+        chave = chave_chamada(funcao, args, kwargs)
+        
+        if chave not in cache:
+            cache[chave] = funcao(*args, **kwargs)
+        return cache[chave]
+    
+    return wrapper
+
+
+def limpar_cache_requisicao(*args, **kwargs) -> None:
+    """Descarta os resultados memoizados do contexto atual (listener de sessão)."""
+    if has_app_context():
+        g.pop(ATRIBUTO_CACHE, None)
+
+
+def registrar_eventos() -> None:
+    """Registra a invalidação do cache nas escritas da sessão (idempotente)."""
+    for nome_evento in ('after_flush', 'after_commit', 'after_rollback'):
+        if not event.contains(Session, nome_evento, limpar_cache_requisicao):
+            event.listen(Session, nome_evento, limpar_cache_requisicao)
+
+
+# =============================================================================
+# CACHE ENTRE REQUISIÇÕES
+# =============================================================================
+
+class CacheLRU:
+    """
+    Backend em memória do processo, com descarte do item menos usado.
+    
+    Os valores ficam serializados (pickle): cada leitura devolve uma cópia
+    nova, então quem recebe o resultado pode alterá-lo sem afetar o cache.
+    
+    Attributes:
+        max_itens: Quantidade máxima de entradas
+    """
+    
+    def __init__(self, max_itens: int = 512):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+    
+    def obter(self, chave: str) -> Optional[bytes]:
+        """Retorna o valor serializado da chave, ou None se ausente."""
+        with self._trava:
+            valor = self._itens.get(chave)
+            if valor is not None:
+                self._itens.move_to_end(chave)
+            return valor
+    
+    def gravar(self, chave: str, valor: bytes, versao: int) -> None:
+        """Grava o valor e descarta os itens mais antigos acima do limite."""
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+    
+    def limpar(self) -> None:
+        """Remove todas as entradas."""
+        with self._trava:
+            self._itens.clear()
+
+
+class CacheSQLite:
+    """
+    Backend em arquivo SQLite, compartilhado por todos os workers.
+    
+    Cada gravação remove as entradas de versões anteriores dos dados
+    (nunca mais serão lidas) e as menos acessadas acima do limite.
+    
+    Attributes:
+        caminho: Arquivo do banco de cache
+        max_itens: Quantidade máxima de entradas
+    """
+    
+    def __init__(self, caminho: Path, max_itens: int = 512):
+        self.caminho = Path(caminho)
+        self.max_itens = max_itens
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        
+        with self._conectar() as conexao:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " chave TEXT PRIMARY KEY, valor BLOB NOT NULL,"
+                " versao INTEGER NOT NULL, acessado REAL NOT NULL)"
+            )
+    
+    @contextmanager
+    def _conectar(self):
+        """Abre uma conexão curta (uma por operação, segura entre threads)."""
+        conexao = sqlite3.connect(self.caminho, timeout=5)
+        try:
+            with conexao:  # Commit ao final, rollback em caso de erro
+                yield conexao
+        finally:
+            conexao.close()
+    
+    def obter(self, chave: str) -> Optional[bytes]:
+        """Retorna o valor serializado da chave, ou None se ausente."""
+        with self._conectar() as conexao:
+            linha = conexao.execute("SELECT valor FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if linha:
+                conexao.execute("UPDATE cache SET acessado = ? WHERE chave = ?", (time.time(), chave))
+        return linha[0] if linha else None
+    
+    def gravar(self, chave: str, valor: bytes, versao: int) -> None:
+        """Grava o valor, remove versões obsoletas e aplica o limite de itens."""
+        with self._conectar() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, versao, acessado) VALUES (?, ?, ?, ?)",
+                (chave, valor, versao, time.time())
+            )
+            conexao.execute("DELETE FROM cache WHERE versao < ?", (versao,))
+            conexao.execute(
+                "DELETE FROM cache WHERE chave NOT IN "
+                "(SELECT chave FROM cache ORDER BY acessado DESC LIMIT ?)",
+                (self.max_itens,)
+            )
+    
+    def limpar(self) -> None:
+        """Remove todas as entradas."""
+        with self._conectar() as conexao:
+            conexao.execute("DELETE FROM cache")
+
+
+# Backend do processo, criado na primeira utilização (um por worker)
+_backend = None
+_backend_trava = threading.Lock()
+
+
+def obter_backend():
+    """
+    Retorna o backend configurado em CACHE_BACKEND (ou None se desativado).
+    
+    Returns:
+        CacheLRU, CacheSQLite ou None
+    """
+    global _backend
+    
+    if _backend is None:
+        with _backend_trava:
+            if _backend is None:
+                tipo = current_app.config.get('CACHE_BACKEND', 'lru')
+                max_itens = current_app.config.get('CACHE_MAX_ITENS', 512)
+                
+                if tipo == 'sqlite':
+                    _backend = CacheSQLite(current_app.config['CACHE_ARQUIVO'], max_itens)
+                elif tipo == 'lru':
+                    _backend = CacheLRU(max_itens)
+                else:
+                    _backend = False  # Desativado
+                
+                logger.info(f"Cache entre requisições: {tipo}")
+    
+    return _backend or None
+
+
+def redefinir_backend() -> None:
+    """Descarta o backend do processo (recriado na próxima utilização)."""
+    global _backend
+    with _backend_trava:
+        _backend = None
+
+
+def marcar_falha_consulta() -> None:
+    """
+    Marca o resultado da chamada em andamento como reserva de um erro.
+    
+    Chamada pelos blocos except das consultas cacheadas, que devolvem
+    zeros em vez de propagar o erro: um "database is locked" passageiro
+    não pode ficar gravado no cache até a próxima escrita.
+    """
+    if has_app_context():
+        setattr(g, ATRIBUTO_FALHA, True)
+
+
+def cache_entre_requisicoes(funcao: Callable) -> Callable:
+    """
+    Decorator que guarda o resultado no backend de cache, por versão dos dados.
+    
+    Só deve ser usado em funções cujo resultado é serializável e não contém
+    objetos ORM (totais, séries, rankings). Se a versão dos dados não
+    puder ser lida, ou o cache estiver desativado, a função é executada
+    normalmente. Resultados marcados com marcar_falha_consulta são
+    devolvidos sem ir para o cache.
+    """
+    @wraps(funcao)
+    def wrapper(*args, **kwargs):
+        if not has_app_context():
+            return funcao(*args, **kwargs)
+        
+        backend = obter_backend()
+        
+        from models import get_versao_dados
+        versao = get_versao_dados()
+        
+        if backend is None or versao is None:
+            return funcao(*args, **kwargs)
+        
+        chave = hashlib.sha256(
+            repr((versao, chave_chamada(funcao, args, kwargs))).encode('utf-8')
+        ).hexdigest()
+        
+        try:
+            valor = backend.obter(chave)
+            if valor is not None:
+                return pickle.loads(valor)
+        except Exception as e:
+            logger.warning(f"Falha ao ler cache de {funcao.__qualname__}: {e}")
+        
+        falha_externa = g.pop(ATRIBUTO_FALHA, False)
+        try:
+            resultado = funcao(*args, **kwargs)
+        finally:
+            falhou = g.pop(ATRIBUTO_FALHA, False)
+            # Propaga a marca para uma chamada cacheada externa
+            if falha_externa or falhou:
+                setattr(g, ATRIBUTO_FALHA, True)
+        
+        if falhou:
+            logger.warning(f"{funcao.__qualname__} falhou; resultado não gravado no cache")
+            return resultado
+        
+        try:
+            backend.gravar(chave, pickle.dumps(resultado), versao)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de {funcao.__qualname__}: {e}")
+        
+        return resultado
+    
+    return wrapper
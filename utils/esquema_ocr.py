@@ -0,0 +1,180 @@
+"""
+Esquemas JSON das respostas de OCR (despesa e receita) e sua validação.
+
+Os esquemas vão para a API da Groq no response_format (saída estruturada)
+e validam a resposta antes da normalização no GroqService. Seguem o
+formato aceito pelo modo estrito: todos os campos obrigatórios, campos
+ausentes como null e nenhum campo extra. Uma resposta fora do esquema
+não é descartada: o GroqService cai no parser tolerante de
+utils/helpers.extrair_json_de_texto.
+
+O validador cobre só o subconjunto de JSON Schema usado aqui (type,
+properties, required, additionalProperties, enum e items), sem dependência extra.
+"""
+
+# 1. Bibliotecas padrão
+import json
+import logging
+from typing import List, Optional
+
+# 3. Imports locais
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Valores aceitos em tipo_pagamento (mesmos do PROMPT_RECEITA)
+TIPOS_PAGAMENTO = ['PIX', 'Cartão', 'Transferência', 'Vendas', 'Outros']
+
+ESQUEMA_DESPESA = {
+    'title': 'despesa',
+    'type': 'object',
+    'properties': {
+        'data': {'type': ['string', 'null'], 'description': 'Data do pagamento/compra (YYYY-MM-DD)'},
+        'estabelecimento': {'type': ['string', 'null'], 'description': 'Fornecedor ou beneficiário'},
+        'valor_total': {'type': ['number', 'null'], 'description': 'Valor total pago, sem R$'},
+        'categoria': {'type': ['string', 'null'], 'enum': Config.CATEGORIAS_DESPESA + [None]},
+        'subcategoria': {'type': ['string', 'null']},
+        'confianca': {'type': ['number', 'null'], 'description': 'Certeza da data e do valor lidos (0 a 1)'},
+        'erro': {'type': ['string', 'null'], 'description': 'Motivo, se não for um documento de despesa legível'},
+    },
+    'required': ['data', 'estabelecimento', 'valor_total', 'categoria', 'subcategoria', 'confianca', 'erro'],
+    'additionalProperties': False,
+}
+
+ESQUEMA_RECEITA = {
+    'title': 'receita',
+    'type': 'object',
+    'properties': {
+        'data': {'type': ['string', 'null'], 'description': 'Data da transação (YYYY-MM-DD)'},
+        'origem': {'type': ['string', 'null'], 'description': 'Pagador ou banco de origem'},
+        'valor': {'type': ['number', 'null'], 'description': 'Valor recebido, sem R$'},
+        'tipo_pagamento': {'type': ['string', 'null'], 'enum': TIPOS_PAGAMENTO + [None]},
+        'confianca': {'type': ['number', 'null'], 'description': 'Certeza da data e do valor lidos (0 a 1)'},
+        'erro': {'type': ['string', 'null'], 'description': 'Motivo, se não for um comprovante legível'},
+    },
+    'required': ['data', 'origem', 'valor', 'tipo_pagamento', 'confianca', 'erro'],
+    'additionalProperties': False,
+}
+
+# Várias imagens numa requisição (GroqService.processar_notas_lote): um
+# item de ESQUEMA_DESPESA por imagem, identificado pelo índice dela
+ESQUEMA_LOTE_DESPESA = {
+    'title': 'lote_despesa',
+    'type': 'object',
+    'properties': {
+        'documentos': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'indice': {'type': 'integer', 'description': 'Posição da imagem (começa em 0)'},
+                    **ESQUEMA_DESPESA['properties'],
+                },
+                'required': ['indice'] + ESQUEMA_DESPESA['required'],
+                'additionalProperties': False,
+            },
+        },
+    },
+    'required': ['documentos'],
+    'additionalProperties': False,
+}
+
+# Tipo JSON -> tipos Python aceitos (bool não conta como número)
+_TIPOS = {
+    'object': (dict,),
+    'array': (list,),
+    'string': (str,),
+    'number': (int, float),
+    'integer': (int,),
+    'boolean': (bool,),
+    'null': (type(None),),
+}
+
+
+def validar_esquema(dados, esquema: dict, caminho: str = '$') -> List[str]:
+    """
+    Valida um valor contra o esquema (subconjunto de JSON Schema).
+    
+    Args:
+        dados: Valor decodificado do JSON
+        esquema: Esquema com type/properties/required/additionalProperties/enum/items
+        caminho: Prefixo das mensagens de erro
+    
+    Returns:
+        list: Mensagens dos problemas encontrados (vazia se válido)
+    """
+    erros = []
+    
+    tipos = esquema.get('type')
+    if tipos:
+        tipos = tipos if isinstance(tipos, list) else [tipos]
+        aceitos = tuple(t for tipo in tipos for t in _TIPOS[tipo])
+        if (isinstance(dados, bool) and 'boolean' not in tipos) or not isinstance(dados, aceitos):
+            return [f"{caminho}: esperado {'/'.join(tipos)}, recebido {type(dados).__name__}"]
+    
+    if 'enum' in esquema and dados not in esquema['enum']:
+        erros.append(f"{caminho}: valor fora da lista permitida: {dados!r}")
+    
+    if isinstance(dados, dict):
+        propriedades = esquema.get('properties', {})
+        for campo in esquema.get('required', []):
+            if campo not in dados:
+                erros.append(f"{caminho}.{campo}: campo obrigatório ausente")
+        for campo, valor in dados.items():
+            if campo in propriedades:
+                erros.extend(validar_esquema(valor, propriedades[campo], f"{caminho}.{campo}"))
+            elif esquema.get('additionalProperties') is False:
+                erros.append(f"{caminho}.{campo}: campo não previsto")
+    
+    if isinstance(dados, list) and 'items' in esquema:
+        for posicao, item in enumerate(dados):
+            erros.extend(validar_esquema(item, esquema['items'], f"{caminho}[{posicao}]"))
+    
+    return erros
+
+
+def formato_resposta(esquema: dict) -> Optional[dict]:
+    """
+    response_format da API para o modo configurado em GROQ_SAIDA_ESTRUTURADA.
+    
+    Args:
+        esquema: ESQUEMA_DESPESA ou ESQUEMA_RECEITA (o title vira o nome do esquema)
+    
+    Returns:
+        dict: Parâmetro response_format, ou None com a saída estruturada desligada
+    """
+    modo = Config.GROQ_SAIDA_ESTRUTURADA
+    if modo == 'json_schema':
+        return {'type': 'json_schema', 'json_schema': {'name': esquema['title'], 'schema': esquema}}
+    if modo == 'json_object':
+        return {'type': 'json_object'}
+    return None
+
+
+def ler_resposta_estruturada(texto: str, esquema: dict) -> Optional[dict]:
+    """
+    Lê a resposta da saída estruturada, sem heurísticas.
+    
+    O texto precisa ser um objeto JSON válido de acordo com o esquema. Campos
+    null são removidos, para a normalização tratá-los como ausentes (e
+    'erro': null não ser confundido com erro).
+    
+    Args:
+        texto: Conteúdo da mensagem devolvida pela API
+        esquema: ESQUEMA_DESPESA ou ESQUEMA_RECEITA
+    
+    Returns:
+        dict: Campos preenchidos, ou None se o texto não é JSON ou não segue o esquema
+    """
+    try:
+        dados = json.loads(texto)
+    except (TypeError, ValueError):
+        return None
+    
+    erros = validar_esquema(dados, esquema)
+    if erros:
+        logger.warning(f"Resposta fora do esquema: {'; '.join(erros[:3])}")
+        return None
+    
+    return {campo: valor for campo, valor in dados.items() if valor is not None}
@@ -1,52 +1,42 @@
 """
 Módulo para manipulação de arquivos do GestorBot.
 
-Este módulo contém funções para salvar arquivos base64 (imagens e PDFs)
-no sistema de arquivos.
+Este módulo contém funções para salvar os arquivos dos uploads (imagens e
+PDFs) no sistema de arquivos e ler de volta o texto dos comprovantes salvos.
 """
 
-import base64
 import logging
+import uuid
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 from config import Config
+from utils.arquivo_upload import ArquivoUpload
+from utils.pdf_converter import extrair_texto_pdf
 
 logger = logging.getLogger(__name__)
 
 
-def salvar_arquivo(arquivo_base64: str, tipo_arquivo: str = 'imagem') -> str:
+def salvar_upload(upload: ArquivoUpload, prefixo: str = 'nota') -> str:
     """
-    Salva arquivo base64 (imagem ou PDF) no disco.
+    Grava no disco os bytes de um upload já decodificado.
     
     Args:
-        arquivo_base64: String base64 (com ou sem prefixo data:)
-        tipo_arquivo: 'imagem' ou 'pdf'
+        upload: Arquivo do upload (ArquivoUpload)
+        prefixo: Início do nome do arquivo ('nota' ou 'comprovante')
     
     Returns:
         str: URL relativa do arquivo salvo (ex: /static/uploads/nota_xxx.jpg)
     
     Raises:
-        ValueError: Se o arquivo for inválido ou não puder ser salvo
+        ValueError: Se o arquivo não puder ser salvo
     """
     try:
-        # Detecta o tipo pelo prefixo base64
-        is_pdf = 'application/pdf' in arquivo_base64 or tipo_arquivo == 'pdf'
-        
-        # Remove prefixo data:xxx;base64, se existir
-        if 'base64,' in arquivo_base64:
-            arquivo_base64 = arquivo_base64.split('base64,')[1]
-        
-        # Remove espaços e quebras de linha
-        arquivo_base64 = arquivo_base64.strip().replace('\n', '').replace('\r', '')
-        
-        # Decodifica base64
-        arquivo_bytes = base64.b64decode(arquivo_base64)
-        
-        # Gera nome único com timestamp e extensão apropriada
+        # Gera nome único: o timestamp sozinho colide quando vários arquivos
+        # do upload em massa são salvos em paralelo no mesmo segundo
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        extensao = 'pdf' if is_pdf else 'jpg'
-        filename = f"nota_{timestamp}.{extensao}"
+        filename = f"{prefixo}_{timestamp}_{uuid.uuid4().hex[:8]}.{upload.extensao}"
         
         # Garante que a pasta existe
         upload_folder = Path(Config.UPLOAD_FOLDER)
@@ -54,10 +44,9 @@ def salvar_arquivo(arquivo_base64: str, tipo_arquivo: str = 'imagem') -> str:
         
         # Salva o arquivo
         filepath = upload_folder / filename
-        with open(filepath, 'wb') as f:
-            f.write(arquivo_bytes)
+        filepath.write_bytes(upload.conteudo)
         
-        logger.info(f"Arquivo salvo: {filepath} (tipo: {tipo_arquivo})")
+        logger.info(f"Arquivo salvo: {filepath} (tipo: {upload.mime})")
         
         # Retorna URL relativa
         return f"/static/uploads/{filename}"
@@ -67,6 +56,56 @@ def salvar_arquivo(arquivo_base64: str, tipo_arquivo: str = 'imagem') -> str:
         raise ValueError(f"Não foi possível salvar o arquivo: {e}")
 
 
+def salvar_arquivo(arquivo_base64: str, tipo_arquivo: str = 'imagem') -> str:
+    """
+    Salva arquivo base64 (imagem ou PDF) no disco.
+    
+    Args:
+        arquivo_base64: String base64 (com ou sem prefixo data:)
+        tipo_arquivo: 'imagem' ou 'pdf'
+    
+    Returns:
+        str: URL relativa do arquivo salvo (ex: /static/uploads/nota_xxx.jpg)
+    
+    Raises:
+        ValueError: Se o arquivo for inválido ou não puder ser salvo
+    """
+    try:
+        upload = ArquivoUpload.de_base64(arquivo_base64, tipo_arquivo=tipo_arquivo)
+    except ValueError as e:
+        logger.error(f"Erro ao salvar arquivo: {e}")
+        raise ValueError(f"Não foi possível salvar o arquivo: {e}")
+    
+    return salvar_upload(upload)
+
+
 def salvar_imagem(imagem_base64: str) -> str:
     """Alias para salvar_arquivo (compatibilidade)."""
     return salvar_arquivo(imagem_base64, 'imagem')
+
+
+def extrair_texto_comprovante(comprovante_url: str) -> Optional[str]:
+    """
+    Lê o texto de um comprovante salvo em /static/uploads (apenas PDFs).
+    
+    Usado para indexar o conteúdo da nota na busca textual. Imagens não
+    têm camada de texto e retornam None.
+    
+    Args:
+        comprovante_url: URL relativa retornada por salvar_arquivo
+    
+    Returns:
+        str: Texto extraído, ou None se não houver texto disponível
+    """
+    if not comprovante_url or not comprovante_url.lower().endswith('.pdf'):
+        return None
+    
+    # Usa apenas o nome do arquivo: nunca lê fora da pasta de uploads
+    caminho = Path(Config.UPLOAD_FOLDER) / Path(comprovante_url).name
+    
+    try:
+        texto = extrair_texto_pdf(caminho.read_bytes())
+        return texto or None
+    except OSError as e:
+        logger.warning(f"Comprovante não encontrado para indexação: {comprovante_url} ({e})")
+        return None
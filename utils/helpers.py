@@ -10,6 +10,7 @@ import json
 import re
 import logging
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Union
 
 # Configuração de logging
@@ -161,6 +162,45 @@ def formatar_valor(valor: Union[str, int, float, None]) -> float:
         return 0.0
 
 
+def para_centavos(valor: Union[int, float, str, Decimal]) -> int:
+    """
+    Converte um valor em reais para centavos inteiros (arredondamento comercial).
+    
+    Usa a representação decimal do número, então 0.285 vira 29 centavos
+    (e não 28, como aconteceria com round(0.285 * 100)).
+    
+    Args:
+        valor: Valor em reais
+    
+    Returns:
+        int: Valor em centavos
+    
+    Example:
+        >>> para_centavos(150.5)
+        15050
+        >>> para_centavos(0.285)
+        29
+    """
+    return int((Decimal(str(valor)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def de_centavos(centavos: Optional[int]) -> float:
+    """
+    Converte centavos inteiros para reais (float com no máximo 2 casas).
+    
+    Args:
+        centavos: Valor em centavos (None é tratado como zero)
+    
+    Returns:
+        float: Valor em reais
+    
+    Example:
+        >>> de_centavos(15050)
+        150.5
+    """
+    return (centavos or 0) / 100
+
+
 def converter_data_para_formato_padrao(data_str: str) -> Optional[str]:
     """
     Converte diferentes formatos de data para o formato padrão YYYY-MM-DD.
@@ -0,0 +1,160 @@
+"""
+Módulo de pré-processamento das imagens enviadas ao OCR.
+
+Fotos de celular chegam como JPEGs de vários megabytes (12 MP ou mais),
+muitas vezes deitadas (orientação só no EXIF) e com a mesa em volta do
+cupom. Enviadas assim, gastam tokens de visão e tempo de upload à Groq e,
+acima de 4 MB, eram recusadas por GroqService._preparar_imagem.
+
+preprocessar_imagem() aplica, com Pillow:
+    1. Rotação pelo EXIF (a imagem fica "em pé" de fato)
+    2. Recorte até os limites do documento (remove a mesa/fundo)
+    3. Tons de cinza quando a imagem praticamente não tem cor
+    4. Redução até OCR_IMAGEM_LADO_MAXIMO no lado maior
+    5. Recompressão em JPEG com OCR_IMAGEM_QUALIDADE
+
+Qualquer falha devolve o arquivo original: o pré-processamento nunca
+impede o OCR. Benchmark: scripts/benchmark_preprocessamento.py.
+"""
+
+# 1. Bibliotecas padrão
+import io
+import logging
+import statistics
+
+# 3. Imports locais
+from config import Config
+from utils.arquivo_upload import ArquivoUpload
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Tentar importar Pillow
+try:
+    from PIL import Image, ImageChops, ImageOps, ImageStat
+    PILLOW_DISPONIVEL = True
+except ImportError:
+    PILLOW_DISPONIVEL = False
+    logger.warning(
+        "Pillow não instalado. Imagens serão enviadas ao OCR sem pré-processamento. "
+        "Instale com: pip install pillow"
+    )
+
+# Lado da miniatura usada para achar o documento e medir a cor
+LADO_ANALISE = 256
+# Diferença mínima (0-255) em relação ao fundo para um pixel contar como documento
+LIMIAR_FUNDO = 40
+# Margem mantida em volta do documento recortado (fração do lado)
+MARGEM_RECORTE = 0.02
+# Saturação média (0-255) abaixo da qual a imagem vai para tons de cinza
+SATURACAO_CINZA = 24
+
+
+def preprocessar_imagem(upload: ArquivoUpload) -> ArquivoUpload:
+    """
+    Prepara uma imagem para o modelo de visão (rotação, recorte, cinza, redução).
+    
+    PDFs e formatos que o Pillow não abre são devolvidos sem alteração.
+    
+    Args:
+        upload: Imagem do upload (ou a página renderizada de um PDF)
+    
+    Returns:
+        ArquivoUpload: Nova imagem JPEG, ou o próprio upload se não houver
+            ganho ou se o pré-processamento falhar
+    """
+    if not Config.OCR_PREPROCESSAMENTO_ATIVO or not PILLOW_DISPONIVEL or upload.eh_pdf:
+        return upload
+    
+    try:
+        with Image.open(io.BytesIO(upload.conteudo)) as original:
+            # 0x0112 = Orientation: fotos de celular costumam vir "deitadas" + EXIF
+            rotacionada = original.getexif().get(0x0112, 1) != 1
+            imagem = ImageOps.exif_transpose(original) if rotacionada else original
+            
+            if imagem.mode not in ('RGB', 'L'):
+                imagem = _achatar(imagem)
+            
+            imagem = _recortar_documento(imagem)
+            if imagem.mode == 'RGB' and _quase_sem_cor(imagem):
+                imagem = imagem.convert('L')
+            
+            lado_maximo = Config.OCR_IMAGEM_LADO_MAXIMO
+            if max(imagem.size) > lado_maximo:
+                imagem = imagem.copy()
+                imagem.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+            
+            saida = io.BytesIO()
+            imagem.save(saida, 'JPEG', quality=Config.OCR_IMAGEM_QUALIDADE, optimize=True)
+        
+        conteudo = saida.getvalue()
+        
+        # Sem rotação pendente e sem ganho de tamanho: o original já serve
+        if not rotacionada and len(conteudo) >= upload.tamanho:
+            return upload
+        
+        logger.debug(
+            f"Imagem pré-processada: {upload.tamanho // 1024} KB → {len(conteudo) // 1024} KB "
+            f"({imagem.size[0]}x{imagem.size[1]}, {imagem.mode})"
+        )
+        return ArquivoUpload(conteudo, upload.nome_arquivo)
+    
+    except Exception as e:
+        logger.warning(f"Falha no pré-processamento da imagem, usando original: {e}")
+        return upload
+
+
+def _achatar(imagem: 'Image.Image') -> 'Image.Image':
+    """Converte para RGB, compondo transparência sobre fundo branco."""
+    if imagem.mode in ('RGBA', 'LA') or 'transparency' in imagem.info:
+        rgba = imagem.convert('RGBA')
+        fundo = Image.new('RGB', rgba.size, (255, 255, 255))
+        fundo.paste(rgba, mask=rgba.getchannel('A'))
+        return fundo
+    return imagem.convert('RGB')
+
+
+def _recortar_documento(imagem: 'Image.Image') -> 'Image.Image':
+    """
+    Recorta a imagem até os limites do documento.
+    
+    O fundo é estimado pela mediana das bordas de uma miniatura em cinza;
+    o documento é a caixa que envolve os pixels que diferem do fundo.
+    Recortes que manteriam quase tudo (ou quase nada) são ignorados.
+    """
+    miniatura = imagem.convert('L')
+    miniatura.thumbnail((LADO_ANALISE, LADO_ANALISE))
+    largura, altura = miniatura.size
+    
+    bordas = [
+        miniatura.crop((0, 0, largura, 2)), miniatura.crop((0, altura - 2, largura, altura)),
+        miniatura.crop((0, 0, 2, altura)), miniatura.crop((largura - 2, 0, largura, altura)),
+    ]
+    fundo = int(statistics.median(p for borda in bordas for p in borda.tobytes()))
+    
+    diferenca = ImageChops.difference(miniatura, Image.new('L', miniatura.size, fundo))
+    caixa = diferenca.point(lambda p: 255 if p > LIMIAR_FUNDO else 0).getbbox()
+    if not caixa:
+        return imagem
+    
+    area = (caixa[2] - caixa[0]) * (caixa[3] - caixa[1])
+    if not 0.1 < area / (largura * altura) < 0.9:
+        return imagem
+    
+    # Caixa da miniatura → coordenadas da imagem original, com margem
+    escala = imagem.width / largura
+    margem = MARGEM_RECORTE * max(imagem.size)
+    return imagem.crop((
+        max(0, int(caixa[0] * escala - margem)),
+        max(0, int(caixa[1] * escala - margem)),
+        min(imagem.width, int(caixa[2] * escala + margem)),
+        min(imagem.height, int(caixa[3] * escala + margem)),
+    ))
+
+
+def _quase_sem_cor(imagem: 'Image.Image') -> bool:
+    """True se a saturação média é baixa (cupom térmico, papel impresso em preto)."""
+    miniatura = imagem.copy()
+    miniatura.thumbnail((LADO_ANALISE, LADO_ANALISE))
+    saturacao = ImageStat.Stat(miniatura.convert('HSV').getchannel('S')).mean[0]
+    return saturacao < SATURACAO_CINZA
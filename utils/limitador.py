@@ -0,0 +1,270 @@
+"""
+Módulo de limitação de taxa das chamadas à API Groq.
+
+A Groq limita cada chave por requisições por minuto (RPM) e por tokens
+por minuto (TPM). LimitadorTokens implementa dois "baldes de fichas"
+(token bucket) compartilhados por todas as threads do processo: cada
+chamada retira uma requisição e uma estimativa de tokens, e os baldes são
+reabastecidos continuamente na taxa da cota. Assim o upload em massa pode
+processar vários arquivos em paralelo sem estourar a cota (erro 429),
+esperando apenas o necessário em vez de um intervalo fixo entre chamadas.
+
+A cota é da chave, não do processo: com vários workers do uWSGI/gunicorn e
+o scripts/worker_ocr.py, cada um com o seu balde, a chave receberia N vezes
+a cota. LimitadorTokensSQLite guarda os baldes num arquivo SQLite
+compartilhado (GROQ_LIMITADOR=sqlite, o padrão); 'processo' mantém o
+balde em memória, para quando só um processo chama a Groq.
+
+Uso:
+    >>> limitador = get_limitador_groq()
+    >>> if limitador.adquirir(tokens=2000, timeout=60):
+    ...     resposta = client.chat.completions.create(...)
+    ...     limitador.ajustar(resposta.usage.total_tokens, estimado=2000)
+"""
+
+# 1. Bibliotecas padrão
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+# 3. Imports locais
+from config import Config
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+
+class LimitadorTokens:
+    """
+    Token bucket duplo (requisições e tokens por minuto), seguro entre threads.
+    
+    Os baldes começam cheios (permitem uma rajada do tamanho da cota) e se
+    reabastecem proporcionalmente ao tempo decorrido.
+    
+    Attributes:
+        requisicoes_por_minuto: Cota de requisições (RPM)
+        tokens_por_minuto: Cota de tokens (TPM)
+    """
+    
+    def __init__(
+        self,
+        requisicoes_por_minuto: int,
+        tokens_por_minuto: int,
+        relogio: Callable[[], float] = time.monotonic
+    ):
+        self.requisicoes_por_minuto = requisicoes_por_minuto
+        self.tokens_por_minuto = tokens_por_minuto
+        self._relogio = relogio
+        self._trava = threading.Lock()
+        
+        self._requisicoes = float(requisicoes_por_minuto)
+        self._tokens = float(tokens_por_minuto)
+        self._ultima_reposicao = relogio()
+    
+    @contextmanager
+    def _estado(self):
+        """Acesso exclusivo aos baldes (aqui, a trava entre as threads do processo)."""
+        with self._trava:
+            yield
+    
+    def _repor(self) -> None:
+        """Reabastece os baldes pelo tempo decorrido (chamar dentro de _estado)."""
+        agora = self._relogio()
+        decorrido = max(0.0, agora - self._ultima_reposicao)
+        self._ultima_reposicao = agora
+        
+        self._requisicoes = min(
+            self.requisicoes_por_minuto,
+            self._requisicoes + decorrido * self.requisicoes_por_minuto / 60
+        )
+        self._tokens = min(
+            self.tokens_por_minuto,
+            self._tokens + decorrido * self.tokens_por_minuto / 60
+        )
+    
+    def _espera_necessaria(self, tokens: int) -> float:
+        """Segundos até os dois baldes comportarem a chamada (0 = agora)."""
+        falta_requisicoes = max(0.0, 1 - self._requisicoes)
+        falta_tokens = max(0.0, tokens - self._tokens)
+        
+        return max(
+            falta_requisicoes * 60 / self.requisicoes_por_minuto,
+            falta_tokens * 60 / self.tokens_por_minuto
+        )
+    
+    def tentar_adquirir(self, tokens: int) -> float:
+        """
+        Retira uma requisição e os tokens se houver saldo, sem bloquear.
+        
+        Args:
+            tokens: Estimativa de tokens da chamada (entrada + saída)
+        
+        Returns:
+            float: 0 se adquiriu, ou os segundos de espera até haver saldo
+        """
+        # Uma chamada maior que a cota inteira nunca caberia no balde
+        tokens = min(tokens, self.tokens_por_minuto)
+        
+        with self._estado():
+            self._repor()
+            espera = self._espera_necessaria(tokens)
+            if espera <= 0:
+                self._requisicoes -= 1
+                self._tokens -= tokens
+            return espera
+    
+    def folga(self) -> float:
+        """
+        Fração livre da cota agora (0 = esgotada, 1 = cheia), sem retirar nada.
+        
+        Returns:
+            float: O menor saldo relativo entre requisições e tokens
+        """
+        with self._estado():
+            self._repor()
+            return max(0.0, min(
+                self._requisicoes / self.requisicoes_por_minuto,
+                self._tokens / self.tokens_por_minuto
+            ))
+    
+    def adquirir(self, tokens: int, timeout: Optional[float] = None) -> bool:
+        """
+        Bloqueia até haver saldo para a chamada (ou até o timeout).
+        
+        Args:
+            tokens: Estimativa de tokens da chamada (entrada + saída)
+            timeout: Espera máxima em segundos (None = sem limite)
+        
+        Returns:
+            bool: True se adquiriu, False se a espera excederia o timeout
+        """
+        limite = None if timeout is None else self._relogio() + timeout
+        
+        while True:
+            espera = self.tentar_adquirir(tokens)
+            if espera <= 0:
+                return True
+            
+            if limite is not None:
+                restante = limite - self._relogio()
+                if espera > restante:
+                    logger.warning(f"Cota da Groq esgotada: espera de {espera:.1f}s excede o limite")
+                    return False
+            
+            logger.debug(f"Aguardando cota da Groq: {espera:.1f}s")
+            time.sleep(espera)
+    
+    def ajustar(self, tokens_reais: Optional[int], estimado: int) -> None:
+        """
+        Corrige o balde de tokens com o consumo real informado pela API.
+        
+        Args:
+            tokens_reais: usage.total_tokens da resposta (None = mantém a estimativa)
+            estimado: Valor passado em adquirir()
+        """
+        if tokens_reais is None:
+            return
+        
+        with self._estado():
+            self._tokens = min(self.tokens_por_minuto, self._tokens + estimado - tokens_reais)
+
+
+class LimitadorTokensSQLite(LimitadorTokens):
+    """
+    LimitadorTokens com os baldes num arquivo SQLite, compartilhado entre processos.
+    
+    Cada operação lê e grava o saldo numa transação BEGIN IMMEDIATE (o
+    SQLite serializa os processos); a trava da classe base serializa as
+    threads do processo. O relógio precisa ser o mesmo para todos os
+    processos, por isso o padrão é time.time e não time.monotonic.
+    
+    Attributes:
+        caminho: Arquivo do banco com os baldes
+    """
+    
+    def __init__(
+        self,
+        caminho: Path,
+        requisicoes_por_minuto: int,
+        tokens_por_minuto: int,
+        relogio: Callable[[], float] = time.time
+    ):
+        super().__init__(requisicoes_por_minuto, tokens_por_minuto, relogio)
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        
+        conexao = sqlite3.connect(self.caminho, timeout=5)
+        try:
+            with conexao:
+                conexao.execute("PRAGMA journal_mode=WAL")
+                conexao.execute(
+                    "CREATE TABLE IF NOT EXISTS baldes ("
+                    " id INTEGER PRIMARY KEY, requisicoes REAL NOT NULL,"
+                    " tokens REAL NOT NULL, ultima_reposicao REAL NOT NULL)"
+                )
+        finally:
+            conexao.close()
+    
+    @contextmanager
+    def _estado(self):
+        """Carrega os baldes do arquivo e grava o novo saldo ao final, na mesma transação."""
+        with self._trava:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            try:
+                conexao.execute("BEGIN IMMEDIATE")
+                linha = conexao.execute(
+                    "SELECT requisicoes, tokens, ultima_reposicao FROM baldes WHERE id = 1"
+                ).fetchone()
+                if linha:
+                    self._requisicoes, self._tokens, self._ultima_reposicao = linha
+                
+                try:
+                    yield
+                except BaseException:
+                    conexao.execute("ROLLBACK")
+                    raise
+                
+                conexao.execute(
+                    "INSERT OR REPLACE INTO baldes (id, requisicoes, tokens, ultima_reposicao) VALUES (1, ?, ?, ?)",
+                    (self._requisicoes, self._tokens, self._ultima_reposicao)
+                )
+                conexao.execute("COMMIT")
+            finally:
+                conexao.close()
+
+
+# Limitador do processo, compartilhado por todas as threads
+_limitador_groq: Optional[LimitadorTokens] = None
+_limitador_trava = threading.Lock()
+
+
+def get_limitador_groq() -> LimitadorTokens:
+    """
+    Retorna o limitador singleton configurado com GROQ_RPM e GROQ_TPM.
+    
+    Com GROQ_LIMITADOR=sqlite (padrão) os baldes ficam em
+    GROQ_LIMITADOR_ARQUIVO e valem para todos os processos; com 'processo',
+    só para as threads deste.
+    
+    Returns:
+        LimitadorTokens: Instância compartilhada do processo
+    """
+    global _limitador_groq
+    if _limitador_groq is None:
+        with _limitador_trava:
+            if _limitador_groq is None:
+                if Config.GROQ_LIMITADOR == 'sqlite':
+                    _limitador_groq = LimitadorTokensSQLite(
+                        Config.GROQ_LIMITADOR_ARQUIVO, Config.GROQ_RPM, Config.GROQ_TPM
+                    )
+                else:
+                    _limitador_groq = LimitadorTokens(Config.GROQ_RPM, Config.GROQ_TPM)
+                logger.info(
+                    f"Limitador Groq ({Config.GROQ_LIMITADOR}): "
+                    f"{Config.GROQ_RPM} RPM, {Config.GROQ_TPM} TPM"
+                )
+    return _limitador_groq
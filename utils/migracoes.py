@@ -0,0 +1,225 @@
+"""
+Módulo de migrações do banco de dados do GestorBot.
+
+O db.create_all() só cria tabelas que ainda não existem; alterações em
+tabelas já existentes (como novos índices) precisam ser aplicadas aqui.
+Cada migração é idempotente, então aplicar_migracoes() pode ser chamada
+a cada inicialização sem risco para os dados.
+
+Uso:
+    >>> with app.app_context():
+    ...     db.create_all()
+    ...     aplicar_migracoes()
+"""
+
+# 1. Bibliotecas padrão
+import logging
+import re
+
+# 2. Bibliotecas externas
+from sqlalchemy import func, inspect, text
+
+# 3. Imports locais
+from models import db, Transacao, ResumoTransacao, SQL_RESUMOS, criar_indice_busca, criar_triggers_resumos
+from utils.helpers import para_centavos
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+
+def _converter_valores_para_centavos() -> list:
+    """
+    Troca a coluna REAL transacoes.valor pela coluna inteira valor_centavos.
+    
+    A conversão é feita em Python (para_centavos) para arredondar pela
+    representação decimal, e não pelo binário do float. Os índices sobre
+    'valor' são removidos antes do DROP COLUMN (SQLite >= 3.35) e recriados
+    sobre valor_centavos pela migração seguinte. Como a tabela não é
+    recriada, os triggers de busca e de versão dos dados continuam válidos.
+    
+    A tabela de rollup antiga (coluna 'total' em REAL) é recriada vazia e
+    repopulada por _criar_triggers_resumos. Os triggers do rollup são
+    removidos antes da conversão, para o UPDATE de valor_centavos não
+    gerar deltas; a migração seguinte os recria.
+    
+    Returns:
+        list: Tabelas convertidas
+    """
+    inspetor = inspect(db.engine)
+    convertidas = []
+    
+    colunas = {coluna['name'] for coluna in inspetor.get_columns(Transacao.__tablename__)}
+    if 'valor_centavos' not in colunas:
+        indices_valor = [
+            indice['name'] for indice in inspetor.get_indexes(Transacao.__tablename__)
+            if 'valor' in indice['column_names']
+        ]
+        
+        with db.engine.begin() as conexao:
+            for nome in _nomes_triggers_resumos():
+                conexao.execute(text(f'DROP TRIGGER IF EXISTS "{nome}"'))
+            conexao.execute(text(
+                "ALTER TABLE transacoes ADD COLUMN valor_centavos INTEGER NOT NULL DEFAULT 0"
+            ))
+            
+            linhas = conexao.execute(text("SELECT id, valor FROM transacoes WHERE valor IS NOT NULL")).all()
+            if linhas:
+                conexao.execute(
+                    text("UPDATE transacoes SET valor_centavos = :centavos WHERE id = :id"),
+                    [{'id': id_transacao, 'centavos': para_centavos(valor)} for id_transacao, valor in linhas]
+                )
+            
+            for nome in indices_valor:
+                conexao.execute(text(f'DROP INDEX IF EXISTS "{nome}"'))
+            conexao.execute(text("ALTER TABLE transacoes DROP COLUMN valor"))
+        
+        convertidas.append(Transacao.__tablename__)
+    
+    colunas_resumo = {coluna['name'] for coluna in inspetor.get_columns(ResumoTransacao.__tablename__)}
+    if colunas_resumo and 'total_centavos' not in colunas_resumo:
+        ResumoTransacao.__table__.drop(bind=db.engine)
+        ResumoTransacao.__table__.create(bind=db.engine)
+        convertidas.append(ResumoTransacao.__tablename__)
+    
+    return convertidas
+
+
+def _criar_indices_transacoes() -> list:
+    """
+    Cria os índices declarados em Transacao que ainda não existem no banco.
+    
+    Returns:
+        list: Nomes dos índices criados
+    """
+    existentes = {
+        indice['name'] for indice in inspect(db.engine).get_indexes(Transacao.__tablename__)
+    }
+    
+    criados = []
+    for indice in Transacao.__table__.indexes:
+        if indice.name not in existentes:
+            indice.create(bind=db.engine)
+            criados.append(indice.name)
+    
+    return criados
+
+
+def _nomes_triggers_resumos() -> list:
+    """Nomes dos triggers declarados em SQL_RESUMOS."""
+    return [re.search(r'IF NOT EXISTS (\w+)', sql).group(1) for sql in SQL_RESUMOS]
+
+
+def _criar_triggers_resumos() -> int:
+    """
+    Cria os triggers do rollup em bancos que ainda não os têm.
+    
+    Até então o rollup era mantido por um listener da sessão, que não via
+    query.delete(), query.update() nem SQL direto: por isso ele é
+    reconstruído junto com a criação dos triggers.
+    
+    Returns:
+        int: Linhas de resumo geradas (0 se os triggers já existiam)
+    """
+    from services.resumo_service import reconstruir_resumos
+    
+    existentes = set(db.session.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    ).scalars())
+    if set(_nomes_triggers_resumos()) <= existentes:
+        return 0
+    
+    # Mesma transação da reconstrução (que faz o commit)
+    criar_triggers_resumos(db.session)
+    return reconstruir_resumos()
+
+
+def _popular_resumos() -> int:
+    """
+    Preenche a tabela de rollup em bancos que já tinham transações.
+    
+    Returns:
+        int: Linhas de resumo geradas (0 se o rollup já estava populado)
+    """
+    from services.resumo_service import reconstruir_resumos
+    
+    tem_resumos = db.session.query(ResumoTransacao.id).first() is not None
+    tem_transacoes = db.session.query(func.count(Transacao.id)).scalar() > 0
+    
+    if tem_resumos or not tem_transacoes:
+        return 0
+    
+    return reconstruir_resumos()
+
+
+def _adicionar_texto_comprovante() -> list:
+    """
+    Adiciona a coluna texto_comprovante em bancos criados antes dela.
+    
+    Returns:
+        list: Colunas adicionadas
+    """
+    colunas = {coluna['name'] for coluna in inspect(db.engine).get_columns(Transacao.__tablename__)}
+    
+    if 'texto_comprovante' in colunas:
+        return []
+    
+    with db.engine.begin() as conexao:
+        conexao.execute(text("ALTER TABLE transacoes ADD COLUMN texto_comprovante TEXT"))
+    return ['texto_comprovante']
+
+
+def _criar_indice_busca() -> int:
+    """
+    Cria o índice FTS5 em bancos existentes e indexa as transações atuais.
+    
+    Returns:
+        int: Transações indexadas (0 se o índice já existia)
+    """
+    if 'transacoes_fts' in inspect(db.engine).get_table_names():
+        return 0
+    
+    with db.engine.begin() as conexao:
+        criar_indice_busca(conexao)
+        # 'rebuild' relê todo o conteúdo da tabela transacoes
+        conexao.execute(text("INSERT INTO transacoes_fts(transacoes_fts) VALUES ('rebuild')"))
+    
+    return db.session.query(func.count(Transacao.id)).scalar()
+
+
+# Migrações na ordem em que devem ser aplicadas: (nome, função)
+MIGRACOES = [
+    ('valores_em_centavos', _converter_valores_para_centavos),
+    ('indices_transacoes', _criar_indices_transacoes),
+    ('triggers_resumos', _criar_triggers_resumos),
+    ('resumos_transacoes', _popular_resumos),
+    ('texto_comprovante', _adicionar_texto_comprovante),
+    ('indice_busca', _criar_indice_busca),
+]
+
+
+def aplicar_migracoes() -> dict:
+    """
+    Aplica todas as migrações pendentes no banco atual.
+    
+    Deve ser chamada dentro de um app_context, depois do db.create_all().
+    
+    Returns:
+        dict: {nome_migracao: resultado} para as migrações que alteraram algo
+    """
+    aplicadas = {}
+    
+    for nome, migracao in MIGRACOES:
+        try:
+            resultado = migracao()
+        except Exception as e:
+            logger.error(f"Erro na migração '{nome}': {e}")
+            raise
+        
+        if resultado:
+            aplicadas[nome] = resultado
+            logger.info(f"Migração '{nome}' aplicada: {resultado}")
+    
+    if not aplicadas:
+        logger.info("Banco de dados já está atualizado")
+    
+    return aplicadas
@@ -1,19 +1,55 @@
 """
 Módulo de conversão de PDF para imagem.
 
-Utiliza PyMuPDF (fitz) para converter a primeira página de um PDF
-em uma imagem JPEG para processamento pelo OCR.
+Utiliza PyMuPDF (fitz) para converter as páginas de um PDF em imagens
+JPEG para processamento pelo OCR, e para ler a camada de texto de PDFs
+digitais (que dispensa o modelo de visão no OCR).
+
+Notas de fornecedor com várias páginas costumam trazer o total na
+última: renderizar_paginas_pdf() renderiza até OCR_PDF_MAX_PAGINAS
+páginas em paralelo, num pool de processos (a renderização é CPU pura
+e não libera o GIL).
+
+Com OCR_PDF_RENDER_ADAPTATIVO, cada página é renderizada:
+    - no DPI que deixa o corpo do texto com ~ALTURA_TEXTO_ALVO px (ou na
+      resolução nativa da imagem, em PDFs escaneados)
+    - recortada na caixa do conteúdo (sem as margens em branco)
+    - em tons de cinza quando não tem cor relevante
+Comparativo de tamanho e tempo: scripts/benchmark_render_pdf.py.
 """
 
 # 1. Bibliotecas padrão
 import base64
 import io
 import logging
-from typing import Optional, Tuple
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+
+# 3. Imports locais
+from config import Config
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
+# Mínimo de letras/dígitos para considerar que o PDF tem camada de texto
+MINIMO_CARACTERES_TEXTO = 40
+
+# Renderização: DPI fixo (modo antigo) e limites do DPI adaptativo
+DPI_PADRAO = 150
+DPI_MINIMO = 96
+DPI_MAXIMO = 200
+# Altura (px) desejada para o corpo do texto na imagem renderizada
+ALTURA_TEXTO_ALVO = 16
+# Margem (pt) mantida em volta da caixa do conteúdo
+MARGEM_CONTEUDO = 12
+# Cor: diferença entre canais (0-255) para um pixel contar como colorido,
+# e fração de pixels coloridos a partir da qual a página fica em RGB
+LIMIAR_COR = 40
+PROPORCAO_COR = 0.01
+
 # Tentar importar PyMuPDF
 try:
     import fitz  # PyMuPDF
@@ -26,72 +62,291 @@ except ImportError:
     )
 
 
-def converter_pdf_para_imagem(pdf_base64: str, dpi: int = 150) -> Optional[str]:
+def renderizar_pdf(pdf_bytes: bytes, dpi: Optional[int] = None) -> Optional[bytes]:
+    """
+    Renderiza a primeira página de um PDF como JPEG.
+    
+    Args:
+        pdf_bytes: Conteúdo binário do PDF (ex: ArquivoUpload.conteudo)
+        dpi: Resolução fixa da imagem; None = adaptativa (ou DPI_PADRAO se
+            OCR_PDF_RENDER_ADAPTATIVO estiver desligado)
+    
+    Returns:
+        bytes: Imagem JPEG, ou None se falhar
+    """
+    if not PYMUPDF_DISPONIVEL:
+        logger.error("PyMuPDF não está disponível para conversão de PDF")
+        return None
+    
+    img_bytes = _renderizar_pagina(pdf_bytes, 0, _dpi_configurado(dpi))
+    if img_bytes:
+        logger.info(f"PDF convertido para imagem: {len(img_bytes)} bytes")
+    return img_bytes
+
+
+def renderizar_paginas_pdf(
+    pdf_bytes: bytes,
+    paginas: Optional[Sequence[int]] = None,
+    dpi: Optional[int] = None
+) -> List[bytes]:
     """
-    Converte a primeira página de um PDF para imagem JPEG em base64.
+    Renderiza várias páginas de um PDF como JPEG, em paralelo.
+    
+    Cada página é renderizada por um processo do pool, que abre o PDF,
+    gera só aquela página e descarta o pixmap logo após o JPEG: a memória
+    fica limitada a uma página por processo, mais os JPEGs já prontos.
+    Com uma página só, ou OCR_PDF_PROCESSOS=0 (padrão fora do
+    scripts/worker_ocr.py), renderiza no próprio processo.
+    
+    Args:
+        pdf_bytes: Conteúdo binário do PDF
+        paginas: Índices das páginas (0 = primeira; negativos contam do fim).
+            None = as primeiras OCR_PDF_MAX_PAGINAS
+        dpi: Resolução fixa das imagens; None = adaptativa por página (ou
+            DPI_PADRAO se OCR_PDF_RENDER_ADAPTATIVO estiver desligado)
+    
+    Returns:
+        list: JPEGs das páginas na ordem pedida (páginas que falharam ficam
+            de fora); lista vazia se o PDF não abrir
+    """
+    if not PYMUPDF_DISPONIVEL:
+        logger.error("PyMuPDF não está disponível para conversão de PDF")
+        return []
+    
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as documento:
+            total = documento.page_count
+    except Exception as e:
+        logger.error(f"Erro ao abrir PDF: {e}")
+        return []
+    
+    indices = _selecionar_paginas(total, paginas)
+    if not indices:
+        logger.warning("PDF não contém páginas")
+        return []
+    
+    dpi = _dpi_configurado(dpi)
+    imagens = None
+    if len(indices) > 1 and Config.OCR_PDF_PROCESSOS > 0:
+        try:
+            imagens = list(_get_pool().map(_renderizar_pagina, repeat(pdf_bytes), indices, repeat(dpi)))
+        except Exception as e:
+            # Pool quebrado (processo morto, ambiente sem fork/spawn): segue sem ele
+            logger.warning(f"Falha no pool de renderização, renderizando em sequência: {e}")
+            _descartar_pool()
+    
+    if imagens is None:
+        imagens = [_renderizar_pagina(pdf_bytes, indice, dpi) for indice in indices]
+    
+    imagens = [imagem for imagem in imagens if imagem]
+    logger.info(f"PDF convertido: {len(imagens)} de {total} página(s), {sum(map(len, imagens))} bytes")
+    return imagens
+
+
+def _selecionar_paginas(total: int, paginas: Optional[Sequence[int]]) -> List[int]:
+    """Índices válidos e sem repetição, no máximo OCR_PDF_MAX_PAGINAS."""
+    if paginas is None:
+        paginas = range(total)
+    
+    indices = []
+    for pagina in paginas:
+        indice = pagina + total if pagina < 0 else pagina
+        if 0 <= indice < total and indice not in indices:
+            indices.append(indice)
+    return indices[:max(1, Config.OCR_PDF_MAX_PAGINAS)]
+
+
+def _dpi_configurado(dpi: Optional[int]) -> Optional[int]:
+    """
+    DPI a repassar para _renderizar_pagina (None = adaptativo).
+    
+    Decidido aqui, no processo principal: os processos do pool leem a
+    configuração do ambiente, não os valores alterados em tempo de execução.
+    """
+    if dpi is None and not Config.OCR_PDF_RENDER_ADAPTATIVO:
+        return DPI_PADRAO
+    return dpi
+
+
+def _renderizar_pagina(pdf_bytes: bytes, indice: int, dpi: Optional[int]) -> Optional[bytes]:
+    """
+    Renderiza uma página como JPEG (executada nos processos do pool).
+    
+    Args:
+        pdf_bytes: Conteúdo binário do PDF
+        indice: Página (0 = primeira)
+        dpi: Resolução fixa, página inteira e colorida; None = adaptativo
+            (DPI pelo texto, recorte no conteúdo e cinza sem cor)
+    
+    Returns:
+        bytes: Imagem JPEG, ou None se falhar
+    """
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as documento:
+            if indice >= documento.page_count:
+                return None
+            
+            pagina = documento[indice]
+            if dpi is None:
+                recorte = _caixa_conteudo(pagina)
+                dpi = _dpi_adaptativo(pagina, recorte or pagina.rect)
+                cores = fitz.csRGB if _tem_cor(pagina) else fitz.csGRAY
+                qualidade = Config.OCR_IMAGEM_QUALIDADE
+            else:
+                recorte, cores, qualidade = None, fitz.csRGB, 95  # 95 = padrão do PyMuPDF
+            
+            # Renderiza como imagem (matriz de zoom baseada no DPI)
+            zoom = dpi / 72  # 72 é o DPI padrão do PDF
+            pixmap = pagina.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=recorte, colorspace=cores)
+            img_bytes = pixmap.tobytes("jpeg", jpg_quality=qualidade)
+            pixmap = None  # Libera o bitmap antes de fechar o documento
+        return img_bytes
+        
+    except Exception as e:
+        logger.error(f"Erro ao converter página {indice + 1} do PDF para imagem: {e}")
+        return None
+
+
+def _dpi_adaptativo(pagina: 'fitz.Page', area: 'fitz.Rect') -> int:
+    """
+    DPI que deixa o texto legível sem pixels sobrando.
+    
+    PDF digital: o corpo do texto (mediana do tamanho da fonte, ponderada
+    pelos caracteres) fica com ALTURA_TEXTO_ALVO px. PDF escaneado: a
+    resolução nativa da maior imagem (renderizar acima dela não acrescenta
+    detalhe). Sempre entre DPI_MINIMO e DPI_MAXIMO, e sem passar de
+    OCR_IMAGEM_LADO_MAXIMO px no lado maior da área renderizada (o
+    pré-processamento reduziria a imagem de qualquer forma).
+    """
+    tamanhos = []
+    for bloco in pagina.get_text('dict')['blocks']:
+        for linha in bloco.get('lines', []):
+            for trecho in linha['spans']:
+                caracteres = len(trecho['text'].strip())
+                if caracteres and trecho['size'] > 0:
+                    tamanhos.append((trecho['size'], caracteres))
+    
+    dpi = DPI_PADRAO
+    if tamanhos:
+        tamanhos.sort()
+        metade, acumulado = sum(c for _, c in tamanhos) / 2, 0
+        for tamanho, caracteres in tamanhos:
+            acumulado += caracteres
+            if acumulado >= metade:
+                break
+        dpi = ALTURA_TEXTO_ALVO * 72 / tamanho
+    else:
+        imagens = [i for i in pagina.get_image_info() if fitz.Rect(i['bbox']).width > 0]
+        if imagens:
+            maior = max(imagens, key=lambda i: abs(fitz.Rect(i['bbox'])))
+            dpi = maior['width'] * 72 / fitz.Rect(maior['bbox']).width
+    
+    dpi_lado_maximo = Config.OCR_IMAGEM_LADO_MAXIMO * 72 / max(area.width, area.height)
+    return int(min(DPI_MAXIMO, dpi_lado_maximo, max(DPI_MINIMO, dpi)))
+
+
+def _caixa_conteudo(pagina: 'fitz.Page') -> Optional['fitz.Rect']:
+    """
+    Caixa que envolve texto, imagens e desenhos da página, com margem.
+    
+    Fundos que cobrem a página inteira são ignorados. Retorna None (página
+    inteira) quando não há ganho relevante ou a página é rotacionada.
+    """
+    if pagina.rotation:
+        return None
+    
+    area_pagina = abs(pagina.rect)
+    caixa = fitz.Rect()
+    for _, retangulo in pagina.get_bboxlog():
+        retangulo = fitz.Rect(retangulo) & pagina.rect
+        if not retangulo.is_empty and abs(retangulo) < 0.95 * area_pagina:
+            caixa |= retangulo
+    
+    if caixa.is_empty:
+        return None
+    
+    caixa = (caixa + (-MARGEM_CONTEUDO, -MARGEM_CONTEUDO, MARGEM_CONTEUDO, MARGEM_CONTEUDO)) & pagina.rect
+    return caixa if abs(caixa) < 0.9 * area_pagina else None
+
+
+def _tem_cor(pagina: 'fitz.Page') -> bool:
+    """True se mais de PROPORCAO_COR dos pixels de uma miniatura são coloridos."""
+    miniatura = pagina.get_pixmap(matrix=fitz.Matrix(0.15, 0.15), colorspace=fitz.csRGB, alpha=False)
+    amostras = miniatura.samples
+    coloridos = sum(
+        1 for r, g, b in zip(amostras[0::3], amostras[1::3], amostras[2::3])
+        if max(r, g, b) - min(r, g, b) > LIMIAR_COR
+    )
+    return coloridos > PROPORCAO_COR * miniatura.width * miniatura.height
+
+
+# Pool de renderização do processo, criado no primeiro PDF com várias páginas
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_trava = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Retorna o pool singleton com OCR_PDF_PROCESSOS processos.
+    
+    Usa 'spawn': os workers do OCR são threads, e fork de um processo com
+    threads pode herdar travas presas. Só é criado no worker de OCR: no
+    uWSGI o spawn executaria o binário do servidor (sys.executable).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_trava:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=Config.OCR_PDF_PROCESSOS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"Pool de renderização de PDF: {Config.OCR_PDF_PROCESSOS} processos")
+    return _pool
+
+
+def _descartar_pool() -> None:
+    """Encerra o pool (o próximo PDF cria outro)."""
+    global _pool
+    with _pool_trava:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def converter_pdf_para_imagem(pdf_base64: str, dpi: Optional[int] = None) -> Optional[str]:
+    """
+    Converte a primeira página de um PDF em base64 para imagem JPEG em base64.
+    
+    Mantida por compatibilidade: o fluxo de upload usa renderizar_paginas_pdf()
+    direto sobre os bytes de ArquivoUpload, sem passar por base64.
     
     Args:
         pdf_base64: String base64 do PDF (com ou sem prefixo data:)
-        dpi: Resolução da imagem gerada (default: 150)
+        dpi: Resolução fixa da imagem; None = adaptativa (ver renderizar_pdf)
     
     Returns:
-        str: String base64 da imagem JPEG, ou None se falhar
+        str: Data URL base64 da imagem JPEG, ou None se falhar
     
     Example:
         >>> with open("nota.pdf", "rb") as f:
         ...     pdf_b64 = base64.b64encode(f.read()).decode()
         >>> img_b64 = converter_pdf_para_imagem(pdf_b64)
     """
-    if not PYMUPDF_DISPONIVEL:
-        logger.error("PyMuPDF não está disponível para conversão de PDF")
-        return None
-    
     try:
         # Remove prefixo data:xxx;base64, se existir
         if 'base64,' in pdf_base64:
             pdf_base64 = pdf_base64.split('base64,')[1]
-        
-        # Remove espaços e quebras de linha
-        pdf_base64 = pdf_base64.strip().replace('\n', '').replace('\r', '')
-        
-        # Decodifica base64
         pdf_bytes = base64.b64decode(pdf_base64)
-        
-        # Abre o PDF com PyMuPDF
-        documento = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        if documento.page_count == 0:
-            logger.warning("PDF não contém páginas")
-            documento.close()
-            return None
-        
-        # Pega a primeira página
-        pagina = documento[0]
-        
-        # Renderiza como imagem (matriz de zoom baseada no DPI)
-        zoom = dpi / 72  # 72 é o DPI padrão do PDF
-        matriz = fitz.Matrix(zoom, zoom)
-        
-        # Gera o pixmap (imagem)
-        pixmap = pagina.get_pixmap(matrix=matriz)
-        
-        # Converte para bytes JPEG
-        img_bytes = pixmap.tobytes("jpeg")
-        
-        # Fecha o documento
-        documento.close()
-        
-        # Converte para base64
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-        
-        logger.info(f"PDF convertido para imagem: {len(img_bytes)} bytes")
-        
-        # Retorna com prefixo data:image
-        return f"data:image/jpeg;base64,{img_base64}"
-        
     except Exception as e:
-        logger.error(f"Erro ao converter PDF para imagem: {e}")
+        logger.error(f"Erro ao decodificar PDF: {e}")
+        return None
+    
+    img_bytes = renderizar_pdf(pdf_bytes, dpi)
+    if img_bytes is None:
         return None
+    
+    return f"data:image/jpeg;base64,{base64.b64encode(img_bytes).decode('utf-8')}"
 
 
 def eh_pdf(arquivo_base64: str) -> bool:
@@ -157,3 +412,52 @@ def obter_info_pdf(pdf_base64: str) -> Optional[dict]:
     except Exception as e:
         logger.error(f"Erro ao obter info do PDF: {e}")
         return None
+
+
+def extrair_texto_pdf(pdf_bytes: bytes, max_paginas: int = 5) -> str:
+    """
+    Extrai a camada de texto de um PDF (PDFs digitais, não escaneados).
+    
+    Args:
+        pdf_bytes: Conteúdo binário do PDF
+        max_paginas: Número máximo de páginas lidas
+    
+    Returns:
+        str: Texto das páginas separado por quebras de linha ('' se não houver)
+    """
+    if not PYMUPDF_DISPONIVEL:
+        return ''
+    
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as documento:
+            # sort=True: ordem de leitura (rótulo e valor da mesma linha ficam juntos)
+            paginas = [
+                documento[i].get_text(sort=True).strip()
+                for i in range(min(documento.page_count, max_paginas))
+            ]
+        
+        return '\n'.join(p for p in paginas if p)
+        
+    except Exception as e:
+        logger.error(f"Erro ao extrair texto do PDF: {e}")
+        return ''
+
+
+def extrair_texto_digital(pdf_bytes: bytes, max_paginas: int = 2) -> Optional[str]:
+    """
+    Retorna a camada de texto de um PDF gerado digitalmente.
+    
+    PDFs escaneados (só imagem) não têm texto, ou têm apenas alguns
+    caracteres soltos; nesses casos retorna None e o OCR segue pela visão.
+    
+    Args:
+        pdf_bytes: Conteúdo binário do PDF
+        max_paginas: Número máximo de páginas lidas (comprovantes são curtos)
+    
+    Returns:
+        str: Texto extraído, ou None se o PDF não tiver texto suficiente
+    """
+    texto = extrair_texto_pdf(pdf_bytes, max_paginas)
+    if sum(c.isalnum() for c in texto) < MINIMO_CARACTERES_TEXTO:
+        return None
+    return texto
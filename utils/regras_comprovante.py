@@ -0,0 +1,242 @@
+"""
+Motor de regras para extrair dados do texto de comprovantes em PDF.
+
+Contas de consumo, boletos e comprovantes de PIX/TED costumam ser PDFs
+gerados digitalmente, com camada de texto. Nesses casos data, valor e
+beneficiário/pagador podem ser lidos por regras locais, sem enviar o
+documento ao modelo de visão.
+
+As regras procuram rótulos conhecidos ("Valor pago", "Data do pagamento",
+"Beneficiário"...) em ordem de prioridade e leem o valor na mesma linha ou
+nas linhas seguintes. Quando algum campo não é encontrado com segurança, a
+função retorna None e o GroqService segue para o modelo (texto ou visão).
+
+Uso:
+    >>> extrair_campos_despesa(texto)
+    {'data': '2025-10-12', 'estabelecimento': 'CELESC', 'valor_total': 231.4}
+"""
+
+# 1. Bibliotecas padrão
+import re
+import unicodedata
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+# 3. Imports locais
+from utils.helpers import formatar_valor
+
+# Valores em reais: 1.234,56 / 1234,56 / R$ 12,30
+PADRAO_VALOR = re.compile(r'(?<![\d.,])(\d{1,3}(?:\.\d{3})+,\d{2}|\d+,\d{2})(?![\d,])')
+
+# Datas: 12/10/2025, 12/10/25, 12-10-2025, 12.10.2025, 2025-10-12, 12 out 2025, 12 de outubro de 2025
+PADRAO_DATA_NUMERICA = re.compile(r'(?<!\d)(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})(?!\d)')
+PADRAO_DATA_ISO = re.compile(r'(?<!\d)(\d{4})-(\d{2})-(\d{2})(?!\d)')
+PADRAO_DATA_EXTENSO = re.compile(
+    r'(?<!\d)(\d{1,2})\s*(?:de\s+)?(jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez)[a-z]*\.?\s*(?:de\s+)?(\d{4})(?!\d)'
+)
+MESES = ('jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez')
+
+# Rótulos por prioridade (texto sem acentos e em minúsculas)
+ROTULOS_VALOR = (
+    ('valor pago', 'total pago', 'valor do pagamento', 'valor da transferencia', 'valor transferido',
+     'valor do pix', 'valor enviado', 'valor recebido', 'valor creditado'),
+    ('valor total', 'total a pagar', 'valor a pagar', 'valor cobrado', 'total geral', 'valor do documento'),
+    ('total', 'valor'),
+)
+ROTULOS_DATA = (
+    ('data do pagamento', 'data de pagamento', 'pago em', 'data da transferencia', 'data da transacao',
+     'data do pix', 'data da operacao', 'realizado em', 'efetuado em', 'data/hora', 'data e hora'),
+    ('data de emissao', 'data da emissao', 'emissao', 'data'),
+    ('vencimento',),
+)
+ROTULOS_BENEFICIARIO = (
+    ('beneficiario', 'favorecido', 'recebedor', 'destinatario', 'nome do recebedor', 'cedente', 'razao social'),
+    ('para', 'destino', 'estabelecimento', 'empresa', 'loja'),
+)
+ROTULOS_PAGADOR = (
+    ('pagador', 'nome do pagador', 'remetente', 'quem pagou', 'enviado por', 'ordenante'),
+    ('de', 'origem'),
+)
+
+# Tipo de pagamento pelas palavras do comprovante (ordem importa: PIX antes de transferência)
+TIPOS_PAGAMENTO = (
+    ('PIX', r'\bpix\b'),
+    ('Transferência', r'\b(ted|doc|transferencia|deposito)\b'),
+    ('Cartão', r'\b(cartao|credito|debito|visa|mastercard|maquininha)\b'),
+    ('Vendas', r'\b(cupom fiscal|nota fiscal|venda|recibo)\b'),
+)
+
+# Linhas seguintes ao rótulo onde o valor ainda pode estar (layout em colunas)
+LINHAS_APOS_ROTULO = 2
+
+
+def extrair_campos_despesa(texto: str) -> Optional[dict]:
+    """
+    Extrai data, valor e beneficiário do texto de um comprovante de despesa.
+    
+    Args:
+        texto: Camada de texto do PDF
+    
+    Returns:
+        dict: {'data', 'estabelecimento', 'valor_total'} ou None se faltar algum campo
+    """
+    linhas = _linhas(texto)
+    data = _buscar_data(linhas)
+    valor = _buscar_valor(linhas)
+    nome = _buscar_nome(linhas, ROTULOS_BENEFICIARIO)
+    
+    if not (data and valor and nome):
+        return None
+    return {'data': data, 'estabelecimento': nome, 'valor_total': valor}
+
+
+def extrair_campos_receita(texto: str) -> Optional[dict]:
+    """
+    Extrai data, valor, pagador e tipo de pagamento de um comprovante de receita.
+    
+    Args:
+        texto: Camada de texto do PDF
+    
+    Returns:
+        dict: {'data', 'origem', 'valor', 'tipo_pagamento'} ou None se faltar algum campo
+    """
+    linhas = _linhas(texto)
+    data = _buscar_data(linhas)
+    valor = _buscar_valor(linhas)
+    nome = _buscar_nome(linhas, ROTULOS_PAGADOR)
+    
+    if not (data and valor and nome):
+        return None
+    return {'data': data, 'origem': nome, 'valor': valor, 'tipo_pagamento': tipo_pagamento(texto)}
+
+
+def tipo_pagamento(texto: str) -> str:
+    """Tipo de pagamento ('PIX', 'Transferência', ...) pelas palavras do texto."""
+    normalizado = _normalizar(texto)
+    for tipo, padrao in TIPOS_PAGAMENTO:
+        if re.search(padrao, normalizado):
+            return tipo
+    return 'Outros'
+
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas sem acentos, com o mesmo comprimento do original (índices batem)."""
+    return ''.join(unicodedata.normalize('NFKD', c)[:1] or c for c in texto).lower()
+
+
+def _linhas(texto: str) -> List[Tuple[str, str]]:
+    """[(linha original, linha normalizada), ...] sem linhas vazias."""
+    return [(linha.strip(), _normalizar(linha.strip())) for linha in (texto or '').splitlines() if linha.strip()]
+
+
+def _apos_rotulo(linhas: List[Tuple[str, str]], rotulos: Iterable[str], exige_separador: bool = False):
+    """
+    Gera (índice, resto da linha após o rótulo) para as linhas que começam por um rótulo.
+    
+    Com exige_separador, o rótulo precisa terminar a linha ou vir seguido
+    de ':' ou '-' (para rótulos curtos e ambíguos como 'para' e 'de').
+    """
+    alternativas = '|'.join(re.escape(r) for r in sorted(rotulos, key=len, reverse=True))
+    fim = r'\s*(?:[:\-]\s*|$)' if exige_separador else r'\b\s*[:\-]?\s*'
+    padrao = re.compile(rf'^(?:{alternativas}){fim}')
+    
+    for indice, (original, normalizada) in enumerate(linhas):
+        encontrado = padrao.match(normalizada)
+        if encontrado:
+            yield indice, original[encontrado.end():].strip()
+
+
+def _buscar_valor(linhas: List[Tuple[str, str]]) -> Optional[float]:
+    """Primeiro valor positivo após o rótulo de maior prioridade encontrado."""
+    for grupo in ROTULOS_VALOR:
+        # Rótulos de valor também aparecem no meio da linha ("TOTAL R$ 42,50")
+        padrao = re.compile(r'\b(?:' + '|'.join(re.escape(r) for r in grupo) + r')\b')
+        for indice, (original, normalizada) in enumerate(linhas):
+            encontrado = padrao.search(normalizada)
+            if not encontrado or 'subtotal' in normalizada:
+                continue
+            trechos = [original[encontrado.end():]] + [o for o, _ in linhas[indice + 1:indice + 1 + LINHAS_APOS_ROTULO]]
+            for trecho in trechos:
+                valor = PADRAO_VALOR.search(trecho)
+                if valor and formatar_valor(valor.group(1)) > 0:
+                    return formatar_valor(valor.group(1))
+    return None
+
+
+def _buscar_data(linhas: List[Tuple[str, str]]) -> Optional[str]:
+    """
+    Data após o rótulo de maior prioridade; sem rótulo, a única data do texto.
+    
+    Returns:
+        str: Data no formato YYYY-MM-DD, ou None
+    """
+    for grupo in ROTULOS_DATA:
+        padrao = re.compile(r'\b(?:' + '|'.join(re.escape(r) for r in grupo) + r')\b')
+        for indice, (_, normalizada) in enumerate(linhas):
+            encontrado = padrao.search(normalizada)
+            # "Data de vencimento" só vale no grupo do vencimento (última opção)
+            if not encontrado or ('vencimento' in normalizada and 'vencimento' not in grupo):
+                continue
+            trechos = [normalizada[encontrado.end():]] + [n for _, n in linhas[indice + 1:indice + 1 + LINHAS_APOS_ROTULO]]
+            for trecho in trechos:
+                datas = _datas(trecho)
+                if datas:
+                    return datas[0]
+    
+    distintas = set(d for _, normalizada in linhas for d in _datas(normalizada))
+    return distintas.pop() if len(distintas) == 1 else None
+
+
+def _datas(trecho: str) -> List[str]:
+    """Datas válidas (YYYY-MM-DD) encontradas no trecho, na ordem em que aparecem."""
+    candidatas = []
+    for encontrado in PADRAO_DATA_ISO.finditer(trecho):
+        candidatas.append((encontrado.start(), encontrado.group(1), encontrado.group(2), encontrado.group(3)))
+    for encontrado in PADRAO_DATA_NUMERICA.finditer(trecho):
+        dia, mes, ano = encontrado.groups()
+        candidatas.append((encontrado.start(), ano if len(ano) == 4 else f'20{ano}', mes, dia))
+    for encontrado in PADRAO_DATA_EXTENSO.finditer(trecho):
+        dia, mes, ano = encontrado.groups()
+        candidatas.append((encontrado.start(), ano, MESES.index(mes) + 1, dia))
+    
+    datas = []
+    for _, ano, mes, dia in sorted(candidatas):
+        try:
+            datas.append(date(int(ano), int(mes), int(dia)).strftime('%Y-%m-%d'))
+        except ValueError:
+            continue
+    return datas
+
+
+def _buscar_nome(linhas: List[Tuple[str, str]], rotulos: Tuple[tuple, tuple]) -> Optional[str]:
+    """Nome após o rótulo (mesma linha ou seguintes), ignorando CPF/CNPJ, datas e valores."""
+    explicitos, ambiguos = rotulos
+    ocorrencias = list(_apos_rotulo(linhas, explicitos)) + list(_apos_rotulo(linhas, ambiguos, exige_separador=True))
+    
+    for indice, resto in ocorrencias:
+        trechos = [resto] + [o for o, _ in linhas[indice + 1:indice + 1 + LINHAS_APOS_ROTULO]]
+        for trecho in trechos:
+            nome = _limpar_nome(trecho)
+            if nome:
+                return nome
+    return None
+
+
+def _limpar_nome(trecho: str) -> Optional[str]:
+    """Nome de pessoa/empresa no trecho, ou None se for outro rótulo, documento ou valor."""
+    nome = re.sub(r'^nome\s*[:\-]?\s*', '', trecho.strip(), flags=re.IGNORECASE).strip(' :-')
+    if not nome or nome.endswith(':') or len(nome) > 80:
+        return None
+    if PADRAO_VALOR.search(nome) or _datas(_normalizar(nome)):
+        return None
+    
+    # CPF/CNPJ, agência/conta e chaves: poucas letras
+    letras = sum(c.isalpha() for c in nome)
+    if letras < 3 or letras < len(nome.replace(' ', '')) / 2:
+        return None
+    
+    # Outro rótulo conhecido logo abaixo (ex: "Beneficiário" seguido de "CPF/CNPJ")
+    normalizado = _normalizar(nome)
+    if normalizado.split()[0] in ('cpf', 'cnpj', 'cpf/cnpj', 'instituicao', 'banco', 'agencia', 'conta', 'chave', 'tipo'):
+        return None
+    return nome
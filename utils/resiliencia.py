@@ -0,0 +1,444 @@
+"""
+Módulo de resiliência das chamadas à API Groq.
+
+Quando a Groq fica lenta ou instável, cada worker do OCR ficava preso numa
+única chamada sem prazo e, no erro, o arquivo falhava de vez. Este módulo
+envolve a chamada com:
+
+    - Prazo: cada tentativa tem timeout (GROQ_TIMEOUT) e o conjunto de
+      tentativas e esperas não passa de GROQ_PRAZO
+    - Novas tentativas com backoff exponencial e jitter; quando a resposta
+      traz Retry-After (429/503), espera o tempo pedido pela Groq
+    - Disjuntor (circuit breaker): após GROQ_DISJUNTOR_FALHAS falhas
+      seguidas (5xx, timeout, conexão), as chamadas falham na hora durante
+      GROQ_DISJUNTOR_ESPERA segundos; depois uma única chamada de teste
+      decide se o circuito fecha ou abre de novo
+
+Opcionalmente (GROQ_HEDGE_ATIVO), cada tentativa é "protegida" (hedged
+request): se não responder até o percentil GROQ_HEDGE_PERCENTIL das
+latências recentes do modelo, uma cópia idêntica é disparada e vale a
+primeira resposta. A cópia só sai se o limitador de cota tiver folga.
+
+O estado do disjuntor e as latências são expostos em GET /api/ocr/status.
+
+Uso:
+    >>> resposta = chamar_com_resiliencia(
+    ...     lambda timeout: client.chat.completions.create(..., timeout=timeout)
+    ... )
+"""
+
+# 1. Bibliotecas padrão
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, TypeVar
+
+# 2. Bibliotecas externas
+from groq import APIConnectionError, APIStatusError
+
+# 3. Imports locais
+from config import Config
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Classificação dos erros da Groq
+ERRO_LIMITE = 'limite'  # 429: tenta de novo, mas a Groq está respondendo
+ERRO_FALHA = 'falha'    # 5xx, timeout, conexão: tenta de novo e conta no disjuntor
+
+
+class Disjuntor:
+    """
+    Circuit breaker seguro entre threads (fechado → aberto → meio aberto).
+    
+    Fechado: chamadas passam. Aberto: chamadas são recusadas até passar
+    tempo_aberto. Meio aberto: uma única chamada de teste passa; sucesso
+    fecha o circuito, falha abre de novo.
+    
+    Attributes:
+        falhas_para_abrir: Falhas consecutivas que abrem o circuito
+        tempo_aberto: Segundos no estado aberto antes da chamada de teste
+    """
+    
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio_aberto'
+    
+    def __init__(
+        self,
+        falhas_para_abrir: int,
+        tempo_aberto: float,
+        relogio: Callable[[], float] = time.monotonic
+    ):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self._relogio = relogio
+        self._trava = threading.Lock()
+        
+        self._estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._aberturas = 0
+        self._recusadas = 0
+    
+    def permitir(self) -> bool:
+        """
+        Indica se a chamada pode seguir (e reserva a chamada de teste).
+        
+        Returns:
+            bool: False se o circuito está aberto ou o teste já está em andamento
+        """
+        with self._trava:
+            if self._estado == self.ABERTO:
+                if self._relogio() - self._aberto_em < self.tempo_aberto:
+                    self._recusadas += 1
+                    return False
+                self._estado = self.MEIO_ABERTO
+                self._teste_em_andamento = False
+            
+            if self._estado == self.MEIO_ABERTO:
+                if self._teste_em_andamento:
+                    self._recusadas += 1
+                    return False
+                self._teste_em_andamento = True
+            
+            return True
+    
+    def registrar_sucesso(self) -> None:
+        """A Groq respondeu: zera as falhas e fecha o circuito."""
+        with self._trava:
+            if self._estado != self.FECHADO:
+                logger.info("Disjuntor da Groq fechado: chamadas normalizadas")
+            self._estado = self.FECHADO
+            self._falhas = 0
+            self._teste_em_andamento = False
+    
+    def registrar_falha(self) -> None:
+        """Falha da Groq: abre o circuito no limite de falhas ou se o teste falhou."""
+        with self._trava:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._estado == self.MEIO_ABERTO or (
+                self._estado == self.FECHADO and self._falhas >= self.falhas_para_abrir
+            ):
+                self._estado = self.ABERTO
+                self._aberto_em = self._relogio()
+                self._aberturas += 1
+                logger.warning(
+                    f"Disjuntor da Groq aberto após {self._falhas} falha(s) seguidas: "
+                    f"chamadas recusadas por {self.tempo_aberto:.0f}s"
+                )
+    
+    def liberar(self) -> None:
+        """A chamada terminou sem dizer nada sobre a Groq: só libera o teste."""
+        with self._trava:
+            self._teste_em_andamento = False
+    
+    def estado(self) -> dict:
+        """
+        Retorna o estado para monitoramento.
+        
+        Returns:
+            dict: {estado, falhas_consecutivas, aberturas, recusadas, reabre_em}
+                (reabre_em: segundos até a chamada de teste, só quando aberto)
+        """
+        with self._trava:
+            reabre_em = None
+            if self._estado == self.ABERTO:
+                reabre_em = round(max(0.0, self.tempo_aberto - (self._relogio() - self._aberto_em)), 1)
+            return {
+                'estado': self._estado,
+                'falhas_consecutivas': self._falhas,
+                'aberturas': self._aberturas,
+                'recusadas': self._recusadas,
+                'reabre_em': reabre_em,
+            }
+
+
+def classificar_erro(erro: Exception) -> Optional[str]:
+    """
+    Classifica um erro da chamada à Groq.
+    
+    Returns:
+        str: ERRO_LIMITE (429), ERRO_FALHA (5xx, 408, timeout, conexão) ou
+            None para erros que não adianta repetir (chave inválida, 400...)
+    """
+    if isinstance(erro, APIStatusError):
+        if erro.status_code == 429:
+            return ERRO_LIMITE
+        if erro.status_code >= 500 or erro.status_code == 408:
+            return ERRO_FALHA
+        return None
+    if isinstance(erro, (APIConnectionError, TimeoutError, ConnectionError)):
+        return ERRO_FALHA  # APITimeoutError é subclasse de APIConnectionError
+    return None
+
+
+def retry_after(erro: Exception) -> Optional[float]:
+    """
+    Segundos pedidos pela Groq nos cabeçalhos retry-after-ms / Retry-After.
+    
+    Returns:
+        float: Espera em segundos, ou None se a resposta não informou
+    """
+    resposta = getattr(erro, 'response', None)
+    cabecalhos = getattr(resposta, 'headers', None) or {}
+    
+    try:
+        if cabecalhos.get('retry-after-ms'):
+            return max(0.0, float(cabecalhos['retry-after-ms']) / 1000)
+        valor = cabecalhos.get('retry-after')
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            # Formato de data HTTP: "Wed, 21 Oct 2015 07:28:00 GMT"
+            return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def espera_backoff(tentativa: int, pedido: Optional[float] = None) -> float:
+    """
+    Espera antes da próxima tentativa.
+    
+    Sem Retry-After: "full jitter" (aleatório entre 0 e base * 2^tentativa,
+    até GROQ_BACKOFF_MAXIMO), para os workers não voltarem todos juntos.
+    Com Retry-After: o tempo pedido mais um jitter de até GROQ_BACKOFF_BASE.
+    
+    Args:
+        tentativa: Número da tentativa que falhou (0 = primeira)
+        pedido: Segundos do Retry-After, se houver
+    """
+    if pedido is not None:
+        return pedido + random.uniform(0, Config.GROQ_BACKOFF_BASE)
+    return random.uniform(0, min(Config.GROQ_BACKOFF_MAXIMO, Config.GROQ_BACKOFF_BASE * 2 ** tentativa))
+
+
+def chamar_com_resiliencia(
+    funcao: Callable[[float], T],
+    disjuntor: Optional[Disjuntor] = None,
+    dormir: Callable[[float], None] = time.sleep,
+    relogio: Callable[[], float] = time.monotonic
+) -> T:
+    """
+    Executa a chamada com prazo, novas tentativas e disjuntor.
+    
+    Args:
+        funcao: Recebe o timeout (s) da tentativa e faz a chamada à API
+        disjuntor: Disjuntor usado (default: o da Groq, compartilhado)
+        dormir, relogio: Substituíveis nos testes
+    
+    Returns:
+        O retorno de funcao
+    
+    Raises:
+        RuntimeError: 'circuito_aberto: ...' se o disjuntor recusar a chamada,
+            ou 'timeout: ...' se o prazo acabar antes de uma tentativa
+        Exception: O último erro da Groq, quando não vale repetir ou as
+            tentativas/prazo acabaram
+    """
+    disjuntor = disjuntor or get_disjuntor_groq()
+    limite = relogio() + Config.GROQ_PRAZO
+    tentativas = max(1, Config.GROQ_TENTATIVAS)
+    
+    for tentativa in range(tentativas):
+        if not disjuntor.permitir():
+            raise RuntimeError('circuito_aberto: Groq instável, chamadas suspensas temporariamente')
+        
+        restante = limite - relogio()
+        if restante <= 0:
+            disjuntor.liberar()
+            raise RuntimeError(f'timeout: prazo de {Config.GROQ_PRAZO:.0f}s da chamada à Groq esgotado')
+        
+        try:
+            resultado = funcao(min(Config.GROQ_TIMEOUT, restante))
+        except Exception as erro:
+            tipo = classificar_erro(erro)
+            if tipo == ERRO_FALHA:
+                disjuntor.registrar_falha()
+            elif isinstance(erro, APIStatusError):
+                disjuntor.registrar_sucesso()  # A Groq respondeu (429, 400...)
+            else:
+                disjuntor.liberar()
+            
+            if tipo is None or tentativa == tentativas - 1:
+                raise
+            
+            espera = espera_backoff(tentativa, retry_after(erro))
+            if relogio() + espera >= limite:
+                raise
+            
+            logger.warning(
+                f"Chamada à Groq falhou ({type(erro).__name__}), tentativa {tentativa + 1}/{tentativas}; "
+                f"nova tentativa em {espera:.1f}s"
+            )
+            dormir(espera)
+            continue
+        
+        disjuntor.registrar_sucesso()
+        return resultado
+
+
+class MonitorLatencia:
+    """
+    Latências recentes das chamadas por modelo e contadores do hedge.
+    
+    Guarda as últimas `tamanho` latências de cada modelo (janela deslizante)
+    para calcular o atraso a partir do qual uma cópia da chamada é disparada.
+    """
+    
+    def __init__(self, tamanho: int = 200):
+        self.tamanho = tamanho
+        self._trava = threading.Lock()
+        self._janelas: Dict[str, deque] = {}
+        self._hedge = {'disparados': 0, 'vencidos_pela_copia': 0, 'suprimidos_por_cota': 0}
+    
+    def registrar(self, modelo: str, segundos: float) -> None:
+        """Registra a latência de uma chamada concluída com sucesso."""
+        with self._trava:
+            self._janelas.setdefault(modelo, deque(maxlen=self.tamanho)).append(segundos)
+    
+    def percentil(self, modelo: str, percentil: float, minimo_amostras: int = 1) -> Optional[float]:
+        """
+        Percentil (0-100) das latências recentes do modelo.
+        
+        Returns:
+            float: Segundos, ou None com menos de minimo_amostras registradas
+        """
+        with self._trava:
+            amostras = sorted(self._janelas.get(modelo, ()))
+        if not amostras or len(amostras) < minimo_amostras:
+            return None
+        indice = min(len(amostras) - 1, int(len(amostras) * percentil / 100))
+        return amostras[indice]
+    
+    def contar(self, evento: str) -> None:
+        """Soma 1 ao contador do hedge ('disparados', 'vencidos_pela_copia', ...)."""
+        with self._trava:
+            self._hedge[evento] += 1
+    
+    def resumo(self) -> dict:
+        """
+        Resumo para monitoramento.
+        
+        Returns:
+            dict: {'modelos': {modelo: {amostras, p50, p95}}, 'hedge': {contadores}}
+        """
+        with self._trava:
+            modelos = {modelo: len(janela) for modelo, janela in self._janelas.items()}
+            hedge = dict(self._hedge)
+        return {
+            'modelos': {
+                modelo: {
+                    'amostras': amostras,
+                    'p50': round(self.percentil(modelo, 50), 2),
+                    'p95': round(self.percentil(modelo, 95), 2),
+                }
+                for modelo, amostras in modelos.items()
+            },
+            'hedge': hedge,
+        }
+
+
+def atraso_hedge(modelo: str) -> Optional[float]:
+    """
+    Segundos de espera antes de disparar a cópia da chamada ao modelo.
+    
+    Returns:
+        float: Percentil GROQ_HEDGE_PERCENTIL das latências recentes, ou None
+            se o hedge está desligado ou ainda não há GROQ_HEDGE_MINIMO_AMOSTRAS
+    """
+    if not Config.GROQ_HEDGE_ATIVO:
+        return None
+    return get_monitor_latencia().percentil(modelo, Config.GROQ_HEDGE_PERCENTIL, Config.GROQ_HEDGE_MINIMO_AMOSTRAS)
+
+
+def chamar_com_hedge(funcao: Callable[[], T], atraso: float, pode_duplicar: Callable[[], bool]) -> T:
+    """
+    Executa a chamada e, se demorar mais que `atraso`, dispara uma cópia.
+    
+    Vale a primeira resposta bem-sucedida; se uma das duas falhar, espera a
+    outra. A perdedora é cancelada se ainda não começou; se já está em
+    andamento, o SDK síncrono não tem como interromper a requisição HTTP:
+    ela termina em segundo plano (no máximo GROQ_TIMEOUT) e é descartada.
+    
+    Args:
+        funcao: Faz uma requisição completa (chamada duas vezes no hedge)
+        atraso: Segundos de espera pela primeira antes da cópia
+        pode_duplicar: Consultada no momento do hedge; False suprime a cópia
+            (ex: limitador sem folga). Se True, já reservou a cota da cópia
+    
+    Returns:
+        O retorno da primeira chamada bem-sucedida
+    
+    Raises:
+        Exception: O erro da chamada original, se nenhuma tiver sucesso
+    """
+    monitor = get_monitor_latencia()
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='groq-hedge')
+    
+    try:
+        original = executor.submit(funcao)
+        pendentes = {original}
+        
+        concluidos, _ = wait(pendentes, timeout=atraso)
+        if not concluidos:
+            if pode_duplicar():
+                logger.info(f"Chamada à Groq passou de {atraso:.1f}s: disparando cópia (hedge)")
+                monitor.contar('disparados')
+                pendentes.add(executor.submit(funcao))
+            else:
+                monitor.contar('suprimidos_por_cota')
+        
+        while pendentes:
+            concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                if futuro.exception() is None:
+                    if futuro is not original:
+                        monitor.contar('vencidos_pela_copia')
+                    return futuro.result()
+        
+        # Nenhuma teve sucesso: propaga o erro da original
+        return original.result()
+    
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Monitor de latência do processo, compartilhado por todas as threads
+_monitor_latencia = MonitorLatencia()
+
+
+def get_monitor_latencia() -> MonitorLatencia:
+    """Retorna o monitor de latência do processo."""
+    return _monitor_latencia
+
+
+# Disjuntor do processo, compartilhado por todas as threads
+_disjuntor_groq: Optional[Disjuntor] = None
+_disjuntor_trava = threading.Lock()
+
+
+def get_disjuntor_groq() -> Disjuntor:
+    """
+    Retorna o disjuntor singleton configurado com GROQ_DISJUNTOR_*.
+    
+    Returns:
+        Disjuntor: Instância compartilhada do processo
+    """
+    global _disjuntor_groq
+    if _disjuntor_groq is None:
+        with _disjuntor_trava:
+            if _disjuntor_groq is None:
+                _disjuntor_groq = Disjuntor(Config.GROQ_DISJUNTOR_FALHAS, Config.GROQ_DISJUNTOR_ESPERA)
+    return _disjuntor_groq
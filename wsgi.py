@@ -55,7 +55,9 @@ else:
 from app import app as application
 
 
-# Inicializa o banco de dados
+# Inicializa o banco de dados (tabelas novas + migrações de tabelas existentes)
 with application.app_context():
     from models import db
+    from utils.migracoes import aplicar_migracoes
     db.create_all()
+    aplicar_migracoes()